@@ -3,8 +3,9 @@
 # This script creates index.list files with type information to avoid GitHub API calls
 #
 # Format:
-#   dir:dirname  - for directories
-#   filename     - for files
+#   dir:dirname           - for directories
+#   filename<TAB>size     - for files (size in bytes, lets /github mounts
+#                           skip HEAD requests and read large files in ranges)
 
 set -e
 
@@ -32,11 +33,11 @@ generate_index() {
         if [ -d "$dir/$entry" ]; then
             # It's a directory - add with dir: prefix
             echo "dir:$entry" >> "$dir/index.list"
-            ((dir_count++))
+            dir_count=$((dir_count + 1))
         else
-            # It's a file - add without prefix
-            echo "$entry" >> "$dir/index.list"
-            ((file_count++))
+            # It's a file - add without prefix, followed by its size
+            printf '%s\t%s\n' "$entry" "$(wc -c < "$dir/$entry" | tr -d ' ')" >> "$dir/index.list"
+            file_count=$((file_count + 1))
         fi
     done < <(ls -1 "$dir" | grep -v "^index.list$" | grep -v "^\.")
 
@@ -188,6 +188,152 @@ The 'ready' status indicates whether the Java-to-JavaScript conversion is comple
         }
     },
 
+    captureFrame: {
+        name: "captureFrame",
+        description: "Capture the display of an image window as binary frame data for polling clients: raw RGBA or WebP bytes (no base64), optionally cropped to a region, optionally as a delta against the previous frame of the same stream",
+        parameters: {
+            type: "object",
+            properties: {
+                windowTitle: {
+                    type: "string",
+                    description: "Title of the image window to capture. If not specified, captures the active image window."
+                },
+                format: {
+                    type: "string",
+                    enum: ["rgba", "webp"],
+                    description: "Pixel transport: raw RGBA bytes, or a WebP-encoded image",
+                    default: "rgba"
+                },
+                region: {
+                    type: "object",
+                    description: "Crop rectangle {x, y, width, height} in image pixels, applied before transfer"
+                },
+                delta: {
+                    type: "boolean",
+                    description: "Send only the tiles that changed since the previous frame of this stream (rgba), or 'unchanged' with no data",
+                    default: false
+                },
+                streamId: {
+                    type: "string",
+                    description: "Name of the delta stream; each poller should use its own. The 8 most recently used streams are kept, and a stream ends when its image is closed",
+                    default: "default"
+                },
+                quality: {
+                    type: "number",
+                    description: "WebP quality between 0 and 1",
+                    default: 0.8
+                }
+            },
+            required: []
+        },
+        returns: {
+            type: "object",
+            properties: {
+                success: {
+                    type: "boolean",
+                    description: "Whether the frame was captured"
+                },
+                encoding: {
+                    type: "string",
+                    description: "'full', 'delta' (data holds only the listed tiles) or 'unchanged' (no data)",
+                    enum: ["full", "delta", "unchanged"]
+                },
+                format: {
+                    type: "string",
+                    enum: ["rgba", "webp"]
+                },
+                width: {
+                    type: "integer",
+                    description: "Frame width in pixels (after cropping)"
+                },
+                height: {
+                    type: "integer",
+                    description: "Frame height in pixels (after cropping)"
+                },
+                region: {
+                    type: "object",
+                    description: "Captured rectangle {x, y, width, height} in image pixels"
+                },
+                frameId: {
+                    type: "integer",
+                    description: "Sequence number of this frame in its stream"
+                },
+                baseFrameId: {
+                    type: "integer",
+                    description: "Frame a delta applies to"
+                },
+                tiles: {
+                    type: "array",
+                    description: "Delta tiles as [x, y, width, height]; their RGBA rows are concatenated in data"
+                },
+                data: {
+                    description: "Binary frame bytes (a Uint8Array, sent as msgpack bin rather than base64)"
+                },
+                error: {
+                    type: "string",
+                    description: "Error message if capture failed"
+                }
+            }
+        }
+    },
+
+    getPixelData: {
+        name: "getPixelData",
+        description: "Export the raw pixel array of an image (all slices, 8/16/32-bit or RGB) as binary chunks with a header giving shape, dtype and calibration. Call with chunk=0, then fetch chunks 1..chunkCount-1 and place each at its byte offset.",
+        parameters: {
+            type: "object",
+            properties: {
+                windowTitle: {
+                    type: "string",
+                    description: "Title of the image to export. If not specified, exports the active image."
+                },
+                chunk: {
+                    type: "integer",
+                    description: "Index of the chunk to return",
+                    default: 0
+                },
+                maxChunkBytes: {
+                    type: "integer",
+                    description: "Upper bound on the bytes in one chunk (rounded down to whole pixels)",
+                    default: 8388608
+                }
+            },
+            required: []
+        },
+        returns: {
+            type: "object",
+            properties: {
+                success: {
+                    type: "boolean",
+                    description: "Whether the chunk was read"
+                },
+                header: {
+                    type: "object",
+                    description: "{title, imageId, shape [stackSize, height, width], dims {channels, slices, frames} (stack index = c + z*C + t*C*Z), dtype (uint8, uint16, float32 or rgb24 = little-endian 0x00RRGGBB), byteOrder, totalBytes, calibration}"
+                },
+                chunk: {
+                    type: "integer",
+                    description: "Index of this chunk"
+                },
+                chunkCount: {
+                    type: "integer",
+                    description: "Number of chunks for the whole array"
+                },
+                offset: {
+                    type: "integer",
+                    description: "Byte offset of this chunk in the C-ordered array"
+                },
+                data: {
+                    description: "Chunk bytes (a Uint8Array, sent as msgpack bin)"
+                },
+                error: {
+                    type: "string",
+                    description: "Error message if the export failed"
+                }
+            }
+        }
+    },
+
     openImage: {
         name: "openImage",
         description: "Open an image file in ImageJ",
@@ -599,13 +745,17 @@ COMMON PATTERNS FOR JAVASCRIPT-JAVA INTERACTION:
 
     searchExamples: {
         name: "searchExamples",
-        description: "Search examples by keyword in title, description, or content",
+        description: "Search examples by keyword in title, tags, description, or content. Results are ranked by BM25 relevance from the precompiled catalogue (imagej-examples/index.json)",
         parameters: {
             type: "object",
             properties: {
                 query: {
                     type: "string",
                     description: "Search query"
+                },
+                limit: {
+                    type: "integer",
+                    description: "Maximum number of results (default: 20)"
                 }
             },
             required: ["query"]
@@ -620,6 +770,7 @@ COMMON PATTERNS FOR JAVASCRIPT-JAVA INTERACTION:
                         properties: {
                             path: { type: "string" },
                             title: { type: "string" },
+                            score: { type: "number", description: "BM25 relevance (catalogue search only)" },
                             matches: { type: "string", description: "Matching content snippet" }
                         }
                     }
@@ -670,6 +821,12 @@ COMMON PATTERNS FOR JAVASCRIPT-JAVA INTERACTION:
                     type: "boolean",
                     description: "Include ROI properties (name, type, measurements) in GeoJSON properties",
                     default: true
+                },
+                format: {
+                    type: "string",
+                    enum: ["geojson", "packed"],
+                    description: "'geojson' returns a FeatureCollection. 'packed' returns the raw com.hack.ij.RoiPacker buffer (type codes, offsets, float32 coordinates, names) for clients that decode it themselves, e.g. tools/roi_packed.py; use it for large ROI sets",
+                    default: "geojson"
                 }
             },
             required: []
@@ -681,9 +838,16 @@ COMMON PATTERNS FOR JAVASCRIPT-JAVA INTERACTION:
                     type: "boolean",
                     description: "Whether ROIs were retrieved successfully"
                 },
+                format: {
+                    type: "string",
+                    description: "'geojson' or 'packed'"
+                },
                 geojson: {
                     type: "object",
-                    description: "GeoJSON FeatureCollection containing all ROIs"
+                    description: "GeoJSON FeatureCollection containing all ROIs (format 'geojson')"
+                },
+                packed: {
+                    description: "Little-endian RoiPacker buffer as bytes (format 'packed')"
                 },
                 count: {
                     type: "integer",
@@ -740,6 +904,93 @@ COMMON PATTERNS FOR JAVASCRIPT-JAVA INTERACTION:
         }
     },
 
+    ingestRoisPacked: {
+        name: "ingestRoisPacked",
+        description: "Bulk ROI import for large sets (tens of thousands of objects). Send ROIs as com.hack.ij.RoiPacker buffers in chunks under one ingestId, then call with finish=true. Chunks are decoded into ROIs in the JVM, and on finish they are added to the ROI Manager in one pass with its window hidden. tools/roi_packed.py ingest packs a GeoJSON FeatureCollection with the same type mapping as setRoisFromGeoJson.",
+        parameters: {
+            type: "object",
+            properties: {
+                ingestId: {
+                    type: "string",
+                    description: "Client-chosen id that groups the chunks of one import"
+                },
+                packed: {
+                    description: "Little-endian RoiPacker buffer (bytes) with the next chunk of ROIs; omit on a bare finish call"
+                },
+                chunk: {
+                    type: "integer",
+                    description: "Chunk index; chunk 0 discards anything still pending under ingestId",
+                    default: 0
+                },
+                finish: {
+                    type: "boolean",
+                    description: "Add all pending ROIs after this chunk and end the import",
+                    default: false
+                },
+                target: {
+                    type: "string",
+                    enum: ["current", "manager", "both"],
+                    description: "Where to put the ROIs on finish, as in setRoisFromGeoJson",
+                    default: "manager"
+                },
+                clearExisting: {
+                    type: "boolean",
+                    description: "Clear the ROI Manager before adding on finish",
+                    default: false
+                }
+            },
+            required: ["ingestId"]
+        },
+        returns: {
+            type: "object",
+            properties: {
+                success: { type: "boolean" },
+                pending: {
+                    type: "integer",
+                    description: "ROIs received so far under ingestId"
+                },
+                count: {
+                    type: "integer",
+                    description: "ROIs added (finish only)"
+                },
+                error: { type: "string" }
+            }
+        }
+    },
+
+    attachRoiIndex: {
+        name: "attachRoiIndex",
+        description: "Attach a spatial ROI index built by tools/roi_index.py (.ijri) to an image. The ROIs embedded in the index become the image's overlay; an index built with --no-rois must match the overlay already on the image. On a pyramidal LazyImagePlus, each repaint draws only the ROIs whose bounds intersect the visible region, which keeps 100k+ ROI overlays responsive.",
+        parameters: {
+            type: "object",
+            properties: {
+                index: {
+                    description: "Contents of the .ijri file (bytes)"
+                },
+                windowTitle: {
+                    type: "string",
+                    description: "Title of the image window (default: the active image)"
+                }
+            },
+            required: ["index"]
+        },
+        returns: {
+            type: "object",
+            properties: {
+                success: { type: "boolean" },
+                count: {
+                    type: "integer",
+                    description: "Number of ROIs attached"
+                },
+                indexed: {
+                    type: "boolean",
+                    description: "Whether repaints use the index (LazyImagePlus only)"
+                },
+                error: { type: "string" }
+            }
+        }
+    },
+
     getSummary: {
         name: "getSummary",
         description: "Get a comprehensive summary of the current ImageJ state and environment for AI agents to understand the context. Returns information about version, open windows, images, ROIs, tables, logs, and mounted file systems.",
@@ -863,6 +1114,134 @@ async function listExampleFiles() {
     }
 }
 
+// Precompiled examples catalogue (imagej-examples/index.json), built by
+// tools/examples_index.py: metadata, bodies and a BM25 inverted index for
+// every example, plus any delta segments listed in index.segments.json.
+// Fetched and merged once; resolves to null when it is missing, in which
+// case listExamples/searchExamples fall back to reading each example file.
+let examplesCatalogPromise = null;
+
+async function fetchExamplesCatalog() {
+    const response = await fetch('imagej-examples/index.json');
+    if (!response.ok) return null;
+    const base = await response.json();
+    if (base.version !== 1) return null;
+    const manifestResponse = await fetch('imagej-examples/index.segments.json').catch(() => null);
+    const names = manifestResponse && manifestResponse.ok ? (await manifestResponse.json()).deltas : [];
+    const deltas = await Promise.all(names.map(async name => {
+        const deltaResponse = await fetch('imagej-examples/' + name);
+        if (!deltaResponse.ok) throw new Error('Missing examples index segment ' + name);
+        return deltaResponse.json();
+    }));
+    return mergeExampleSegments(base, deltas);
+}
+
+function loadExamplesCatalog() {
+    if (!examplesCatalogPromise) {
+        examplesCatalogPromise = fetchExamplesCatalog()
+            .catch(error => {
+                console.warn('Examples catalogue unavailable:', error);
+                return null;
+            })
+            .then(catalog => {
+                if (!catalog) examplesCatalogPromise = null;  // retry on the next call
+                return catalog;
+            });
+    }
+    return examplesCatalogPromise;
+}
+
+// Fold delta segments over the base catalogue: a path's newest segment wins,
+// tombstones in `deleted` drop it, and docs are renumbered in path order so
+// the result equals a full rebuild (tools/examples_index.py merge_segments).
+// Only the doc list is merged here; each term's postings are merged on first
+// use by examplePostings().
+function mergeExampleSegments(base, deltas) {
+    if (!deltas.length) return base;
+    const segments = [base, ...deltas];
+    const live = new Map();
+    segments.forEach((segment, s) => {
+        for (const path of segment.deleted || []) live.delete(path);
+        segment.docs.forEach((doc, d) => live.set(doc.path, s + ':' + d));
+    });
+    const order = [...live.keys()].sort((a, b) => (a < b ? -1 : a > b ? 1 : 0));
+    const newId = new Map(order.map((path, i) => [live.get(path), i]));
+    const docs = order.map(path => {
+        const [s, d] = live.get(path).split(':');
+        return segments[s].docs[d];
+    });
+    const total = docs.reduce((sum, doc) => sum + doc.length, 0);
+    const avgdl = docs.length ? Math.round(total / docs.length * 1e4) / 1e4 : 0;
+    return { ...base, bm25: { ...base.bm25, avgdl }, docs, terms: {}, segments, newId };
+}
+
+// Postings for one term as [doc, tf, ...] in doc order, or null.
+function examplePostings(catalog, term) {
+    const has = (obj, key) => Object.prototype.hasOwnProperty.call(obj, key);
+    if (has(catalog.terms, term)) return catalog.terms[term];
+    if (!catalog.segments) return null;
+    const pairs = [];
+    catalog.segments.forEach((segment, s) => {
+        const post = has(segment.terms, term) ? segment.terms[term] : [];
+        for (let i = 0; i < post.length; i += 2) {
+            const j = catalog.newId.get(s + ':' + post[i]);
+            if (j !== undefined) pairs.push([j, post[i + 1]]);
+        }
+    });
+    catalog.terms[term] = pairs.length ? pairs.sort((a, b) => a[0] - b[0]).flat() : null;
+    return catalog.terms[term];
+}
+
+function tokenizeExampleText(catalog, text) {
+    const tokenizer = catalog.tokenizer;
+    if (!tokenizer.regex) {
+        tokenizer.regex = new RegExp(tokenizer.pattern, 'g');
+        tokenizer.stop = new Set(tokenizer.stopwords);
+    }
+    return (text.toLowerCase().match(tokenizer.regex) || []).filter(t => !tokenizer.stop.has(t));
+}
+
+function exampleSnippet(body, queryTerms) {
+    const lower = body.toLowerCase();
+    let at = -1;
+    for (const term of queryTerms) {
+        const m = lower.match(new RegExp('(?<![a-z0-9])' + term.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')));
+        if (m && (at < 0 || m.index < at)) at = m.index;
+    }
+    if (at < 0) at = 0;
+    return '...' + body.substring(Math.max(0, at - 50), at + 100) + '...';
+}
+
+// BM25 over the catalogue's inverted index; only the query terms' postings
+// are visited. tools/examples_index.py search() is the reference.
+function searchExamplesCatalog(catalog, query, limit = 20) {
+    const { docs, bm25 } = catalog;
+    const n = docs.length;
+    const avgdl = bm25.avgdl || 1;
+    const queryTerms = [...new Set(tokenizeExampleText(catalog, query))];
+    const scores = new Map();
+    for (const term of queryTerms) {
+        const post = examplePostings(catalog, term);
+        if (!post) continue;
+        const df = post.length / 2;
+        const idf = Math.log(1 + (n - df + 0.5) / (df + 0.5));
+        for (let i = 0; i < post.length; i += 2) {
+            const d = post[i], tf = post[i + 1];
+            const norm = bm25.k1 * (1 - bm25.b + bm25.b * docs[d].length / avgdl);
+            scores.set(d, (scores.get(d) || 0) + idf * tf * (bm25.k1 + 1) / (tf + norm));
+        }
+    }
+    return [...scores]
+        .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+        .slice(0, limit)
+        .map(([d, score]) => ({
+            path: docs[d].path,
+            title: docs[d].title,
+            score: Math.round(score * 1e4) / 1e4,
+            matches: exampleSnippet(docs[d].body, queryTerms)
+        }));
+}
+
 // Get configuration from URL parameters
 function getConfig() {
     const params = new URLSearchParams(window.location.search);
@@ -938,6 +1317,158 @@ async function readVirtualFile(path) {
     });
 }
 
+// Java primitive arrays come back from CheerpJ as typed arrays; fall back to
+// an element copy for anything else.
+async function javaArrayToTyped(javaArray, TypedArray) {
+    if (ArrayBuffer.isView(javaArray)) return javaArray;
+    const length = await javaArray.length;
+    const out = new TypedArray(length);
+    for (let i = 0; i < length; i++) {
+        out[i] = await javaArray[i];
+    }
+    return out;
+}
+
+// Last frame sent on each captureFrame stream, for delta encoding. Each entry
+// holds a full RGBA frame, so at most MAX_FRAME_STREAMS are kept (least
+// recently used go first), and a stream ends when its image is closed.
+const frameStreams = new Map();
+const MAX_FRAME_STREAMS = 8;
+const FRAME_TILE = 64;
+
+function rememberFrame(streamId, frame) {
+    frameStreams.delete(streamId);  // re-insert as most recently used
+    frameStreams.set(streamId, frame);
+    for (const id of frameStreams.keys()) {
+        if (frameStreams.size <= MAX_FRAME_STREAMS) break;
+        frameStreams.delete(id);
+    }
+}
+
+// Drop the streams of images that are no longer open
+async function pruneFrameStreams() {
+    if (frameStreams.size === 0) return;
+    const WindowManager = await window.lib.ij.WindowManager;
+    const open = new Set();
+    const imageIDs = await WindowManager.getIDList();
+    if (imageIDs) {
+        const imageCount = await WindowManager.getImageCount();
+        for (let i = 0; i < imageCount; i++) open.add(await imageIDs[i]);
+    }
+    for (const [streamId, frame] of frameStreams) {
+        if (!open.has(frame.imageId)) frameStreams.delete(streamId);
+    }
+}
+
+// Flatten imp (overlays and ROIs included), crop to region and return RGBA bytes
+async function captureRgba(imp, region) {
+    const flattened = (await imp.flatten()) || (await imp.duplicate());
+    try {
+        let ip = await flattened.getProcessor();
+        if ((await flattened.getBitDepth()) !== 24) ip = await ip.convertToRGB();
+        const fullWidth = await ip.getWidth();
+        const fullHeight = await ip.getHeight();
+        const x = Math.max(0, Math.min(fullWidth - 1, Math.floor(region ? region.x : 0)));
+        const y = Math.max(0, Math.min(fullHeight - 1, Math.floor(region ? region.y : 0)));
+        const width = Math.max(1, Math.min(fullWidth - x, Math.floor(region ? region.width : fullWidth)));
+        const height = Math.max(1, Math.min(fullHeight - y, Math.floor(region ? region.height : fullHeight)));
+        if (width !== fullWidth || height !== fullHeight) {
+            await ip.setRoi(x, y, width, height);
+            ip = await ip.crop();
+        }
+        // ColorProcessor pixels are packed 0xRRGGBB ints
+        const argb = await javaArrayToTyped(await ip.getPixels(), Int32Array);
+        const rgba = new Uint8Array(width * height * 4);
+        for (let i = 0, j = 0; i < argb.length; i++, j += 4) {
+            const c = argb[i];
+            rgba[j] = (c >> 16) & 0xff;
+            rgba[j + 1] = (c >> 8) & 0xff;
+            rgba[j + 2] = c & 0xff;
+            rgba[j + 3] = 0xff;
+        }
+        return { rgba, region: { x, y, width, height } };
+    } finally {
+        await flattened.close();
+    }
+}
+
+// Tiles of cur that differ from prev (same size), with their RGBA rows concatenated
+function diffFrameTiles(prev, cur, width, height) {
+    const tiles = [];
+    const chunks = [];
+    const rowBytes = width * 4;
+    for (let ty = 0; ty < height; ty += FRAME_TILE) {
+        for (let tx = 0; tx < width; tx += FRAME_TILE) {
+            const tw = Math.min(FRAME_TILE, width - tx);
+            const th = Math.min(FRAME_TILE, height - ty);
+            let changed = false;
+            for (let row = ty; row < ty + th && !changed; row++) {
+                const start = row * rowBytes + tx * 4;
+                for (let k = start; k < start + tw * 4; k++) {
+                    if (prev[k] !== cur[k]) { changed = true; break; }
+                }
+            }
+            if (!changed) continue;
+            tiles.push([tx, ty, tw, th]);
+            for (let row = ty; row < ty + th; row++) {
+                const start = row * rowBytes + tx * 4;
+                chunks.push(cur.subarray(start, start + tw * 4));
+            }
+        }
+    }
+    const data = new Uint8Array(chunks.reduce((n, c) => n + c.length, 0));
+    let offset = 0;
+    for (const c of chunks) {
+        data.set(c, offset);
+        offset += c.length;
+    }
+    return { tiles, data };
+}
+
+async function encodeWebp(rgba, width, height, quality) {
+    const canvas = new OffscreenCanvas(width, height);
+    canvas.getContext('2d').putImageData(new ImageData(new Uint8ClampedArray(rgba.buffer), width, height), 0, 0);
+    const blob = await canvas.convertToBlob({ type: 'image/webp', quality });
+    return new Uint8Array(await blob.arrayBuffer());
+}
+
+const PIXEL_DTYPES = { 8: ['uint8', 1], 16: ['uint16', 2], 24: ['rgb24', 4], 32: ['float32', 4] };
+
+// Shape, dtype and calibration of imp, as sent in getPixelData headers
+async function pixelHeader(imp) {
+    const bitDepth = await imp.getBitDepth();
+    const [dtype, bytesPerPixel] = PIXEL_DTYPES[bitDepth];
+    const width = await imp.getWidth();
+    const height = await imp.getHeight();
+    const stackSize = await imp.getStackSize();
+    const cal = await imp.getCalibration();
+    // Calibration fields are not reachable through CheerpJ; derive them from its methods
+    const x0 = await cal.getX(0), y0 = await cal.getY(0), z0 = await cal.getZ(0);
+    const pixelWidth = (await cal.getX(1)) - x0;
+    const pixelHeight = (await cal.getY(1)) - y0;
+    const pixelDepth = (await cal.getZ(1)) - z0;
+    const coefficients = await cal.getCoefficients();
+    return {
+        title: await imp.getTitle(),
+        imageId: await imp.getID(),
+        shape: [stackSize, height, width],
+        dims: { channels: await imp.getNChannels(), slices: await imp.getNSlices(), frames: await imp.getNFrames() },
+        dtype,
+        bitDepth,
+        bytesPerPixel,
+        byteOrder: 'little',
+        totalBytes: stackSize * height * width * bytesPerPixel,
+        calibration: {
+            unit: await cal.getUnit(),
+            pixelWidth, pixelHeight, pixelDepth,
+            origin: [pixelWidth ? -x0 / pixelWidth : 0, pixelHeight ? -y0 / pixelHeight : 0, pixelDepth ? -z0 / pixelDepth : 0],
+            valueUnit: await cal.getValueUnit(),
+            function: await cal.getFunction(),
+            coefficients: coefficients ? Array.from(await javaArrayToTyped(coefficients, Float64Array)) : null
+        }
+    };
+}
+
 // Convert Uint8Array to base64
 function arrayBufferToBase64(buffer) {
     let binary = '';
@@ -949,6 +1480,99 @@ function arrayBufferToBase64(buffer) {
     return btoa(binary);
 }
 
+// Roi.getType() codes, indexed to their Roi.getTypeAsString() names
+const ROI_TYPE_NAMES = ['Rectangle', 'Oval', 'Polygon', 'Freehand', 'Traced', 'Straight Line',
+    'Polyline', 'Freeline', 'Angle', 'Composite', 'Point'];
+const ROI_PACK_MAGIC = 0x50524A49;  // "IJRP", com.hack.ij.RoiPacker.MAGIC
+
+// Serialise ROIs with one com.hack.ij.RoiPacker call instead of several bridge
+// calls per ROI and per vertex. Returns null if parallel-tool.jar predates RoiPacker.
+async function packRois(source) {
+    let RoiPacker = null;
+    try {
+        RoiPacker = await window.lib.com.hack.ij.RoiPacker;
+    } catch (e) {
+        console.log('RoiPacker unavailable:', e.message);
+    }
+    if (!RoiPacker) return null;
+    const packed = await javaArrayToTyped(await RoiPacker.pack(source), Int8Array);
+    return new Uint8Array(packed.buffer, packed.byteOffset, packed.byteLength);
+}
+
+// Decode a RoiPacker buffer into the features roiToGeoJson would produce
+function packedRoisToFeatures(bytes, includeProperties = true) {
+    const buf = bytes.slice().buffer;  // aligned copy for the typed views below
+    const head = new DataView(buf, 0, 32);
+    if (head.getUint32(0, true) !== ROI_PACK_MAGIC) throw new Error('Not a RoiPacker buffer');
+    const r = head.getUint32(8, true), p = head.getUint32(12, true), n = head.getUint32(16, true);
+    let off = 32;
+    const take = (TypedArray, count) => {
+        const a = new TypedArray(buf, off, count);
+        off += a.byteLength;
+        return a;
+    };
+    const partStart = take(Uint32Array, r + 1);
+    const pointStart = take(Uint32Array, p + 1);
+    const stroke = take(Int32Array, r);  // ARGB, 0 when unset
+    const position = take(Int32Array, 3 * r);  // c, z, t per ROI
+    const nameStart = take(Uint32Array, r + 1);
+    const coords = take(Float32Array, 2 * n);
+    const types = take(Uint8Array, r);
+    const sources = take(Uint8Array, r);
+    const nameBytes = new Uint8Array(buf, off, nameStart[r]);
+
+    const ring = (j, close) => {
+        const pts = [];
+        for (let k = pointStart[j]; k < pointStart[j + 1]; k++) {
+            pts.push([coords[2 * k], coords[2 * k + 1]]);
+        }
+        if (close && pts.length > 0) {
+            const [fx, fy] = pts[0], [lx, ly] = pts[pts.length - 1];
+            if (fx !== lx || fy !== ly) pts.push([fx, fy]);
+        }
+        return pts;
+    };
+    const decoder = new TextDecoder();
+    const features = [];
+    let managerIndex = 0;
+    for (let i = 0; i < r; i++) {
+        const type = types[i], first = partStart[i];
+        let geometry;
+        if (type === 10) {
+            const pts = ring(first, false);
+            geometry = pts.length === 1 ? { type: "Point", coordinates: pts[0] }
+                                        : { type: "MultiPoint", coordinates: pts };
+        } else if (type === 5 || type === 6 || type === 7 || type === 8) {
+            geometry = { type: "LineString", coordinates: ring(first, false) };
+        } else if (type === 9) {
+            const geometries = [];
+            for (let j = first; j < partStart[i + 1]; j++) {
+                geometries.push({ type: "Polygon", coordinates: [ring(j, true)] });
+            }
+            geometry = { type: "GeometryCollection", geometries: geometries };
+        } else {
+            geometry = { type: "Polygon", coordinates: [ring(first, true)] };
+        }
+        const properties = {};
+        if (includeProperties) {
+            properties.name = decoder.decode(nameBytes.subarray(nameStart[i], nameStart[i + 1])) || 'Unnamed';
+            properties.type = ROI_TYPE_NAMES[type] || 'Unknown';
+            if (type === 1) properties.shape = 'ellipse';
+            if (sources[i] === 1) {
+                properties.index = managerIndex;
+                properties.source = 'ROI Manager';
+            }
+            if (stroke[i]) properties.strokeColor = '#' + (stroke[i] & 0xFFFFFF).toString(16).padStart(6, '0');
+            ['c', 'z', 't'].forEach((key, k) => {
+                if (position[3 * i + k]) properties[key] = position[3 * i + k];
+            });
+        }
+        if (sources[i] === 1) managerIndex++;
+        features.push({ type: "Feature", geometry: geometry, properties: properties });
+    }
+    return features;
+}
+
 // Helper function to convert ImageJ ROI to GeoJSON geometry
 // Based on QuPath's IJTools.java conversion patterns
 async function roiToGeoJson(roi, roiName = null, includeProperties = true) {
@@ -1559,7 +2183,7 @@ async function connectToHypha() {
 
         // Register ImageJ service
         console.log('Registering ImageJ service...');
-        const service = await hyphaServer.registerService({
+        const serviceApi = {
             type: 'imagej-macro-executor',
             id: config.service_id,
             name: 'ImageJ Macro Executor',
@@ -1806,6 +2430,116 @@ async function connectToHypha() {
                 { __schema__: schemas.takeScreenshot }
             ),
 
+            // Capture a binary frame (raw RGBA / WebP, cropped, optionally delta-encoded)
+            captureFrame: Object.assign(
+                async ({ windowTitle = null, format = 'rgba', region = null, delta = false, streamId = 'default', quality = 0.8 }, context = null) => {
+                    console.log('🌐 Remote call: captureFrame(windowTitle=' + (windowTitle || 'active') + ', format=' + format + ', delta=' + delta + ')');
+
+                    try {
+                        const IJ = window.IJClass || window.IJ;
+                        if (!IJ) throw new Error('ImageJ not initialized');
+                        if (format !== 'rgba' && format !== 'webp') throw new Error('Unsupported frame format: ' + format);
+
+                        let imp;
+                        if (windowTitle) {
+                            const WindowManager = await window.lib.ij.WindowManager;
+                            imp = await WindowManager.getImage(windowTitle);
+                            if (!imp) throw new Error('Image window not found: ' + windowTitle);
+                        } else {
+                            imp = await IJ.getImage();
+                            if (!imp) throw new Error('No image open');
+                        }
+
+                        await pruneFrameStreams();
+                        const imageId = await imp.getID();
+                        const captured = await captureRgba(imp, region);
+                        const { width, height } = captured.region;
+                        const prev = frameStreams.get(streamId);
+                        const frameId = prev ? prev.frameId + 1 : 1;
+                        const sameShape = prev && prev.format === format && prev.imageId === imageId
+                            && ['x', 'y', 'width', 'height'].every(k => prev.region[k] === captured.region[k]);
+                        rememberFrame(streamId, { frameId, imageId, format, region: captured.region, rgba: captured.rgba });
+
+                        const frame = {
+                            success: true, format, width, height, region: captured.region,
+                            frameId, baseFrameId: sameShape && delta ? prev.frameId : null
+                        };
+                        if (delta && sameShape) {
+                            const diff = diffFrameTiles(prev.rgba, captured.rgba, width, height);
+                            if (diff.tiles.length === 0) {
+                                return { ...frame, encoding: 'unchanged', tiles: [], data: new Uint8Array(0) };
+                            }
+                            if (format === 'rgba' && diff.data.length < captured.rgba.length / 2) {
+                                return { ...frame, encoding: 'delta', tileSize: FRAME_TILE, tiles: diff.tiles, data: diff.data };
+                            }
+                        }
+                        const data = format === 'webp'
+                            ? await encodeWebp(captured.rgba, width, height, quality)
+                            : captured.rgba;
+                        console.log(`✓ Frame ${frameId} captured: ${width}x${height} ${format}, ${data.length} bytes`);
+                        return { ...frame, encoding: 'full', baseFrameId: null, tiles: [], data };
+                    } catch (error) {
+                        console.error('✗ Error capturing frame:', error);
+                        return { success: false, error: error.message };
+                    }
+                },
+                { __schema__: schemas.captureFrame }
+            ),
+
+            // Export raw pixels in chunks (NumPy-ready, see tools/pixel_export.py)
+            getPixelData: Object.assign(
+                async ({ windowTitle = null, chunk = 0, maxChunkBytes = 8388608 }, context = null) => {
+                    console.log('🌐 Remote call: getPixelData(windowTitle=' + (windowTitle || 'active') + ', chunk=' + chunk + ')');
+
+                    try {
+                        const IJ = window.IJClass || window.IJ;
+                        if (!IJ) throw new Error('ImageJ not initialized');
+
+                        let imp;
+                        if (windowTitle) {
+                            const WindowManager = await window.lib.ij.WindowManager;
+                            imp = await WindowManager.getImage(windowTitle);
+                            if (!imp) throw new Error('Image window not found: ' + windowTitle);
+                        } else {
+                            imp = await IJ.getImage();
+                            if (!imp) throw new Error('No image open');
+                        }
+
+                        const header = await pixelHeader(imp);
+                        const [stackSize, height, width] = header.shape;
+                        const sliceBytes = height * width * header.bytesPerPixel;
+                        const chunkBytes = Math.max(header.bytesPerPixel,
+                            maxChunkBytes - maxChunkBytes % header.bytesPerPixel);
+                        const chunkCount = Math.max(1, Math.ceil(header.totalBytes / chunkBytes));
+                        if (!(chunk >= 0 && chunk < chunkCount)) {
+                            throw new Error('chunk ' + chunk + ' out of range (chunkCount=' + chunkCount + ')');
+                        }
+                        const offset = chunk * chunkBytes;
+                        const end = Math.min(header.totalBytes, offset + chunkBytes);
+
+                        // Java arrays arrive as typed arrays; view their bytes as-is (little-endian)
+                        const data = new Uint8Array(end - offset);
+                        const stack = await imp.getStack();
+                        for (let s = Math.floor(offset / sliceBytes); s < stackSize && s * sliceBytes < end; s++) {
+                            const pixels = await javaArrayToTyped(await stack.getPixels(s + 1), {
+                                uint8: Int8Array, uint16: Int16Array, rgb24: Int32Array, float32: Float32Array
+                            }[header.dtype]);
+                            const bytes = new Uint8Array(pixels.buffer, pixels.byteOffset, pixels.byteLength);
+                            const from = Math.max(offset, s * sliceBytes);
+                            const to = Math.min(end, (s + 1) * sliceBytes);
+                            data.set(bytes.subarray(from - s * sliceBytes, to - s * sliceBytes), from - offset);
+                        }
+
+                        console.log(`✓ Pixel chunk ${chunk + 1}/${chunkCount}: ${data.length} bytes`);
+                        return { success: true, header, chunk, chunkCount, offset, data };
+                    } catch (error) {
+                        console.error('✗ Error exporting pixels:', error);
+                        return { success: false, error: error.message };
+                    }
+                },
+                { __schema__: schemas.getPixelData }
+            ),
+
             // Open image
             openImage: Object.assign(
                 async ({ path, url }, context = null) => {
@@ -1986,6 +2720,7 @@ async function connectToHypha() {
                             }
                             await imp.close();
                         }
+                        await pruneFrameStreams();
 
                         return { success: true };
                     } catch (error) {
@@ -2292,8 +3027,25 @@ async function connectToHypha() {
 
                     try {
                         await IJ.log('🌐 Remote API Call: listExamples(category=' + category + ', tag=' + tag + ')');
-                        
-                        // Get list of examples from catalog
+
+                        const catalog = await loadExamplesCatalog();
+                        if (catalog) {
+                            const examples = catalog.docs
+                                .filter(doc => (!category || doc.category === category) &&
+                                               (!tag || doc.tags.includes(tag)))
+                                .map(doc => ({
+                                    path: doc.path,
+                                    title: doc.title,
+                                    category: doc.category,
+                                    tags: doc.tags,
+                                    difficulty: doc.difficulty,
+                                    language: doc.language
+                                }));
+                            console.log(`✓ Found ${examples.length} example(s) in catalogue`);
+                            return { examples };
+                        }
+
+                        // No catalogue: read metadata from each example listed in README.md
                         const catalogExamples = await listExampleFiles();
                         const examples = [];
                         
@@ -2362,7 +3114,7 @@ async function connectToHypha() {
 
             // Search examples
             searchExamples: Object.assign(
-                async ({ query }, context = null) => {
+                async ({ query, limit = 20 }, context = null) => {
                     console.log('🌐 Remote call: searchExamples(query=' + query + ')');
 
                     try {
@@ -2370,7 +3122,15 @@ async function connectToHypha() {
                         if (IJ) {
                             await IJ.log('🌐 Remote API Call: searchExamples(query=' + query + ')');
                         }
-                        
+
+                        const catalog = await loadExamplesCatalog();
+                        if (catalog) {
+                            const results = searchExamplesCatalog(catalog, query, limit);
+                            console.log(`✓ Found ${results.length} matching example(s) in catalogue`);
+                            return { examples: results };
+                        }
+
+                        // No catalogue: substring scan over every example file
                         const catalogExamples = await listExampleFiles();
                         const results = [];
                         const queryLower = query.toLowerCase();
@@ -2467,8 +3227,8 @@ async function connectToHypha() {
 
             // Get ROIs as GeoJSON
             getRoisAsGeoJson: Object.assign(
-                async ({ source = 'current', includeProperties = true }, context = null) => {
-                    console.log('🌐 Remote call: getRoisAsGeoJson(source=' + source + ')');
+                async ({ source = 'current', includeProperties = true, format = 'geojson' }, context = null) => {
+                    console.log('🌐 Remote call: getRoisAsGeoJson(source=' + source + ', format=' + format + ')');
 
                     try {
                         const IJ = window.IJClass || window.IJ;
@@ -2476,10 +3236,19 @@ async function connectToHypha() {
 
                         await IJ.log('🌐 Remote API Call: getRoisAsGeoJson(source=' + source + ', includeProperties=' + includeProperties + ')');
 
-                        const features = [];
+                        // One JVM call for every ROI; the per-ROI loops below are the fallback
+                        const packed = await packRois(source);
+                        if (format === 'packed') {
+                            if (!packed) throw new Error('format "packed" needs com.hack.ij.RoiPacker; rebuild parallel-tool.jar');
+                            const count = new DataView(packed.buffer, packed.byteOffset, 32).getUint32(8, true);
+                            await IJ.log(`✓ Packed ${count} ROI(s) into ${packed.byteLength} bytes`);
+                            return { success: true, format: 'packed', packed: packed, count: count };
+                        }
+
+                        const features = packed ? packedRoisToFeatures(packed, includeProperties) : [];
 
                         // Get current ROI from active image
-                        if (source === 'current' || source === 'both') {
+                        if (!packed && (source === 'current' || source === 'both')) {
                             try {
                                 const imp = await IJ.getImage();
                                 if (imp) {
@@ -2497,7 +3266,7 @@ async function connectToHypha() {
                         }
 
                         // Get ROIs from ROI Manager
-                        if (source === 'manager' || source === 'both') {
+                        if (!packed && (source === 'manager' || source === 'both')) {
                             try {
                                 const RoiManager = await window.lib.ij.plugin.frame.RoiManager;
                                 const rm = await RoiManager.getInstance();
@@ -2540,6 +3309,7 @@ async function connectToHypha() {
 
                         return {
                             success: true,
+                            format: 'geojson',
                             geojson: geojson,
                             count: features.length
                         };
@@ -2644,6 +3414,14 @@ async function connectToHypha() {
                             for (const roi of rois) {
                                 await rm.addRoi(roi);
                             }
+                            // A pyramidal image's overlay index no longer matches the manager's ROIs
+                            try {
+                                const LazyImagePlus = await window.lib.com.hack.viewer.LazyImagePlus;
+                                const WindowManager = await window.lib.ij.WindowManager;
+                                if (LazyImagePlus) await LazyImagePlus.overlayChanged(await WindowManager.getCurrentImage());
+                            } catch (e) {
+                                console.log('LazyImagePlus unavailable:', e.message);
+                            }
 
                             await IJ.log(`✓ Added ${rois.length} ROI(s) to ROI Manager`);
                         }
@@ -2692,6 +3470,87 @@ async function connectToHypha() {
                 { __schema__: schemas.setRoisFromGeoJson }
             ),
 
+            // Bulk ROI import in packed chunks (see com.hack.ij.RoiPacker)
+            ingestRoisPacked: Object.assign(
+                async ({ ingestId, packed = null, chunk = 0, finish = false, target = 'manager', clearExisting = false }, context = null) => {
+                    let RoiPacker = null;
+                    try {
+                        const IJ = window.IJClass || window.IJ;
+                        if (!IJ) throw new Error('ImageJ not initialized');
+                        RoiPacker = await window.lib.com.hack.ij.RoiPacker;
+                        if (!RoiPacker) throw new Error('ingestRoisPacked needs com.hack.ij.RoiPacker; rebuild parallel-tool.jar');
+
+                        let pending = 0;
+                        if (packed) {
+                            const bytes = packed instanceof Uint8Array ? packed : new Uint8Array(packed);
+                            pending = await RoiPacker.ingest(ingestId,
+                                new Int8Array(bytes.buffer, bytes.byteOffset, bytes.byteLength), chunk === 0);
+                        }
+                        if (!finish) {
+                            return { success: true, pending: pending };
+                        }
+
+                        const t0 = performance.now();
+                        const count = await RoiPacker.commit(ingestId, target, clearExisting);
+                        console.log(`✓ ingestRoisPacked(${ingestId}): ${count} ROI(s) in ${(performance.now() - t0).toFixed(0)} ms`);
+                        await IJ.log(`✓ Imported ${count} ROI(s) (${target})`);
+                        return { success: true, pending: 0, count: count };
+                    } catch (error) {
+                        console.error('✗ Error ingesting packed ROIs:', error);
+                        if (RoiPacker) {
+                            try { await RoiPacker.abort(ingestId); } catch (e) { /* nothing pending */ }
+                        }
+                        return {
+                            success: false,
+                            error: error.message || error.toString(),
+                            pending: 0,
+                            count: 0
+                        };
+                    }
+                },
+                { __schema__: schemas.ingestRoisPacked }
+            ),
+
+            // Attach a tools/roi_index.py spatial index and its ROIs as the overlay
+            attachRoiIndex: Object.assign(
+                async ({ index, windowTitle = null }, context = null) => {
+                    console.log('🌐 Remote call: attachRoiIndex(windowTitle=' + (windowTitle || 'active') + ')');
+
+                    try {
+                        const IJ = window.IJClass || window.IJ;
+                        if (!IJ) throw new Error('ImageJ not initialized');
+
+                        let imp;
+                        if (windowTitle) {
+                            const WindowManager = await window.lib.ij.WindowManager;
+                            imp = await WindowManager.getImage(windowTitle);
+                            if (!imp) throw new Error('Image window not found: ' + windowTitle);
+                        } else {
+                            imp = await IJ.getImage();
+                            if (!imp) throw new Error('No image open');
+                        }
+
+                        const RoiIndex = await window.lib.com.hack.viewer.RoiIndex;
+                        if (!RoiIndex) throw new Error('attachRoiIndex needs com.hack.viewer.RoiIndex; rebuild parallel-tool.jar');
+                        const bytes = index instanceof Uint8Array ? index : new Uint8Array(index);
+                        const count = await RoiIndex.attach(imp, new Int8Array(bytes.buffer, bytes.byteOffset, bytes.byteLength));
+                        const LazyImagePlus = await window.lib.com.hack.viewer.LazyImagePlus;
+                        const indexed = imp instanceof LazyImagePlus;
+                        await IJ.log(`✓ Attached ${count} indexed ROI(s) to ${await imp.getTitle()}`);
+                        return { success: true, count: count, indexed: indexed };
+                    } catch (error) {
+                        console.error('✗ Error attaching ROI index:', error);
+                        return {
+                            success: false,
+                            error: error.message || error.toString(),
+                            count: 0,
+                            indexed: false
+                        };
+                    }
+                },
+                { __schema__: schemas.attachRoiIndex }
+            ),
+
             // Get comprehensive summary of ImageJ state
             getSummary: Object.assign(
                 async ({ includeLog = true, includeFileSystem = true }, context = null) => {
@@ -3011,12 +3870,16 @@ async function connectToHypha() {
                 },
                 { __schema__: schemas.getSummary }
             )
-        });
+        };
+        const service = await hyphaServer.registerService(serviceApi);
 
         connectedService = service;
 
         // Expose service globally for testing
         window.hyphaService = service;
+        // Handlers by name, so one executeJavaScript call can run several of them
+        // (tools/imagej_client.py batch()).
+        window.imagejServiceApi = serviceApi;
 
         // Build service URL
         const serviceUrl = `${config.server_url}/${hyphaServer.config.workspace}/services/${config.service_id}`;
@@ -3046,6 +3909,7 @@ async function disconnectFromHypha() {
         hyphaServer = null;
         connectedService = null;
         window.hyphaService = null;
+        window.imagejServiceApi = null;
         updateStatus('disconnected', 'Disconnected');
     }
 }
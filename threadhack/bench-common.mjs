@@ -0,0 +1,22 @@
+// Shared setup for the run-*.mjs benchmark drivers. The environment
+// overrides are set by tools/bench_matrix.py (local COOP/COEP server, CI browsers).
+const PUPPETEER = process.env.PUPPETEER || "/Users/weio/.nvm/versions/node/v24.13.0/lib/node_modules/puppeteer/lib/esm/puppeteer/puppeteer.js";
+export const { default: puppeteer } = await import(PUPPETEER);
+export const THREADHACK_BASE = process.env.THREADHACK_BASE || "https://static-serve-0bc5cde8.svc.hypha.aicell.io/imagej-test/threadhack/";
+export const BROWSER = process.env.BROWSER || "chrome";
+const CHEERPJ_CDN = "https://cjrtnc.leaningtech.com/";
+const CHEERPJ_MIRROR = process.env.CHEERPJ_MIRROR || "";
+
+export function launchBrowser() {
+  return puppeteer.launch({ browser: BROWSER, headless: true, args: BROWSER === "chrome" ? ["--no-sandbox"] : [], protocolTimeout: 1200000 });
+}
+
+export async function mirrorCheerpJ(page) {
+  if (!CHEERPJ_MIRROR) return;
+  await page.setRequestInterception(true);
+  page.on("request", (req) => {
+    const u = req.url();
+    if (u.startsWith(CHEERPJ_CDN)) req.continue({ url: CHEERPJ_MIRROR + u.slice(CHEERPJ_CDN.length) });
+    else req.continue();
+  });
+}
@@ -0,0 +1,314 @@
+package com.hack.ij;
+
+import com.hack.viewer.LazyImagePlus;
+
+import ij.ImagePlus;
+import ij.WindowManager;
+import ij.gui.Line;
+import ij.gui.OvalRoi;
+import ij.gui.PointRoi;
+import ij.gui.PolygonRoi;
+import ij.gui.Roi;
+import ij.gui.ShapeRoi;
+import ij.plugin.frame.RoiManager;
+import ij.process.FloatPolygon;
+
+import java.awt.Color;
+import java.awt.geom.Path2D;
+import java.awt.geom.Rectangle2D;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+
+/**
+ * Serialises ROIs into one packed little-endian buffer so JS can export the
+ * whole ROI Manager with a single bridge call instead of several awaited
+ * calls per ROI and per vertex. getRoisAsGeoJson (hypha-imagej-service.js)
+ * calls {@link #pack(String)}; tools/roi_packed.py decodes the result.
+ *
+ * Layout (R rois, P parts, N points; every section 4-byte aligned):
+ *   header      magic "IJRP", u16 version, u16 flags, u32 R, u32 P, u32 N,
+ *               u32 nameBytes, 8 reserved bytes            (32 bytes)
+ *   partStart   u32[R + 1]  first part of ROI i
+ *   pointStart  u32[P + 1]  first point of part j
+ *   stroke      i32[R]      ARGB stroke colour, 0 = none
+ *   position    i32[3R]     channel, slice, frame (0 = unset)
+ *   nameStart   u32[R + 1]  byte offset of ROI i's name
+ *   coords      f32[2N]     x0, y0, x1, y1, ...
+ *   type        u8[R]       Roi.getType() (RECTANGLE = 0 ... POINT = 10)
+ *   source      u8[R]       SOURCE_CURRENT or SOURCE_MANAGER
+ *   names       UTF-8 bytes
+ *
+ * Composite (ShapeRoi) ROIs get one part per sub-ROI; every other type has
+ * exactly one part.
+ *
+ * The same layout also works in reverse for bulk import
+ * (ingestRoisPacked): {@link #ingest} decodes chunks into ROIs that
+ * are held per ingest id, and {@link #commit} adds them all to the
+ * ROI Manager in one pass while its window is hidden.
+ */
+public final class RoiPacker {
+    public static final int MAGIC = 0x50524A49;  // "IJRP" read little-endian
+    public static final int VERSION = 1;
+    public static final int HEADER_BYTES = 32;
+    public static final int SOURCE_CURRENT = 0;
+    public static final int SOURCE_MANAGER = 1;
+
+    /** ROIs decoded by {@link #ingest}, waiting for {@link #commit}. */
+    private static final Map<String, List<Roi>> PENDING = new HashMap<String, List<Roi>>();
+
+    private RoiPacker() {}
+
+    /**
+     * Pack the active image's selection and/or every ROI Manager entry.
+     *
+     * @param source "current", "manager" or "both", as in getRoisAsGeoJson
+     */
+    public static byte[] pack(String source) {
+        List<Roi> rois = new ArrayList<Roi>();
+        List<String> names = new ArrayList<String>();
+        List<Integer> sources = new ArrayList<Integer>();
+        if ("current".equals(source) || "both".equals(source)) {
+            ImagePlus imp = WindowManager.getCurrentImage();
+            Roi roi = imp == null ? null : imp.getRoi();
+            if (roi != null) {
+                rois.add(roi);
+                names.add("Current Selection");
+                sources.add(SOURCE_CURRENT);
+            }
+        }
+        if ("manager".equals(source) || "both".equals(source)) {
+            RoiManager rm = RoiManager.getInstance();
+            Roi[] all = rm == null ? new Roi[0] : rm.getRoisAsArray();
+            for (int i = 0; i < all.length; i++) {
+                String name = all[i].getName();
+                rois.add(all[i]);
+                names.add(name != null && name.length() > 0 ? name : "ROI " + (i + 1));
+                sources.add(SOURCE_MANAGER);
+            }
+        }
+        return pack(rois, names, sources);
+    }
+
+    static byte[] pack(List<Roi> rois, List<String> names, List<Integer> sources) {
+        int r = rois.size();
+        List<float[]> parts = new ArrayList<float[]>();
+        int[] partStart = new int[r + 1];
+        int[] nameStart = new int[r + 1];
+        byte[][] nameBytes = new byte[r][];
+        for (int i = 0; i < r; i++) {
+            partStart[i] = parts.size();
+            addParts(rois.get(i), parts);
+            nameBytes[i] = names.get(i).getBytes(StandardCharsets.UTF_8);
+            nameStart[i + 1] = nameStart[i] + nameBytes[i].length;
+        }
+        int p = parts.size();
+        partStart[r] = p;
+        int n = 0;
+        for (float[] xy : parts) n += xy.length / 2;
+
+        int size = HEADER_BYTES + 4 * ((r + 1) + (p + 1) + r + 3 * r + (r + 1) + 2 * n) + 2 * r + nameStart[r];
+        ByteBuffer buf = ByteBuffer.allocate(size).order(ByteOrder.LITTLE_ENDIAN);
+        buf.putInt(MAGIC).putShort((short) VERSION).putShort((short) 0)
+           .putInt(r).putInt(p).putInt(n).putInt(nameStart[r]).putLong(0L);
+        for (int v : partStart) buf.putInt(v);
+        int point = 0;
+        for (float[] xy : parts) {
+            buf.putInt(point);
+            point += xy.length / 2;
+        }
+        buf.putInt(point);
+        for (Roi roi : rois) {
+            Color c = roi.getStrokeColor();
+            buf.putInt(c == null ? 0 : c.getRGB());
+        }
+        for (Roi roi : rois) {
+            buf.putInt(roi.getCPosition()).putInt(roi.getZPosition()).putInt(roi.getTPosition());
+        }
+        for (int v : nameStart) buf.putInt(v);
+        for (float[] xy : parts) {
+            for (float v : xy) buf.putFloat(v);
+        }
+        for (Roi roi : rois) buf.put((byte) roi.getType());
+        for (Integer s : sources) buf.put(s.byteValue());
+        for (byte[] b : nameBytes) buf.put(b);
+        return buf.array();
+    }
+
+    private static void addParts(Roi roi, List<float[]> parts) {
+        int type = roi.getType();
+        if (roi instanceof ShapeRoi) {
+            Roi[] subs = ((ShapeRoi) roi).getRois();
+            if (subs != null && subs.length > 0) {
+                for (Roi sub : subs) parts.add(interleave(sub.getFloatPolygon()));
+                return;
+            }
+        } else if (roi instanceof Line) {
+            Line line = (Line) roi;
+            parts.add(new float[] {(float) line.x1d, (float) line.y1d, (float) line.x2d, (float) line.y2d});
+            return;
+        } else if (type == Roi.RECTANGLE && roi.getCornerDiameter() == 0) {
+            Rectangle2D.Double b = roi.getFloatBounds();
+            float x0 = (float) b.x, y0 = (float) b.y;
+            float x1 = (float) (b.x + b.width), y1 = (float) (b.y + b.height);
+            parts.add(new float[] {x0, y0, x1, y0, x1, y1, x0, y1});
+            return;
+        }
+        parts.add(interleave(roi.getFloatPolygon()));
+    }
+
+    private static float[] interleave(FloatPolygon poly) {
+        if (poly == null) return new float[0];
+        float[] xy = new float[2 * poly.npoints];
+        for (int i = 0; i < poly.npoints; i++) {
+            xy[2 * i] = poly.xpoints[i];
+            xy[2 * i + 1] = poly.ypoints[i];
+        }
+        return xy;
+    }
+
+    /**
+     * Decode one packed chunk and hold its ROIs under ingestId.
+     *
+     * @param reset drop anything already pending under ingestId (first chunk)
+     * @return number of ROIs now pending under ingestId
+     */
+    public static synchronized int ingest(String ingestId, byte[] chunk, boolean reset) {
+        List<Roi> pending = reset ? null : PENDING.get(ingestId);
+        if (pending == null) {
+            pending = new ArrayList<Roi>();
+            PENDING.put(ingestId, pending);
+        }
+        for (Roi roi : unpack(chunk)) pending.add(roi);
+        return pending.size();
+    }
+
+    /**
+     * Add every ROI pending under ingestId to the ROI Manager and/or set the
+     * last one on the active image.
+     *
+     * @param target "current", "manager" or "both", as in setRoisFromGeoJson
+     * @return number of ROIs committed
+     */
+    public static synchronized int commit(String ingestId, String target, boolean clearExisting) {
+        List<Roi> rois = PENDING.remove(ingestId);
+        if (rois == null || rois.isEmpty()) return 0;
+        if ("manager".equals(target) || "both".equals(target)) {
+            RoiManager rm = RoiManager.getInstance();
+            if (rm == null) rm = new RoiManager();
+            if (clearExisting) rm.reset();
+            // Hidden, the manager skips a list repaint per addRoi
+            boolean shown = rm.isVisible();
+            rm.setVisible(false);
+            try {
+                for (Roi roi : rois) rm.addRoi(roi);
+            } finally {
+                rm.setVisible(shown);
+            }
+            LazyImagePlus.overlayChanged(WindowManager.getCurrentImage());
+        }
+        if ("current".equals(target) || "both".equals(target)) {
+            ImagePlus imp = WindowManager.getCurrentImage();
+            if (imp != null) imp.setRoi(rois.get(rois.size() - 1));
+        }
+        return rois.size();
+    }
+
+    /** Discard ROIs pending under ingestId. */
+    public static synchronized void abort(String ingestId) {
+        PENDING.remove(ingestId);
+    }
+
+    /** Build ROIs from a buffer in the {@link #pack} layout. */
+    public static Roi[] unpack(byte[] bytes) {
+        ByteBuffer buf = ByteBuffer.wrap(bytes).order(ByteOrder.LITTLE_ENDIAN);
+        if (bytes.length < HEADER_BYTES || buf.getInt(0) != MAGIC) {
+            throw new IllegalArgumentException("not a RoiPacker buffer");
+        }
+        if (buf.getShort(4) != VERSION) {
+            throw new IllegalArgumentException("unsupported RoiPacker version " + buf.getShort(4));
+        }
+        int r = buf.getInt(8), p = buf.getInt(12), n = buf.getInt(16), nameLen = buf.getInt(20);
+        int partAt = HEADER_BYTES;
+        int pointAt = partAt + 4 * (r + 1);
+        int strokeAt = pointAt + 4 * (p + 1);
+        int positionAt = strokeAt + 4 * r;
+        int nameAt = positionAt + 12 * r;
+        int coordAt = nameAt + 4 * (r + 1);
+        int typeAt = coordAt + 8 * n;
+        int textAt = typeAt + 2 * r;
+        if (textAt + nameLen != bytes.length) {
+            throw new IllegalArgumentException("RoiPacker buffer is " + bytes.length + " bytes, header says "
+                    + (textAt + nameLen));
+        }
+        Roi[] rois = new Roi[r];
+        for (int i = 0; i < r; i++) {
+            int firstPart = buf.getInt(partAt + 4 * i), endPart = buf.getInt(partAt + 4 * (i + 1));
+            int type = buf.get(typeAt + i);
+            Roi roi;
+            if (type == Roi.COMPOSITE) {
+                Path2D.Float path = new Path2D.Float();
+                for (int j = firstPart; j < endPart; j++) {
+                    FloatPolygon poly = polygon(buf, coordAt, buf.getInt(pointAt + 4 * j), buf.getInt(pointAt + 4 * (j + 1)));
+                    if (poly.npoints == 0) continue;
+                    path.moveTo(poly.xpoints[0], poly.ypoints[0]);
+                    for (int k = 1; k < poly.npoints; k++) path.lineTo(poly.xpoints[k], poly.ypoints[k]);
+                    path.closePath();
+                }
+                roi = new ShapeRoi(path);
+            } else {
+                FloatPolygon poly = polygon(buf, coordAt, buf.getInt(pointAt + 4 * firstPart),
+                        buf.getInt(pointAt + 4 * (firstPart + 1)));
+                roi = toRoi(type, poly);
+            }
+            int nameStart = buf.getInt(nameAt + 4 * i), nameEnd = buf.getInt(nameAt + 4 * (i + 1));
+            String name = new String(bytes, textAt + nameStart, nameEnd - nameStart, StandardCharsets.UTF_8);
+            roi.setName(name.length() > 0 ? name : "Unnamed");
+            int argb = buf.getInt(strokeAt + 4 * i);
+            if (argb != 0) roi.setStrokeColor(new Color(argb, true));
+            int c = buf.getInt(positionAt + 12 * i), z = buf.getInt(positionAt + 12 * i + 4),
+                t = buf.getInt(positionAt + 12 * i + 8);
+            if (c != 0 || z != 0 || t != 0) roi.setPosition(c, z, t);
+            rois[i] = roi;
+        }
+        return rois;
+    }
+
+    private static Roi toRoi(int type, FloatPolygon poly) {
+        switch (type) {
+            case Roi.RECTANGLE:
+            case Roi.OVAL: {
+                Rectangle2D.Double b = poly.getFloatBounds();
+                return type == Roi.OVAL ? new OvalRoi(b.x, b.y, b.width, b.height)
+                                        : new Roi(b.x, b.y, b.width, b.height);
+            }
+            case Roi.LINE:
+                return new Line(poly.xpoints[0], poly.ypoints[0], poly.xpoints[1], poly.ypoints[1]);
+            case Roi.POINT:
+                return new PointRoi(poly);
+            case Roi.POLYGON:
+            case Roi.FREEROI:
+            case Roi.TRACED_ROI:
+            case Roi.POLYLINE:
+            case Roi.FREELINE:
+            case Roi.ANGLE:
+                return new PolygonRoi(poly, type);
+            default:
+                throw new IllegalArgumentException("unsupported ROI type " + type);
+        }
+    }
+
+    private static FloatPolygon polygon(ByteBuffer buf, int coordAt, int first, int end) {
+        int count = end - first;
+        float[] xs = new float[count], ys = new float[count];
+        for (int k = 0; k < count; k++) {
+            xs[k] = buf.getFloat(coordAt + 8 * (first + k));
+            ys[k] = buf.getFloat(coordAt + 8 * (first + k) + 4);
+        }
+        return new FloatPolygon(xs, ys, count);
+    }
+}
@@ -84,14 +84,15 @@ public class LazyImageCanvas extends ImageCanvas {
             // Standard overlay + ROI rendering via public Roi.draw(Graphics)
             // — internally Roi.draw calls ic.screenX/Y which transforms
             // level-0 → display via srcRect + magnification.
+            // With a RoiIndex attached, only ROIs intersecting srcRect are
+            // visited, so repaint cost follows what is on screen.
             Overlay overlay = imp.getOverlay();
             if (overlay != null) {
-                for (int i = 0; i < overlay.size(); i++) {
-                    Roi r = overlay.get(i);
-                    if (r != null) {
-                        r.setImage(imp);
-                        r.draw(g);
-                    }
+                RoiIndex index = lip.overlayIndexFor(overlay);
+                if (index != null) {
+                    for (int i : index.query(srcRect)) drawOverlayRoi(g, overlay.get(i));
+                } else {
+                    for (int i = 0; i < overlay.size(); i++) drawOverlayRoi(g, overlay.get(i));
                 }
             }
             Roi roi = imp.getRoi();
@@ -104,6 +105,13 @@ public class LazyImageCanvas extends ImageCanvas {
         }
     }
 
+    private void drawOverlayRoi(Graphics g, Roi r) {
+        if (r != null) {
+            r.setImage(imp);
+            r.draw(g);
+        }
+    }
+
     @Override
     public void update(Graphics g) { paint(g); }
 
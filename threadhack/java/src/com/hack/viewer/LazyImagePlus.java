@@ -4,6 +4,7 @@ import ij.IJ;
 import ij.ImagePlus;
 import ij.gui.ImageCanvas;
 import ij.gui.ImageWindow;
+import ij.gui.Overlay;
 import ij.gui.Toolbar;
 import ij.process.ByteProcessor;
 
@@ -73,6 +74,11 @@ public class LazyImagePlus extends ImagePlus {
     /** Last chosen pyramid level (for title + println). */
     private int currentLevel = 0;
 
+    /** Spatial index over the overlay, set by RoiIndex.attach; null = draw all. */
+    private volatile RoiIndex overlayIndex;
+    /** The overlay instance the index was attached with. */
+    private Overlay indexedOverlay;
+
     public LazyImagePlus(String title, TileSource src) {
         super();
         this.src = src;
@@ -211,6 +217,52 @@ public class LazyImagePlus extends ImagePlus {
     public int viewportHeight() { return viewH; }
     public int getCurrentLevel() { return currentLevel; }
 
+    public RoiIndex getOverlayIndex() { return overlayIndex; }
+
+    /**
+     * Let the canvas draw only the ROIs of overlay that the index finds in
+     * srcRect. Null clears the index.
+     */
+    public void setOverlayIndex(RoiIndex index, Overlay overlay) {
+        indexedOverlay = index == null ? null : overlay;
+        overlayIndex = index;  // volatile write last: readers see the field above
+        if (lazyCanvas != null) lazyCanvas.repaint();
+    }
+
+    /**
+     * Drop the overlay index after an edit that keeps the Overlay instance
+     * and its size, e.g. a ROI replaced or moved with setLocation. Overlay
+     * has no change listener, so such edits must call this; setOverlay,
+     * RoiIndex.attach and the ROI Manager import paths already do.
+     */
+    public void invalidateOverlayIndex() {
+        if (overlayIndex != null) setOverlayIndex(null, null);
+    }
+
+    /** {@link #invalidateOverlayIndex()} when imp is a LazyImagePlus. */
+    public static void overlayChanged(ImagePlus imp) {
+        if (imp instanceof LazyImagePlus) ((LazyImagePlus) imp).invalidateOverlayIndex();
+    }
+
+    /**
+     * The index if it still describes overlay, else null (and the index is
+     * dropped). O(1) per repaint: the overlay must be the instance the
+     * index was attached with and still hold as many ROIs.
+     */
+    RoiIndex overlayIndexFor(Overlay overlay) {
+        RoiIndex index = overlayIndex;
+        if (index == null) return null;
+        if (overlay == indexedOverlay && overlay.size() == index.size()) return index;
+        invalidateOverlayIndex();
+        return null;
+    }
+
+    @Override
+    public void setOverlay(Overlay overlay) {
+        if (overlay != indexedOverlay) invalidateOverlayIndex();
+        super.setOverlay(overlay);
+    }
+
     /**
      * Resize the viewport to (w, h) canvas pixels, keeping the image centre
      * and magnification fixed; srcRect grows / shrinks so the new canvas
@@ -363,6 +415,9 @@ public class LazyImagePlus extends ImagePlus {
         try {
             Rectangle sr = currentSrcRectOrDefault();
             double mag = currentMagnificationOrDefault();
+            // Replayable by tools/tile_trace.py — keep the format stable.
+            System.out.println("[LazyImagePlus] view x=" + sr.x + " y=" + sr.y
+                    + " w=" + sr.width + " h=" + sr.height + " mag=" + mag);
             int lvl = pickLevelFor(mag);
             logLevelChange(lvl, mag);
             double sf = src.levelScaleFactor(lvl);
@@ -0,0 +1,154 @@
+package com.hack.viewer;
+
+import com.hack.ij.RoiPacker;
+
+import ij.ImagePlus;
+import ij.gui.Overlay;
+import ij.gui.Roi;
+
+import java.awt.Rectangle;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.util.Arrays;
+
+/**
+ * Uniform-grid spatial index over overlay ROI bounding boxes, built offline
+ * by tools/roi_index.py. {@link LazyImageCanvas} asks it for the ROIs that
+ * intersect srcRect and draws only those. With 100k+ ROIs on a whole-slide
+ * image, a repaint then costs time in proportion to what is on screen.
+ *
+ * Layout (little-endian, 4-byte aligned):
+ *   header     magic "IJRI", u16 version, u16 flags, u32 R, u32 cols,
+ *              u32 rows, u32 M, u32 L, f32 x0, f32 y0, f32 cellW,
+ *              f32 cellH, u32 packedBytes                   (48 bytes)
+ *   bounds     f32[4R]             minX, minY, maxX, maxY per ROI
+ *   cellStart  u32[cols * rows + 1] CSR offsets into items, row-major
+ *   items      u32[M]              ROI ids per cell, ascending
+ *   large      u32[L]              ROIs spanning too many cells; always tested
+ *   packed     RoiPacker buffer with the ROIs in id order (may be empty)
+ */
+public final class RoiIndex {
+    public static final int MAGIC = 0x49524A49;  // "IJRI" read little-endian
+    public static final int VERSION = 1;
+    public static final int HEADER_BYTES = 48;
+
+    private final int count, cols, rows;
+    private final float x0, y0, cellW, cellH;
+    private final float[] bounds;
+    private final int[] cellStart, items, large;
+    private final byte[] packed;
+    /** Per-ROI stamp of the last query that reported it, to dedupe across cells. */
+    private final int[] seen;
+    private int stamp;
+
+    private RoiIndex(ByteBuffer buf, byte[] bytes) {
+        if (bytes.length < HEADER_BYTES || buf.getInt(0) != MAGIC) {
+            throw new IllegalArgumentException("not a RoiIndex buffer");
+        }
+        if (buf.getShort(4) != VERSION) {
+            throw new IllegalArgumentException("unsupported RoiIndex version " + buf.getShort(4));
+        }
+        count = buf.getInt(8);
+        cols = buf.getInt(12);
+        rows = buf.getInt(16);
+        int m = buf.getInt(20), l = buf.getInt(24);
+        x0 = buf.getFloat(28);
+        y0 = buf.getFloat(32);
+        cellW = buf.getFloat(36);
+        cellH = buf.getFloat(40);
+        int packedBytes = buf.getInt(44);
+        buf.position(HEADER_BYTES);
+        bounds = new float[4 * count];
+        buf.asFloatBuffer().get(bounds);
+        buf.position(buf.position() + 16 * count);
+        cellStart = readInts(buf, cols * rows + 1);
+        items = readInts(buf, m);
+        large = readInts(buf, l);
+        packed = Arrays.copyOfRange(bytes, buf.position(), buf.position() + packedBytes);
+        seen = new int[count];
+    }
+
+    private static int[] readInts(ByteBuffer buf, int n) {
+        int[] out = new int[n];
+        buf.asIntBuffer().get(out);
+        buf.position(buf.position() + 4 * n);
+        return out;
+    }
+
+    public static RoiIndex fromBytes(byte[] bytes) {
+        return new RoiIndex(ByteBuffer.wrap(bytes).order(ByteOrder.LITTLE_ENDIAN), bytes);
+    }
+
+    /**
+     * Load an index onto imp. Embedded ROIs replace imp's overlay; an index
+     * built without them (roi_index.py --no-rois) must describe the overlay
+     * already there. On a LazyImagePlus the index then decides which
+     * overlay ROIs get drawn.
+     *
+     * @return number of ROIs attached
+     */
+    public static int attach(ImagePlus imp, byte[] bytes) {
+        RoiIndex index = fromBytes(bytes);
+        Overlay overlay = index.packed.length > 0 ? new Overlay() : imp.getOverlay();
+        if (index.packed.length > 0) {
+            for (Roi roi : RoiPacker.unpack(index.packed)) overlay.add(roi);
+        }
+        int n = overlay == null ? 0 : overlay.size();
+        if (n != index.count) {
+            throw new IllegalArgumentException("index has " + index.count + " ROIs but the overlay has " + n);
+        }
+        if (overlay != null) imp.setOverlay(overlay);
+        if (imp instanceof LazyImagePlus) ((LazyImagePlus) imp).setOverlayIndex(index, overlay);
+        return index.count;
+    }
+
+    public int size() { return count; }
+
+    /** Ids (ascending) of ROIs whose bounds intersect r, in level-0 pixels. */
+    public synchronized int[] query(Rectangle r) {
+        return query(r.x, r.y, r.x + r.width, r.y + r.height);
+    }
+
+    public synchronized int[] query(double minX, double minY, double maxX, double maxY) {
+        if (++stamp == 0) {
+            Arrays.fill(seen, 0);
+            stamp = 1;
+        }
+        int c0 = clamp((int) Math.floor((minX - x0) / cellW), cols);
+        int c1 = clamp((int) Math.floor((maxX - x0) / cellW), cols);
+        int r0 = clamp((int) Math.floor((minY - y0) / cellH), rows);
+        int r1 = clamp((int) Math.floor((maxY - y0) / cellH), rows);
+        int[] hits = new int[64];
+        int n = 0;
+        for (int row = r0; row <= r1; row++) {
+            for (int col = c0; col <= c1; col++) {
+                int cell = row * cols + col;
+                for (int k = cellStart[cell]; k < cellStart[cell + 1]; k++) {
+                    int id = items[k];
+                    if (seen[id] == stamp || !intersects(id, minX, minY, maxX, maxY)) continue;
+                    seen[id] = stamp;
+                    if (n == hits.length) hits = Arrays.copyOf(hits, 2 * n);
+                    hits[n++] = id;
+                }
+            }
+        }
+        for (int id : large) {
+            if (seen[id] == stamp || !intersects(id, minX, minY, maxX, maxY)) continue;
+            seen[id] = stamp;
+            if (n == hits.length) hits = Arrays.copyOf(hits, 2 * n);
+            hits[n++] = id;
+        }
+        int[] out = Arrays.copyOf(hits, n);
+        Arrays.sort(out);  // keep overlay (z) order
+        return out;
+    }
+
+    private boolean intersects(int id, double minX, double minY, double maxX, double maxY) {
+        return bounds[4 * id] <= maxX && bounds[4 * id + 2] >= minX
+            && bounds[4 * id + 1] <= maxY && bounds[4 * id + 3] >= minY;
+    }
+
+    private static int clamp(int v, int n) {
+        return v < 0 ? 0 : (v >= n ? n - 1 : v);
+    }
+}
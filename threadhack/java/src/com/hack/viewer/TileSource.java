@@ -22,7 +22,11 @@ public interface TileSource {
     int levelHeight(int level);
     double levelScaleFactor(int level);
 
-    /** 8 / 16 / 32. JS-side rescale to 8-bit happens before this method returns. */
+    /**
+     * 8 / 16 / 32. JS-side rescale to 8-bit happens before getTile returns —
+     * or is skipped entirely when the provider serves precomputed display
+     * tiles (tools/build_pyramid.py), in which case this is the raw depth.
+     */
     int bitsPerSample();
 
     /**
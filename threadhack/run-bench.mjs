@@ -1,6 +1,6 @@
-import puppeteer from "/Users/weio/.nvm/versions/node/v24.13.0/lib/node_modules/puppeteer/lib/esm/puppeteer/puppeteer.js";
+import { THREADHACK_BASE, launchBrowser, mirrorCheerpJ } from "./bench-common.mjs";
 
-const BASE = "https://static-serve-0bc5cde8.svc.hypha.aicell.io/imagej-test/threadhack/test-bench.html";
+const BASE = THREADHACK_BASE + "test-bench.html";
 const POOL = parseInt(process.env.POOL || "4");
 const JOBS = parseInt(process.env.JOBS || (POOL * 2));
 const WORK = parseInt(process.env.WORK || "20000000");
@@ -8,9 +8,10 @@ const WORK = parseInt(process.env.WORK || "20000000");
 const url = `${BASE}?pool=${POOL}&jobs=${JOBS}&work=${WORK}&cb=${Date.now()}`;
 console.log(`\n=== bench: pool=${POOL} jobs=${JOBS} work=${WORK} ===`);
 
-const browser = await puppeteer.launch({ headless: true, args: ["--no-sandbox"], protocolTimeout: 1200000 });
+const browser = await launchBrowser();
 const page = await browser.newPage();
 await page.setCacheEnabled(true);   // cache ON so preload actually helps
+await mirrorCheerpJ(page);
 page.on("console", (m) => { if (["error","warn","log"].includes(m.type())) console.log(`  [${m.type()}] ${m.text()}`); });
 page.on("pageerror", (e) => console.log(`  [pageerror] ${e.message}`));
 
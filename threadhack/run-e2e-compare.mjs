@@ -1,10 +1,14 @@
-import puppeteer from "/Users/weio/.nvm/versions/node/v24.13.0/lib/node_modules/puppeteer/lib/esm/puppeteer/puppeteer.js";
-const URL = "https://static-serve-0bc5cde8.svc.hypha.aicell.io/imagej-test/threadhack/test-e2e.html";
+import { THREADHACK_BASE, launchBrowser, mirrorCheerpJ } from "./bench-common.mjs";
+const URL = THREADHACK_BASE + "test-e2e.html";
+const POOLS = (process.env.POOLS || "1,6").split(",").map((p) => parseInt(p));
+// MACRO=bench|morpholibj runs a preset from macros/ instead of the inline stack macro.
+const MACRO = process.env.MACRO || "";
 
 async function runWith(pool) {
-  const browser = await puppeteer.launch({ headless: true, args: ["--no-sandbox"], protocolTimeout: 1200000 });
+  const browser = await launchBrowser();
   const page = await browser.newPage();
   await page.setCacheEnabled(true);
+  await mirrorCheerpJ(page);
   const logs = [];
   page.on("console", (m) => { if (m.type() === "log") logs.push(m.text()); });
   await page.goto(URL + "?cb=" + Date.now(), { waitUntil: "domcontentloaded" });
@@ -16,9 +20,13 @@ async function runWith(pool) {
     if (s.includes("ready")) break;
     await new Promise(r => setTimeout(r, 1500));
   }
-  // big stack that triggers PARALLELIZE_STACKS
-  await page.evaluate(() => {
-    document.getElementById("macro").value = `
+  if (MACRO) {
+    await page.select("#preset", MACRO);
+    await page.waitForFunction(() => !document.getElementById("macro").value.startsWith("(load"));
+  } else {
+    // big stack that triggers PARALLELIZE_STACKS
+    await page.evaluate(() => {
+      document.getElementById("macro").value = `
 setBatchMode(true);
 newImage("t", "8-bit noise", 1024, 1024, 16);
 t0 = getTime();
@@ -30,7 +38,8 @@ mms = getTime() - t0;
 close();
 "gauss_ms=" + gms + " median_ms=" + mms;
 `;
-  });
+    });
+  }
   // run macro
   await page.$eval("#run", b => b.click());
   for (let i = 0; i < 100; i++) {
@@ -45,9 +54,13 @@ close();
   console.log(`\nPool=${pool} stats=${stats.replace(/\s+/g," ")}`);
   console.log(`Pool=${pool} elapsed="${elapsed}"`);
   console.log(`Pool=${pool} result=${out}`);
+  if (MACRO) {
+    console.log(`[config] POOL=${pool} MACRO=${MACRO}`);
+    for (const l of logs) console.log(`  [log] ${l}`);
+  }
   await browser.close();
 }
 
-for (const p of [1, 6]) {
+for (const p of POOLS) {
   await runWith(p);
 }
@@ -112,6 +112,9 @@
   // JS-side data sources register themselves as window.__tileSources[key].
   // A provider has shape: { levels:[{w,h,scaleFactor}], bitsPerSample,
   //   async getRegion(level,x,y,w,h) -> { data: TypedArray, width, height } }
+  // Providers backed by tools/build_pyramid.py output may also expose
+  //   async getDisplayRegion(level,x,y,w,h) -> { data: Uint8Array, ... }
+  // serving pre-rescaled 8-bit tiles; those bypass autoStretchToU8.
   window.__tileSources = window.__tileSources || {};
 
   function getSrc(key) {
@@ -150,6 +153,19 @@
     return out;
   }
 
+  // 8-bit bytes for a region: precomputed display tiles when the provider
+  // has them, otherwise raw samples stretched in the browser.
+  async function getU8Region(src, key, level, x, y, w, h) {
+    if (typeof src.getDisplayRegion === 'function') {
+      var disp = await src.getDisplayRegion(level, x, y, w, h);
+      return disp.data || new Uint8Array(w * h);
+    }
+    var region = await src.getRegion(level, x, y, w, h);
+    return region.data
+      ? autoStretchToU8(region.data, src.bitsPerSample || 8, key + '|' + level)
+      : new Uint8Array(w * h);
+  }
+
   // ---- BrowserFilePicker natives (File > Open / Save As) ---------------
   // Delegates to the HTML dialog exposed as window.hfs.* by file-browser.js.
   var filePickerNatives = {
@@ -201,12 +217,7 @@
     Java_com_hack_viewer_JSTileSource_nativeLevelHeight:   async function (lib, key, level) { return getSrc(key).levels[level].h; },
     Java_com_hack_viewer_JSTileSource_nativeLevelScale:    async function (lib, key, level) { return getSrc(key).levels[level].scaleFactor; },
     Java_com_hack_viewer_JSTileSource_nativeGetTile: async function (lib, key, level, x, y, w, h) {
-      var src = getSrc(key);
-      var region = await src.getRegion(level, x, y, w, h);
-      if (!region.data) {
-        return new Int8Array(w * h); // black tile
-      }
-      var u8 = autoStretchToU8(region.data, src.bitsPerSample || 8, key + '|' + level);
+      var u8 = await getU8Region(getSrc(key), key, level, x, y, w, h);
       return new Int8Array(u8.buffer, u8.byteOffset, u8.byteLength);
     },
     /**
@@ -219,11 +230,7 @@
       console.log('[tile] req id=' + id + ' L' + level + ' ' + w + 'x' + h);
       (async function () {
         try {
-          var src = getSrc(key);
-          var region = await src.getRegion(level, x, y, w, h);
-          var bytes = region.data
-            ? autoStretchToU8(region.data, src.bitsPerSample || 8, key + '|' + level)
-            : new Uint8Array(w * h);
+          var bytes = await getU8Region(getSrc(key), key, level, x, y, w, h);
           console.log('[tile] fetched id=' + id + ' bytes=' + bytes.length);
           var javaBytes = new Int8Array(bytes.buffer, bytes.byteOffset, bytes.byteLength);
           window.__tileDeliverTail = (window.__tileDeliverTail || Promise.resolve()).then(async function () {
@@ -8,6 +8,10 @@
 //  Supports:
 //    - .tif / .ome.tif   — geotiff.js, SUBIFD-aware pyramids
 //    - .zarr             — zarrita, OME multiscales
+//    - manifest.json     — tile pyramids from tools/build_pyramid.py,
+//                          with precomputed 8-bit display tiles
+//    - .ijtp             — the same pyramid packed into one file,
+//                          read with HTTP Range requests
 // ============================================================
 
 console.log("[ome-loader] module evaluated");
@@ -26,7 +30,9 @@ const STATUS_ID = "__ome_loader_status__";
 
   try {
     setStatus("reading metadata…");
-    const provider = /\.zarr(\/|$)/.test(url) ? await zarrProvider(url) : await tiffProvider(url);
+    const provider = /\.ijtp$/.test(url) ? await containerProvider(url)
+      : /manifest\.json$/.test(url) ? await pyramidProvider(url)
+      : /\.zarr(\/|$)/.test(url) ? await zarrProvider(url) : await tiffProvider(url);
     const key = "ome:" + (titleFromUrl(url) || "img");
     window.__tileSources[key] = provider;
     window.__omeProvider = provider;
@@ -172,5 +178,143 @@ async function zarrProvider(url) {
   };
 }
 
+async function pyramidProvider(url) {
+  // Directory pyramid written by tools/build_pyramid.py: one file per tile,
+  // located through the manifest's rawTile / displayTile templates.
+  const manifest = await (await fetch(url)).json();
+  if (manifest.format !== "imagej-pyramid") throw new Error("not an imagej-pyramid manifest");
+  const base = url.replace(/[^/]*$/, "");
+  const templates = { raw: manifest.rawTile, display: manifest.displayTile };
+  return tiledProvider(url, manifest, async (kind, level, row, c0, c1) => {
+    const bufs = [];
+    for (let col = c0; col < c1; col++) {
+      const path = templates[kind].replace("{level}", level).replace("{row}", row).replace("{col}", col);
+      bufs.push(fetch(base + path).then(r => {
+        if (!r.ok) throw new Error(path + ": HTTP " + r.status);
+        return r.arrayBuffer();
+      }));
+    }
+    return Promise.all(bufs);
+  });
+}
+
+async function containerProvider(url) {
+  // Single-file .ijtp container (build_pyramid.py --container). Loader
+  // contract: a 32-byte header gives the offsets of the tile index and
+  // manifest, which sit next to each other at the end of the file and are
+  // fetched with one Range request. Tile (kind, level, row, col) is index
+  // entry kindBase[kind] + levelBase[level] + row*cols + col, 12 bytes of
+  // (u64 offset, u32 length). Tiles of one row are contiguous, so a run
+  // of columns is a single Range request.
+  const head = new DataView(await fetchRange(url, 0, 32));
+  const magic = String.fromCharCode(head.getUint8(0), head.getUint8(1), head.getUint8(2), head.getUint8(3));
+  if (magic !== "IJTP") throw new Error("not an imagej-pyramid container");
+  const indexOffset = Number(head.getBigUint64(8, true));
+  const indexCount = head.getUint32(16, true);
+  const manifestOffset = Number(head.getBigUint64(20, true));
+  const manifestLength = head.getUint32(28, true);
+  const tail = await fetchRange(url, indexOffset, manifestOffset + manifestLength);
+  const index = new DataView(tail, 0, indexCount * 12);
+  const manifest = JSON.parse(new TextDecoder().decode(new Uint8Array(tail, manifestOffset - indexOffset)));
+  const ti = manifest.tileIndex;
+  const entry = (kind, level, row, col) => {
+    const i = (ti.kindBase[kind] + ti.levelBase[level] + row * manifest.levels[level].cols + col) * 12;
+    return { offset: Number(index.getBigUint64(i, true)), length: index.getUint32(i + 8, true) };
+  };
+  return tiledProvider(url, manifest, async (kind, level, row, c0, c1) => {
+    const first = entry(kind, level, row, c0);
+    const last = entry(kind, level, row, c1 - 1);
+    const run = await fetchRange(url, first.offset, last.offset + last.length);
+    const bufs = [];
+    for (let col = c0; col < c1; col++) {
+      const e = entry(kind, level, row, col);
+      bufs.push(run.slice(e.offset - first.offset, e.offset - first.offset + e.length));
+    }
+    return bufs;
+  });
+}
+
+async function fetchRange(url, start, end) {
+  const r = await fetch(url, { headers: { Range: "bytes=" + start + "-" + (end - 1) } });
+  if (r.status !== 206 && !(r.ok && start === 0)) throw new Error(url + ": Range HTTP " + r.status);
+  const buf = await r.arrayBuffer();
+  // A server that ignores Range answers 200 with the whole file.
+  return r.status === 206 ? buf : buf.slice(start, end);
+}
+
+function tiledProvider(url, manifest, loadRun) {
+  // Shared region assembly for build_pyramid.py output. `loadRun(kind,
+  // level, row, c0, c1)` resolves to the ArrayBuffers of tiles c0..c1-1 of
+  // one tile row. Raw tiles keep the source depth; display tiles are
+  // already rescaled to 8-bit with the global percentile range, so
+  // getDisplayRegion is a plain tile copy.
+  const T = manifest.tileSize;
+  const RawArray = { uint8: Uint8Array, uint16: Uint16Array, float32: Float32Array }[manifest.dtype];
+  const levels = manifest.levels.map(L => ({ w: L.w, h: L.h, scaleFactor: L.scaleFactor, stats: L.stats }));
+  const tiles = new Map();
+  const MAX_TILES = 512;
+
+  function getRow(kind, ArrayType, level, row, c0, c1) {
+    // Cached tiles are reused; each gap of uncached columns is one loadRun.
+    const out = [];
+    let gap = -1;
+    const flush = (end) => {
+      if (gap < 0) return;
+      const start = gap;
+      const run = loadRun(kind, level, row, start, end);
+      for (let col = start; col < end; col++) {
+        const k = kind + "/" + level + "/" + row + "/" + col;
+        const p = run.then(bufs => new ArrayType(bufs[col - start]));
+        p.catch(() => tiles.delete(k));
+        tiles.set(k, p);
+        if (tiles.size > MAX_TILES) tiles.delete(tiles.keys().next().value);
+        out[col - c0] = p;
+      }
+      gap = -1;
+    };
+    for (let col = c0; col < c1; col++) {
+      const k = kind + "/" + level + "/" + row + "/" + col;
+      const p = tiles.get(k);
+      if (p) { flush(col); tiles.delete(k); tiles.set(k, p); out[col - c0] = p; }
+      else if (gap < 0) gap = col;
+    }
+    flush(c1);
+    return out;
+  }
+
+  async function readRegion(kind, ArrayType, level, x, y, w, h) {
+    const L = levels[level];
+    const x0 = clamp(Math.floor(x), 0, L.w), y0 = clamp(Math.floor(y), 0, L.h);
+    const x1 = clamp(Math.ceil(x + w), 0, L.w), y1 = clamp(Math.ceil(y + h), 0, L.h);
+    if (x1 <= x0 || y1 <= y0) return { data: null, width: 0, height: 0 };
+    const rw = x1 - x0, rh = y1 - y0;
+    const out = new ArrayType(rw * rh);
+    const c0 = Math.floor(x0 / T), c1 = Math.ceil(x1 / T);
+    const jobs = [];
+    for (let row = Math.floor(y0 / T); row * T < y1; row++) {
+      getRow(kind, ArrayType, level, row, c0, c1).forEach((p, i) => {
+        const col = c0 + i;
+        jobs.push(p.then(tile => {
+          const tx = col * T, ty = row * T, tw = Math.min(T, L.w - tx);
+          const cx0 = Math.max(x0, tx), cx1 = Math.min(x1, tx + tw);
+          const cy0 = Math.max(y0, ty), cy1 = Math.min(y1, ty + T, L.h);
+          for (let yy = cy0; yy < cy1; yy++) {
+            const src = (yy - ty) * tw + (cx0 - tx);
+            out.set(tile.subarray(src, src + cx1 - cx0), (yy - y0) * rw + (cx0 - x0));
+          }
+        }));
+      });
+    }
+    await Promise.all(jobs);
+    return { data: out, width: rw, height: rh };
+  }
+
+  return {
+    kind: "pyramid", url, manifest, levels, bitsPerSample: manifest.bitsPerSample, channels: 1,
+    getRegion: (level, x, y, w, h) => readRegion("raw", RawArray, level, x, y, w, h),
+    getDisplayRegion: (level, x, y, w, h) => readRegion("display", Uint8Array, level, x, y, w, h)
+  };
+}
+
 function timeout(ms, label) { return new Promise((_, r) => setTimeout(() => r(new Error(label + " (" + ms + "ms)")), ms)); }
 function clamp(v, lo, hi) { return Math.max(lo, Math.min(hi, v)); }
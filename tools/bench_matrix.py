@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""Cross-browser benchmark matrix for the threadhack runners.
+
+The FINDINGS.md numbers come from `threadhack/run-*.mjs` pointed at a
+hosted static server. This tool reproduces them offline:
+
+1. It serves the repository from a local HTTP server that sends the
+   cross-origin-isolation headers SharedArrayBuffer needs:
+   `Cross-Origin-Opener-Policy: same-origin` and
+   `Cross-Origin-Embedder-Policy: require-corp` (or `credentialless`).
+   It answers single-range GETs (CheerpJ loads its runtime and jars with
+   Range requests) through tools/range_server.py's handler. It can also
+   serve a local CheerpJ mirror at /__cheerpj/ for machines without
+   network access.
+2. It runs the existing runners over a grid of browser x runner x POOL x
+   JOBS x WORK x macro. The runners read THREADHACK_BASE, BROWSER,
+   PUPPETEER and CHEERPJ_MIRROR from the environment. Without those
+   variables they behave exactly as before.
+3. It saves each cell's log and parses it with tools/bench_results.py.
+   It prints one table and can append the records to the results store
+   for `bench_results.py compare`.
+
+Runners
+-------
+  bench   run-bench.mjs        POOL x JOBS x WORK      (JOBS 'auto' = 2 x POOL)
+  reuse   run-reuse.mjs        POOL x JOBS x WORK x RUNS
+  e2e     run-e2e-compare.mjs  POOL x MACRO            (inline, bench, morpholibj)
+
+Usage
+-----
+    python3 tools/bench_matrix.py --self-test
+    python3 tools/bench_matrix.py serve --port 8000            # just the server
+    python3 tools/bench_matrix.py run --runners bench --pools 1,2,4 --work 20000000 \
+        --browsers chrome,firefox --cheerpj-dir ~/cheerpj-4.2 --store --label ci
+    python3 tools/bench_matrix.py run --runners e2e --pools 1,6 --macros bench,morpholibj --dry-run
+
+Exit status: 0 when every cell produced records, 1 otherwise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_results import (DEFAULT_STORE, BenchRecord, append_store, git_label, parse_log,  # noqa: E402
+                           render_scaling, scaling)
+from range_server import RangeHandler, Stats  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+THREADHACK_DIR = REPO_ROOT / "threadhack"
+RUNNERS = {
+    "bench": THREADHACK_DIR / "run-bench.mjs",
+    "reuse": THREADHACK_DIR / "run-reuse.mjs",
+    "e2e": THREADHACK_DIR / "run-e2e-compare.mjs",
+}
+CHEERPJ_PREFIX = "/__cheerpj/"
+DEFAULT_CELL_TIMEOUT_S = 1800
+
+
+class IsolatedHandler(RangeHandler):
+    """Range-capable static handler that adds COOP/COEP and maps /__cheerpj/ to a mirror."""
+
+    coep = "require-corp"
+    cheerpj_dir: Path | None = None
+
+    def end_headers(self) -> None:
+        self.send_header("Cross-Origin-Opener-Policy", "same-origin")
+        self.send_header("Cross-Origin-Embedder-Policy", self.coep)
+        self.send_header("Cross-Origin-Resource-Policy", "cross-origin")
+        super().end_headers()  # CORS
+
+    def content_type(self, path: Path) -> str:
+        return self.guess_type(str(path))
+
+    def translate_path(self, path: str) -> str:
+        if self.cheerpj_dir is not None and path.startswith(CHEERPJ_PREFIX):
+            rel = urllib.parse.unquote(path[len(CHEERPJ_PREFIX):].split("?", 1)[0].split("#", 1)[0])
+            target = (self.cheerpj_dir / rel).resolve()
+            if self.cheerpj_dir.resolve() in target.parents:
+                return str(target)
+            return str(self.cheerpj_dir / "__outside__")
+        target = super().translate_path(path)
+        index = os.path.join(target, "index.html")
+        return index if os.path.isdir(target) and os.path.isfile(index) else target
+
+
+IsolatedHandler.extensions_map = {**SimpleHTTPRequestHandler.extensions_map,
+                                  ".wasm": "application/wasm", ".mjs": "text/javascript",
+                                  ".ijm": "text/plain", ".jar": "application/java-archive"}
+
+
+def start_server(root: Path, port: int = 0, coep: str = "require-corp",
+                 cheerpj_dir: Path | None = None) -> ThreadingHTTPServer:
+    """Serve *root* on 127.0.0.1 in a daemon thread; port 0 picks a free one."""
+    handler = type("Handler", (IsolatedHandler,), {"coep": coep, "cheerpj_dir": cheerpj_dir, "stats": Stats()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), functools.partial(handler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@dataclass
+class Cell:
+    runner: str
+    browser: str
+    pool: int
+    jobs: int | None = None
+    work: int | None = None
+    runs: int | None = None
+    macro: str = ""
+    repeat: int = 1
+
+    @property
+    def name(self) -> str:
+        parts = [self.runner, self.browser, f"p{self.pool}"]
+        if self.jobs is not None:
+            parts += [f"j{self.jobs}", f"w{self.work}"]
+        if self.macro:
+            parts.append(self.macro)
+        return "_".join(parts) + f"_r{self.repeat}"
+
+    def env(self) -> dict[str, str]:
+        env = {"BROWSER": self.browser}
+        if self.runner == "e2e":
+            env["POOLS"] = str(self.pool)
+            if self.macro and self.macro != "inline":
+                env["MACRO"] = self.macro
+        else:
+            env.update(POOL=str(self.pool), JOBS=str(self.jobs), WORK=str(self.work))
+            if self.runs is not None:
+                env["RUNS"] = str(self.runs)
+        return env
+
+
+@dataclass
+class CellResult:
+    cell: Cell
+    status: str
+    seconds: float
+    log_path: str
+    records: list[BenchRecord] = field(default_factory=list)
+
+
+def expand_grid(runners: list[str], browsers: list[str], pools: list[int], jobs: list[str],
+                works: list[int], macros: list[str], runs: int | None, repeat: int) -> list[Cell]:
+    cells = []
+    for rep, runner, browser in itertools.product(range(1, repeat + 1), runners, browsers):
+        if runner not in RUNNERS:
+            raise ValueError(f"unknown runner {runner!r} (choose from {', '.join(RUNNERS)})")
+        if runner == "e2e":
+            cells += [Cell(runner, browser, p, macro=m, repeat=rep) for p in pools for m in macros]
+            continue
+        for p, j, w in itertools.product(pools, jobs, works):
+            n = 2 * p if j == "auto" else int(j)
+            cells.append(Cell(runner, browser, p, n, w, runs if runner == "reuse" else None, repeat=rep))
+    return cells
+
+
+def run_cell(cell: Cell, base_url: str, log_dir: Path, node: str = "node",
+             puppeteer: str | None = None, mirror: str | None = None,
+             runners: dict[str, Path] = RUNNERS, timeout: float = DEFAULT_CELL_TIMEOUT_S) -> CellResult:
+    env = dict(os.environ, THREADHACK_BASE=base_url, **cell.env())
+    if puppeteer:
+        env["PUPPETEER"] = puppeteer
+    if mirror:
+        env["CHEERPJ_MIRROR"] = mirror
+    log_path = log_dir / f"{cell.name}.txt"
+    t0 = time.monotonic()
+    try:
+        proc = subprocess.run([node, str(runners[cell.runner])], env=env, cwd=runners[cell.runner].parent,
+                              capture_output=True, text=True, timeout=timeout)
+        text = proc.stdout + (f"\n[stderr]\n{proc.stderr}" if proc.stderr else "")
+        status = "ok" if proc.returncode == 0 else f"exit {proc.returncode}"
+    except subprocess.TimeoutExpired as e:
+        text = (e.stdout or b"").decode("utf-8", "replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+        status = "timeout"
+    except OSError as e:
+        text, status = str(e), "error"
+    log_path.write_text(text, encoding="utf-8")
+    records = parse_log(text, str(log_path))
+    if status == "ok" and not records:
+        status = "no-results"
+    return CellResult(cell, status, time.monotonic() - t0, str(log_path), records)
+
+
+def render_matrix(results: list[CellResult]) -> str:
+    lines = [f"{'runner':<6} {'browser':<8} {'pool':>4} {'jobs':>5} {'work':>10} {'macro':<11} "
+             f"{'status':<11} {'suite':<18} {'wall ms':>9}  phases"]
+    for r in results:
+        c = r.cell
+        head = (f"{c.runner:<6} {c.browser:<8} {c.pool:>4} {c.jobs if c.jobs is not None else '-':>5} "
+                f"{c.work if c.work is not None else '-':>10} {c.macro or '-':<11} {r.status:<11}")
+        if not r.records:
+            lines.append(f"{head} {'-':<18} {'-':>9}  {r.log_path}")
+        for rec in r.records:
+            extra = " ".join(f"{k}={v:g}" for k, v in sorted(rec.phases.items())
+                             if k != "wall_ms")
+            lines.append(f"{head} {rec.suite:<18} {rec.wall_ms:>9.0f}  {extra}")
+    return "\n".join(lines)
+
+
+def _self_test() -> bool:
+    """Serve the repo, check isolation headers, run a stub runner through the grid."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        mirror = tmp_path / "cheerpj" / "4.2"
+        mirror.mkdir(parents=True)
+        (mirror / "cj3.wasm").write_bytes(b"\0asm")
+        server = start_server(REPO_ROOT, cheerpj_dir=tmp_path / "cheerpj")
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/threadhack/test-bench.html") as resp:
+                if resp.headers["Cross-Origin-Opener-Policy"] != "same-origin" \
+                        or resp.headers["Cross-Origin-Embedder-Policy"] != "require-corp":
+                    print(f"self-test FAIL: isolation headers {dict(resp.headers)}")
+                    return False
+            with urllib.request.urlopen(f"{base}{CHEERPJ_PREFIX}4.2/cj3.wasm") as resp:
+                if resp.read() != b"\0asm" or resp.headers["Content-Type"] != "application/wasm":
+                    print("self-test FAIL: CheerpJ mirror not served as wasm")
+                    return False
+            req = urllib.request.Request(f"{base}{CHEERPJ_PREFIX}4.2/cj3.wasm", headers={"Range": "bytes=1-2"})
+            with urllib.request.urlopen(req) as resp:
+                if resp.status != 206 or resp.headers["Content-Range"] != "bytes 1-2/4" or resp.read() != b"as" \
+                        or resp.headers["Cross-Origin-Embedder-Policy"] != "require-corp":
+                    print(f"self-test FAIL: Range GET {resp.status} {dict(resp.headers)}")
+                    return False
+            try:
+                urllib.request.urlopen(f"{base}{CHEERPJ_PREFIX}..%2f..%2fetc/passwd")
+                print("self-test FAIL: mirror path escaped its directory")
+                return False
+            except urllib.error.HTTPError:
+                pass
+        finally:
+            server.shutdown()
+
+        cells = expand_grid(["bench", "e2e"], ["chrome"], [1, 2], ["auto"], [1000], ["inline", "bench"], None, 1)
+        if [c.name for c in cells] != ["bench_chrome_p1_j2_w1000_r1", "bench_chrome_p2_j4_w1000_r1",
+                                       "e2e_chrome_p1_inline_r1", "e2e_chrome_p1_bench_r1",
+                                       "e2e_chrome_p2_inline_r1", "e2e_chrome_p2_bench_r1"]:
+            print(f"self-test FAIL: grid {[c.name for c in cells]}")
+            return False
+
+        # A Python stand-in for run-bench.mjs that echoes its env as a bench log.
+        stub = tmp_path / "stub.py"
+        stub.write_text(
+            "import os\n"
+            "p, j, w = os.environ['POOL'], os.environ['JOBS'], os.environ['WORK']\n"
+            "print(f'=== bench: pool={p} jobs={j} work={w} ===')\n"
+            "print(f\"  [log] [bench] wall_ms={8000 // int(p)}  base={os.environ['THREADHACK_BASE']}\")\n")
+        cells = expand_grid(["bench"], ["chrome"], [1, 2], ["4"], [1000], [], None, 1)
+        results = [run_cell(c, "http://127.0.0.1:1/threadhack/", tmp_path, node=sys.executable,
+                            runners={"bench": stub}) for c in cells]
+        walls = [(r.status, r.records[0].pool, r.records[0].wall_ms) for r in results if r.records]
+        if walls != [("ok", 1, 8000), ("ok", 2, 4000)]:
+            print(f"self-test FAIL: stub runs {walls} {[r.status for r in results]}")
+            return False
+        row = scaling([rec for r in results for rec in r.records])[("thread-bench", 4, 1000, False)]
+        if row[1].speedup != 2.0:
+            print(f"self-test FAIL: scaling {row}")
+            return False
+    print("bench_matrix self-test: PASS")
+    return True
+
+
+def _csv(text: str, cast=str) -> list:
+    return [cast(v.strip()) for v in text.split(",") if v.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+
+    def server_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--port", type=int, default=0, help="Server port (0 = any free port)")
+        p.add_argument("--coep", default="require-corp", choices=("require-corp", "credentialless"))
+        p.add_argument("--cheerpj-dir", help="Local CheerpJ mirror (contains 4.2/cj3.js ...)")
+
+    p_serve = sub.add_parser("serve", help="Serve the repo with COOP/COEP headers until interrupted")
+    server_args(p_serve)
+    p_run = sub.add_parser("run", help="Run the benchmark grid")
+    server_args(p_run)
+    p_run.add_argument("--runners", default="bench")
+    p_run.add_argument("--browsers", default="chrome", help="Puppeteer browsers (chrome, firefox)")
+    p_run.add_argument("--pools", default="1,2,4")
+    p_run.add_argument("--jobs", default="auto", help="Comma list or 'auto' (2 x pool)")
+    p_run.add_argument("--work", default="20000000")
+    p_run.add_argument("--runs", type=int, help="RUNS for the reuse runner")
+    p_run.add_argument("--macros", default="inline", help="e2e macros: inline, bench, morpholibj")
+    p_run.add_argument("--repeat", type=int, default=1, help="Repeat the whole grid N times")
+    p_run.add_argument("--node", default="node")
+    p_run.add_argument("--puppeteer", help="Puppeteer ESM entry (PUPPETEER env for the runners)")
+    p_run.add_argument("--timeout", type=float, default=DEFAULT_CELL_TIMEOUT_S, help="Per-cell timeout (s)")
+    p_run.add_argument("--out-dir", default=str(REPO_ROOT / "threadhack" / "bench-logs"))
+    p_run.add_argument("--store", nargs="?", const=str(DEFAULT_STORE), help="Append records to this store")
+    p_run.add_argument("--label", help="Store label (default: git short hash)")
+    p_run.add_argument("--dry-run", action="store_true", help="Print the cells and exit")
+    p_run.add_argument("--json", dest="emit_json", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.cmd:
+        parser.error("a command (serve, run) is required")
+    cheerpj_dir = Path(args.cheerpj_dir).expanduser() if args.cheerpj_dir else None
+
+    if args.cmd == "serve":
+        server = start_server(REPO_ROOT, args.port, args.coep, cheerpj_dir)
+        print(f"serving {REPO_ROOT} at http://127.0.0.1:{server.server_address[1]}/ (COEP {args.coep}); Ctrl-C to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    try:
+        cells = expand_grid(_csv(args.runners), _csv(args.browsers), _csv(args.pools, int), _csv(args.jobs),
+                            _csv(args.work, int), _csv(args.macros), args.runs, args.repeat)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.dry_run:
+        for c in cells:
+            print(f"{c.name}: " + " ".join(f"{k}={v}" for k, v in c.env().items()) + f" node {RUNNERS[c.runner].name}")
+        return 0
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    server = start_server(REPO_ROOT, args.port, args.coep, cheerpj_dir)
+    origin = f"http://127.0.0.1:{server.server_address[1]}"
+    mirror = f"{origin}{CHEERPJ_PREFIX}" if cheerpj_dir else None
+    results = []
+    try:
+        for i, cell in enumerate(cells, 1):
+            print(f"[{i}/{len(cells)}] {cell.name}", file=sys.stderr)
+            results.append(run_cell(cell, f"{origin}/threadhack/", out_dir, args.node, args.puppeteer,
+                                    mirror, timeout=args.timeout))
+            print(f"    {results[-1].status} in {results[-1].seconds:.0f}s", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    records = [rec for r in results for rec in r.records]
+    if args.store:
+        label = args.label or git_label()
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for rec in records:
+            rec.label, rec.recorded_at = label, now
+        append_store(Path(args.store), records)
+        print(f"{len(records)} records -> {args.store} (label {label})", file=sys.stderr)
+    if args.emit_json:
+        print(json.dumps([{"cell": asdict(r.cell), "status": r.status, "log": r.log_path,
+                           "records": [asdict(x) for x in r.records]} for r in results], indent=2))
+    else:
+        print(render_matrix(results))
+        print()
+        print(render_scaling(scaling(records)))
+    return 0 if all(r.status == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
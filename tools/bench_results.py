@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""Structured result store and regression detector for threadhack benchmarks.
+
+The threadhack runners (`run-bench.mjs`, `run-reuse.mjs`,
+`run-e2e-compare.mjs`) and the bench macros print free-form console text.
+Until now those numbers were copied into FINDINGS.md by hand. This tool
+parses saved logs into records, keeps them in a versioned JSONL store, and
+answers two questions offline: how does the pool scale, and did a change
+make anything slower?
+
+What it does
+------------
+1. `ingest` parses logs into records. Each record holds the suite, pool
+   size, jobs, work and cold/warm flag, plus per-phase milliseconds. Lines
+   understood:
+     === bench: pool=P jobs=J work=W ===         run-bench.mjs header
+     [config] POOL=P JOBS=J WORK=W ...           test-bench / test-reuse
+     [pool] N workers ready in Xms               phase boot_ms
+     [bench] warmup pass N=..                    marks the run warm
+     [bench] dispatch_ms=.. join_ms=.. wall_ms=  Bench.java
+     [wN] task id=.. ms=X                        worker task times
+     [main] cheerpjRunJar wall = Xms             phase jar_ms
+     === run r/R === / run r: thread=..ms ...    run-reuse.mjs (r > 1 is warm)
+     Pool=P result=gauss_ms=.. median_ms=..      run-e2e-compare.mjs
+     Gaussian Blur: N ms / newImage elapsed: N ms  bench.ijm-style prints
+     RESULT key=value ...                        generic result lines
+2. `report` groups records by (suite, jobs, work, warm). For each pool
+   size it prints the median wall time, the speedup against pool=1 and
+   the parallel efficiency (speedup / pool), the way FINDINGS.md §3a and
+   §11 compute them.
+3. `compare` checks two labels (e.g. two commits) for every
+   (suite, pool, jobs, work, warm, phase). It uses a one-sided
+   permutation test on the run times. A slowdown is flagged as a
+   regression when p <= --alpha and the median grew by at least
+   --min-change. With fewer than 3 runs per side a 5% test cannot come
+   out significant, so such groups are reported as `insufficient`
+   instead of being judged from one run.
+
+Store
+-----
+JSON lines, one record per benchmark run, each with `schema` (currently
+1), `label` (defaults to the git short hash), `recorded_at` and `source`.
+Records with a newer schema are rejected rather than misread.
+
+Usage
+-----
+    python3 tools/bench_results.py --self-test
+    python3 tools/bench_results.py ingest logs/pool*.txt --label after-batching
+    python3 tools/bench_results.py report --label after-batching
+    python3 tools/bench_results.py compare main after-batching --strict
+
+Exit status: 0 on success; 1 on input errors, or with --strict when a
+regression is flagged.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import math
+import random
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_STORE = REPO_ROOT / "threadhack" / "bench-results.jsonl"
+SCHEMA_VERSION = 1
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_MIN_CHANGE = 0.05
+EXACT_PERMUTATION_LIMIT = 20000
+SAMPLED_PERMUTATIONS = 10000
+
+RUNNER_PREFIX_RE = re.compile(r"^\s*\[(?:log|warn|error)\]\s?")
+KV_RE = re.compile(r"([\w-]+)\s*=\s*(-?\d+(?:\.\d+)?)(ms)?")
+BENCH_HEADER_RE = re.compile(r"=== bench: pool=(\d+) jobs=(\d+) work=(\d+) ===")
+CONFIG_RE = re.compile(r"^\[config\] (.*)$")
+POOL_READY_RE = re.compile(r"^\[pool\] (\d+) workers ready in (\d+(?:\.\d+)?)ms")
+WARMUP_RE = re.compile(r"^\[bench\] warmup pass")
+BENCH_WALL_RE = re.compile(r"^\[bench\] (.*\bwall_ms=\d.*)$")
+WORKER_TASK_RE = re.compile(r"^\[w\d+\] task id=\S+ .*\bms=(\d+(?:\.\d+)?)")
+JAR_WALL_RE = re.compile(r"^\[main\] cheerpjRunJar wall = (\d+(?:\.\d+)?)ms")
+RUN_HEADER_RE = re.compile(r"^=== run (\d+)/(\d+) ===")
+RUN_LINE_RE = re.compile(r"^run (\d+): (.*)$")
+E2E_RE = re.compile(r"^Pool=(\d+) (result|elapsed)=(.*)$")
+MACRO_PHASE_RE = re.compile(r"^(?P<name>[A-Za-z][\w .()/-]*?)(?: elapsed)?: (?P<ms>\d+(?:\.\d+)?) ms$")
+MACRO_DONE_RE = re.compile(r"^=== (?:(?P<suite>[\w.-]+) )?done ===$")
+RESULT_RE = re.compile(r"^RESULT (.*)$")
+
+
+@dataclass
+class BenchRecord:
+    suite: str
+    pool: int | None
+    jobs: int | None
+    work: int | None
+    warm: bool
+    phases: dict[str, float]
+    run: int = 1
+    source: str = ""
+    label: str = ""
+    recorded_at: str = ""
+    schema: int = SCHEMA_VERSION
+
+    @property
+    def wall_ms(self) -> float:
+        for key in ("wall_ms", "total_ms"):
+            if key in self.phases:
+                return self.phases[key]
+        return sum(v for k, v in self.phases.items() if k not in ("boot_ms", "jar_ms"))
+
+    def group(self) -> tuple:
+        return (self.suite, self.jobs, self.work, self.warm)
+
+
+def _phase_name(name: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+    return slug if slug.endswith("_ms") else slug + "_ms"
+
+
+def _kv(text: str) -> dict[str, float]:
+    return {k: float(v) for k, v, _ in KV_RE.findall(text)}
+
+
+@dataclass
+class _Context:
+    pool: int | None = None
+    jobs: int | None = None
+    work: int | None = None
+    warm: bool = False
+    run: int = 1
+    boot_ms: float | None = None
+    worker_ms: list[float] = field(default_factory=list)
+    macro: dict[str, float] = field(default_factory=dict)
+
+
+def parse_log(text: str, source: str = "") -> list[BenchRecord]:
+    """Turn one runner log into benchmark records."""
+    ctx = _Context()
+    records: list[BenchRecord] = []
+    e2e: dict[int, dict[str, float]] = {}
+
+    def emit(suite: str, phases: dict[str, float], pool: int | None = None) -> BenchRecord:
+        phases = dict(phases)
+        if ctx.boot_ms is not None:
+            phases.setdefault("boot_ms", ctx.boot_ms)
+        if ctx.worker_ms:
+            phases["worker_task_max_ms"] = max(ctx.worker_ms)
+            phases["worker_task_mean_ms"] = statistics.fmean(ctx.worker_ms)
+            ctx.worker_ms = []
+        rec = BenchRecord(suite, pool if pool is not None else ctx.pool, ctx.jobs, ctx.work,
+                          ctx.warm, phases, ctx.run, source)
+        records.append(rec)
+        return rec
+
+    for raw in text.splitlines():
+        line = RUNNER_PREFIX_RE.sub("", raw).strip()
+        if not line:
+            continue
+        if m := BENCH_HEADER_RE.search(line):
+            ctx = _Context(int(m[1]), int(m[2]), int(m[3]))
+        elif m := CONFIG_RE.match(line):
+            kv = _kv(m[1])
+            ctx.pool = int(kv.get("POOL", ctx.pool or 0)) or ctx.pool
+            ctx.jobs = int(kv["JOBS"]) if "JOBS" in kv else ctx.jobs
+            ctx.work = int(kv["WORK"]) if "WORK" in kv else ctx.work
+        elif m := POOL_READY_RE.match(line):
+            ctx.pool = ctx.pool or int(m[1])
+            ctx.boot_ms = float(m[2])
+        elif WARMUP_RE.match(line):
+            ctx.warm = True
+        elif m := WORKER_TASK_RE.match(line):
+            ctx.worker_ms.append(float(m[1]))
+        elif m := BENCH_WALL_RE.match(line):
+            phases = {k if k.endswith("_ms") else k + "_ms": v for k, v in _kv(m[1]).items()}
+            last = records[-1] if records else None
+            # Bench.main prints a bare wall_ms after the detailed line.
+            if not (last and last.suite == "thread-bench" and set(phases) == {"wall_ms"}
+                    and last.phases.get("wall_ms") == phases["wall_ms"]):
+                emit("thread-bench", phases)
+        elif m := JAR_WALL_RE.match(line):
+            if records:
+                records[-1].phases["jar_ms"] = float(m[1])
+        elif m := RUN_HEADER_RE.match(line):
+            ctx.run = int(m[1])
+            ctx.warm = ctx.run > 1
+        elif m := RUN_LINE_RE.match(line):
+            ctx.run = int(m[1])
+            ctx.warm = ctx.run > 1
+            for name, v in _kv(m[2]).items():
+                emit(f"reuse-{name.lower()}", {"wall_ms": v})
+        elif m := E2E_RE.match(line):
+            pool = int(m[1])
+            phases = e2e.setdefault(pool, {})
+            if m[2] == "result":
+                phases.update({k if k.endswith("_ms") else k + "_ms": v for k, v in _kv(m[3]).items()})
+            elif t := re.search(r"done in (\d+(?:\.\d+)?)ms", m[3]):
+                phases["total_ms"] = float(t[1])
+        elif m := RESULT_RE.match(line):
+            kv = _kv(m[1])
+            phases = {k if k.endswith("_ms") else k + "_ms": v
+                      for k, v in kv.items() if k.endswith("ms") or k in ("wall", "elapsed")}
+            if "n" in kv:
+                ctx.jobs = int(kv["n"])
+            if phases:
+                emit("result", phases, int(kv["pool"]) if "pool" in kv else None)
+        elif m := MACRO_DONE_RE.match(line):
+            if ctx.macro:
+                emit(m["suite"] or "bench.ijm", ctx.macro)
+                ctx.macro = {}
+        elif not line.startswith("[") and (m := MACRO_PHASE_RE.match(line)):
+            ctx.macro[_phase_name(m["name"])] = float(m["ms"])
+
+    for pool, phases in e2e.items():
+        emit("e2e-macro", phases, pool)
+    if ctx.macro:
+        emit("macro", ctx.macro)
+    return records
+
+
+def git_label() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unlabelled"
+    except (OSError, subprocess.SubprocessError):
+        return "unlabelled"
+
+
+def load_store(path: Path) -> list[BenchRecord]:
+    if not path.exists():
+        return []
+    records = []
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        d = json.loads(line)
+        if d.get("schema", 0) > SCHEMA_VERSION:
+            raise ValueError(f"{path}:{lineno}: schema {d['schema']} is newer than "
+                             f"this tool ({SCHEMA_VERSION})")
+        records.append(BenchRecord(**d))
+    return records
+
+
+def append_store(path: Path, records: list[BenchRecord]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as fh:
+        for rec in records:
+            fh.write(json.dumps(asdict(rec), sort_keys=True) + "\n")
+
+
+@dataclass
+class ScalingRow:
+    pool: int | None
+    runs: int
+    median_ms: float
+    speedup: float | None
+    efficiency: float | None
+
+
+def scaling(records: list[BenchRecord]) -> dict[tuple, list[ScalingRow]]:
+    """Median wall per pool, with speedup and efficiency against pool=1."""
+    groups: dict[tuple, dict[int | None, list[float]]] = {}
+    for rec in records:
+        groups.setdefault(rec.group(), {}).setdefault(rec.pool, []).append(rec.wall_ms)
+    out = {}
+    for key, by_pool in groups.items():
+        base = statistics.median(by_pool[1]) if 1 in by_pool else None
+        rows = []
+        for pool in sorted(by_pool, key=lambda p: (p is None, p or 0)):
+            med = statistics.median(by_pool[pool])
+            speedup = base / med if base and med > 0 else None
+            eff = speedup / pool if speedup is not None and pool else None
+            rows.append(ScalingRow(pool, len(by_pool[pool]), med, speedup, eff))
+        out[key] = rows
+    return out
+
+
+def permutation_pvalue(base: list[float], new: list[float]) -> float:
+    """One-sided p-value for 'new has a larger mean than base'."""
+    pooled = base + new
+    k = len(new)
+    observed = statistics.fmean(new) - statistics.fmean(base)
+    total = sum(pooled)
+    n = len(pooled)
+
+    def diff(idx: tuple[int, ...]) -> float:
+        s = sum(pooled[i] for i in idx)
+        return s / k - (total - s) / (n - k)
+
+    if math.comb(n, k) <= EXACT_PERMUTATION_LIMIT:
+        splits = itertools.combinations(range(n), k)
+        count = hits = 0
+        for idx in splits:
+            count += 1
+            hits += diff(idx) >= observed - 1e-9
+        return hits / count
+    rng = random.Random(0)
+    hits = sum(diff(tuple(rng.sample(range(n), k))) >= observed - 1e-9
+               for _ in range(SAMPLED_PERMUTATIONS))
+    return (hits + 1) / (SAMPLED_PERMUTATIONS + 1)
+
+
+@dataclass
+class Comparison:
+    suite: str
+    pool: int | None
+    jobs: int | None
+    work: int | None
+    warm: bool
+    phase: str
+    base_median: float
+    new_median: float
+    change: float
+    p_value: float | None
+    verdict: str
+
+
+def compare(base: list[BenchRecord], new: list[BenchRecord], alpha: float = DEFAULT_ALPHA,
+            min_change: float = DEFAULT_MIN_CHANGE) -> list[Comparison]:
+    def samples(records: list[BenchRecord]) -> dict[tuple, list[float]]:
+        out: dict[tuple, list[float]] = {}
+        for rec in records:
+            for phase, v in rec.phases.items():
+                out.setdefault((rec.suite, rec.pool, rec.jobs, rec.work, rec.warm, phase), []).append(v)
+        return out
+
+    b, n = samples(base), samples(new)
+    result = []
+    for key in sorted(set(b) & set(n), key=str):
+        bs, ns = b[key], n[key]
+        bm, nm = statistics.median(bs), statistics.median(ns)
+        change = (nm - bm) / bm if bm else 0.0
+        p = None
+        if len(bs) < 2 or len(ns) < 2 or math.comb(len(bs) + len(ns), len(ns)) * alpha < 1:
+            verdict = "insufficient"
+        else:
+            p = permutation_pvalue(bs, ns)
+            if p <= alpha and change >= min_change:
+                verdict = "REGRESSION"
+            elif permutation_pvalue(ns, bs) <= alpha and change <= -min_change:
+                verdict = "improved"
+            else:
+                verdict = "ok"
+        result.append(Comparison(*key, bm, nm, change, p, verdict))
+    return result
+
+
+def render_scaling(table: dict[tuple, list[ScalingRow]]) -> str:
+    lines = []
+    for (suite, jobs, work, warm), rows in sorted(table.items(), key=str):
+        lines.append(f"== {suite} jobs={jobs} work={work} {'warm' if warm else 'cold'} ==")
+        lines.append(f"  {'pool':>4} {'runs':>4} {'median ms':>10} {'speedup':>8} {'eff':>6}")
+        for r in rows:
+            sp = f"{r.speedup:.2f}x" if r.speedup is not None else "-"
+            ef = f"{100 * r.efficiency:.0f}%" if r.efficiency is not None else "-"
+            lines.append(f"  {r.pool if r.pool is not None else '-':>4} {r.runs:>4} "
+                         f"{r.median_ms:>10.0f} {sp:>8} {ef:>6}")
+    return "\n".join(lines) if lines else "(no records)"
+
+
+def render_comparison(rows: list[Comparison]) -> str:
+    lines = [f"{'suite':<16} {'pool':>4} {'warm':>5} {'phase':<22} {'base':>9} {'new':>9} "
+             f"{'change':>8} {'p':>6}  verdict"]
+    for c in rows:
+        p = f"{c.p_value:.3f}" if c.p_value is not None else "-"
+        lines.append(f"{c.suite:<16} {c.pool if c.pool is not None else '-':>4} "
+                     f"{'yes' if c.warm else 'no':>5} {c.phase:<22} {c.base_median:>9.0f} "
+                     f"{c.new_median:>9.0f} {100 * c.change:>+7.1f}% {p:>6}  {c.verdict}")
+    flagged = sum(c.verdict == "REGRESSION" for c in rows)
+    lines.append(f"Regressions: {flagged} / {len(rows)}")
+    return "\n".join(lines)
+
+
+def _self_test() -> bool:
+    """Parse synthetic logs in every supported shape, then compare labels."""
+    bench_log = """
+=== bench: pool=4 jobs=8 work=20000000 ===
+  [log] [config] POOL=4 JOBS=8 WORK=20000000 PREWARM=false hwCores=10
+  [log] [pool] 4 workers ready in 2812ms
+  [log] [w0] task id=1 start=1 end=2 ms=905
+  [log] [w1] task id=2 start=1 end=2 ms=1961
+  [log] [bench] dispatch_ms=92  join_ms=4613   wall_ms=4705
+  [log] [bench] wall_ms=4705
+  [log] [main] cheerpjRunJar wall = 5100ms
+"""
+    recs = parse_log(bench_log, "bench.txt")
+    if len(recs) != 1:
+        print(f"self-test FAIL: bench log gave {len(recs)} records, want 1")
+        return False
+    r = recs[0]
+    if (r.pool, r.jobs, r.work, r.warm) != (4, 8, 20000000, False) or r.wall_ms != 4705:
+        print(f"self-test FAIL: bench record {r}")
+        return False
+    if r.phases.get("boot_ms") != 2812 or r.phases.get("worker_task_max_ms") != 1961 \
+            or r.phases.get("jar_ms") != 5100:
+        print(f"self-test FAIL: bench phases {r.phases}")
+        return False
+
+    reuse_log = """[config] POOL=6 JOBS=10 WORK=100000000 RUNS=2
+=== run 1/2 ===
+run 1: thread=5263ms  executor=6324ms  direct-TPE=6000ms
+=== run 2/2 ===
+run 2: thread=3792ms  executor=3842ms  direct-TPE=3900ms
+"""
+    recs = parse_log(reuse_log)
+    if [(x.suite, x.warm) for x in recs][:3] != [("reuse-thread", False), ("reuse-executor", False),
+                                                 ("reuse-direct-tpe", False)] or not recs[3].warm:
+        print(f"self-test FAIL: reuse records {[(x.suite, x.warm) for x in recs]}")
+        return False
+
+    e2e_log = """Pool=1 stats={}
+Pool=1 elapsed="done in 9000ms — result=..."
+Pool=1 result=gauss_ms=4000 median_ms=4500
+Pool=6 result=gauss_ms=1000 median_ms=1300
+"""
+    recs = parse_log(e2e_log)
+    if [(x.pool, x.phases) for x in recs] != [
+            (1, {"total_ms": 9000, "gauss_ms": 4000, "median_ms": 4500}),
+            (6, {"gauss_ms": 1000, "median_ms": 1300})]:
+        print(f"self-test FAIL: e2e records {[(x.pool, x.phases) for x in recs]}")
+        return False
+
+    macro_log = """newImage elapsed: 120 ms
+Gaussian Blur: 3000 ms
+Median: 2500 ms
+stats: area=4194304 mean=32767
+=== done ===
+RESULT n=10 pool=2 wall_ms=9169
+"""
+    recs = parse_log(macro_log)
+    if recs[0].phases != {"newimage_ms": 120, "gaussian_blur_ms": 3000, "median_ms": 2500} \
+            or recs[0].wall_ms != 5620 or (recs[1].pool, recs[1].jobs, recs[1].wall_ms) != (2, 10, 9169):
+        print(f"self-test FAIL: macro/RESULT records {recs}")
+        return False
+
+    # FINDINGS.md §11 scaling table: pool=2 -> 1.88x / 94%.
+    table = scaling([BenchRecord("thread-bench", 1, 10, 100, False, {"wall_ms": 17257}),
+                     BenchRecord("thread-bench", 2, 10, 100, False, {"wall_ms": 9169})])
+    row = table[("thread-bench", 10, 100, False)][1]
+    if round(row.speedup, 2) != 1.88 or round(row.efficiency, 2) != 0.94:
+        print(f"self-test FAIL: scaling row {row}")
+        return False
+
+    def runs(label: str, walls: list[float]) -> list[BenchRecord]:
+        return [BenchRecord("thread-bench", 4, 8, 1, True, {"wall_ms": w}, label=label) for w in walls]
+
+    same = compare(runs("a", [3000, 3050, 2990, 3020]), runs("b", [3010, 2995, 3040, 3005]))
+    slow = compare(runs("a", [3000, 3050, 2990, 3020]), runs("c", [3600, 3550, 3700, 3620]))
+    single = compare(runs("a", [3000]), runs("d", [6000]))
+    if same[0].verdict != "ok" or slow[0].verdict != "REGRESSION" or single[0].verdict != "insufficient":
+        print(f"self-test FAIL: verdicts {same[0].verdict}/{slow[0].verdict}/{single[0].verdict}")
+        return False
+    print("bench_results self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=str(DEFAULT_STORE), help="Results store (JSONL)")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    p_in = sub.add_parser("ingest", help="Parse logs and append records to the store")
+    p_in.add_argument("logs", nargs="+")
+    p_in.add_argument("--label", help="Dataset label (default: git short hash)")
+    p_in.add_argument("--dry-run", action="store_true", help="Print records instead of storing them")
+    p_rep = sub.add_parser("report", help="Speedup / efficiency table")
+    p_rep.add_argument("--label", help="Only records with this label")
+    p_rep.add_argument("--json", dest="emit_json", action="store_true")
+    p_cmp = sub.add_parser("compare", help="Flag significant regressions between two labels")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--alpha", type=float, default=DEFAULT_ALPHA)
+    p_cmp.add_argument("--min-change", type=float, default=DEFAULT_MIN_CHANGE,
+                       help="Minimum relative slowdown to flag (0.05 = 5%%)")
+    p_cmp.add_argument("--strict", action="store_true", help="Exit non-zero on any regression")
+    p_cmp.add_argument("--json", dest="emit_json", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.cmd:
+        parser.error("a command (ingest, report, compare) is required")
+    store = Path(args.store)
+
+    try:
+        if args.cmd == "ingest":
+            label = args.label or git_label()
+            now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            records = []
+            for log in args.logs:
+                for rec in parse_log(Path(log).read_text(encoding="utf-8", errors="replace"), log):
+                    rec.label, rec.recorded_at = label, now
+                    records.append(rec)
+            if args.dry_run:
+                for rec in records:
+                    print(json.dumps(asdict(rec), sort_keys=True))
+            else:
+                append_store(store, records)
+                print(f"{len(records)} records from {len(args.logs)} logs -> {store} (label {label})")
+            return 0
+
+        records = load_store(store)
+        if args.cmd == "report":
+            if args.label:
+                records = [r for r in records if r.label == args.label]
+            table = scaling(records)
+            if args.emit_json:
+                print(json.dumps([{"group": list(k), "rows": [asdict(r) for r in v]}
+                                  for k, v in table.items()], indent=2))
+            else:
+                print(render_scaling(table))
+            return 0
+
+        rows = compare([r for r in records if r.label == args.base],
+                       [r for r in records if r.label == args.new], args.alpha, args.min_change)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.emit_json:
+        print(json.dumps([asdict(c) for c in rows], indent=2))
+    else:
+        print(render_comparison(rows))
+    if args.strict and any(c.verdict == "REGRESSION" for c in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
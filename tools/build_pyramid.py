@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+"""Tile-pyramid builder for the LazyImagePlus / JSTileSource viewer.
+
+Cuts a 2-D image into a multi-resolution tile pyramid that
+`threadhack/viv-loader/ome-loader.js` can open with
+`?load=<dir>/manifest.json`, or `?load=<file>.ijtp` for the single-file
+container layout.
+
+What it does
+------------
+1. Walks each pyramid level in horizontal strips of one tile row. Every
+   strip is cut into raw tiles, folded into that level's histogram, and
+   2×2-mean downsampled into the next level. Levels >= 1 live in scratch
+   `.npy` memmaps, so memory stays at about one strip per level.
+   With `--workers N` each level is split into bands of tile rows that run
+   on a process pool. Workers reopen the memmaps by path. The number of
+   bands in flight and their height are sized to stay under
+   `--max-memory`. Levels still run one after another, because level L+1
+   is built from all of level L.
+2. Computes global (level 0) and per-level statistics from those
+   histograms: min, max, mean and the `--percentiles` display range.
+   They come out of the tiling pass; the source is not re-scanned for
+   integer data. Float data needs one extra min/max scan to fix the bins.
+3. Writes pre-rescaled 8-bit display tiles next to the raw tiles. It uses
+   the global display range, so contrast does not change between zoom
+   levels. The JS provider serves these through `getDisplayRegion`, and
+   the loader natives skip `autoStretchToU8` for them.
+
+Output layout
+-------------
+Directory (default):
+
+    <out>/manifest.json
+    <out>/raw/<level>/<row>_<col>.bin       little-endian samples
+    <out>/display/<level>/<row>_<col>.u8    8-bit, display range applied
+
+Container (`--container`, one `.ijtp` file, every tile one HTTP Range):
+
+    [0, 32)            header: "IJTP", u16 version, u16 flags,
+                       u64 indexOffset, u32 indexCount,
+                       u64 manifestOffset, u32 manifestLength  (little-endian)
+    [32, indexOffset)  tile payloads, row-major per level, raw then display
+    index              indexCount × (u64 offset, u32 length)
+    manifest           JSON, same as manifest.json plus `tileIndex`
+
+The index is dense: tile (kind, level, row, col) is entry
+`kindBase[kind] + levelBase[level] + row * cols + col`. A loader reads the
+header, then the index and manifest in one Range request (they are
+adjacent). Neighbouring tiles in a row are adjacent on disk, so a run of
+them is also a single Range request.
+
+Edge tiles are clipped to the level bounds. 8-bit inputs have no display
+tiles; `displayKind` is "raw" and display reads return the raw tiles.
+
+Requires NumPy. Inputs are `.npy` files (memory-mapped) or raw binary
+files with `--shape H W --dtype uint16`.
+
+Usage
+-----
+    python3 tools/build_pyramid.py --self-test
+    python3 tools/build_pyramid.py slide.npy out/slide.pyramid
+    python3 tools/build_pyramid.py slide.raw out/ --shape 40000 60000 --dtype uint16
+    python3 tools/build_pyramid.py slide.npy out/ --tile-size 512 --percentiles 0.5 99.5
+    python3 tools/build_pyramid.py slide.npy out/slide.ijtp --container
+    python3 tools/build_pyramid.py slide.npy out/ --workers 8 --max-memory 2048
+
+Exit status: 0 on success, 1 on input errors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import os
+import struct
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "imagej-pyramid"
+MANIFEST_VERSION = 1
+TILE_TEMPLATES = {
+    "raw": "raw/{level}/{row}_{col}.bin",
+    "display": "display/{level}/{row}_{col}.u8",
+}
+
+CONTAINER_MAGIC = b"IJTP"
+CONTAINER_HEADER = struct.Struct("<4sHHQIQI")
+INDEX_ENTRY_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4")])
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_PERCENTILES = (0.1, 99.9)
+# Bin count for float histograms, and for the summary histogram written
+# into the manifest (a full 16-bit histogram would be 65 536 entries).
+FLOAT_BINS = 4096
+SUMMARY_BINS = 256
+# Parallel build: band size cap (tile rows) and default memory ceiling.
+MAX_BAND_ROWS = 16
+DEFAULT_MAX_MEMORY = 1024 << 20
+
+# dtype -> bitsPerSample as reported through TileSource.bitsPerSample().
+SUPPORTED_DTYPES: dict[str, int] = {"uint8": 8, "uint16": 16, "float32": 32}
+
+
+def open_source(path: Path, shape: tuple[int, int] | None = None,
+                dtype: str | None = None) -> np.ndarray:
+    """Memory-map a 2-D source image without reading it into RAM."""
+    if path.suffix == ".npy":
+        arr = np.load(path, mmap_mode="r")
+    else:
+        if shape is None or dtype is None:
+            raise ValueError(f"{path}: raw input needs --shape and --dtype")
+        arr = np.memmap(path, dtype=np.dtype(dtype).newbyteorder("<"),
+                        mode="r", shape=shape)
+    if arr.ndim != 2:
+        raise ValueError(f"{path}: expected a 2-D image, got shape {arr.shape}")
+    if arr.dtype.name not in SUPPORTED_DTYPES:
+        raise ValueError(f"{path}: unsupported dtype {arr.dtype.name} "
+                         f"(expected one of {', '.join(SUPPORTED_DTYPES)})")
+    return arr
+
+
+@dataclass
+class Histogram:
+    """Streaming histogram with exact bins for integer data.
+
+    Integer dtypes get one bin per representable value, so percentiles are
+    exact. Float data uses `FLOAT_BINS` bins over a range fixed up front.
+    """
+
+    dtype: np.dtype
+    value_range: tuple[float, float] | None = None
+    counts: np.ndarray = field(init=False)
+    total: int = 0
+    vsum: float = 0.0
+    vmin: float = float("inf")
+    vmax: float = float("-inf")
+
+    def __post_init__(self) -> None:
+        if self.is_integer:
+            self.counts = np.zeros(1 << (8 * self.dtype.itemsize), dtype=np.int64)
+        else:
+            if self.value_range is None:
+                raise ValueError("float histograms need a value_range")
+            self.counts = np.zeros(FLOAT_BINS, dtype=np.int64)
+
+    @property
+    def is_integer(self) -> bool:
+        return self.dtype.kind == "u"
+
+    def add(self, block: np.ndarray) -> None:
+        if block.size == 0:
+            return
+        flat = block.ravel()
+        if self.is_integer:
+            self.counts += np.bincount(flat, minlength=self.counts.size)
+        else:
+            lo, hi = self.value_range
+            self.counts += np.histogram(flat, bins=FLOAT_BINS, range=(lo, hi))[0]
+        self.total += flat.size
+        self.vsum += float(flat.sum(dtype=np.float64))
+        self.vmin = min(self.vmin, float(flat.min()))
+        self.vmax = max(self.vmax, float(flat.max()))
+
+    def merge(self, other: Histogram) -> None:
+        """Fold in a histogram accumulated by a worker over another band."""
+        self.counts += other.counts
+        self.total += other.total
+        self.vsum += other.vsum
+        self.vmin = min(self.vmin, other.vmin)
+        self.vmax = max(self.vmax, other.vmax)
+
+    def value_at(self, bin_index: int) -> float:
+        if self.is_integer:
+            return float(bin_index)
+        lo, hi = self.value_range
+        return lo + (hi - lo) * bin_index / FLOAT_BINS
+
+    def percentile(self, p: float) -> float:
+        if self.total == 0:
+            return 0.0
+        cum = np.cumsum(self.counts)
+        idx = int(np.searchsorted(cum, self.total * p / 100.0, side="left"))
+        idx = min(idx, self.counts.size - 1)
+        return min(max(self.value_at(idx), self.vmin), self.vmax)
+
+    def summary(self, bins: int = SUMMARY_BINS) -> dict:
+        """Re-bin to `bins` buckets over [min, max] for the manifest."""
+        if self.total == 0:
+            return {"range": [0, 0], "counts": []}
+        if self.is_integer:
+            lo, hi = int(self.vmin), int(self.vmax)
+            edges = np.linspace(lo, hi + 1, min(bins, hi - lo + 1) + 1).astype(np.int64)
+            counts = np.add.reduceat(self.counts[lo:hi + 1], edges[:-1] - lo)
+        else:
+            vlo, vhi = self.value_range
+            first = int((self.vmin - vlo) / (vhi - vlo) * FLOAT_BINS)
+            last = min(FLOAT_BINS - 1, int((self.vmax - vlo) / (vhi - vlo) * FLOAT_BINS))
+            span = self.counts[first:last + 1]
+            edges = np.linspace(0, span.size, min(bins, span.size) + 1).astype(np.int64)
+            counts = np.add.reduceat(span, edges[:-1])
+        return {"range": [self.vmin, self.vmax], "counts": counts.tolist()}
+
+    def stats(self, percentiles: tuple[float, float]) -> dict:
+        p_lo, p_hi = percentiles
+        return {
+            "min": self.vmin if self.total else 0,
+            "max": self.vmax if self.total else 0,
+            "mean": self.vsum / self.total if self.total else 0,
+            "pLow": self.percentile(p_lo),
+            "pHigh": self.percentile(p_hi),
+        }
+
+
+def downsample2(block: np.ndarray) -> np.ndarray:
+    """2×2 mean with edge replication for odd sizes; keeps the input dtype."""
+    h, w = block.shape
+    if h % 2 or w % 2:
+        block = np.pad(block, ((0, h % 2), (0, w % 2)), mode="edge")
+    if block.dtype.kind == "u":
+        acc = block.astype(np.uint32)
+        s = acc[0::2, 0::2] + acc[1::2, 0::2] + acc[0::2, 1::2] + acc[1::2, 1::2]
+        return ((s + 2) >> 2).astype(block.dtype)
+    acc = block.astype(np.float64)
+    s = acc[0::2, 0::2] + acc[1::2, 0::2] + acc[0::2, 1::2] + acc[1::2, 1::2]
+    return (s * 0.25).astype(block.dtype)
+
+
+def display_transform(dtype: np.dtype, lo: float, hi: float):
+    """Return a function mapping raw samples to uint8 over [lo, hi].
+
+    Matches `autoStretchToU8` in threadhack/runtime/loader.js, so display
+    tiles look the same as tiles stretched in the browser. Integer data
+    goes through a lookup table, which costs one gather per pixel.
+    """
+    if hi <= lo:
+        hi = lo + 1
+    scale = 255.0 / (hi - lo)
+    if dtype.kind == "u":
+        values = np.arange(1 << (8 * dtype.itemsize), dtype=np.float64)
+        lut = np.clip((values - lo) * scale, 0, 255).astype(np.uint8)
+        return lambda block: lut[block]
+    return lambda block: np.clip((block.astype(np.float64) - lo) * scale, 0, 255).astype(np.uint8)
+
+
+def level_shapes(h: int, w: int, tile_size: int) -> list[tuple[int, int]]:
+    """Halve until the whole level fits in a single tile."""
+    shapes = [(h, w)]
+    while shapes[-1][0] > tile_size or shapes[-1][1] > tile_size:
+        ph, pw = shapes[-1]
+        shapes.append(((ph + 1) // 2, (pw + 1) // 2))
+    return shapes
+
+
+def scan_range(arr: np.ndarray, strip_rows: int) -> tuple[float, float]:
+    lo, hi = float("inf"), float("-inf")
+    for r0 in range(0, arr.shape[0], strip_rows):
+        strip = np.asarray(arr[r0:r0 + strip_rows])
+        lo = min(lo, float(strip.min()))
+        hi = max(hi, float(strip.max()))
+    return (lo, hi) if hi > lo else (lo, lo + 1.0)
+
+
+class DirectoryTileWriter:
+    """One file per tile under `<out>/raw` and `<out>/display`.
+
+    Workers construct their own instance with no `kinds` and write tiles
+    straight to disk; the parent only writes the manifest.
+    """
+
+    layout = "directory"
+
+    def __init__(self, out_dir: Path, shapes: list[tuple[int, int]] = (),
+                 tile_size: int = 0, kinds: tuple[str, ...] = ()) -> None:
+        self.out_dir = out_dir
+        for kind in kinds:
+            for level in range(len(shapes)):
+                (out_dir / kind / str(level)).mkdir(parents=True, exist_ok=True)
+
+    def write(self, kind: str, level: int, row: int, col: int, data: bytes) -> None:
+        path = self.out_dir / TILE_TEMPLATES[kind].format(level=level, row=row, col=col)
+        path.write_bytes(data)
+
+    def finish(self, manifest: dict) -> None:
+        manifest["rawTile"] = TILE_TEMPLATES["raw"]
+        manifest["displayTile"] = TILE_TEMPLATES[manifest["displayKind"]]
+        (self.out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+
+
+class ContainerTileWriter:
+    """All tiles in one range-addressable file.
+
+    Tiles are appended after a fixed header as they are produced; a dense
+    `(offset, length)` index and the manifest JSON go at the end, and the
+    header is patched to point at them (see CONTAINER_HEADER).
+    """
+
+    layout = "container"
+
+    def __init__(self, path: Path, shapes: list[tuple[int, int]],
+                 tile_size: int, kinds: tuple[str, ...]) -> None:
+        grid = [-(-h // tile_size) * -(-w // tile_size) for h, w in shapes]
+        self.level_base = [0]
+        for n in grid[:-1]:
+            self.level_base.append(self.level_base[-1] + n)
+        self.per_kind = sum(grid)
+        self.kind_base = {kind: i * self.per_kind for i, kind in enumerate(kinds)}
+        self.cols = [-(-w // tile_size) for _, w in shapes]
+        self.index = np.zeros(self.per_kind * len(kinds), dtype=INDEX_ENTRY_DTYPE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.fh = open(path, "wb")
+        self.fh.write(b"\0" * CONTAINER_HEADER.size)
+        self.pos = CONTAINER_HEADER.size
+
+    def entry(self, kind: str, level: int, row: int, col: int) -> int:
+        return self.kind_base[kind] + self.level_base[level] + row * self.cols[level] + col
+
+    def write(self, kind: str, level: int, row: int, col: int, data: bytes) -> None:
+        self.index[self.entry(kind, level, row, col)] = (self.pos, len(data))
+        self.fh.write(data)
+        self.pos += len(data)
+
+    def finish(self, manifest: dict) -> None:
+        manifest["tileIndex"] = {
+            "entryBytes": INDEX_ENTRY_DTYPE.itemsize,
+            "kindBase": {"raw": self.kind_base["raw"],
+                         "display": self.kind_base[manifest["displayKind"]]},
+            "levelBase": self.level_base,
+        }
+        index_offset = self.pos
+        self.fh.write(self.index.tobytes())
+        manifest_bytes = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+        self.fh.write(manifest_bytes)
+        self.fh.seek(0)
+        self.fh.write(CONTAINER_HEADER.pack(CONTAINER_MAGIC, MANIFEST_VERSION, 0,
+                                            index_offset, len(self.index),
+                                            self.pos + self.index.nbytes, len(manifest_bytes)))
+        self.fh.close()
+
+
+class TileBuffer:
+    """Collects a worker's tiles for the parent to append to a container."""
+
+    def __init__(self) -> None:
+        self.tiles: list[tuple[str, int, int, int, bytes]] = []
+
+    def write(self, kind: str, level: int, row: int, col: int, data: bytes) -> None:
+        self.tiles.append((kind, level, row, col, data))
+
+
+def write_strip_tiles(writer, kind: str, strip: np.ndarray, level: int, row: int,
+                      tile_size: int) -> int:
+    written = 0
+    for col, c0 in enumerate(range(0, strip.shape[1], tile_size)):
+        tile = np.ascontiguousarray(strip[:, c0:c0 + tile_size])
+        writer.write(kind, level, row, col,
+                     tile.astype(tile.dtype.newbyteorder("<"), copy=False).tobytes())
+        written += tile.nbytes
+    return written
+
+
+@dataclass(frozen=True)
+class ArrayRef:
+    """Picklable handle to a memory-mapped level; workers reopen it by path."""
+
+    filename: str
+    offset: int
+    dtype: str
+    shape: tuple[int, int]
+
+    @classmethod
+    def of(cls, arr: np.memmap) -> ArrayRef:
+        return cls(str(arr.filename), int(arr.offset), arr.dtype.str, tuple(arr.shape))
+
+    def open(self, mode: str = "r") -> np.memmap:
+        return np.memmap(self.filename, dtype=np.dtype(self.dtype), mode=mode,
+                         offset=self.offset, shape=self.shape)
+
+
+@dataclass(frozen=True)
+class BandJob:
+    """Tile rows [row0, row1) of one level, for one phase ("raw" or "display")."""
+
+    phase: str
+    level: int
+    row0: int
+    row1: int
+    tile_size: int
+    src: ArrayRef
+    nxt: ArrayRef | None = None
+    out_dir: str | None = None
+    value_range: tuple[float, float] | None = None
+    display_range: tuple[float, float] | None = None
+
+
+@dataclass
+class BandResult:
+    job: BandJob
+    tiles: list[tuple[str, int, int, int, bytes]]
+    hist: Histogram | None
+    nbytes: int
+
+
+def run_band(job: BandJob) -> BandResult:
+    """Process one band; runs in a pool worker or inline.
+
+    Raw bands cut tiles, build a partial histogram and write their 2×2
+    downsample into the next level's memmap. Bands start on even rows
+    (tile_size is even), so the rows they write never overlap.
+    """
+    t = job.tile_size
+    arr = job.src.open()
+    writer = DirectoryTileWriter(Path(job.out_dir)) if job.out_dir else TileBuffer()
+    r0, r1 = job.row0 * t, min(job.row1 * t, job.src.shape[0])
+    nbytes = 0
+    hist = None
+    if job.phase == "raw":
+        hist = Histogram(arr.dtype, job.value_range)
+        nxt = job.nxt.open("r+") if job.nxt else None
+        for row in range(job.row0, job.row1):
+            strip = np.asarray(arr[row * t:min((row + 1) * t, r1)])
+            nbytes += write_strip_tiles(writer, "raw", strip, job.level, row, t)
+            hist.add(strip)
+            if nxt is not None:
+                half = downsample2(strip)
+                nxt[row * t // 2:row * t // 2 + half.shape[0]] = half
+        if nxt is not None:
+            nxt.flush()
+            del nxt
+    else:
+        to_u8 = display_transform(arr.dtype, *job.display_range)
+        for row in range(job.row0, job.row1):
+            strip = to_u8(np.asarray(arr[row * t:min((row + 1) * t, r1)]))
+            nbytes += write_strip_tiles(writer, "display", strip, job.level, row, t)
+    tiles = writer.tiles if isinstance(writer, TileBuffer) else []
+    return BandResult(job, tiles, hist, nbytes)
+
+
+def plan_band_rows(width: int, itemsize: int, tile_size: int, rows: int,
+                   workers: int, window: int, max_memory: int) -> int:
+    """Tile rows per band so that `window` in-flight bands fit in max_memory.
+
+    Per pixel a band holds the strip, a uint32 accumulator and the
+    downsampled copy, plus one or two copies of the tile bytes.
+    Integer histograms add a fixed cost per band for the counts and the
+    bincount temporary.
+    """
+    per_pixel = 4 * itemsize + 6
+    hist_bytes = 2 * 8 * (1 << (8 * itemsize)) if itemsize <= 2 else 2 * 8 * FLOAT_BINS
+    row_bytes = tile_size * width * per_pixel
+    fit = (max_memory // window - hist_bytes) // row_bytes
+    if fit < 1:
+        raise ValueError(f"--max-memory {max_memory >> 20} MB cannot hold {window} bands "
+                         f"of one {tile_size}x{width} tile row")
+    # Keep at least one band per worker so small levels still spread out.
+    return max(1, min(fit, MAX_BAND_ROWS, -(-rows // workers)))
+
+
+def _run_bands(jobs: list[BandJob], pool, window: int):
+    """Yield results in job order, keeping at most `window` jobs in flight."""
+    if pool is None:
+        for job in jobs:
+            yield run_band(job)
+        return
+    pending: deque = deque()
+    it = iter(jobs)
+    for job in it:
+        pending.append(pool.submit(run_band, job))
+        if len(pending) >= window:
+            break
+    while pending:
+        result = pending.popleft().result()
+        for job in it:
+            pending.append(pool.submit(run_band, job))
+            break
+        yield result
+
+
+def build_pyramid(src: np.ndarray, out: Path, tile_size: int = DEFAULT_TILE_SIZE,
+                  percentiles: tuple[float, float] = DEFAULT_PERCENTILES,
+                  keep_levels: bool = False, container: bool = False,
+                  workers: int = 1, max_memory: int = DEFAULT_MAX_MEMORY,
+                  progress=None) -> dict:
+    """Write raw + display tiles and a manifest for `src`; return the manifest.
+
+    `out` is a directory, or the container file path when `container` is set.
+    With `workers > 1` bands of tile rows run on a process pool. Source and
+    level pixels are never pickled: every level is a memmap that workers
+    reopen by path. Directory output is written by the workers themselves.
+    Container output is one file, so workers pickle each band's encoded
+    tiles back to the parent, which appends them (at most `window` bands
+    in flight, within the memory ceiling). `progress(phase, done, total)` is called as tile
+    rows finish.
+    """
+    if tile_size < 2 or tile_size % 2:
+        raise ValueError(f"tile size must be an even number >= 2, got {tile_size}")
+    dtype = src.dtype
+    bits = SUPPORTED_DTYPES[dtype.name]
+    shapes = level_shapes(src.shape[0], src.shape[1], tile_size)
+    value_range = None if dtype.kind == "u" else scan_range(src, tile_size)
+    kinds = ("raw", "display") if bits > 8 else ("raw",)
+    workers = max(1, workers)
+    window = 2 * workers if workers > 1 else 1
+    tile_rows = [-(-h // tile_size) for h, _ in shapes]
+    total = sum(tile_rows) * len(kinds)
+    done = 0
+
+    scratch_parent = out.parent if container else out
+    scratch_parent.mkdir(parents=True, exist_ok=True)
+    scratch = Path(tempfile.mkdtemp(prefix="_levels-", dir=scratch_parent))
+    writer_cls = ContainerTileWriter if container else DirectoryTileWriter
+    writer = writer_cls(out, shapes, tile_size, kinds)
+    out_dir = None if container else str(out)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    hists: list[Histogram] = []
+    raw_bytes = 0
+    try:
+        if not (isinstance(src, np.memmap) and src.filename and src.flags.c_contiguous):
+            spill = np.lib.format.open_memmap(scratch / "0.npy", mode="w+",
+                                              dtype=dtype, shape=src.shape)
+            for r0 in range(0, src.shape[0], tile_size):
+                spill[r0:r0 + tile_size] = src[r0:r0 + tile_size]
+            spill.flush()
+            src = spill
+        refs = [ArrayRef.of(src)]
+        for level, shape in enumerate(shapes[1:], start=1):
+            lvl = np.lib.format.open_memmap(scratch / f"{level}.npy", mode="w+",
+                                            dtype=dtype, shape=shape)
+            refs.append(ArrayRef.of(lvl))
+            del lvl
+
+        def bands(phase: str, level: int, **extra) -> list[BandJob]:
+            h, w = shapes[level]
+            step = plan_band_rows(w, dtype.itemsize, tile_size, tile_rows[level],
+                                  workers, window, max_memory)
+            return [BandJob(phase, level, r, min(r + step, tile_rows[level]), tile_size,
+                            refs[level], out_dir=out_dir, **extra)
+                    for r in range(0, tile_rows[level], step)]
+
+        def consume(jobs: list[BandJob]):
+            nonlocal done
+            for result in _run_bands(jobs, pool, window):
+                for tile in result.tiles:
+                    writer.write(*tile)
+                done += result.job.row1 - result.job.row0
+                if progress:
+                    progress(result.job.phase, done, total)
+                yield result
+
+        # Pass 1: raw tiles + histograms + next-level downsample, per band.
+        # Level L+1 is only read once every band of level L has finished.
+        for level in range(len(shapes)):
+            nxt = refs[level + 1] if level + 1 < len(shapes) else None
+            hist = Histogram(dtype, value_range)
+            for result in consume(bands("raw", level, nxt=nxt, value_range=value_range)):
+                hist.merge(result.hist)
+                raw_bytes += result.nbytes
+            hists.append(hist)
+
+        global_stats = hists[0].stats(percentiles)
+        display_range = (global_stats["pLow"], global_stats["pHigh"])
+
+        # Pass 2: 8-bit display tiles from the same levels via the LUT.
+        if "display" in kinds:
+            for level in range(len(shapes)):
+                for _ in consume(bands("display", level, display_range=display_range)):
+                    pass
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if not keep_levels:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    base_w = shapes[0][1]
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": MANIFEST_VERSION,
+        "layout": writer.layout,
+        "tileSize": tile_size,
+        "dtype": dtype.name,
+        "bitsPerSample": bits,
+        "byteOrder": "little",
+        "displayKind": kinds[-1],
+        "displayRange": list(display_range),
+        "percentiles": list(percentiles),
+        "rawBytes": raw_bytes,
+        "stats": dict(global_stats, histogram=hists[0].summary()),
+        "levels": [
+            {
+                "level": level,
+                "w": w,
+                "h": h,
+                "scaleFactor": base_w / w,
+                "cols": -(-w // tile_size),
+                "rows": -(-h // tile_size),
+                "stats": hists[level].stats(percentiles),
+            }
+            for level, (h, w) in enumerate(shapes)
+        ],
+    }
+    writer.finish(manifest)
+    return manifest
+
+
+class PyramidReader:
+    """Read tiles back from either layout."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.index = None
+        if path.is_dir():
+            self.manifest = json.loads((path / MANIFEST_NAME).read_text(encoding="utf-8"))
+            return
+        with open(path, "rb") as fh:
+            magic, _ver, _flags, index_offset, index_count, man_offset, man_len = \
+                CONTAINER_HEADER.unpack(fh.read(CONTAINER_HEADER.size))
+            if magic != CONTAINER_MAGIC:
+                raise ValueError(f"{path}: not a pyramid container")
+            fh.seek(index_offset)
+            self.index = np.frombuffer(fh.read(index_count * INDEX_ENTRY_DTYPE.itemsize),
+                                       dtype=INDEX_ENTRY_DTYPE)
+            fh.seek(man_offset)
+            self.manifest = json.loads(fh.read(man_len))
+
+    def tile_bytes(self, kind: str, level: int, row: int, col: int) -> bytes:
+        m = self.manifest
+        if self.index is None:
+            template = m["rawTile"] if kind == "raw" else m["displayTile"]
+            return (self.path / template.format(level=level, row=row, col=col)).read_bytes()
+        ti = m["tileIndex"]
+        entry = (ti["kindBase"][kind] + ti["levelBase"][level]
+                 + row * m["levels"][level]["cols"] + col)
+        offset, length = self.index[entry]
+        with open(self.path, "rb") as fh:
+            fh.seek(int(offset))
+            return fh.read(int(length))
+
+    def tile(self, level: int, row: int, col: int, display: bool = False) -> np.ndarray:
+        lv = self.manifest["levels"][level]
+        t = self.manifest["tileSize"]
+        th = min(t, lv["h"] - row * t)
+        tw = min(t, lv["w"] - col * t)
+        dtype = np.uint8 if display else np.dtype(self.manifest["dtype"]).newbyteorder("<")
+        data = self.tile_bytes("display" if display else "raw", level, row, col)
+        return np.frombuffer(data, dtype=dtype).reshape(th, tw)
+
+
+def _self_test() -> bool:
+    """Build a small 16-bit pyramid in both layouts and check tiles and stats."""
+    rng = np.random.default_rng(7)
+    img = rng.integers(100, 4000, size=(300, 520), dtype=np.uint16)
+    img[0, 0] = 60000  # a hot pixel the percentile range must ignore
+    with tempfile.TemporaryDirectory() as tmp:
+        src_path = Path(tmp) / "img.npy"
+        np.save(src_path, img)
+        out = Path(tmp) / "pyr"
+        m = build_pyramid(open_source(src_path), out, tile_size=128)
+        reader = PyramidReader(out)
+        dims = [(lv["h"], lv["w"]) for lv in m["levels"]]
+        if dims != [(300, 520), (150, 260), (75, 130), (38, 65)]:
+            print(f"self-test FAIL: level dims {dims}")
+            return False
+        if not np.array_equal(reader.tile(0, 2, 4), img[256:300, 512:520]):
+            print("self-test FAIL: level-0 edge tile does not match the source")
+            return False
+        expected_l1 = downsample2(img)
+        if not np.array_equal(reader.tile(1, 1, 0), expected_l1[128:150, 0:128]):
+            print("self-test FAIL: level-1 tile does not match the 2x2 mean")
+            return False
+        if m["stats"]["max"] != 60000 or m["displayRange"][1] >= 60000:
+            print(f"self-test FAIL: display range {m['displayRange']} not percentile-clipped")
+            return False
+        lo, hi = m["displayRange"]
+        if abs(lo - np.percentile(img, 0.1)) > 2 or abs(hi - np.percentile(img, 99.9)) > 2:
+            print(f"self-test FAIL: percentiles {lo},{hi} disagree with numpy")
+            return False
+        disp = reader.tile(0, 0, 0, display=True)
+        want = display_transform(img.dtype, lo, hi)(img[0:128, 0:128])
+        if not np.array_equal(disp, want):
+            print("self-test FAIL: display tile does not match the LUT")
+            return False
+        if any(p.name.startswith("_levels-") for p in out.iterdir()):
+            print("self-test FAIL: scratch level memmaps left behind")
+            return False
+
+        packed = Path(tmp) / "img.ijtp"
+        build_pyramid(open_source(src_path), packed, tile_size=128, container=True)
+        creader = PyramidReader(packed)
+        for level, lv in enumerate(m["levels"]):
+            for row in range(lv["rows"]):
+                for col in range(lv["cols"]):
+                    for display in (False, True):
+                        if not np.array_equal(creader.tile(level, row, col, display),
+                                              reader.tile(level, row, col, display)):
+                            print(f"self-test FAIL: container tile L{level} r{row} c{col} "
+                                  f"display={display} differs from directory layout")
+                            return False
+        if any(p.name.startswith("_levels-") for p in Path(tmp).iterdir()):
+            print("self-test FAIL: container build left scratch memmaps behind")
+            return False
+
+        # Parallel builds with tiny bands must be byte-identical to serial.
+        par_dir = Path(tmp) / "par"
+        build_pyramid(open_source(src_path), par_dir, tile_size=128, workers=2,
+                      max_memory=8 << 20)
+        par_packed = Path(tmp) / "par.ijtp"
+        build_pyramid(img, par_packed, tile_size=128, container=True, workers=2,
+                      max_memory=8 << 20)
+        if par_packed.read_bytes() != packed.read_bytes():
+            print("self-test FAIL: parallel container differs from serial build")
+            return False
+        preader = PyramidReader(par_dir)
+        for level, lv in enumerate(m["levels"]):
+            for row in range(lv["rows"]):
+                for col in range(lv["cols"]):
+                    if not np.array_equal(preader.tile(level, row, col, True),
+                                          reader.tile(level, row, col, True)):
+                        print(f"self-test FAIL: parallel tile L{level} r{row} c{col} differs")
+                        return False
+        try:
+            build_pyramid(img, Path(tmp) / "tiny", tile_size=128, max_memory=1 << 10)
+        except ValueError:
+            pass
+        else:
+            print("self-test FAIL: an impossible --max-memory was accepted")
+            return False
+    print("build_pyramid self-test: PASS")
+    return True
+
+
+def _print_progress(phase: str, done: int, total: int) -> None:
+    end = "\n" if done == total else ""
+    print(f"\r[build_pyramid] {phase:<7} {done}/{total} tile rows "
+          f"({100 * done // total}%)", end=end, file=sys.stderr, flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", help="Input image (.npy, or raw with --shape/--dtype)")
+    parser.add_argument("out", nargs="?", help="Output pyramid directory (or .ijtp file with --container)")
+    parser.add_argument("--shape", type=int, nargs=2, metavar=("H", "W"), help="Raw input shape")
+    parser.add_argument("--dtype", choices=sorted(SUPPORTED_DTYPES), help="Raw input dtype")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE, help="Tile edge in pixels (even)")
+    parser.add_argument("--percentiles", type=float, nargs=2, default=DEFAULT_PERCENTILES,
+                        metavar=("LOW", "HIGH"), help="Display-range percentiles")
+    parser.add_argument("--container", action="store_true", help="Pack all tiles into one range-addressable file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument("--max-memory", type=int, default=DEFAULT_MAX_MEMORY >> 20, metavar="MB",
+                        help="Ceiling for band buffers held by in-flight workers")
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    parser.add_argument("--keep-levels", action="store_true", help="Keep the scratch level memmaps")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.source or not args.out:
+        parser.error("source and out are required")
+
+    try:
+        src = open_source(Path(args.source), tuple(args.shape) if args.shape else None, args.dtype)
+        m = build_pyramid(src, Path(args.out), args.tile_size, tuple(args.percentiles),
+                          args.keep_levels, args.container, args.workers,
+                          args.max_memory << 20, None if args.quiet else _print_progress)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    base = m["levels"][0]
+    print(f"{args.out}: {len(m['levels'])} levels, base {base['w']}x{base['h']}, "
+          f"{m['dtype']}, {m['layout']}, "
+          f"display range {m['displayRange'][0]:g}..{m['displayRange'][1]:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
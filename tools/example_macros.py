@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Extract and check the macro blocks embedded in imagej-examples/.
+
+Agents copy the ```imagej-macro blocks from the example markdown straight
+into `runMacro`. An example that calls a command missing from the
+running ImageJ (a renamed menu entry, or a plugin that is not installed)
+fails only after a multi-second round trip. This tool finds such breakage
+offline. For every macro block it:
+
+  - tokenises it with tools/ijm_tokenizer.py and checks that brackets
+    balance (unterminated strings and comments are tokenizer errors);
+  - records each command it references, i.e. the literal first argument
+    of run() and doCommand(); calls built from variables are counted as
+    dynamic;
+  - reports commands that are not in the command catalogue, with the
+    nearest catalogue names as suggestions.
+
+The command catalogue is Menus.getCommands() from a live service. The
+`commands` subcommand saves it as {command: menu path} JSON via
+searchCommands(query="").
+
+Results are cached in a JSON file keyed by content hashes. A file whose
+hash is unchanged is not re-read for blocks. A block already seen, in
+any file, is not tokenised again. Only the set lookup against the
+catalogue runs again, so a new catalogue re-checks everything without
+re-parsing.
+
+Usage
+-----
+    python3 tools/example_macros.py --self-test
+    python3 tools/example_macros.py commands --service-id <workspace>/<id> -o commands.json
+    python3 tools/example_macros.py check [--commands commands.json] [--json] [PATH ...]
+    python3 tools/example_macros.py extract imagej-examples/roi/roi-manager-basics.md
+    python3 tools/example_macros.py bench [--docs 2000]
+
+`check` exits 1 when a block has a syntax error or references a command
+missing from the catalogue. Without --commands it only lists references.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import difflib
+import hashlib
+import json
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from ijm_tokenizer import OP, STRING, WORD, MacroSyntaxError, tokenize  # noqa: E402
+from imagej_client import HyphaTransport, ImageJClient  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLES = ROOT / "imagej-examples"
+DEFAULT_CACHE = ROOT / ".example-macros-cache.json"
+CACHE_VERSION = 1
+MACRO_LANGS = frozenset({"imagej-macro", "ijm", "macro"})
+COMMAND_FUNCS = frozenset({"run", "doCommand"})
+BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+FENCE = re.compile(r"^(\s*)(`{3,}|~{3,})\s*([\w+-]*)[^\n]*$")
+
+
+@dataclass
+class Block:
+    path: str
+    index: int
+    line: int  # markdown line of the first code line
+    lang: str
+    code: str
+
+
+@dataclass
+class BlockReport:
+    path: str
+    index: int
+    line: int
+    commands: list[str] = field(default_factory=list)
+    dynamic: int = 0
+    error: str | None = None
+    dead: list[str] = field(default_factory=list)
+    suggestions: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.dead
+
+
+@dataclass
+class CheckStats:
+    files: int = 0
+    files_parsed: int = 0
+    blocks: int = 0
+    blocks_analysed: int = 0
+
+
+def extract_blocks(markdown: str, path: str = "") -> list[Block]:
+    """Fenced code blocks tagged as ImageJ macro, in document order."""
+    blocks, lines, i = [], markdown.split("\n"), 0
+    while i < len(lines):
+        m = FENCE.match(lines[i])
+        if not m:
+            i += 1
+            continue
+        fence, lang, start = m.group(2), m.group(3).lower(), i + 1
+        i = start
+        while i < len(lines) and not lines[i].strip().startswith(fence):
+            i += 1
+        if lang in MACRO_LANGS:
+            blocks.append(Block(path, len(blocks), start + 1, lang, "\n".join(lines[start:i])))
+        i += 1
+    return blocks
+
+
+def analyse(code: str) -> dict[str, Any]:
+    """Catalogue-independent facts about one block: referenced commands and syntax errors."""
+    try:
+        tokens = tokenize(code)
+    except MacroSyntaxError as e:
+        return {"commands": [], "dynamic": 0, "error": str(e)}
+    commands, dynamic, stack = [], 0, []
+    for i, t in enumerate(tokens):
+        if t.type == OP and t.value in BRACKETS:
+            stack.append(t)
+        elif t.type == OP and t.value in BRACKETS.values():
+            if not stack or BRACKETS[stack[-1].value] != t.value:
+                return {"commands": commands, "dynamic": dynamic, "error": f"line {t.line}: unmatched '{t.value}'"}
+            stack.pop()
+        elif t.type == WORD and t.value in COMMAND_FUNCS and not (i and tokens[i - 1].is_(OP, ".")) \
+                and i + 3 < len(tokens) and tokens[i + 1].is_(OP, "("):
+            arg, after = tokens[i + 2], tokens[i + 3]
+            if arg.type == STRING and (after.is_(OP, ",") or after.is_(OP, ")")):
+                commands.append(arg.value)
+            else:
+                dynamic += 1
+    if stack:
+        return {"commands": commands, "dynamic": dynamic,
+                "error": f"line {stack[-1].line}: unclosed '{stack[-1].value}'"}
+    return {"commands": commands, "dynamic": dynamic, "error": None}
+
+
+def load_commands(path: str | Path) -> set[str]:
+    """Accepts {command: menuPath}, a list of names, or a searchCommands() result."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(data, dict) and "commands" in data:
+        data = data["commands"]
+    if isinstance(data, dict):
+        return set(data)
+    return {c["command"] if isinstance(c, dict) else c for c in data}
+
+
+class MacroCheckCache:
+    """Two-level hash cache: file sha -> block keys, block key -> analyse() result."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self.files: dict[str, dict[str, Any]] = {}
+        self.blocks: dict[str, dict[str, Any]] = {}
+        if path and path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == CACHE_VERSION:
+                self.files, self.blocks = data["files"], data["blocks"]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        used = {b["key"] for f in self.files.values() for b in f["blocks"]}
+        self.blocks = {k: v for k, v in self.blocks.items() if k in used}
+        self.path.write_text(json.dumps({"version": CACHE_VERSION, "files": self.files, "blocks": self.blocks},
+                                        sort_keys=True) + "\n", encoding="utf-8")
+
+
+def check(files: dict[str, str], commands: set[str] | None, cache: MacroCheckCache,
+          stats: CheckStats | None = None) -> list[BlockReport]:
+    """Reports for every macro block in {path: markdown}."""
+    stats = stats if stats is not None else CheckStats()
+    reports = []
+    for path in sorted(files):
+        stats.files += 1
+        sha = hashlib.sha256(files[path].encode("utf-8")).hexdigest()
+        entry = cache.files.get(path)
+        if not entry or entry["sha"] != sha or any(b["key"] not in cache.blocks for b in entry["blocks"]):
+            stats.files_parsed += 1
+            entry = {"sha": sha, "blocks": []}
+            for block in extract_blocks(files[path], path):
+                key = hashlib.sha256(block.code.encode("utf-8")).hexdigest()[:32]
+                if key not in cache.blocks:
+                    stats.blocks_analysed += 1
+                    cache.blocks[key] = analyse(block.code)
+                entry["blocks"].append({"key": key, "line": block.line})
+            cache.files[path] = entry
+        for index, b in enumerate(entry["blocks"]):
+            stats.blocks += 1
+            facts = cache.blocks[b["key"]]
+            report = BlockReport(path, index, b["line"], facts["commands"], facts["dynamic"], facts["error"])
+            if commands is not None:
+                report.dead = sorted({c for c in facts["commands"] if c not in commands})
+                report.suggestions = {c: difflib.get_close_matches(c, commands, n=3) for c in report.dead}
+            reports.append(report)
+    for path in set(cache.files) - set(files):
+        del cache.files[path]
+    return reports
+
+
+def example_files(paths: list[str] | None = None) -> dict[str, str]:
+    """{path relative to imagej-examples/ (or as given): markdown} for the examples to check."""
+    if paths:
+        out = {}
+        for p in map(Path, paths):
+            for f in sorted(p.rglob("*.md")) if p.is_dir() else [p]:
+                rel = f.resolve().relative_to(EXAMPLES) if f.resolve().is_relative_to(EXAMPLES) else f
+                out[rel.as_posix()] = f.read_text(encoding="utf-8")
+        return out
+    return {f.relative_to(EXAMPLES).as_posix(): f.read_text(encoding="utf-8") for f in sorted(EXAMPLES.rglob("*.md"))}
+
+
+def format_report(reports: list[BlockReport], checked: bool) -> str:
+    lines = []
+    for r in reports:
+        where = f"{r.path}:{r.line} block {r.index + 1}"
+        if r.error:
+            lines.append(f"{where}: syntax error: {r.error}")
+        for c in r.dead:
+            hint = f" (did you mean {', '.join(repr(s) for s in r.suggestions[c])}?)" if r.suggestions.get(c) else ""
+            lines.append(f"{where}: unknown command {c!r}{hint}")
+        if not checked and r.commands:
+            lines.append(f"{where}: {', '.join(repr(c) for c in r.commands)}")
+    bad = sum(not r.ok for r in reports)
+    lines.append(f"{len(reports)} macro block(s), {bad} with problems"
+                 + ("" if checked else "; no --commands catalogue, commands not checked"))
+    return "\n".join(lines)
+
+
+# --- self-test / bench -------------------------------------------------------
+
+_SAMPLE = """---
+title: Sample
+---
+
+```imagej-macro
+run("Blobs (25K)");
+setAutoThreshold("Default");
+run("Analyze Particles...", "size=50-Infinity show=Nothing add");
+cmd = "Measure"; run(cmd);
+```
+
+```javascript
+run("Not A Macro");
+```
+
+~~~ijm
+doCommand("Start Animation [\\\\]");
+run("Gausian Blur...", "sigma=2");
+~~~
+
+```imagej-macro
+if (nImages > 0 { close(); }
+```
+"""
+_COMMANDS = {"Blobs (25K)", "Analyze Particles...", "Measure", "Gaussian Blur...", "Start Animation [\\]"}
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    blocks = extract_blocks(_SAMPLE, "s.md")
+    if [(b.line, b.lang) for b in blocks] != [(6, "imagej-macro"), (17, "ijm"), (22, "imagej-macro")]:
+        fails.append(f"extract: {[(b.line, b.lang) for b in blocks]}")
+    cache = MacroCheckCache()
+    stats = CheckStats()
+    reports = check({"s.md": _SAMPLE}, _COMMANDS, cache, stats)
+    first, second, third = reports
+    if first.commands != ["Blobs (25K)", "Analyze Particles..."] or first.dynamic != 1 or not first.ok:
+        fails.append(f"block 1: {first}")
+    if second.dead != ["Gausian Blur..."] or second.suggestions["Gausian Blur..."][:1] != ["Gaussian Blur..."]:
+        fails.append(f"block 2: {second}")
+    if third.error != "line 1: unclosed '('":
+        fails.append(f"block 3: {third}")
+    if analyse('print("a);')["error"] is None:
+        fails.append("unterminated string not reported")
+    edited = _SAMPLE.replace("```javascript", "Not a macro:\n\n```javascript")
+    stats = CheckStats()
+    again = check({"s.md": _SAMPLE, "t.md": edited}, _COMMANDS, cache, stats)
+    if (stats.files_parsed, stats.blocks_analysed) != (1, 0):
+        fails.append(f"cache: parsed {stats.files_parsed} files, analysed {stats.blocks_analysed} blocks")
+    if [r.line for r in again[3:]] != [6, 19, 24] or again[3].commands != first.commands:
+        fails.append(f"edited file: {[(r.line, r.commands) for r in again[3:]]}")
+    stats = CheckStats()
+    check({"t.md": edited}, None, cache, stats)
+    if stats.files_parsed or "s.md" in cache.files:
+        fails.append("unchanged file re-parsed or deleted file kept")
+    if EXAMPLES.is_dir():
+        for r in check(example_files(), None, MacroCheckCache()):
+            if r.error:
+                fails.append(f"shipped example {r.path}:{r.line}: {r.error}")
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("example_macros self-test: PASS")
+    return True
+
+
+def bench(count: int) -> list[tuple[str, float]]:
+    import random
+    import tempfile
+    rng = random.Random(0)
+    commands = sorted(_COMMANDS) + [f"Command {i}..." for i in range(800)]
+    files = {}
+    for i in range(count):
+        body = [f"---\ntitle: Example {i}\n---\n"]
+        for _ in range(rng.randint(1, 4)):
+            lines = [f'run("{rng.choice(commands)}", "x={k}");\nfor (i = 0; i < {k}; i++) {{ v = getPixel(i, 0); }}'
+                     for k in range(rng.randint(5, 40))]
+            body.append("```imagej-macro\n" + "\n".join(lines) + "\n```\n")
+        files[f"cat{i % 20}/ex{i}.md"] = "\n".join(body)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.json"
+        rows = []
+        for label, mutate in (("cold (s)", None), ("warm (s)", None), ("1 file edited (s)", sorted(files)[count // 2])):
+            if mutate:
+                files[mutate] += "\n```imagej-macro\nrun(\"Measure\");\n```\n"
+            cache, stats = MacroCheckCache(path), CheckStats()
+            t0 = time.perf_counter()
+            check(files, set(commands), cache, stats)
+            cache.save()
+            rows.append((label, time.perf_counter() - t0))
+            rows.append(("  blocks analysed", stats.blocks_analysed))
+        rows.append(("cache KB", path.stat().st_size / 1e3))
+    return rows
+
+
+async def _dump_commands(args: argparse.Namespace) -> int:
+    client = ImageJClient(await HyphaTransport.connect(args.service_id, args.server_url))
+    res = await client.searchCommands(query="")
+    if res.get("error"):
+        raise RuntimeError(res["error"])
+    catalogue = {c["command"]: c["menuPath"] for c in res.get("commands", [])}
+    Path(args.output).write_text(json.dumps(catalogue, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"wrote {len(catalogue)} commands to {args.output}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    c = sub.add_parser("check", help="Check the macro blocks of examples (default: all of imagej-examples/)")
+    c.add_argument("paths", nargs="*")
+    c.add_argument("--commands", help="Command catalogue JSON (see the `commands` subcommand)")
+    c.add_argument("--cache", default=str(DEFAULT_CACHE), help="Cache file ('' to disable)")
+    c.add_argument("--json", action="store_true")
+    e = sub.add_parser("extract", help="Print the macro blocks of one markdown file")
+    e.add_argument("markdown")
+    d = sub.add_parser("commands", help="Save a live service's command catalogue")
+    d.add_argument("--service-id", required=True)
+    d.add_argument("--server-url", default="https://hypha.aicell.io")
+    d.add_argument("-o", "--output", default="commands.json")
+    be = sub.add_parser("bench", help="Cold, warm and incremental checks of a synthetic library")
+    be.add_argument("--docs", type=int, default=2000)
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    try:
+        if args.cmd == "check":
+            commands = load_commands(args.commands) if args.commands else None
+            cache = MacroCheckCache(Path(args.cache) if args.cache else None)
+            stats = CheckStats()
+            reports = check(example_files(args.paths), commands, cache, stats)
+            cache.save()
+            if args.json:
+                print(json.dumps({"stats": asdict(stats), "blocks": [asdict(r) for r in reports]}, indent=1))
+            else:
+                print(format_report(reports, commands is not None))
+                print(f"({stats.files_parsed}/{stats.files} files parsed, "
+                      f"{stats.blocks_analysed}/{stats.blocks} blocks analysed; rest from cache)")
+            return 0 if all(r.ok for r in reports) else 1
+        if args.cmd == "extract":
+            for block in extract_blocks(Path(args.markdown).read_text(encoding="utf-8"), args.markdown):
+                print(f"// --- block {block.index + 1} ({block.lang}), line {block.line}\n{block.code}")
+            return 0
+        if args.cmd == "commands":
+            return asyncio.run(_dump_commands(args))
+    except (OSError, KeyError, ValueError, RuntimeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.cmd == "bench":
+        print(f"{args.docs} synthetic examples")
+        for label, v in bench(args.docs):
+            print(f"  {label:<20} {v:>10.2f}")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
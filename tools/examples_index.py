@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""Build imagej-examples/index.json, the precompiled examples catalogue.
+
+listExamples and searchExamples used to fetch README.md and then every
+example file on each call. They then parsed front-matter and scanned
+bodies in the browser, so one query cost O(files x file size) in
+fetches and string scans. This step does that work once, at build time.
+It writes a single JSON catalogue with:
+
+  docs     per-example front-matter, a short description, and the body
+           (for snippets), in path order
+  terms    inverted index: token -> flat [doc, weighted tf, doc, tf, ...]
+  bm25     k1, b, per-field weights and average document length
+  tokenizer
+           the token regex and stopwords, so the service tokenises
+           queries the same way
+
+The service fetches the catalogue once and answers list and search from
+memory. BM25 scoring touches only the postings of the query terms.
+search() below is the reference implementation of that scoring. The
+self-test holds the service's searchExamplesCatalog to it.
+
+Updates are incremental. Each doc records a hash of its file and its
+README link title. `update` writes only the examples that were added or
+changed, plus tombstones for deleted paths, as a delta segment
+(index.delta-N.json). The segment is listed in index.segments.json. The
+service and merge_segments() fold the deltas over the base in memory.
+The result is exactly what a full rebuild would produce.
+`compact` (also the default command) rebuilds index.json and removes the
+deltas. `update` compacts by itself after MAX_DELTAS segments.
+--check exits 1 when the catalogue and its deltas are stale.
+
+Usage
+-----
+    python3 tools/examples_index.py                 # compact: rewrite index.json, drop deltas
+    python3 tools/examples_index.py update          # add a delta segment for changed examples
+    python3 tools/examples_index.py --check
+    python3 tools/examples_index.py --self-test
+    python3 tools/examples_index.py search "roi manager measure" [--limit 5]
+    python3 tools/examples_index.py bench [--docs 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+EXAMPLES = ROOT / "imagej-examples"
+OUT = EXAMPLES / "index.json"
+MANIFEST = "index.segments.json"
+MAX_DELTAS = 8
+SERVICE_JS = ROOT / "hypha-imagej-service.js"
+
+VERSION = 1
+TOKEN_PATTERN = "[a-z0-9]+"
+STOPWORDS = sorted({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "into", "is", "it", "of",
+    "on", "or", "that", "the", "then", "this", "to", "with",
+})
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "description": 2, "body": 1}
+K1, B = 1.2, 0.75
+SNIPPET_BEFORE, SNIPPET_AFTER = 50, 100
+
+FRONTMATTER = re.compile(r"^---\s*\n([\s\S]*?)\n---\s*\n([\s\S]*)$")
+LINK = re.compile(r"\[([^\]]+)\]\(([^)]+\.md)\)")
+_TOKEN = re.compile(TOKEN_PATTERN)
+_STOP = frozenset(STOPWORDS)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOP]
+
+
+def parse_frontmatter(content: str) -> tuple[dict[str, Any], str]:
+    """Same rules as parseFrontmatter() in hypha-imagej-service.js."""
+    match = FRONTMATTER.match(content)
+    if not match:
+        return {}, content
+    metadata: dict[str, Any] = {}
+    for line in match.group(1).split("\n"):
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            metadata[key.strip()] = [re.sub(r"['\"]", "", v.strip()) for v in value[1:-1].split(",")]
+        else:
+            metadata[key.strip()] = {"true": True, "false": False}.get(value, value)
+    return metadata, match.group(2)
+
+
+def _description(metadata: dict[str, Any], body: str) -> str:
+    if isinstance(metadata.get("description"), str):
+        return metadata["description"]
+    for para in re.split(r"\n\s*\n", body):
+        para = "\n".join(line for line in para.strip().split("\n") if not line.startswith("#")).strip()
+        if para and not para.startswith(("#", "```", "-", "|", ">")):
+            return " ".join(para.split())[:200]
+    return ""
+
+
+def example_paths(root: Path = EXAMPLES) -> list[str]:
+    """Examples in category folders, plus any .md the README links to."""
+    paths = {p.relative_to(root).as_posix() for p in root.glob("*/**/*.md")}
+    readme = root / "README.md"
+    if readme.exists():
+        for _, link in LINK.findall(readme.read_text(encoding="utf-8")):
+            if "://" not in link and (root / link).is_file():
+                paths.add(link)
+    return sorted(paths)
+
+
+def content_hash(text: str, readme_title: str = "") -> str:
+    return hashlib.sha256(f"{readme_title}\0{text}".encode()).hexdigest()[:16]
+
+
+def build_catalog(files: dict[str, str], readme_titles: dict[str, str] | None = None) -> dict[str, Any]:
+    """Catalogue for {relative path: markdown} examples."""
+    readme_titles = readme_titles or {}
+    docs, postings, lengths = [], {}, []
+    for doc_id, path in enumerate(sorted(files)):
+        metadata, body = parse_frontmatter(files[path])
+        tags = metadata.get("tags") if isinstance(metadata.get("tags"), list) else []
+        doc = {
+            "path": path,
+            "sha": content_hash(files[path], readme_titles.get(path, "")),
+            "title": metadata.get("title") or readme_titles.get(path) or Path(path).stem,
+            "category": metadata.get("category") or (path.split("/")[0] if "/" in path else ""),
+            "tags": tags,
+            "difficulty": metadata.get("difficulty", ""),
+            "language": metadata.get("language", ""),
+            "description": _description(metadata, body),
+            "metadata": metadata,
+            "body": body,
+        }
+        tf: Counter[str] = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            text = " ".join(tags) if field == "tags" else doc[field]
+            for token in tokenize(text):
+                tf[token] += weight
+        for token, count in tf.items():
+            postings.setdefault(token, []).extend((doc_id, count))
+        doc["length"] = sum(tf.values())
+        lengths.append(doc["length"])
+        docs.append(doc)
+    return {
+        "version": VERSION,
+        "generated_by": "tools/examples_index.py",
+        "tokenizer": {"pattern": TOKEN_PATTERN, "stopwords": STOPWORDS},
+        "bm25": {"k1": K1, "b": B, "fields": FIELD_WEIGHTS,
+                 "avgdl": round(sum(lengths) / len(lengths), 4) if lengths else 0},
+        "docs": docs,
+        "terms": dict(sorted(postings.items())),
+    }
+
+
+def load_examples(root: Path = EXAMPLES) -> tuple[dict[str, str], dict[str, str]]:
+    readme = root / "README.md"
+    titles = {link: title for title, link in LINK.findall(readme.read_text(encoding="utf-8"))} if readme.exists() else {}
+    return {p: (root / p).read_text(encoding="utf-8") for p in example_paths(root)}, titles
+
+
+def render(catalog: dict[str, Any]) -> str:
+    return json.dumps(catalog, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+# --- segments ----------------------------------------------------------------
+
+def load_segments(root: Path = EXAMPLES) -> tuple[dict[str, Any] | None, list[dict[str, Any]]]:
+    """The base catalogue (None if missing) and its delta segments in order."""
+    if not (root / OUT.name).exists():
+        return None, []
+    base = json.loads((root / OUT.name).read_text(encoding="utf-8"))
+    manifest = root / MANIFEST
+    names = json.loads(manifest.read_text(encoding="utf-8"))["deltas"] if manifest.exists() else []
+    return base, [json.loads((root / name).read_text(encoding="utf-8")) for name in names]
+
+
+def live_docs(base: dict[str, Any], deltas: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """path -> newest doc across segments, tombstoned paths dropped."""
+    live: dict[str, dict[str, Any]] = {}
+    for seg in [base, *deltas]:
+        for path in seg.get("deleted", []):
+            live.pop(path, None)
+        live.update((doc["path"], doc) for doc in seg["docs"])
+    return live
+
+
+def merge_segments(base: dict[str, Any], deltas: list[dict[str, Any]]) -> dict[str, Any]:
+    """Fold deltas over base; equals build_catalog() over the live examples.
+
+    A path's newest segment wins and a tombstone drops it. Docs are
+    renumbered in path order, as a full build numbers them, so BM25
+    statistics and tie-breaks match a rebuild exactly.
+    """
+    if not deltas:
+        return base
+    segments = [base, *deltas]
+    live: dict[str, tuple[int, int]] = {}
+    for s, seg in enumerate(segments):
+        for path in seg.get("deleted", []):
+            live.pop(path, None)
+        for d, doc in enumerate(seg["docs"]):
+            live[doc["path"]] = (s, d)
+    order = sorted(live)
+    new_id = {live[path]: i for i, path in enumerate(order)}
+    docs = [segments[s]["docs"][d] for s, d in (live[path] for path in order)]
+    pairs: dict[str, list[tuple[int, int]]] = {}
+    for s, seg in enumerate(segments):
+        for term, post in seg["terms"].items():
+            for i in range(0, len(post), 2):
+                j = new_id.get((s, post[i]))
+                if j is not None:
+                    pairs.setdefault(term, []).append((j, post[i + 1]))
+    total = sum(doc["length"] for doc in docs)
+    return {
+        "version": base["version"],
+        "generated_by": base["generated_by"],
+        "tokenizer": base["tokenizer"],
+        "bm25": {**base["bm25"], "avgdl": round(total / len(docs), 4) if docs else 0},
+        "docs": docs,
+        "terms": {t: [v for pair in sorted(p) for v in pair] for t, p in sorted(pairs.items())},
+    }
+
+
+def compact(root: Path = EXAMPLES) -> int:
+    """Full rebuild of index.json; deletes every delta segment. Returns the example count."""
+    files, titles = load_examples(root)
+    catalog = build_catalog(files, titles)
+    (root / OUT.name).write_text(render(catalog), encoding="utf-8")
+    for delta in root.glob("index.delta-*.json"):
+        delta.unlink()
+    (root / MANIFEST).unlink(missing_ok=True)
+    return len(catalog["docs"])
+
+
+def update(root: Path = EXAMPLES) -> str:
+    """Write one delta segment for added, changed and deleted examples."""
+    files, titles = load_examples(root)
+    base, deltas = load_segments(root)
+    fresh_settings = {"tokenizer": {"pattern": TOKEN_PATTERN, "stopwords": STOPWORDS},
+                      "bm25": {"k1": K1, "b": B, "fields": FIELD_WEIGHTS}}
+    if base is None or base.get("version") != VERSION or base["tokenizer"] != fresh_settings["tokenizer"] \
+            or {k: base["bm25"].get(k) for k in ("k1", "b", "fields")} != fresh_settings["bm25"]:
+        return f"rebuilt {OUT.name} ({compact(root)} examples)"
+    known = {path: doc.get("sha") for path, doc in live_docs(base, deltas).items()}
+    changed = {p: text for p, text in files.items() if known.get(p) != content_hash(text, titles.get(p, ""))}
+    deleted = sorted(set(known) - set(files))
+    if not changed and not deleted:
+        return "up to date"
+    if len(deltas) >= MAX_DELTAS:
+        return f"compacted {len(deltas)} deltas into {OUT.name} ({compact(root)} examples)"
+    n = max((int(p.stem.rsplit("-", 1)[1]) for p in root.glob("index.delta-*.json")), default=0) + 1
+    segment = {**build_catalog(changed, titles), "deleted": deleted}
+    name = f"index.delta-{n}.json"
+    (root / name).write_text(render(segment), encoding="utf-8")
+    manifest = root / MANIFEST
+    names = json.loads(manifest.read_text(encoding="utf-8"))["deltas"] if manifest.exists() else []
+    manifest.write_text(json.dumps({"version": VERSION, "deltas": [*names, name]}, indent=2) + "\n",
+                        encoding="utf-8")
+    return f"wrote {name} ({len(changed)} added/changed, {len(deleted)} deleted)"
+
+
+def is_current(root: Path = EXAMPLES) -> bool:
+    base, deltas = load_segments(root)
+    return base is not None and render(merge_segments(base, deltas)) == render(build_catalog(*load_examples(root)))
+
+
+def search(catalog: dict[str, Any], query: str, limit: int = 20) -> list[dict[str, Any]]:
+    """BM25 over the catalogue; mirrors searchExamplesCatalog() in the service."""
+    docs, bm = catalog["docs"], catalog["bm25"]
+    n, avgdl = len(docs), bm["avgdl"] or 1
+    scores: dict[int, float] = {}
+    terms = list(dict.fromkeys(tokenize(query)))
+    for term in terms:
+        post = catalog["terms"].get(term)
+        if not post:
+            continue
+        df = len(post) // 2
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for i in range(0, len(post), 2):
+            d, tf = post[i], post[i + 1]
+            norm = bm["k1"] * (1 - bm["b"] + bm["b"] * docs[d]["length"] / avgdl)
+            scores[d] = scores.get(d, 0.0) + idf * tf * (bm["k1"] + 1) / (tf + norm)
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+    return [{"path": docs[d]["path"], "title": docs[d]["title"], "score": round(s, 4),
+             "matches": snippet(docs[d]["body"], terms)} for d, s in ranked]
+
+
+def snippet(body: str, terms: list[str]) -> str:
+    lower = body.lower()
+    hits = [m.start() for t in terms for m in [re.search(r"(?<![a-z0-9])" + re.escape(t), lower)] if m]
+    at = min(hits) if hits else 0
+    return "..." + body[max(0, at - SNIPPET_BEFORE):at + SNIPPET_AFTER] + "..."
+
+
+# --- self-test / bench -------------------------------------------------------
+
+_SAMPLE = {
+    "roi/manager.md": "---\ntitle: ROI Manager Basics\ncategory: roi\ntags: [roi, 'cheerpj-safe']\n"
+                      "language: macro\nworks_in_cheerpj: true\n---\n\n# ROI Manager\n\n## Description\n"
+                      "Add, list and measure regions of interest.\n\n```\nroiManager(\"Measure\");\n```\n",
+    "segmentation/wand.md": "---\ntitle: Blob Segmentation with Magic Wand\ncategory: segmentation\n"
+                            "tags: [segmentation, wand]\n---\n\nThreshold the blobs, then trace each one with "
+                            "doWand and add it to the ROI manager.\n",
+    "filters/gauss.md": "# Gaussian blur\n\nSmooth an image before thresholding with run(\"Gaussian Blur...\").\n",
+}
+
+# Pulls the catalogue helpers out of the service, merges the segments from stdin
+# and searches the result.
+_NODE_SEARCH = r"""
+const src = require('fs').readFileSync(process.argv[1], 'utf8');
+const grab = (name) => { const i = src.indexOf('function ' + name + '(');
+  let depth = 0, j = src.indexOf('{', i);
+  for (; j < src.length; j++) { if (src[j] === '{') depth++; else if (src[j] === '}' && --depth === 0) break; }
+  return src.slice(i, j + 1); };
+eval(['mergeExampleSegments', 'examplePostings', 'tokenizeExampleText', 'exampleSnippet', 'searchExamplesCatalog']
+     .map(grab).join('\n') + ';Object.assign(globalThis, { mergeExampleSegments, examplePostings, run: searchExamplesCatalog });');
+const { base, deltas, queries } = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const catalog = mergeExampleSegments(base, deltas);
+const results = queries.map(q => run(catalog, q, 20));
+const terms = {};
+for (const segment of [base, ...deltas]) for (const term of Object.keys(segment.terms)) {
+  const post = examplePostings(catalog, term);
+  if (post) terms[term] = post;
+}
+process.stdout.write(JSON.stringify({ catalog: { docs: catalog.docs, terms, bm25: catalog.bm25 }, results }));
+"""
+
+
+def _incremental_test(fails: list[str]) -> tuple[dict[str, Any], list[dict[str, Any]], dict[str, Any]]:
+    """Exercise update/compact in a scratch tree; returns (base, deltas, merged) for the node check."""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+
+        def write(files: dict[str, str]) -> None:
+            for path, text in files.items():
+                (root / path).parent.mkdir(parents=True, exist_ok=True)
+                (root / path).write_text(text, encoding="utf-8")
+
+        write(_SAMPLE)
+        compact(root)
+        if update(root) != "up to date":
+            fails.append("update on an unchanged tree")
+        write({"roi/manager.md": _SAMPLE["roi/manager.md"].replace("measure", "measure and rename"),
+               "stacks/zproject.md": "---\ntitle: Z Project\ntags: [stack]\n---\n\nMax-intensity projection.\n"})
+        (root / "filters/gauss.md").unlink()
+        msg = update(root)
+        base, deltas = load_segments(root)
+        if len(deltas) != 1 or len(deltas[0]["docs"]) != 2 or deltas[0]["deleted"] != ["filters/gauss.md"]:
+            fails.append(f"delta segment: {msg}")
+        write({"filters/gauss.md": _SAMPLE["filters/gauss.md"]})
+        update(root)
+        base, deltas = load_segments(root)
+        merged = merge_segments(base, deltas)
+        if not is_current(root) or update(root) != "up to date":
+            fails.append("merged segments differ from a full rebuild")
+        msgs = []
+        for i in range(MAX_DELTAS):
+            write({"segmentation/wand.md": _SAMPLE["segmentation/wand.md"] + f"\nRevision {i}.\n"})
+            msgs.append(update(root))
+        if not any(m.startswith("compacted") for m in msgs) or not is_current(root) or \
+                len(load_segments(root)[1]) > MAX_DELTAS:
+            fails.append(f"auto-compaction: {msgs}")
+    return base, deltas, merged
+
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    catalog = json.loads(render(build_catalog(_SAMPLE)))
+    docs = {d["path"]: d for d in catalog["docs"]}
+    roi = docs["roi/manager.md"]
+    if roi["tags"] != ["roi", "cheerpj-safe"] or roi["metadata"]["works_in_cheerpj"] is not True:
+        fails.append(f"front-matter {roi['metadata']}")
+    if roi["description"] != "Add, list and measure regions of interest.":
+        fails.append(f"description {roi['description']!r}")
+    if docs["filters/gauss.md"]["title"] != "gauss" or docs["filters/gauss.md"]["category"] != "filters":
+        fails.append("defaults for an example without front-matter")
+    if "the" in catalog["terms"] or "roimanager" not in catalog["terms"]:
+        fails.append("tokenizer")
+    hits = search(catalog, "ROI manager")
+    if [h["path"] for h in hits] != ["roi/manager.md", "segmentation/wand.md"]:
+        fails.append(f"ranking {hits}")
+    if search(catalog, "wand")[0]["path"] != "segmentation/wand.md" or search(catalog, "zebra"):
+        fails.append("single-term search")
+    if "doWand" not in search(catalog, "wand")[0]["matches"]:
+        fails.append(f"snippet {search(catalog, 'wand')[0]['matches']!r}")
+    base, deltas, merged = _incremental_test(fails)
+    queries = ["ROI manager", "threshold blobs", "gaussian", "measure regions", "rename stack", "the", ""]
+    try:
+        for label, segments, want_catalog in (("base", (catalog, []), catalog), ("merged", (base, deltas), merged)):
+            out = subprocess.run(["node", "-e", _NODE_SEARCH, str(SERVICE_JS)], capture_output=True, text=True,
+                                 check=True, input=json.dumps({"base": segments[0], "deltas": segments[1],
+                                                               "queries": queries}))
+            js = json.loads(out.stdout)
+            got_catalog = js["catalog"]
+            if got_catalog["docs"] != want_catalog["docs"] or got_catalog["terms"] != want_catalog["terms"] or \
+                    abs(got_catalog["bm25"]["avgdl"] - want_catalog["bm25"]["avgdl"]) > 1e-9:
+                fails.append(f"service merge ({label}) differs from merge_segments()")
+            for q, got in zip(queries, js["results"]):
+                want = search(want_catalog, q)
+                if [(h["path"], round(h["score"], 4), h["matches"]) for h in got] != \
+                        [(h["path"], h["score"], h["matches"]) for h in want]:
+                    fails.append(f"service search ({label}) {q!r}: {got} != {want}")
+    except FileNotFoundError:
+        print("  (node not found; skipped service parity check)")
+    except subprocess.CalledProcessError as e:
+        fails.append(f"service search failed: {e.stderr.strip()[:300]}")
+    if EXAMPLES.is_dir() and OUT.exists() and not is_current():
+        fails.append(f"{OUT.relative_to(ROOT)} is stale; re-run tools/examples_index.py")
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("examples_index self-test: PASS")
+    return True
+
+
+def _synthetic(count: int) -> dict[str, str]:
+    import random
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(3000)] + ["roi", "threshold", "measure", "wand", "particles", "stack"]
+    return {f"cat{i % 20}/ex{i}.md": f"---\ntitle: Example {i} {rng.choice(words)}\ncategory: cat{i % 20}\n"
+            f"tags: [{rng.choice(words)}, {rng.choice(words)}]\n---\n\n"
+            + " ".join(rng.choice(words) for _ in range(rng.randint(200, 1500))) + "\n"
+            for i in range(count)}
+
+
+def bench(count: int, queries: int = 200) -> list[tuple[str, float]]:
+    files = _synthetic(count)
+    t0 = time.perf_counter()
+    catalog = build_catalog(files)
+    t1 = time.perf_counter()
+    text = render(catalog)
+    catalog = json.loads(text)
+    qs = ["roi measure", "threshold particles", "wand stack", "w17 w2048"] * (queries // 4)
+    t2 = time.perf_counter()
+    for q in qs:
+        search(catalog, q)
+    t3 = time.perf_counter()
+    for q in qs[:20]:  # what the service did per call: parse every file, scan every body
+        ql = q.lower()
+        for content in files.values():
+            _, body = parse_frontmatter(content)
+            ql in body.lower()
+    t4 = time.perf_counter()
+    rows = [("build (s)", t1 - t0), ("catalogue MB", len(text.encode()) / 1e6), ("terms", len(catalog["terms"])),
+            ("BM25 search (ms)", (t3 - t2) / len(qs) * 1e3), ("per-file scan (ms)", (t4 - t3) / 20 * 1e3)]
+    return rows + _bench_update(files)
+
+
+def _bench_update(files: dict[str, str], edits: int = 5) -> list[tuple[str, float]]:
+    """One saveExample-sized change: full compact vs an update delta."""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for path, text in files.items():
+            (root / path).parent.mkdir(parents=True, exist_ok=True)
+            (root / path).write_text(text, encoding="utf-8")
+        t0 = time.perf_counter()
+        compact(root)
+        t1 = time.perf_counter()
+        for i in range(edits):
+            (root / f"user/new-{i}.md").parent.mkdir(exist_ok=True)
+            (root / f"user/new-{i}.md").write_text(f"---\ntitle: User example {i}\n---\n\nroi wand\n", encoding="utf-8")
+            update(root)
+        t2 = time.perf_counter()
+        base, deltas = load_segments(root)
+        t3 = time.perf_counter()
+        live_docs(base, deltas)  # the service's load-time merge; postings merge per query term
+        t4 = time.perf_counter()
+        delta_bytes = sum(p.stat().st_size for p in root.glob("index.delta-*.json"))
+    return [("compact (s)", t1 - t0), ("update, 1 new (s)", (t2 - t1) / edits),
+            ("delta KB / update", delta_bytes / edits / 1e3), (f"fold {edits} deltas (ms)", (t4 - t3) * 1e3)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the catalogue is out of date")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("compact", help="Rebuild index.json from scratch and drop delta segments (default)")
+    sub.add_parser("update", help="Write a delta segment for added, changed and deleted examples")
+    s = sub.add_parser("search", help="Query the built catalogue")
+    s.add_argument("query")
+    s.add_argument("--limit", type=int, default=10)
+    be = sub.add_parser("bench", help="Build and search a synthetic example library")
+    be.add_argument("--docs", type=int, default=2000)
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if args.cmd == "bench":
+        print(f"{args.docs} synthetic examples")
+        for label, v in bench(args.docs):
+            print(f"  {label:<20} {v:>10.2f}")
+        return 0
+    if args.cmd == "search":
+        try:
+            base, deltas = load_segments()
+            if base is None:
+                raise FileNotFoundError(f"{OUT.relative_to(ROOT)} not built")
+        except OSError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        catalog = merge_segments(base, deltas)
+        for hit in search(catalog, args.query, args.limit):
+            print(f"{hit['score']:8.3f}  {hit['path']}  {hit['title']}")
+        return 0
+    if args.check:
+        if not is_current():
+            print(f"{OUT.relative_to(ROOT)} is stale; re-run tools/examples_index.py update", file=sys.stderr)
+            return 1
+        print(f"{OUT.relative_to(ROOT)} is up to date")
+        return 0
+    if args.cmd == "update":
+        print(update())
+        return 0
+    print(f"wrote {OUT.relative_to(ROOT)} ({compact()} examples)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Decode `captureFrame` frames from the ImageJ.JS service into NumPy arrays.
+
+takeScreenshot PNG-encodes the flattened image and base64s it on every call.
+captureFrame (hypha-imagej-service.js) returns the bytes as msgpack bin
+instead. Three options cut the cost of polling:
+
+  format   "rgba" sends raw bytes with no encode; "webp" sends a lossy
+           encode for slow links (decoding it needs Pillow)
+  region   {x, y, width, height}, cropped in ImageJ before conversion
+  delta    sends only the 64x64 tiles that changed since the stream's
+           previous frame, or encoding "unchanged" with no data
+
+FrameDecoder keeps one array per stream. A full RGBA frame becomes an
+(H, W, 4) uint8 view over the received bytes, with no copy. The first
+delta copies it once into a writable array, and later deltas patch tiles
+in place. encode_frame() mirrors the browser encoder; the self-test and
+`bench` use it.
+
+Usage
+-----
+    python3 tools/frame_stream.py --self-test
+    python3 tools/frame_stream.py bench [--size 1024 768] [--changed 0.02] [--frames 60]
+    python3 tools/frame_stream.py watch --service-id <workspace>/<id> [--interval 1] [--region X Y W H]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import sys
+import time
+import zlib
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from imagej_client import HyphaTransport, ImageJClient  # noqa: E402
+
+TILE = 64  # FRAME_TILE in hypha-imagej-service.js
+
+
+class FrameError(ValueError):
+    pass
+
+
+class FrameDecoder:
+    def __init__(self) -> None:
+        self.frames: dict[str, tuple[int, np.ndarray]] = {}
+
+    def decode(self, frame: dict[str, Any], stream: str = "default") -> np.ndarray:
+        """Apply a captureFrame result and return the stream's current (H, W, 4) array."""
+        if not frame.get("success", True):
+            raise FrameError(frame.get("error", "capture failed"))
+        h, w, encoding = frame["height"], frame["width"], frame["encoding"]
+        data = frame.get("data") or b""
+        if encoding == "full":
+            arr = _decode_full(frame["format"], data, h, w)
+        else:
+            if stream not in self.frames or self.frames[stream][0] != frame["baseFrameId"]:
+                raise FrameError(f"{encoding} frame {frame['frameId']} needs frame {frame['baseFrameId']}, "
+                                 f"have {self.frames.get(stream, (None,))[0]}")
+            arr = self.frames[stream][1]
+            if encoding == "delta":
+                if not arr.flags.writeable:
+                    arr = arr.copy()
+                buf = memoryview(data)
+                offset = 0
+                for x, y, tw, th in frame["tiles"]:
+                    n = tw * th * 4
+                    arr[y:y + th, x:x + tw] = np.frombuffer(buf, np.uint8, n, offset).reshape(th, tw, 4)
+                    offset += n
+                if offset != len(buf):
+                    raise FrameError(f"delta frame {frame['frameId']}: {len(buf) - offset} stray bytes")
+        self.frames[stream] = (frame["frameId"], arr)
+        return arr
+
+
+def _decode_full(fmt: str, data: bytes, h: int, w: int) -> np.ndarray:
+    if fmt == "rgba":
+        if len(data) != h * w * 4:
+            raise FrameError(f"rgba frame is {len(data)} bytes, expected {h * w * 4}")
+        return np.frombuffer(data, np.uint8).reshape(h, w, 4)
+    try:
+        from io import BytesIO
+
+        from PIL import Image
+    except ImportError as e:
+        raise FrameError("decoding webp frames needs Pillow (pip install pillow)") from e
+    return np.asarray(Image.open(BytesIO(data)).convert("RGBA"))
+
+
+def encode_frame(prev: np.ndarray | None, cur: np.ndarray, frame_id: int, delta: bool = True) -> dict[str, Any]:
+    """Python twin of the browser's rgba encoder (diffFrameTiles), for tests and sizing."""
+    h, w = cur.shape[:2]
+    frame = {"success": True, "format": "rgba", "width": w, "height": h, "frameId": frame_id,
+             "baseFrameId": None, "region": {"x": 0, "y": 0, "width": w, "height": h}}
+    if delta and prev is not None and prev.shape == cur.shape:
+        tiles, chunks = [], []
+        for ty in range(0, h, TILE):
+            for tx in range(0, w, TILE):
+                a, b = prev[ty:ty + TILE, tx:tx + TILE], cur[ty:ty + TILE, tx:tx + TILE]
+                if not np.array_equal(a, b):
+                    tiles.append([tx, ty, b.shape[1], b.shape[0]])
+                    chunks.append(b.tobytes())
+        if not tiles:
+            return {**frame, "baseFrameId": frame_id - 1, "encoding": "unchanged", "tiles": [], "data": b""}
+        data = b"".join(chunks)
+        if len(data) < cur.nbytes / 2:
+            return {**frame, "baseFrameId": frame_id - 1, "encoding": "delta", "tiles": tiles, "data": data}
+    return {**frame, "encoding": "full", "tiles": [], "data": np.ascontiguousarray(cur).tobytes()}
+
+
+async def poll(client: ImageJClient, interval_s: float = 1.0, stream: str = "default",
+               **options: Any) -> AsyncIterator[np.ndarray]:
+    """Yield the current frame every interval_s, fetching deltas after the first."""
+    decoder, delta = FrameDecoder(), False
+    while True:
+        t0 = time.perf_counter()
+        frame = await client.captureFrame(delta=delta, streamId=stream, **options)
+        try:
+            yield decoder.decode(frame, stream)
+            delta = True
+        except FrameError:
+            if not frame.get("success", True):
+                raise
+            delta = False  # lost sync (e.g. another poller on the stream): resend a full frame
+        await asyncio.sleep(max(0.0, interval_s - (time.perf_counter() - t0)))
+
+
+def _synthetic(size: tuple[int, int], frames: int, changed: float, seed: int = 0) -> list[np.ndarray]:
+    """A noisy gradient with a moving patch covering `changed` of the area."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = np.empty((h, w, 4), np.uint8)
+    base[..., 0] = xx * 255 // max(1, w - 1)
+    base[..., 1] = yy * 255 // max(1, h - 1)
+    base[..., 2] = rng.integers(0, 8, (h, w)) + 120  # sensor noise
+    base[..., 3] = 255
+    side = max(1, int((changed * w * h) ** 0.5))
+    out = []
+    for i in range(frames):
+        f = base.copy()
+        x, y = (i * 37) % max(1, w - side), (i * 23) % max(1, h - side)
+        f[y:y + side, x:x + side, :3] = (i * 40) % 256
+        out.append(f)
+    return out
+
+
+def bench(size: tuple[int, int], frames: int, changed: float) -> list[tuple[str, int]]:
+    seq = _synthetic(size, frames, changed)
+    png_like = sum(len(base64.b64encode(zlib.compress(f.tobytes(), 6))) for f in seq)
+    raw = sum(f.nbytes for f in seq)
+    delta, prev = 0, None
+    for i, f in enumerate(seq, 1):
+        delta += len(encode_frame(prev, f, i)["data"])
+        prev = f
+    return [("base64 deflate (~ takeScreenshot PNG)", png_like), ("raw rgba", raw), ("rgba + delta", delta)]
+
+
+def _self_test() -> bool:
+    seq = _synthetic((300, 200), 4, 0.01)
+    seq.append(seq[-1].copy())
+    dec, prev = FrameDecoder(), None
+    encodings = []
+    for i, f in enumerate(seq, 1):
+        frame = encode_frame(prev, f, i)
+        encodings.append(frame["encoding"])
+        got = dec.decode(frame)
+        if not np.array_equal(got, f):
+            print(f"self-test FAIL: frame {i} ({frame['encoding']}) decoded wrong")
+            return False
+        if i == 1 and (got.flags.writeable or got.base is None):
+            print("self-test FAIL: full frame was copied")
+            return False
+        prev = f
+    if encodings != ["full", "delta", "delta", "delta", "unchanged"]:
+        print(f"self-test FAIL: encodings {encodings}")
+        return False
+    stale = encode_frame(seq[0], seq[1], 9)
+    try:
+        FrameDecoder().decode(stale)
+        print("self-test FAIL: delta accepted without its base frame")
+        return False
+    except FrameError:
+        pass
+    rows = dict(bench((640, 480), 10, 0.02))
+    if not rows["rgba + delta"] * 4 < rows["raw rgba"]:
+        print(f"self-test FAIL: delta saved too little {rows}")
+        return False
+    print("frame_stream self-test: PASS")
+    return True
+
+
+async def _watch(args: argparse.Namespace) -> int:
+    client = ImageJClient(await HyphaTransport.connect(args.service_id, args.server_url))
+    region = dict(zip(("x", "y", "width", "height"), args.region)) if args.region else None
+    n = 0
+    async for arr in poll(client, args.interval, format=args.format, region=region):
+        n += 1
+        h = client.histograms["captureFrame"]
+        print(f"frame {n}: {arr.shape[1]}x{arr.shape[0]}  mean {arr[..., :3].mean():.1f}  "
+              f"{h.samples[-1]:.0f} ms")
+        if args.frames and n >= args.frames:
+            return 0
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    b = sub.add_parser("bench", help="Bytes on the wire for a synthetic monitoring sequence")
+    b.add_argument("--size", type=int, nargs=2, default=(1024, 768), metavar=("W", "H"))
+    b.add_argument("--frames", type=int, default=60)
+    b.add_argument("--changed", type=float, default=0.02, help="Fraction of the image that changes per frame")
+    w = sub.add_parser("watch", help="Poll a live service and print frame stats")
+    w.add_argument("--service-id", required=True)
+    w.add_argument("--server-url", default="https://hypha.aicell.io")
+    w.add_argument("--interval", type=float, default=1.0)
+    w.add_argument("--format", choices=("rgba", "webp"), default="rgba")
+    w.add_argument("--region", type=int, nargs=4, metavar=("X", "Y", "W", "H"))
+    w.add_argument("--frames", type=int, default=0, help="Stop after N frames (default: run until interrupted)")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if args.cmd == "bench":
+        rows = bench(tuple(args.size), args.frames, args.changed)
+        base = rows[0][1]
+        print(f"{args.frames} frames of {args.size[0]}x{args.size[1]}, {args.changed:.0%} changed per frame")
+        for name, n in rows:
+            print(f"  {name:<38} {n / args.frames / 1024:>9.1f} KiB/frame  {base / n:>6.1f}x")
+        return 0
+    if args.cmd == "watch":
+        try:
+            return asyncio.run(_watch(args))
+        except (RuntimeError, FrameError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
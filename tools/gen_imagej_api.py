@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Generate tools/imagej_api.py from the `schemas` object in hypha-imagej-service.js.
+
+The service declares each RPC method as a JSON schema (parameters and
+returns). This script evaluates that object literal with node. It then writes
+one typed async method per schema and a TypedDict per return shape. The
+result is the ImageJAPI base class that tools/imagej_client.py builds its
+transports on. Re-run it whenever a schema changes; --check exits 1 when
+the checked-in file is stale.
+
+Usage
+-----
+    python3 tools/gen_imagej_api.py            # rewrite tools/imagej_api.py
+    python3 tools/gen_imagej_api.py --check
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import keyword
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVICE_JS = ROOT / "hypha-imagej-service.js"
+OUT = Path(__file__).resolve().parent / "imagej_api.py"
+
+PY_TYPES = {"string": "str", "boolean": "bool", "integer": "int", "number": "float",
+            "array": "list[Any]", "object": "dict[str, Any]"}
+EVAL_JS = 'process.stdout.write(JSON.stringify(eval("(" + require("fs").readFileSync(0, "utf8") + ")")))'
+
+
+def load_schemas(path: Path = SERVICE_JS) -> dict:
+    src = path.read_text(encoding="utf-8")
+    start = src.index("const schemas = {") + len("const schemas = ")
+    end = src.index("\n};\n", start) + 2
+    out = subprocess.run(["node", "-e", EVAL_JS], input=src[start:end], capture_output=True,
+                         text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def _camel(name: str) -> str:
+    return name[0].upper() + name[1:]
+
+
+def _pytype(prop: dict) -> str:
+    if "enum" in prop:
+        return "Literal[" + ", ".join(json.dumps(v) for v in prop["enum"]) + "]"
+    return PY_TYPES.get(prop.get("type", ""), "Any")
+
+
+def render(schemas: dict) -> str:
+    lines = [
+        '"""Typed ImageJ.JS service API. GENERATED by tools/gen_imagej_api.py from the',
+        '`schemas` object in hypha-imagej-service.js -- do not edit by hand."""',
+        "",
+        "from __future__ import annotations",
+        "",
+        "from typing import Any, Literal, TypedDict",
+        "",
+        "METHODS: dict[str, dict[str, Any]] = {",
+    ]
+    for name, schema in schemas.items():
+        params = schema["parameters"]
+        props = {k: {kk: vv for kk, vv in v.items() if kk != "description"}
+                 for k, v in params.get("properties", {}).items()}
+        lines.append(f"    {name!r}: {{'params': {props!r}, 'required': {params.get('required', [])!r}}},")
+    lines.append("}")
+    for name, schema in schemas.items():
+        rets = schema.get("returns", {}).get("properties", {})
+        lines += ["", "", f"class {_camel(name)}Result(TypedDict, total=False):"]
+        lines += [f"    {k}: {_pytype(v)}" for k, v in rets.items()] or ["    pass"]
+    lines += ["", "", "class ImageJAPI:",
+              '    """One coroutine per service method; subclasses implement _call()."""', "",
+              "    async def _call(self, method: str, kwargs: dict[str, Any]) -> Any:",
+              "        raise NotImplementedError", ""]
+    for name, schema in schemas.items():
+        params = schema["parameters"]
+        required = params.get("required", [])
+        args, body = ["self"], []
+        props = params.get("properties", {})
+        for pname in sorted(props, key=lambda p: p not in required):
+            prop, arg = props[pname], pname + "_" if keyword.iskeyword(pname) else pname
+            t = _pytype(prop)
+            if pname in required:
+                args.append(f"{arg}: {t}")
+            elif "default" in prop:
+                args.append(f"{arg}: {t} = {prop['default']!r}")
+            else:
+                args.append(f"{arg}: {t} | None = None")
+            body.append((pname, arg, pname in required or "default" in prop))
+        summary = schema.get("description", name).strip().splitlines()[0].replace('"""', "'''")
+        lines.append(f"    async def {name}({', '.join(args)}) -> {_camel(name)}Result:")
+        lines.append(f'        """{summary}"""')
+        always = ", ".join(f"{p!r}: {a}" for p, a, keep in body if keep)
+        lines.append(f"        kwargs: dict[str, Any] = {{{always}}}")
+        for p, a, keep in body:
+            if not keep:
+                lines.append(f"        if {a} is not None:")
+                lines.append(f"            kwargs[{p!r}] = {a}")
+        lines += [f"        return await self._call({name!r}, kwargs)", ""]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Exit 1 if tools/imagej_api.py is out of date")
+    args = parser.parse_args(argv)
+    try:
+        text = render(load_schemas())
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"ERROR: cannot read schemas from {SERVICE_JS.name}: {e}", file=sys.stderr)
+        return 1
+    if args.check:
+        current = OUT.read_text(encoding="utf-8") if OUT.exists() else ""
+        if current != text:
+            print(f"{OUT.name} is stale; run tools/gen_imagej_api.py", file=sys.stderr)
+            return 1
+        print(f"{OUT.name} is up to date")
+        return 0
+    OUT.write_text(text, encoding="utf-8")
+    print(f"wrote {OUT.relative_to(ROOT)} ({text.count('    async def ') - 1} methods)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
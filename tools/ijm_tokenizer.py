@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Tokenizer for the ImageJ macro language, mirroring ij.macro.Tokenizer.
+
+The Java tokenizer turns a macro into a flat token stream with line
+numbers. It skips `//` and `/* */` comments and reads string constants in
+either quote style, with backslash escapes. Numbers may be decimal, hex
+(0x..) or use an exponent. Keywords are words from
+MacroConstants.keywords. Two-character operators are single tokens; any
+other character is its own token. This module does the same and also
+keeps the source offsets. Tools that rewrite a macro
+(macro_profile.py) can then splice text in without disturbing line numbers.
+iter_statements() walks the statement tree with loop nesting for the
+profiler and for macro_lint.py.
+
+Usage
+-----
+    python3 tools/ijm_tokenizer.py macro.ijm        # dump tokens
+    python3 tools/ijm_tokenizer.py --self-test
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+WORD = "word"
+NUMBER = "number"
+STRING = "string"
+KEYWORD = "keyword"
+OP = "op"
+EOF = "eof"
+
+# MacroConstants.keywords, plus break/continue (ImageJ 1.48+).
+KEYWORDS = frozenset({"macro", "var", "if", "else", "while", "do", "for", "function", "return",
+                      "true", "false", "PI", "NaN", "break", "continue"})
+# Two-character operators from Tokenizer.getToken; everything else is one char.
+OPERATORS = ("++", "--", "==", "!=", ">=", "<=", "&&", "||", "+=", "-=", "*=", "/=",
+             "<<", ">>")
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "'": "'", "\\": "\\"}
+
+
+class MacroSyntaxError(ValueError):
+    def __init__(self, message: str, line: int):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+@dataclass(frozen=True)
+class Token:
+    type: str
+    value: str
+    line: int
+    start: int
+    end: int
+
+    def is_(self, type_: str, value: str | None = None) -> bool:
+        return self.type == type_ and (value is None or self.value == value)
+
+
+def tokenize(src: str) -> list[Token]:
+    """Return the token list, always terminated by an EOF token."""
+    tokens: list[Token] = []
+    i, n, line = 0, len(src), 1
+    while i < n:
+        c = src[i]
+        if c == "\n":
+            line += 1
+            i += 1
+        elif c in " \t\r\f":
+            i += 1
+        elif src.startswith("//", i):
+            j = src.find("\n", i)
+            i = n if j < 0 else j
+        elif src.startswith("/*", i):
+            j = src.find("*/", i + 2)
+            if j < 0:
+                raise MacroSyntaxError("unterminated /* comment", line)
+            line += src.count("\n", i, j)
+            i = j + 2
+        elif c in "\"'":
+            start, start_line, buf = i, line, []
+            i += 1
+            while True:
+                if i >= n or src[i] == "\n":
+                    raise MacroSyntaxError("unterminated string constant", start_line)
+                ch = src[i]
+                if ch == c:
+                    i += 1
+                    break
+                if ch == "\\" and i + 1 < n:
+                    nxt = src[i + 1]
+                    if nxt == "u" and i + 5 < n:
+                        try:
+                            buf.append(chr(int(src[i + 2:i + 6], 16)))
+                            i += 6
+                            continue
+                        except ValueError:
+                            pass
+                    buf.append(ESCAPES.get(nxt, "\\" + nxt))
+                    i += 2
+                    continue
+                buf.append(ch)
+                i += 1
+            tokens.append(Token(STRING, "".join(buf), start_line, start, i))
+        elif c.isdigit() or (c == "." and i + 1 < n and src[i + 1].isdigit()):
+            start = i
+            if src.startswith(("0x", "0X"), i):
+                i += 2
+                while i < n and src[i] in "0123456789abcdefABCDEF":
+                    i += 1
+            else:
+                while i < n and (src[i].isdigit() or src[i] == "."):
+                    i += 1
+                if i < n and src[i] in "eE":
+                    j = i + 1 + (i + 1 < n and src[i + 1] in "+-")
+                    if j < n and src[j].isdigit():
+                        i = j
+                        while i < n and src[i].isdigit():
+                            i += 1
+            tokens.append(Token(NUMBER, src[start:i], line, start, i))
+        elif c.isalpha() or c == "_":
+            start = i
+            while i < n and (src[i].isalnum() or src[i] == "_"):
+                i += 1
+            word = src[start:i]
+            tokens.append(Token(KEYWORD if word in KEYWORDS else WORD, word, line, start, i))
+        else:
+            op = next((o for o in OPERATORS if src.startswith(o, i)), c)
+            tokens.append(Token(OP, op, line, i, i + len(op)))
+            i += len(op)
+    tokens.append(Token(EOF, "", line, n, n))
+    return tokens
+
+
+def match_close(tokens: list[Token], i: int) -> int:
+    """Index of the bracket closing tokens[i] ('(', '[' or '{')."""
+    pairs = {"(": ")", "[": "]", "{": "}"}
+    open_, close = tokens[i].value, pairs[tokens[i].value]
+    depth = 0
+    for j in range(i, len(tokens)):
+        t = tokens[j]
+        if t.type == OP and t.value == open_:
+            depth += 1
+        elif t.type == OP and t.value == close:
+            depth -= 1
+            if depth == 0:
+                return j
+    raise MacroSyntaxError(f"unbalanced '{open_}'", tokens[i].line)
+
+
+def statement_end(tokens: list[Token], i: int) -> int:
+    """Index of the last token of the statement starting at tokens[i].
+
+    Follows the grammar used by ij.macro.Interpreter.doStatement: blocks,
+    if/else, for, while, do-while, and simple statements ending at ';'
+    (or just before an unmatched '}' / EOF, which the interpreter tolerates).
+    """
+    t = tokens[i]
+    if t.is_(OP, "{"):
+        return match_close(tokens, i)
+    if t.type == KEYWORD and t.value in ("if", "for", "while"):
+        if not tokens[i + 1].is_(OP, "("):
+            raise MacroSyntaxError(f"'(' expected after {t.value}", t.line)
+        end = statement_end(tokens, match_close(tokens, i + 1) + 1)
+        if t.value == "if" and tokens[end + 1].is_(KEYWORD, "else"):
+            end = statement_end(tokens, end + 2)
+        return end
+    if t.is_(KEYWORD, "do"):
+        end = statement_end(tokens, i + 1)
+        if not tokens[end + 1].is_(KEYWORD, "while") or not tokens[end + 2].is_(OP, "("):
+            raise MacroSyntaxError("'while' expected after do body", t.line)
+        end = match_close(tokens, end + 2)
+        return end + 1 if tokens[end + 1].is_(OP, ";") else end
+    if t.type == KEYWORD and t.value in ("function", "macro"):
+        j = i + 1
+        while not tokens[j].is_(OP, "{"):
+            if tokens[j].type == EOF:
+                raise MacroSyntaxError(f"{t.value} body expected", t.line)
+            j += 1
+        return match_close(tokens, j)
+    j, depth = i, 0
+    while True:
+        tj = tokens[j]
+        if tj.type == EOF:
+            return j - 1
+        if tj.type == OP:
+            if tj.value in "([{":
+                depth += 1
+            elif tj.value in ")]}":
+                if depth == 0:
+                    return j - 1
+                depth -= 1
+            elif tj.value == ";" and depth == 0:
+                return j
+        j += 1
+
+
+LOOP_KINDS = ("for", "while", "do")
+
+
+@dataclass(frozen=True)
+class Statement:
+    kind: str  # block, if, for, while, do, function, macro or simple
+    first: int
+    last: int
+    loops: tuple[int, ...]  # first-token indices of enclosing loops, outermost first
+    function: int | None  # first-token index of the enclosing function / macro block
+
+
+def iter_statements(tokens: list[Token]) -> Iterator[Statement]:
+    """Yield every statement in source order, compound statements before their bodies.
+
+    Loop nesting restarts inside function and macro bodies, since those run
+    wherever they are called from.
+    """
+    def walk(i: int, stop: int, loops: tuple[int, ...], func: int | None) -> Iterator[Statement]:
+        while i < stop and tokens[i].type != EOF:
+            t = tokens[i]
+            if t.is_(OP, ";"):
+                i += 1
+                continue
+            end = statement_end(tokens, i)
+            if t.is_(OP, "{"):
+                kind = "block"
+            elif t.type == KEYWORD and t.value in ("if", "for", "while", "do", "function", "macro"):
+                kind = t.value
+            else:
+                kind = "simple"
+            yield Statement(kind, i, end, loops, func)
+            if kind == "block":
+                yield from walk(i + 1, end, loops, func)
+            elif kind == "if":
+                close = match_close(tokens, i + 1)
+                body_end = statement_end(tokens, close + 1)
+                yield from walk(close + 1, body_end + 1, loops, func)
+                if body_end < end:
+                    yield from walk(body_end + 2, end + 1, loops, func)
+            elif kind in ("for", "while"):
+                yield from walk(match_close(tokens, i + 1) + 1, end + 1, loops + (i,), func)
+            elif kind == "do":
+                yield from walk(i + 1, statement_end(tokens, i + 1) + 1, loops + (i,), func)
+            elif kind in ("function", "macro"):
+                j = i + 1
+                while not tokens[j].is_(OP, "{"):
+                    j += 1
+                yield from walk(j + 1, end, (), i)
+            i = end + 1
+
+    yield from walk(0, len(tokens), (), None)
+
+
+def _self_test() -> bool:
+    src = ('// header\nx = 0x1F + 1.5e3; s = "a\\"b" + \'c\';\n/* multi\nline */ for (i=0; i<3; i++) '
+           'if (x >= 2) run("Gaussian Blur...", "sigma=2"); else { y -= 1; }\n'
+           'do { x++; } while (x < 10);\nfunction f(a) { return a*2; }\n')
+    toks = tokenize(src)
+    vals = [t.value for t in toks[:9]]
+    if vals != ["x", "=", "0x1F", "+", "1.5e3", ";", "s", "=", 'a"b']:
+        print(f"self-test FAIL: tokens {vals}")
+        return False
+    i_for = next(i for i, t in enumerate(toks) if t.is_(KEYWORD, "for"))
+    if toks[i_for].line != 4 or src[toks[i_for].start:toks[i_for].end] != "for":
+        print(f"self-test FAIL: for token {toks[i_for]}")
+        return False
+    end = statement_end(toks, i_for)
+    if not toks[end].is_(OP, "}") or toks[end + 1].value != "do":
+        print(f"self-test FAIL: for statement ends at {toks[end]}")
+        return False
+    i_do = end + 1
+    end = statement_end(toks, i_do)
+    if not toks[end].is_(OP, ";") or not toks[end + 1].is_(KEYWORD, "function"):
+        print(f"self-test FAIL: do statement ends at {toks[end]}")
+        return False
+    if not toks[statement_end(toks, end + 1)].is_(OP, "}"):
+        print("self-test FAIL: function body")
+        return False
+    stmts = list(iter_statements(toks))
+    nested = [(s.kind, toks[s.first].value, len(s.loops)) for s in stmts if s.kind == "simple"]
+    if nested[:4] != [("simple", "x", 0), ("simple", "s", 0), ("simple", "run", 1), ("simple", "y", 1)] \
+            or nested[-1] != ("simple", "return", 0) or stmts[-2].kind != "function":
+        print(f"self-test FAIL: statements {nested}")
+        return False
+    for bad in ('s = "open;\n', "/* never closed"):
+        try:
+            tokenize(bad)
+        except MacroSyntaxError:
+            continue
+        print(f"self-test FAIL: accepted {bad!r}")
+        return False
+    print("ijm_tokenizer self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("macro", nargs="?", help="Macro file to tokenize")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.macro:
+        parser.error("a macro file is required")
+    try:
+        for t in tokenize(Path(args.macro).read_text(encoding="utf-8")):
+            print(f"{t.line:>5} {t.type:<8} {t.value!r}")
+    except (OSError, MacroSyntaxError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
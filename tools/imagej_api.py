@@ -0,0 +1,320 @@
+"""Typed ImageJ.JS service API. GENERATED by tools/gen_imagej_api.py from the
+`schemas` object in hypha-imagej-service.js -- do not edit by hand."""
+
+from __future__ import annotations
+
+from typing import Any, Literal, TypedDict
+
+METHODS: dict[str, dict[str, Any]] = {
+    'runMacro': {'params': {'macro': {'type': 'string'}, 'returnLog': {'type': 'boolean', 'default': False}}, 'required': ['macro']},
+    'getStatus': {'params': {}, 'required': []},
+    'getLogs': {'params': {'clear': {'type': 'boolean', 'default': False}}, 'required': []},
+    'takeScreenshot': {'params': {'windowTitle': {'type': 'string'}, 'format': {'type': 'string', 'enum': ['png', 'jpeg'], 'default': 'png'}}, 'required': []},
+    'captureFrame': {'params': {'windowTitle': {'type': 'string'}, 'format': {'type': 'string', 'enum': ['rgba', 'webp'], 'default': 'rgba'}, 'region': {'type': 'object'}, 'delta': {'type': 'boolean', 'default': False}, 'streamId': {'type': 'string', 'default': 'default'}, 'quality': {'type': 'number', 'default': 0.8}}, 'required': []},
+    'getPixelData': {'params': {'windowTitle': {'type': 'string'}, 'chunk': {'type': 'integer', 'default': 0}, 'maxChunkBytes': {'type': 'integer', 'default': 8388608}}, 'required': []},
+    'openImage': {'params': {'path': {'type': 'string'}, 'url': {'type': 'string'}}, 'required': []},
+    'getImageInfo': {'params': {}, 'required': []},
+    'listImages': {'params': {}, 'required': []},
+    'closeImage': {'params': {'title': {'type': 'string'}}, 'required': ['title']},
+    'listFiles': {'params': {'path': {'type': 'string', 'default': '/files/'}, 'pattern': {'type': 'string'}}, 'required': []},
+    'getTextFromTable': {'params': {'title': {'type': 'string'}}, 'required': ['title']},
+    'executeJavaScript': {'params': {'code': {'type': 'string'}}, 'required': ['code']},
+    'searchCommands': {'params': {'query': {'type': 'string'}}, 'required': ['query']},
+    'listExamples': {'params': {'category': {'type': 'string'}, 'tag': {'type': 'string'}}, 'required': []},
+    'readExample': {'params': {'path': {'type': 'string'}}, 'required': ['path']},
+    'searchExamples': {'params': {'query': {'type': 'string'}, 'limit': {'type': 'integer'}}, 'required': ['query']},
+    'saveExample': {'params': {'path': {'type': 'string'}, 'content': {'type': 'string'}}, 'required': ['path', 'content']},
+    'getRoisAsGeoJson': {'params': {'source': {'type': 'string', 'enum': ['current', 'manager', 'both'], 'default': 'both'}, 'includeProperties': {'type': 'boolean', 'default': True}, 'format': {'type': 'string', 'enum': ['geojson', 'packed'], 'default': 'geojson'}}, 'required': []},
+    'setRoisFromGeoJson': {'params': {'geojson': {'type': 'object'}, 'target': {'type': 'string', 'enum': ['current', 'manager', 'both'], 'default': 'both'}, 'clearExisting': {'type': 'boolean', 'default': False}}, 'required': ['geojson']},
+    'ingestRoisPacked': {'params': {'ingestId': {'type': 'string'}, 'packed': {}, 'chunk': {'type': 'integer', 'default': 0}, 'finish': {'type': 'boolean', 'default': False}, 'target': {'type': 'string', 'enum': ['current', 'manager', 'both'], 'default': 'manager'}, 'clearExisting': {'type': 'boolean', 'default': False}}, 'required': ['ingestId']},
+    'attachRoiIndex': {'params': {'index': {}, 'windowTitle': {'type': 'string'}}, 'required': ['index']},
+    'getSummary': {'params': {'includeLog': {'type': 'boolean', 'default': True}, 'includeFileSystem': {'type': 'boolean', 'default': True}}, 'required': []},
+}
+
+
+class RunMacroResult(TypedDict, total=False):
+    success: bool
+    error: str
+    log: str
+
+
+class GetStatusResult(TypedDict, total=False):
+    ready: bool
+    version: str
+
+
+class GetLogsResult(TypedDict, total=False):
+    logs: str
+
+
+class TakeScreenshotResult(TypedDict, total=False):
+    type: Literal["image"]
+    mimeType: Literal["image/png", "image/jpeg"]
+    data: str
+    width: int
+    height: int
+
+
+class CaptureFrameResult(TypedDict, total=False):
+    success: bool
+    encoding: Literal["full", "delta", "unchanged"]
+    format: Literal["rgba", "webp"]
+    width: int
+    height: int
+    region: dict[str, Any]
+    frameId: int
+    baseFrameId: int
+    tiles: list[Any]
+    data: Any
+    error: str
+
+
+class GetPixelDataResult(TypedDict, total=False):
+    success: bool
+    header: dict[str, Any]
+    chunk: int
+    chunkCount: int
+    offset: int
+    data: Any
+    error: str
+
+
+class OpenImageResult(TypedDict, total=False):
+    success: bool
+    title: str
+
+
+class GetImageInfoResult(TypedDict, total=False):
+    title: str
+    width: int
+    height: int
+    type: str
+    slices: int
+
+
+class ListImagesResult(TypedDict, total=False):
+    images: list[Any]
+
+
+class CloseImageResult(TypedDict, total=False):
+    success: bool
+
+
+class ListFilesResult(TypedDict, total=False):
+    files: list[Any]
+
+
+class GetTextFromTableResult(TypedDict, total=False):
+    success: bool
+    text: str
+    error: str
+
+
+class ExecuteJavaScriptResult(TypedDict, total=False):
+    success: bool
+    result: Any
+    error: str
+
+
+class SearchCommandsResult(TypedDict, total=False):
+    commands: list[Any]
+
+
+class ListExamplesResult(TypedDict, total=False):
+    examples: list[Any]
+
+
+class ReadExampleResult(TypedDict, total=False):
+    content: str
+    metadata: dict[str, Any]
+
+
+class SearchExamplesResult(TypedDict, total=False):
+    examples: list[Any]
+
+
+class SaveExampleResult(TypedDict, total=False):
+    success: bool
+    path: str
+
+
+class GetRoisAsGeoJsonResult(TypedDict, total=False):
+    success: bool
+    format: str
+    geojson: dict[str, Any]
+    packed: Any
+    count: int
+    error: str
+
+
+class SetRoisFromGeoJsonResult(TypedDict, total=False):
+    success: bool
+    count: int
+    error: str
+
+
+class IngestRoisPackedResult(TypedDict, total=False):
+    success: bool
+    pending: int
+    count: int
+    error: str
+
+
+class AttachRoiIndexResult(TypedDict, total=False):
+    success: bool
+    count: int
+    indexed: bool
+    error: str
+
+
+class GetSummaryResult(TypedDict, total=False):
+    success: bool
+    summary: str
+    data: dict[str, Any]
+    error: str
+
+
+class ImageJAPI:
+    """One coroutine per service method; subclasses implement _call()."""
+
+    async def _call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        raise NotImplementedError
+
+    async def runMacro(self, macro: str, returnLog: bool = False) -> RunMacroResult:
+        """Execute an ImageJ macro script."""
+        kwargs: dict[str, Any] = {'macro': macro, 'returnLog': returnLog}
+        return await self._call('runMacro', kwargs)
+
+    async def getStatus(self) -> GetStatusResult:
+        """Get the current status of ImageJ."""
+        kwargs: dict[str, Any] = {}
+        return await self._call('getStatus', kwargs)
+
+    async def getLogs(self, clear: bool = False) -> GetLogsResult:
+        """Get the ImageJ log window content"""
+        kwargs: dict[str, Any] = {'clear': clear}
+        return await self._call('getLogs', kwargs)
+
+    async def takeScreenshot(self, windowTitle: str | None = None, format: Literal["png", "jpeg"] = 'png') -> TakeScreenshotResult:
+        """Take a screenshot of an ImageJ image window, capturing the visual display including overlays, ROIs, and annotations"""
+        kwargs: dict[str, Any] = {'format': format}
+        if windowTitle is not None:
+            kwargs['windowTitle'] = windowTitle
+        return await self._call('takeScreenshot', kwargs)
+
+    async def captureFrame(self, windowTitle: str | None = None, format: Literal["rgba", "webp"] = 'rgba', region: dict[str, Any] | None = None, delta: bool = False, streamId: str = 'default', quality: float = 0.8) -> CaptureFrameResult:
+        """Capture the display of an image window as binary frame data for polling clients: raw RGBA or WebP bytes (no base64), optionally cropped to a region, optionally as a delta against the previous frame of the same stream"""
+        kwargs: dict[str, Any] = {'format': format, 'delta': delta, 'streamId': streamId, 'quality': quality}
+        if windowTitle is not None:
+            kwargs['windowTitle'] = windowTitle
+        if region is not None:
+            kwargs['region'] = region
+        return await self._call('captureFrame', kwargs)
+
+    async def getPixelData(self, windowTitle: str | None = None, chunk: int = 0, maxChunkBytes: int = 8388608) -> GetPixelDataResult:
+        """Export the raw pixel array of an image (all slices, 8/16/32-bit or RGB) as binary chunks with a header giving shape, dtype and calibration. Call with chunk=0, then fetch chunks 1..chunkCount-1 and place each at its byte offset."""
+        kwargs: dict[str, Any] = {'chunk': chunk, 'maxChunkBytes': maxChunkBytes}
+        if windowTitle is not None:
+            kwargs['windowTitle'] = windowTitle
+        return await self._call('getPixelData', kwargs)
+
+    async def openImage(self, path: str | None = None, url: str | None = None) -> OpenImageResult:
+        """Open an image file in ImageJ"""
+        kwargs: dict[str, Any] = {}
+        if path is not None:
+            kwargs['path'] = path
+        if url is not None:
+            kwargs['url'] = url
+        return await self._call('openImage', kwargs)
+
+    async def getImageInfo(self) -> GetImageInfoResult:
+        """Get information about the currently active image"""
+        kwargs: dict[str, Any] = {}
+        return await self._call('getImageInfo', kwargs)
+
+    async def listImages(self) -> ListImagesResult:
+        """List all currently open images"""
+        kwargs: dict[str, Any] = {}
+        return await self._call('listImages', kwargs)
+
+    async def closeImage(self, title: str) -> CloseImageResult:
+        """Close an image by title"""
+        kwargs: dict[str, Any] = {'title': title}
+        return await self._call('closeImage', kwargs)
+
+    async def listFiles(self, path: str = '/files/', pattern: str | None = None) -> ListFilesResult:
+        """List files in the virtual file system"""
+        kwargs: dict[str, Any] = {'path': path}
+        if pattern is not None:
+            kwargs['pattern'] = pattern
+        return await self._call('listFiles', kwargs)
+
+    async def getTextFromTable(self, title: str) -> GetTextFromTableResult:
+        """Get text content from an ImageJ table window"""
+        kwargs: dict[str, Any] = {'title': title}
+        return await self._call('getTextFromTable', kwargs)
+
+    async def executeJavaScript(self, code: str) -> ExecuteJavaScriptResult:
+        """Execute arbitrary JavaScript code in the ImageJ.js environment with full access to ImageJ classes."""
+        kwargs: dict[str, Any] = {'code': code}
+        return await self._call('executeJavaScript', kwargs)
+
+    async def searchCommands(self, query: str) -> SearchCommandsResult:
+        """Search ImageJ's built-in command list to discover available functions"""
+        kwargs: dict[str, Any] = {'query': query}
+        return await self._call('searchCommands', kwargs)
+
+    async def listExamples(self, category: str | None = None, tag: str | None = None) -> ListExamplesResult:
+        """List available code examples from the markdown knowledge base (imagej-examples/)"""
+        kwargs: dict[str, Any] = {}
+        if category is not None:
+            kwargs['category'] = category
+        if tag is not None:
+            kwargs['tag'] = tag
+        return await self._call('listExamples', kwargs)
+
+    async def readExample(self, path: str) -> ReadExampleResult:
+        """Read a specific example markdown file from the knowledge base"""
+        kwargs: dict[str, Any] = {'path': path}
+        return await self._call('readExample', kwargs)
+
+    async def searchExamples(self, query: str, limit: int | None = None) -> SearchExamplesResult:
+        """Search examples by keyword in title, tags, description, or content. Results are ranked by BM25 relevance from the precompiled catalogue (imagej-examples/index.json)"""
+        kwargs: dict[str, Any] = {'query': query}
+        if limit is not None:
+            kwargs['limit'] = limit
+        return await self._call('searchExamples', kwargs)
+
+    async def saveExample(self, path: str, content: str) -> SaveExampleResult:
+        """Save a new example to the knowledge base as a markdown file"""
+        kwargs: dict[str, Any] = {'path': path, 'content': content}
+        return await self._call('saveExample', kwargs)
+
+    async def getRoisAsGeoJson(self, source: Literal["current", "manager", "both"] = 'both', includeProperties: bool = True, format: Literal["geojson", "packed"] = 'geojson') -> GetRoisAsGeoJsonResult:
+        """Get ROIs (Regions of Interest) in GeoJSON format. Returns the current ROI from the active image, or all ROIs from the ROI Manager if it's open."""
+        kwargs: dict[str, Any] = {'source': source, 'includeProperties': includeProperties, 'format': format}
+        return await self._call('getRoisAsGeoJson', kwargs)
+
+    async def setRoisFromGeoJson(self, geojson: dict[str, Any], target: Literal["current", "manager", "both"] = 'both', clearExisting: bool = False) -> SetRoisFromGeoJsonResult:
+        """Set ROIs from GeoJSON format. Converts GeoJSON features to ImageJ ROIs and adds them to the ROI Manager and/or sets them on the active image."""
+        kwargs: dict[str, Any] = {'geojson': geojson, 'target': target, 'clearExisting': clearExisting}
+        return await self._call('setRoisFromGeoJson', kwargs)
+
+    async def ingestRoisPacked(self, ingestId: str, packed: Any | None = None, chunk: int = 0, finish: bool = False, target: Literal["current", "manager", "both"] = 'manager', clearExisting: bool = False) -> IngestRoisPackedResult:
+        """Bulk ROI import for large sets (tens of thousands of objects). Send ROIs as com.hack.ij.RoiPacker buffers in chunks under one ingestId, then call with finish=true. Chunks are decoded into ROIs in the JVM, and on finish they are added to the ROI Manager in one pass with its window hidden. tools/roi_packed.py ingest packs a GeoJSON FeatureCollection with the same type mapping as setRoisFromGeoJson."""
+        kwargs: dict[str, Any] = {'ingestId': ingestId, 'chunk': chunk, 'finish': finish, 'target': target, 'clearExisting': clearExisting}
+        if packed is not None:
+            kwargs['packed'] = packed
+        return await self._call('ingestRoisPacked', kwargs)
+
+    async def attachRoiIndex(self, index: Any, windowTitle: str | None = None) -> AttachRoiIndexResult:
+        """Attach a spatial ROI index built by tools/roi_index.py (.ijri) to an image. The ROIs embedded in the index become the image's overlay; an index built with --no-rois must match the overlay already on the image. On a pyramidal LazyImagePlus, each repaint draws only the ROIs whose bounds intersect the visible region, which keeps 100k+ ROI overlays responsive."""
+        kwargs: dict[str, Any] = {'index': index}
+        if windowTitle is not None:
+            kwargs['windowTitle'] = windowTitle
+        return await self._call('attachRoiIndex', kwargs)
+
+    async def getSummary(self, includeLog: bool = True, includeFileSystem: bool = True) -> GetSummaryResult:
+        """Get a comprehensive summary of the current ImageJ state and environment for AI agents to understand the context. Returns information about version, open windows, images, ROIs, tables, logs, and mounted file systems."""
+        kwargs: dict[str, Any] = {'includeLog': includeLog, 'includeFileSystem': includeFileSystem}
+        return await self._call('getSummary', kwargs)
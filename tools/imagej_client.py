@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""Async client for the ImageJ.JS Hypha service, with pipelining and batching.
+
+ImageJClient adds transports and scheduling to the generated ImageJAPI
+(tools/imagej_api.py, from the service `schemas`). Every method is a typed
+coroutine:
+
+  pipelining   calls may overlap, up to max_in_flight at a time. A call
+               that changes state (runMacro, openImage, ...) acts as a
+               barrier. It waits for every earlier call, and later calls
+               wait for it, so results match strictly sequential use.
+  batch()      runs several read-only calls in one executeJavaScript round
+               trip. The browser runs them one after another through
+               window.imagejServiceApi. It is ordered like one read-only
+               call, so a later state change waits for the whole batch.
+               With coalesce_ms > 0, read-only calls issued within that
+               window (e.g. under asyncio.gather) are batched automatically.
+  histograms   per-method client latency. Batched calls also report the
+               browser-side time as "<method>@browser".
+
+Transports: HyphaTransport (optional `hypha-rpc` package) and
+StreamTransport, which speaks JSON lines to MockServer. MockServer is a
+local stand-in with a configurable network RTT. It serialises service time,
+as CheerpJ's single Java thread does, and it understands the batch snippet.
+
+Usage
+-----
+    python3 tools/imagej_client.py --self-test
+    python3 tools/imagej_client.py mock --port 9527 [--rtt-ms 40] [--service-ms 5]
+    python3 tools/imagej_client.py bench [--calls 24] [--rtt-ms 40] [--port 9527]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from imagej_api import METHODS, ImageJAPI  # noqa: E402
+
+DEFAULT_SERVER = "https://hypha.aicell.io"
+READ_ONLY = frozenset({"getStatus", "takeScreenshot", "getImageInfo", "listImages", "listFiles",
+                       "getTextFromTable", "searchCommands", "listExamples", "readExample",
+                       "searchExamples", "getRoisAsGeoJson", "getSummary", "getPixelData"})
+BATCH_MARKER = "// imagej_client batch v1"
+BATCH_JS = BATCH_MARKER + """
+const calls = %s;
+const api = window.imagejServiceApi;
+if (!api) throw new Error('window.imagejServiceApi missing: reconnect with a current hypha-imagej-service.js');
+const out = [];
+for (const [name, args] of calls) {
+    const t0 = performance.now();
+    try {
+        out.push({ ok: true, value: await api[name](args, null), ms: performance.now() - t0 });
+    } catch (e) {
+        out.push({ ok: false, error: String((e && e.message) || e), ms: performance.now() - t0 });
+    }
+}
+return out;"""
+
+
+class RemoteError(RuntimeError):
+    pass
+
+
+class LatencyHistogram:
+    """Log2-bucketed latencies in ms; keeps the samples for exact percentiles."""
+
+    def __init__(self) -> None:
+        self.samples: list[float] = []
+
+    def record(self, ms: float) -> None:
+        self.samples.append(ms)
+
+    def percentile(self, p: float) -> float:
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, max(0, math.ceil(p / 100 * len(s)) - 1))] if s else math.nan
+
+    def buckets(self) -> dict[int, int]:
+        """Upper bound (ms, power of two) -> count."""
+        out: dict[int, int] = {}
+        for ms in self.samples:
+            ub = 1 << max(0, math.ceil(math.log2(max(ms, 1e-3))))
+            out[ub] = out.get(ub, 0) + 1
+        return dict(sorted(out.items()))
+
+
+def render_histograms(hists: dict[str, LatencyHistogram], width: int = 30) -> str:
+    lines = [f"{'method':<28} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for name, h in sorted(hists.items()):
+        if not h.samples:
+            continue
+        lines.append(f"{name:<28} {len(h.samples):>5} {h.percentile(50):>9.1f} {h.percentile(95):>9.1f} "
+                     f"{max(h.samples):>9.1f}")
+        top = max(h.buckets().values())
+        for ub, n in h.buckets().items():
+            lines.append(f"{'':<28} <={ub:>6} ms {'#' * max(1, round(n / top * width))} {n}")
+    return "\n".join(lines)
+
+
+class HyphaTransport:
+    """Calls a hypha_rpc service handle by keyword arguments."""
+
+    def __init__(self, service: Any):
+        self.service = service
+
+    @classmethod
+    async def connect(cls, service_id: str, server_url: str = DEFAULT_SERVER,
+                      token: str | None = None) -> "HyphaTransport":
+        try:
+            from hypha_rpc import connect_to_server
+        except ImportError as e:
+            raise RuntimeError("HyphaTransport needs hypha-rpc (pip install hypha-rpc)") from e
+        server = await connect_to_server({"server_url": server_url, "token": token})
+        return cls(await server.get_service(service_id))
+
+    async def call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        return await getattr(self.service, method)(**kwargs)
+
+
+class StreamTransport:
+    """JSON lines over TCP with request ids, so responses may arrive in any order."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer = reader, writer
+        self.pending: dict[int, asyncio.Future] = {}
+        self.next_id = 0
+        self.reader_task = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> "StreamTransport":
+        return cls(*await asyncio.open_connection(host, port, limit=1 << 26))
+
+    async def _read(self) -> None:
+        while line := await self.reader.readline():
+            msg = json.loads(line)
+            fut = self.pending.pop(msg["id"], None)
+            if fut is None or fut.done():
+                continue
+            if "error" in msg:
+                fut.set_exception(RemoteError(msg["error"]))
+            else:
+                fut.set_result(msg["result"])
+        for fut in self.pending.values():
+            fut.set_exception(ConnectionError("mock server closed the connection"))
+
+    async def call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        self.next_id += 1
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = fut
+        self.writer.write(json.dumps({"id": self.next_id, "method": method, "kwargs": kwargs}).encode() + b"\n")
+        await self.writer.drain()
+        return await fut
+
+    async def close(self) -> None:
+        self.reader_task.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class ImageJClient(ImageJAPI):
+    def __init__(self, transport: Any, max_in_flight: int = 8, coalesce_ms: float = 0.0):
+        self.transport = transport
+        self.coalesce_ms = coalesce_ms
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._inflight: set[asyncio.Future] = set()
+        self._barrier: asyncio.Future | None = None
+        self._queue: list[tuple[str, dict[str, Any], asyncio.Future]] = []
+        self._flush: asyncio.TimerHandle | None = None
+
+    def _record(self, name: str, ms: float) -> None:
+        self.histograms.setdefault(name, LatencyHistogram()).record(ms)
+
+    async def _call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        # Ordering is fixed here, before the first await, in issue order.
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        if method in READ_ONLY:
+            waits = [self._barrier] if self._barrier else []
+        else:
+            waits = list(self._inflight) + ([self._barrier] if self._barrier else [])
+            self._barrier = done
+        self._inflight.add(done)
+        try:
+            if waits:
+                await asyncio.wait(waits)
+            if method in READ_ONLY and self.coalesce_ms > 0:
+                return await self._enqueue(method, kwargs)
+            async with self._slots:
+                t0 = time.perf_counter()
+                result = await self.transport.call(method, kwargs)
+                self._record(method, (time.perf_counter() - t0) * 1000)
+                return result
+        finally:
+            self._inflight.discard(done)
+            if self._barrier is done:
+                self._barrier = None
+            done.set_result(None)
+
+    def _enqueue(self, method: str, kwargs: dict[str, Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._queue.append((method, kwargs, fut))
+        if self._flush is None:
+            self._flush = loop.call_later(self.coalesce_ms / 1000, self._drain_queue)
+        return fut
+
+    def _drain_queue(self) -> None:
+        queue, self._queue, self._flush = self._queue, [], None
+
+        async def run() -> None:
+            try:
+                results = await self._batch([(m, k) for m, k, _ in queue])
+            except Exception as e:  # noqa: BLE001 - handed to every waiter
+                for *_, fut in queue:
+                    fut.set_exception(e)
+                return
+            for (*_, fut), (ok, value) in zip(queue, results):
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(RemoteError(value))
+
+        asyncio.ensure_future(run())
+
+    async def _batch(self, calls: list[tuple[str, dict[str, Any]]]) -> list[tuple[bool, Any]]:
+        for method, _ in calls:
+            if method not in READ_ONLY:
+                raise ValueError(f"{method} is not read-only and cannot be batched")
+        code = BATCH_JS % json.dumps([[m, k] for m, k in calls])
+        async with self._slots:
+            t0 = time.perf_counter()
+            res = await self.transport.call("executeJavaScript", {"code": code})
+            ms = (time.perf_counter() - t0) * 1000
+        if not res.get("success"):
+            raise RemoteError(res.get("error", "executeJavaScript failed"))
+        out = []
+        for (method, _), item in zip(calls, res["result"]):
+            self._record(method, ms)
+            self._record(method + "@browser", item.get("ms", 0.0))
+            out.append((True, item["value"]) if item["ok"] else (False, item["error"]))
+        return out
+
+    async def batch(self, calls: Iterable[tuple[str, dict[str, Any]]]) -> list[Any]:
+        """Run read-only (method, kwargs) calls in one round trip; raises on the first failure."""
+        calls = list(calls)
+        for method, kwargs in calls:
+            unknown = set(kwargs) - set(METHODS.get(method, {}).get("params", {}))
+            if method not in METHODS or unknown:
+                raise ValueError(f"bad batch call {method}({', '.join(sorted(unknown))})")
+        # Registered like a read-only _call: later state changes wait for it.
+        done = asyncio.get_running_loop().create_future()
+        waits = [self._barrier] if self._barrier else []
+        self._inflight.add(done)
+        try:
+            if waits:
+                await asyncio.wait(waits)
+            results = await self._batch(calls)
+        finally:
+            self._inflight.discard(done)
+            done.set_result(None)
+        for (method, _), (ok, value) in zip(calls, results):
+            if not ok:
+                raise RemoteError(f"{method}: {value}")
+        return [value for _, value in results]
+
+
+class MockServer:
+    """Local stand-in for the browser service, reachable with StreamTransport."""
+
+    def __init__(self, rtt_ms: float = 40.0, service_ms: float = 5.0):
+        self.rtt_s, self.service_s = rtt_ms / 1000, service_ms / 1000
+        self.java = asyncio.Lock()  # CheerpJ runs one Java call at a time
+        self.images = [{"id": -1, "title": "blobs.gif", "width": 256, "height": 254}]
+        self.calls: dict[str, int] = {}
+        self.server: asyncio.base_events.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self.server = await asyncio.start_server(self._client, host, port, limit=1 << 26)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def answer(msg: dict) -> None:
+            await asyncio.sleep(self.rtt_s / 2)
+            try:
+                reply = {"id": msg["id"], "result": await self.dispatch(msg["method"], msg["kwargs"])}
+            except Exception as e:  # noqa: BLE001 - reported to the caller like the service does
+                reply = {"id": msg["id"], "error": str(e)}
+            await asyncio.sleep(self.rtt_s / 2)
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+
+        tasks = set()
+        while line := await reader.readline():
+            task = asyncio.create_task(answer(json.loads(line)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        writer.close()
+
+    async def dispatch(self, method: str, kwargs: dict[str, Any]) -> Any:
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "executeJavaScript":
+            code = kwargs["code"]
+            if not code.startswith(BATCH_MARKER):
+                return {"success": False, "error": "the mock only runs imagej_client batches"}
+            calls = json.loads(code.split("\n")[1].removeprefix("const calls = ").rstrip(";"))
+            out = []
+            for name, args in calls:
+                t0 = time.perf_counter()
+                try:
+                    out.append({"ok": True, "value": await self.handle(name, args),
+                                "ms": (time.perf_counter() - t0) * 1000})
+                except Exception as e:  # noqa: BLE001 - mirrors the batch snippet
+                    out.append({"ok": False, "error": str(e), "ms": 0.0})
+            return {"success": True, "result": out}
+        return await self.handle(method, kwargs)
+
+    async def handle(self, method: str, kwargs: dict[str, Any]) -> Any:
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method}")
+        async with self.java:
+            await asyncio.sleep(self.service_s)
+            active = self.images[-1] if self.images else None
+            if method == "getStatus":
+                return {"ready": True, "version": "mock"}
+            if method == "listImages":
+                return {"images": list(self.images)}
+            if method == "getImageInfo":
+                if active is None:
+                    raise ValueError("No image open")
+                return {"title": active["title"], "width": active["width"], "height": active["height"],
+                        "type": "8-bit", "slices": 1}
+            if method == "openImage":
+                title = Path(kwargs.get("path") or kwargs.get("url") or "untitled").name
+                self.images.append({"id": -len(self.images) - 1, "title": title, "width": 512, "height": 512})
+                return {"success": True, "title": title}
+            if method == "closeImage":
+                self.images = [im for im in self.images if kwargs["title"] not in ("all", im["title"])]
+                return {"success": True}
+            if method == "runMacro":
+                return {"success": True, "result": str(len(self.images))}
+            return {"success": True}
+
+
+async def _pattern(client: ImageJClient, mode: str, calls: int) -> list[Any]:
+    reads = [("getImageInfo", {}), ("listImages", {}), ("getStatus", {})]
+    plan = [reads[i % len(reads)] for i in range(calls)]
+    if mode == "sequential":
+        return [await client._call(m, k) for m, k in plan]
+    if mode == "pipelined":
+        return list(await asyncio.gather(*(client._call(m, k) for m, k in plan)))
+    return await client.batch(plan)
+
+
+async def _bench(args: argparse.Namespace) -> list[tuple[str, float, ImageJClient]]:
+    mock = MockServer(args.rtt_ms, args.service_ms)
+    port = await mock.start(port=args.port)
+    rows = []
+    for mode in ("sequential", "pipelined", "batched"):
+        transport = await StreamTransport.connect("127.0.0.1", port)
+        client = ImageJClient(transport, max_in_flight=args.max_in_flight)
+        t0 = time.perf_counter()
+        await _pattern(client, mode, args.calls)
+        rows.append((mode, (time.perf_counter() - t0) * 1000, client))
+        await transport.close()
+    mock.server.close()
+    return rows
+
+
+async def _exercise() -> list[str]:
+    fails: list[str] = []
+    mock = MockServer(rtt_ms=20, service_ms=1)
+    port = await mock.start()
+    transport = await StreamTransport.connect("127.0.0.1", port)
+    client = ImageJClient(transport)
+    t0 = time.perf_counter()
+    seq = await _pattern(client, "sequential", 6)
+    t_seq = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pipe = await _pattern(client, "pipelined", 6)
+    t_pipe = time.perf_counter() - t0
+    batched = await _pattern(client, "batched", 6)
+    if not (seq == pipe == batched) or t_pipe > t_seq / 2:
+        fails.append(f"pipelining: {t_seq * 1000:.0f} ms sequential vs {t_pipe * 1000:.0f} ms")
+    # A state change in the middle of a pipeline is seen by the later reads only.
+    before, _, after = await asyncio.gather(client.listImages(), client.openImage(path="/files/a.tif"),
+                                            client.listImages())
+    if len(after["images"]) != len(before["images"]) + 1:
+        fails.append(f"barrier: {before} -> {after}")
+    # The same holds for a batch: the open waits until every batched read has run.
+    reads, _, after = await asyncio.gather(client.batch([("listImages", {})] * 3),
+                                           client.openImage(path="/files/b.tif"), client.listImages())
+    if any(len(r["images"]) != len(before["images"]) + 1 for r in reads) or \
+            len(after["images"]) != len(before["images"]) + 2:
+        fails.append(f"batch barrier: {[len(r['images']) for r in reads]} -> {len(after['images'])}")
+    await client.closeImage(title="b.tif")
+    coalescing = ImageJClient(transport, coalesce_ms=2)
+    n_exec = mock.calls.get("executeJavaScript", 0)
+    info, images = await asyncio.gather(coalescing.getImageInfo(), coalescing.listImages())
+    if info["title"] != "a.tif" or len(images["images"]) != 2 or mock.calls["executeJavaScript"] != n_exec + 1:
+        fails.append(f"coalescing: {info} {images} {mock.calls}")
+    try:
+        await client.batch([("runMacro", {"macro": "1"})])
+        fails.append("batch accepted runMacro")
+    except ValueError:
+        pass
+    if "getImageInfo@browser" not in client.histograms or len(client.histograms["getImageInfo"].samples) != 6:
+        fails.append(f"histograms: {sorted(client.histograms)}")
+    await transport.close()
+    mock.server.close()
+    return fails
+
+
+def _self_test() -> bool:
+    fails = asyncio.run(_exercise())
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("imagej_client self-test: PASS")
+    return True
+
+
+async def _serve_mock(args: argparse.Namespace) -> int:
+    mock = MockServer(args.rtt_ms, args.service_ms)
+    port = await mock.start(args.host, args.port)
+    print(f"mock ImageJ.JS service on {args.host}:{port} (rtt {args.rtt_ms} ms, service {args.service_ms} ms)")
+    await mock.server.serve_forever()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    for name, help_ in (("mock", "Run the mock service"), ("bench", "Compare call patterns against the mock")):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("--rtt-ms", type=float, default=40.0, help="Simulated network round trip (default 40)")
+        p.add_argument("--service-ms", type=float, default=5.0, help="Serialised service time per call (default 5)")
+        p.add_argument("--port", type=int, default=0 if name == "bench" else 9527)
+    sub.choices["mock"].add_argument("--host", default="127.0.0.1")
+    sub.choices["bench"].add_argument("--calls", type=int, default=24)
+    sub.choices["bench"].add_argument("--max-in-flight", type=int, default=8)
+    sub.choices["bench"].add_argument("--histograms", action="store_true", help="Print per-method histograms")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if args.cmd == "mock":
+        return asyncio.run(_serve_mock(args))
+    if args.cmd == "bench":
+        rows = asyncio.run(_bench(args))
+        base = rows[0][1]
+        print(f"{args.calls} read-only calls, rtt {args.rtt_ms} ms, service {args.service_ms} ms")
+        for mode, ms, client in rows:
+            print(f"  {mode:<11} {ms:>8.0f} ms  {base / ms:>5.1f}x")
+            if args.histograms:
+                print(render_histograms(client.histograms))
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""Caching proxy for the service's `runMacro` and `getTextFromTable`.
+
+Agents often send the same measurement macro or threshold preview to the
+same image several times in a row. Each call is a multi-second CheerpJ
+round trip. MacroCache wraps any object with the service's async methods
+(a hypha_rpc service handle, or StandInService below). It answers repeat
+calls from an LRU keyed on:
+
+  macro key   sha256 of the macro's token stream from tools/ijm_tokenizer.py,
+              so comments, whitespace and line breaks do not split entries
+  image key   sha256 of FINGERPRINT_MACRO's output (active image title, ID,
+              dimensions, bit depth, slice, selection, threshold and
+              calibration) and of the image's pixel bytes, read through
+              the service's getPixelData; taken again after each
+              invalidation, so a flip or rotation changes the key
+
+Only macros whose calls all appear in READ_ONLY_FUNCS (or are run() of a
+command in READ_ONLY_COMMANDS) are served from the cache. Any other macro is forwarded and then invalidates the cache:
+
+  table writers   the commands in TABLE_COMMANDS (run("Measure"), ...),
+                  setResult, Table.* -- table text is dropped, image keys
+                  are kept
+  everything else -- the image fingerprint and all table text are dropped
+  nondeterministic (random, getTime, ...) -- forwarded, nothing dropped
+
+openImage and closeImage also drop everything. Calls with returnLog=true
+are forwarded, because the service returns the whole Log window, which
+grows between calls. On a hit, print() output does not reach the Log
+window. Edits made by hand in the browser are not seen by the proxy, so
+pass --verify to take the fingerprint before every lookup.
+
+Usage
+-----
+    python3 tools/macro_cache.py --self-test
+    python3 tools/macro_cache.py key macro.ijm        # print the normalised macro key
+    python3 tools/macro_cache.py serve --service-id <workspace>/<id> [--verify]
+
+`serve` needs the optional `hypha-rpc` package. It registers an
+`imagej-cached` service that forwards to the browser service.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from ijm_tokenizer import (EOF, KEYWORD, OP, STRING, WORD, MacroSyntaxError, Token,  # noqa: E402
+                           tokenize)
+
+DEFAULT_SERVER = "https://hypha.aicell.io"
+
+# Built-ins that only read image, table or macro state.
+READ_ONLY_FUNCS = frozenset({
+    "getValue", "getStatistics", "getRawStatistics", "getHistogram", "getTitle", "getWidth",
+    "getHeight", "getDimensions", "getPixel", "getPixelSize", "getVoxelSize", "getInfo",
+    "getMetadata", "getImageInfo", "bitDepth", "nSlices", "nImages", "nResults", "getResult",
+    "getResultString", "getResultLabel", "getSelectionBounds", "getSelectionCoordinates",
+    "selectionType", "getThreshold", "getMinAndMax", "getImageID", "getSliceNumber", "getLine",
+    "getProfile", "is", "isOpen", "print", "d2s", "parseInt", "parseFloat", "round", "floor",
+    "abs", "sqrt", "pow", "exp", "log", "sin", "cos", "atan", "atan2", "minOf", "maxOf",
+    "lengthOf", "substring", "indexOf", "lastIndexOf", "startsWith", "endsWith", "replace",
+    "split", "toString", "toHex", "toBinary", "toUpperCase", "toLowerCase", "matches", "isNaN",
+    "newArray", "fromCharCode", "charCodeAt", "IJ.pad", "Array.getStatistics", "Array.concat",
+    "Array.copy", "Array.slice", "Array.sort", "Array.rankPositions", "Array.reverse",
+    "Array.trim", "Array.fill", "Array.findMaxima", "Array.findMinima", "Array.getSequence",
+    "Array.print", "Array.deleteValue", "Array.deleteIndex", "Math.abs", "Math.sqrt",
+    "Math.min", "Math.max", "Math.round", "Math.floor", "Math.ceil", "Math.pow", "Math.log",
+    "Math.log10", "Math.exp", "Math.sqr", "Math.constrain", "String.join", "String.trim",
+    "String.pad", "String.format", "Table.size", "Table.get", "Table.getString",
+    "Table.getColumn", "Table.headings", "Table.title", "List.get", "List.getValue",
+})
+# Read-only run() commands. "Properties..." only when it has no options;
+# with options it sets the calibration. "Histogram" is not here: it opens a
+# window that becomes the active image.
+READ_ONLY_COMMANDS = frozenset({"Show Info..."})
+BARE_READ_ONLY_COMMANDS = frozenset({"Properties..."})
+# run() commands that only write the Results / Summary tables. Analyze
+# Particles (show=Masks, add) and Distribution open windows, so they mutate.
+TABLE_COMMANDS = frozenset({"Measure", "Set Measurements...", "Clear Results", "Summarize"})
+TABLE_FUNCS = frozenset({"setResult", "updateResults", "IJ.renameResults", "IJ.deleteRows"})
+NONDETERMINISTIC_FUNCS = frozenset({"random", "getTime", "getDateAndTime", "Math.random"})
+
+PURE, TABLES, NONDETERMINISTIC, MUTATING = "pure", "tables", "nondeterministic", "mutating"
+
+# Returns the state of the active image that is not in its pixels. The
+# pixels themselves are hashed from getPixelData: statistics and histograms
+# do not change under a flip or rotation, but getPixel/getProfile do.
+FINGERPRINT_MACRO = """\
+if (nImages == 0) return "none";
+setBatchMode(true);
+getDimensions(ijcW, ijcH, ijcC, ijcZ, ijcT);
+getPixelSize(ijcUnit, ijcPw, ijcPh);
+getThreshold(ijcLo, ijcHi);
+getSelectionBounds(ijcX, ijcY, ijcSw, ijcSh);
+ijcOut = getTitle() + "|" + getImageID() + "|" + ijcW + "x" + ijcH + "x" + ijcC + "x" + ijcZ + "x" + ijcT
+    + "|" + bitDepth() + "|" + getSliceNumber() + "|" + selectionType() + ":" + ijcX + "," + ijcY
+    + "," + ijcSw + "," + ijcSh + "|" + ijcLo + "," + ijcHi + "|" + ijcUnit + ":" + ijcPw + "," + ijcPh;
+return ijcOut;
+"""
+
+
+def macro_key(macro: str) -> str:
+    """Hash of the token stream; comments and layout do not change it."""
+    h = hashlib.sha256()
+    for t in tokenize(macro):
+        if t.type != EOF:
+            h.update(f"{t.type}\x1f{t.value}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _called(tokens: list[Token], i: int) -> tuple[str, int] | None:
+    """(name, index of '(') when tokens[i] starts a call like f( or Array.sort(."""
+    if tokens[i].type != WORD or (i > 0 and tokens[i - 1].is_(OP, ".")):
+        return None
+    name, j = tokens[i].value, i + 1
+    while tokens[j].is_(OP, ".") and tokens[j + 1].type == WORD:
+        name += "." + tokens[j + 1].value
+        j += 2
+    return (name, j) if tokens[j].is_(OP, "(") else None
+
+
+def classify(macro: str) -> str:
+    """PURE, TABLES, NONDETERMINISTIC or MUTATING; see the module docstring."""
+    tokens = tokenize(macro)
+    user_funcs = {tokens[i + 1].value for i, t in enumerate(tokens)
+                  if t.is_(KEYWORD, "function") and tokens[i + 1].type == WORD}
+    effect = PURE
+    for i in range(len(tokens)):
+        call = _called(tokens, i)
+        if call is None or call[0] in user_funcs:
+            continue
+        name, paren = call
+        if name == "run":
+            arg = tokens[paren + 1]
+            cmd = arg.value if arg.type == STRING else None
+            if cmd in READ_ONLY_COMMANDS or (cmd in BARE_READ_ONLY_COMMANDS and tokens[paren + 2].is_(OP, ")")):
+                continue
+            if cmd in TABLE_COMMANDS:
+                effect = TABLES if effect in (PURE, NONDETERMINISTIC) else effect
+                continue
+            return MUTATING
+        if name in READ_ONLY_FUNCS:
+            continue
+        if name in TABLE_FUNCS or (name.startswith("Table.") and name not in READ_ONLY_FUNCS):
+            effect = TABLES if effect in (PURE, NONDETERMINISTIC) else effect
+        elif name in NONDETERMINISTIC_FUNCS:
+            effect = NONDETERMINISTIC if effect == PURE else effect
+        else:
+            return MUTATING
+    return effect
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    fingerprints: int = 0
+    saved_ms: float = 0.0
+
+
+class MacroCache:
+    """Wraps a service object; forwards unknown attributes unchanged."""
+
+    def __init__(self, service: Any, max_entries: int = 256, verify: bool = False):
+        self.service = service
+        self.max_entries = max_entries
+        self.verify = verify
+        self.stats = CacheStats()
+        self._entries: OrderedDict[tuple[str, str], tuple[dict, float]] = OrderedDict()
+        self._tables: dict[str, dict] = {}
+        self._image_key: str | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.service, name)
+
+    def invalidate(self, tables_only: bool = False) -> None:
+        self.stats.invalidations += 1
+        self._tables.clear()
+        if not tables_only:
+            self._image_key = None
+
+    async def image_key(self) -> str:
+        if self._image_key is None or self.verify:
+            self.stats.fingerprints += 1
+            res = await self.service.runMacro(macro=FINGERPRINT_MACRO)
+            if not res.get("success"):
+                raise RuntimeError(f"fingerprint macro failed: {res.get('error')}")
+            meta = str(res.get("result", ""))
+            h = hashlib.sha256(meta.encode("utf-8"))
+            chunk, count = 0, (0 if meta == "none" else 1)
+            while chunk < count:
+                res = await self.service.getPixelData(chunk=chunk)
+                if not res.get("success"):
+                    raise RuntimeError(f"fingerprint pixel read failed: {res.get('error')}")
+                h.update(res["data"])
+                chunk, count = chunk + 1, res["chunkCount"]
+            self._image_key = h.hexdigest()
+        return self._image_key
+
+    async def runMacro(self, macro: str, returnLog: bool = False) -> dict:
+        try:
+            effect = classify(macro)
+        except MacroSyntaxError:
+            effect = MUTATING  # let ImageJ report the error
+        if returnLog or effect != PURE:
+            self.stats.bypassed += 1
+            res = await self.service.runMacro(macro=macro, returnLog=returnLog)
+            if effect in (TABLES, MUTATING):
+                self.invalidate(tables_only=effect == TABLES)
+            return res
+        key = (macro_key(macro), await self.image_key())
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            res, cost_ms = self._entries[key]
+            self.stats.hits += 1
+            self.stats.saved_ms += cost_ms
+            return dict(res)
+        self.stats.misses += 1
+        t0 = time.perf_counter()
+        res = await self.service.runMacro(macro=macro, returnLog=False)
+        if res.get("success"):  # errors may be transient (no image open yet, ...)
+            self._entries[key] = (dict(res), (time.perf_counter() - t0) * 1000)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return res
+
+    async def getTextFromTable(self, title: str) -> dict:
+        if title in self._tables:
+            self.stats.hits += 1
+            return dict(self._tables[title])
+        self.stats.misses += 1
+        res = await self.service.getTextFromTable(title=title)
+        if res.get("success"):
+            self._tables[title] = dict(res)
+        return res
+
+    async def openImage(self, **kwargs: Any) -> dict:
+        try:
+            return await self.service.openImage(**kwargs)
+        finally:
+            self.invalidate()
+
+    async def closeImage(self, **kwargs: Any) -> dict:
+        try:
+            return await self.service.closeImage(**kwargs)
+        finally:
+            self.invalidate()
+
+
+class StandInService:
+    """In-process stand-in with the service's call signatures and a fixed latency.
+
+    Images are flat lists of 8-bit pixels. runMacro understands the
+    fingerprint macro, getValue("Mean"), getPixel(0, 0), run("Invert"),
+    run("Flip Horizontally"), run("Measure"), run("Clear Results") and
+    run("Analyze Particles...") (which opens a mask as the active image);
+    any other macro only costs the latency. getPixelData serves one chunk.
+    """
+
+    def __init__(self, latency_s: float = 0.02):
+        self.latency_s = latency_s
+        self.images: dict[str, list[int]] = {}
+        self.active: str | None = None
+        self.results: list[float] = []
+        self.calls: dict[str, int] = {}
+
+    async def _call(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await asyncio.sleep(self.latency_s)
+
+    async def openImage(self, path: str | None = None, url: str | None = None) -> dict:
+        await self._call("openImage")
+        title = Path(path or url or "untitled").name
+        self.images[title] = [(i * 7) % 256 for i in range(64)]
+        self.active = title
+        return {"success": True, "title": title}
+
+    async def closeImage(self, title: str | None = None) -> dict:
+        await self._call("closeImage")
+        for t in (list(self.images) if title in (None, "all") else [title]):
+            self.images.pop(t, None)
+        self.active = next(iter(self.images), None)
+        return {"success": True}
+
+    async def getTextFromTable(self, title: str) -> dict:
+        await self._call("getTextFromTable")
+        if title != "Results":
+            return {"success": False, "error": "Table not found: " + title}
+        rows = [" \tMean"] + [f"{i + 1}\t{m:.3f}" for i, m in enumerate(self.results)]
+        return {"success": True, "text": "\n".join(rows)}
+
+    async def runMacro(self, macro: str, returnLog: bool = False) -> dict:
+        await self._call("runMacro")
+        px = self.images.get(self.active) if self.active else None
+        if macro == FINGERPRINT_MACRO:
+            return {"success": True, "result": "none" if px is None else f"{self.active}|{len(px)}"}
+        if px is None:
+            return {"success": False, "error": "There are no images open"}
+        if 'run("Invert")' in macro:
+            self.images[self.active] = [255 - v for v in px]
+        if 'run("Flip Horizontally")' in macro:
+            self.images[self.active] = px[::-1]
+        if 'run("Analyze Particles..."' in macro:
+            self.results.append(sum(px) / len(px))
+            self.active = "Mask of " + self.active
+            self.images[self.active] = [255 if v > 127 else 0 for v in px]
+            px = self.images[self.active]
+        if 'run("Clear Results")' in macro:
+            self.results.clear()
+        if 'run("Measure")' in macro:
+            self.results.append(sum(px) / len(px))
+        result = f"{sum(self.images[self.active]) / len(px):.3f}" if 'getValue("Mean")' in macro else ""
+        if "getPixel(0, 0)" in macro:
+            result = str(self.images[self.active][0])
+        res = {"success": True, "result": result}
+        if returnLog:
+            res["log"] = ""
+        return res
+
+    async def getPixelData(self, windowTitle: str | None = None, chunk: int = 0) -> dict:
+        await self._call("getPixelData")
+        px = self.images.get(windowTitle or self.active or "")
+        if px is None:
+            return {"success": False, "error": "No image open"}
+        return {"success": True, "chunk": chunk, "chunkCount": 1, "data": bytes(px)}
+
+
+async def _serve(args: argparse.Namespace) -> int:
+    try:
+        from hypha_rpc import connect_to_server
+    except ImportError:
+        print("ERROR: `serve` needs hypha-rpc (pip install hypha-rpc)", file=sys.stderr)
+        return 1
+    server = await connect_to_server({"server_url": args.server_url})
+    cache = MacroCache(await server.get_service(args.service_id), args.max_entries, args.verify)
+    names = ("runMacro", "getTextFromTable", "openImage", "closeImage")
+    info = await server.register_service({
+        "id": args.id, "name": "ImageJ.JS (cached)", "config": {"visibility": "public"},
+        **{n: getattr(cache, n) for n in names},
+        "cacheStats": lambda: vars(cache.stats),
+    })
+    print(f"registered {info.id}; forwarding to {args.service_id}")
+    await server.serve()
+    return 0
+
+
+async def _exercise() -> tuple[StandInService, MacroCache, list[str]]:
+    svc = StandInService(latency_s=0.005)
+    cache = MacroCache(svc, max_entries=2)
+    fails: list[str] = []
+    await cache.openImage(path="/data/blobs.gif")
+    mean = 'x = getValue("Mean"); // measure\nreturn d2s(x, 3);'
+    r1 = await cache.runMacro(mean)
+    r2 = await cache.runMacro("x = getValue(\"Mean\");   return d2s(x,3);")
+    if r1 != r2 or cache.stats.hits != 1 or svc.calls["runMacro"] != 2:
+        fails.append(f"repeat lookup: {r1} {r2} {cache.stats} {svc.calls}")
+    await cache.runMacro('run("Invert");')
+    r3 = await cache.runMacro(mean)
+    if r3 == r1 or cache.stats.fingerprints != 2:
+        fails.append(f"mutation did not invalidate: {r3} {cache.stats}")
+    await cache.runMacro('run("Measure");')
+    t1 = await cache.getTextFromTable(title="Results")
+    await cache.getTextFromTable(title="Results")
+    await cache.runMacro('run("Measure");')
+    t2 = await cache.getTextFromTable(title="Results")
+    if t1 == t2 or svc.calls["getTextFromTable"] != 2:
+        fails.append(f"table cache: {t1} {t2} {svc.calls}")
+    if cache.stats.fingerprints != 2:
+        fails.append("table writer dropped the image key")
+    for m in ("getWidth();", "getHeight();", "bitDepth();"):
+        await cache.runMacro(m)
+    if cache.stats.evictions != 3 or len(cache._entries) != 2:
+        fails.append(f"LRU: {cache.stats}")
+    corner = "return getPixel(0, 0);"
+    p1 = await cache.runMacro(corner)
+    await cache.runMacro('run("Flip Horizontally");')
+    misses = cache.stats.misses
+    p2 = await cache.runMacro(corner)
+    if p1 == p2 or cache.stats.misses != misses + 1:
+        fails.append(f"flipped image hit the cache: {p1} {p2} {cache.stats}")
+    # Analyze Particles writes the Results table and also opens a new active image
+    m1 = await cache.runMacro(mean)
+    await cache.runMacro('run("Analyze Particles...", "size=0-Infinity show=Masks display");')
+    m2 = await cache.runMacro(mean)
+    if m1 == m2 or m2["result"] != f"{sum(svc.images[svc.active]) / 64:.3f}":
+        fails.append(f"new active image after Analyze Particles served from the cache: {m1} {m2}")
+    await cache.closeImage(title="all")
+    if cache._image_key is not None or cache._tables:
+        fails.append("closeImage did not invalidate")
+    return svc, cache, fails
+
+
+def _self_test() -> bool:
+    cases = {'getStatistics(a, m); print(m);': PURE,
+             'run("Measure"); n = nResults;': TABLES,
+             'setAutoThreshold("Otsu"); getThreshold(l, u);': MUTATING,
+             'run("Gaussian Blur...", "sigma=2");': MUTATING,
+             'x = random(); function f() { return 1; } y = f();': NONDETERMINISTIC,
+             'a = Array.getStatistics(newArray(1, 2)); selectWindow("x");': MUTATING,
+             'run("Properties..."); getPixelSize(u, w, h);': PURE,
+             'run("Properties...", "pixel_width=2 pixel_height=2");': MUTATING,
+             'run("Histogram");': MUTATING,
+             'run("Analyze Particles...", "size=10-Infinity display");': MUTATING,
+             'run("Distribution...", "parameter=Area");': MUTATING}
+    for src, want in cases.items():
+        if classify(src) != want:
+            print(f"self-test FAIL: classify({src!r}) = {classify(src)}, expected {want}")
+            return False
+    if macro_key("a=1;// x\nb=2;") != macro_key("a = 1;\n\n/* y */ b = 2;") or \
+            macro_key("a=1;") == macro_key("a=2;"):
+        print("self-test FAIL: macro_key normalisation")
+        return False
+    _, cache, fails = asyncio.run(_exercise())
+    if fails:
+        for f in fails:
+            print(f"self-test FAIL: {f}")
+        return False
+    print(f"macro_cache self-test: PASS ({cache.stats.hits} hits, {cache.stats.misses} misses, "
+          f"{cache.stats.evictions} evictions)")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    k = sub.add_parser("key", help="Print the normalised key and effect class of a macro")
+    k.add_argument("macro")
+    s = sub.add_parser("serve", help="Register a caching proxy for a running ImageJ.JS service")
+    s.add_argument("--service-id", required=True, help="Service to wrap, e.g. <workspace>/<client>:imagej-js")
+    s.add_argument("--server-url", default=DEFAULT_SERVER)
+    s.add_argument("--id", default="imagej-cached", help="Service id to register (default: imagej-cached)")
+    s.add_argument("--max-entries", type=int, default=256)
+    s.add_argument("--verify", action="store_true", help="Fingerprint the image before every lookup")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if args.cmd == "key":
+        try:
+            src = Path(args.macro).read_text(encoding="utf-8")
+            print(f"{macro_key(src)}  {classify(src)}")
+        except (OSError, MacroSyntaxError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        return 0
+    if args.cmd == "serve":
+        return asyncio.run(_serve(args))
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
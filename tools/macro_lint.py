@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Static performance linter for ImageJ macros.
+
+Macros sent through the service's `runMacro` execute on CheerpJ's single
+interpreter thread. Patterns that cost milliseconds on desktop ImageJ can
+tie a browser session up for minutes there. This linter reads a macro
+with tools/ijm_tokenizer.py and reports the known offenders, each with a
+vectorised replacement:
+
+  IJM001 pixel-loop       getPixel/setPixel/putPixel inside a loop, directly
+                          or through a user function called from the loop
+                          (error when nested or bounded by getWidth/getHeight)
+  IJM002 no-batch-mode    run()/open()/newImage() before setBatchMode(true);
+                          every command then repaints a window
+  IJM003 select-in-loop   selectWindow/selectImage inside a loop
+  IJM004 slice-loop       setSlice() loop around run() calls that lack the
+                          "stack" option, which does all slices in one call
+
+`--fix` applies one mechanical rewrite. It wraps the macro in
+setBatchMode(true) / setBatchMode("exit and display"), which keeps the
+final images visible. The opening call goes in front of line 1 and the
+closing call on a new last line, so existing line numbers stay the same.
+Macros that leave batch mode themselves part-way through, or that rely on
+windows being shown mid-run, should be reviewed by hand.
+
+Usage
+-----
+    python3 tools/macro_lint.py --self-test
+    python3 tools/macro_lint.py macro.ijm [more.ijm ...] [--json] [--fail-on warning]
+    python3 tools/macro_lint.py macro.ijm --fix -o fixed.ijm
+
+Exit status: 0 when no finding reaches --fail-on (default: error), 1
+otherwise or on syntax errors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from ijm_tokenizer import (LOOP_KINDS, OP, STRING, WORD, MacroSyntaxError, Statement, Token,  # noqa: E402
+                           iter_statements, match_close, tokenize)
+
+SEVERITIES = ("info", "warning", "error")
+PIXEL_FUNCS = frozenset({"getPixel", "setPixel", "putPixel"})
+WRITE_FUNCS = frozenset({"setPixel", "putPixel"})
+SELECT_FUNCS = frozenset({"selectWindow", "selectImage"})
+IMAGE_FUNCS = frozenset({"run", "open", "newImage"})
+BOUND_FUNCS = frozenset({"getWidth", "getHeight", "getDimensions", "nSlices"})
+
+
+@dataclass
+class Finding:
+    rule: str
+    name: str
+    severity: str
+    line: int
+    message: str
+    suggestion: str
+    path: str = ""
+
+    def render(self) -> str:
+        return (f"{self.path or '<macro>'}:{self.line}: {self.rule} {self.severity} {self.name}: "
+                f"{self.message}\n    suggest: {self.suggestion}")
+
+
+def _calls(tokens: list[Token], first: int, last: int, names: frozenset[str]) -> list[int]:
+    return [k for k in range(first, last + 1)
+            if tokens[k].type == WORD and tokens[k].value in names and tokens[k + 1].is_(OP, "(")]
+
+
+def _call_args(tokens: list[Token], k: int) -> list[Token]:
+    return tokens[k + 2:match_close(tokens, k + 1)]
+
+
+def _user_functions(tokens: list[Token], stmts: list[Statement]) -> dict[str, Statement]:
+    return {tokens[s.first + 1].value: s for s in stmts
+            if s.kind == "function" and tokens[s.first + 1].type == WORD}
+
+
+def check_pixel_loops(tokens: list[Token], stmts: list[Statement]) -> list[Finding]:
+    funcs = _user_functions(tokens, stmts)
+    pixel_funcs = {name for name, s in funcs.items() if _calls(tokens, s.first, s.last, PIXEL_FUNCS)}
+    findings = []
+    loops = [s for s in stmts if s.kind in LOOP_KINDS]
+    for loop in (s for s in loops if not s.loops):
+        direct = _calls(tokens, loop.first, loop.last, PIXEL_FUNCS)
+        via = _calls(tokens, loop.first, loop.last, frozenset(pixel_funcs))
+        if not direct and not via:
+            continue
+        depth = max(sum(1 for s in loops if s.function == loop.function and s.first <= k <= s.last)
+                    for k in direct + via)
+        bounded = any(tokens[k].type == WORD and tokens[k].value in BOUND_FUNCS
+                      for k in range(loop.first, loop.last + 1))
+        writes = any(tokens[k].value in WRITE_FUNCS for k in direct) or any(
+            _calls(tokens, funcs[tokens[k].value].first, funcs[tokens[k].value].last, WRITE_FUNCS) for k in via)
+        names = sorted({tokens[k].value for k in direct + via})
+        what = ", ".join(f"{n}()" for n in names)
+        severity = "error" if depth >= 2 or bounded else "warning"
+        if writes:
+            suggestion = ('express the per-pixel formula as run("Macro...", "code=[v = ...]") '
+                          '(add " stack" for all slices), or use Process>Math commands such as '
+                          'run("Multiply...", "value=2") / run("Add...", "value=10")')
+        else:
+            suggestion = ("read pixels in bulk: getStatistics()/getRawStatistics(), getHistogram(), "
+                          "List.setMeasurements, or getLine()/makeLine() + getProfile() for a row")
+        findings.append(Finding("IJM001", "pixel-loop", severity, tokens[loop.first].line,
+                                f"{what} inside {depth} nested loop(s) starting at line "
+                                f"{tokens[loop.first].line}; each call is an interpreter round-trip",
+                                suggestion))
+    return findings
+
+
+def check_batch_mode(tokens: list[Token], stmts: list[Statement]) -> list[Finding]:
+    image_calls = _calls(tokens, 0, len(tokens) - 2, IMAGE_FUNCS)
+    if not image_calls:
+        return []
+    batch_on = [k for k in _calls(tokens, 0, len(tokens) - 2, frozenset({"setBatchMode"}))
+                if any(t.value == "true" for t in _call_args(tokens, k))]
+    first = image_calls[0]
+    if batch_on and batch_on[0] < first:
+        return []
+    where = "before any setBatchMode(true)" if batch_on else "and setBatchMode(true) is never called"
+    return [Finding("IJM002", "no-batch-mode", "warning", tokens[first].line,
+                    f"{len(image_calls)} image command(s) run with display updates ({where})",
+                    'start with setBatchMode(true); and end with setBatchMode("exit and display"); '
+                    "(macro_lint.py --fix does this)")]
+
+
+def check_select_in_loop(tokens: list[Token], stmts: list[Statement]) -> list[Finding]:
+    findings, seen = [], set()
+    for s in stmts:
+        if s.kind != "simple" or not s.loops or s.loops[0] in seen:
+            continue
+        if tokens[s.first].type == WORD and tokens[s.first].value in SELECT_FUNCS:
+            seen.add(s.loops[0])
+            findings.append(Finding("IJM003", "select-in-loop", "warning", tokens[s.first].line,
+                                    f"{tokens[s.first].value}() inside a loop (line "
+                                    f"{tokens[s.loops[0]].line}) re-activates a window every iteration",
+                                    "hoist the selection out of the loop; remember getImageID() once and "
+                                    'work on slices with setSlice() or a single run(..., "... stack") call'))
+    return findings
+
+
+def check_slice_loops(tokens: list[Token], stmts: list[Statement]) -> list[Finding]:
+    findings = []
+    for loop in (s for s in stmts if s.kind in LOOP_KINDS):
+        if not _calls(tokens, loop.first, loop.last, frozenset({"setSlice"})):
+            continue
+        if any(s.kind in LOOP_KINDS and loop.first in s.loops and s.first != loop.first for s in stmts):
+            continue  # an inner loop is the pixel loop; IJM001 covers it
+        runs = [k for k in _calls(tokens, loop.first, loop.last, frozenset({"run"}))
+                if (args := _call_args(tokens, k)) and args[0].type == STRING
+                and not any(t.type == STRING and "stack" in t.value.split() for t in args[1:])]
+        if runs:
+            cmds = sorted({_call_args(tokens, k)[0].value for k in runs})
+            findings.append(Finding("IJM004", "slice-loop", "warning", tokens[loop.first].line,
+                                    f"setSlice() loop runs {', '.join(cmds)} once per slice",
+                                    'drop the loop and pass " stack" in the options, e.g. '
+                                    f'run("{cmds[0]}", "... stack"); ImageJ then processes all slices '
+                                    "in one (possibly worker-parallel) call"))
+    return findings
+
+
+RULES = (check_pixel_loops, check_batch_mode, check_select_in_loop, check_slice_loops)
+
+
+def lint(src: str, path: str = "") -> list[Finding]:
+    tokens = tokenize(src)
+    stmts = list(iter_statements(tokens))
+    findings = [f for rule in RULES for f in rule(tokens, stmts)]
+    for f in findings:
+        f.path = path
+    return sorted(findings, key=lambda f: (f.line, f.rule))
+
+
+def fix_batch_mode(src: str) -> str:
+    """Wrap the macro in batch mode, keeping existing line numbers.
+
+    The closing call goes on its own line after a bare `;`, so a trailing
+    `//` comment or a final statement without a semicolon cannot swallow it.
+    """
+    if not any(f.rule == "IJM002" for f in lint(src)):
+        return src
+    return 'setBatchMode(true); ' + src.rstrip("\n") + '\n;setBatchMode("exit and display");\n'
+
+
+def _self_test() -> bool:
+    """Run every rule on a pathological macro and a clean rewrite of it."""
+    bad = ("// invert by hand\n"
+           "open(\"/data/blobs.gif\");\n"
+           "w = getWidth(); h = getHeight();\n"
+           "for (y = 0; y < h; y++)\n"
+           "    for (x = 0; x < w; x++) {\n"
+           "        v = getPixel(x, y);\n"
+           "        setPixel(x, y, 255 - v);\n"
+           "    }\n"
+           "for (s = 1; s <= nSlices; s++) {\n"
+           "    selectWindow(\"blobs.gif\");\n"
+           "    setSlice(s);\n"
+           "    run(\"Gaussian Blur...\", \"sigma=2\");\n"
+           "}\n"
+           "function mean(x0) { t = 0; for (i = 0; i < 4; i++) t += getPixel(x0 + i, 0); return t / 4; }\n"
+           "for (k = 0; k < 10; k++) m = mean(k);\n")
+    found = [(f.rule, f.severity, f.line) for f in lint(bad)]
+    want = [("IJM002", "warning", 2), ("IJM001", "error", 4), ("IJM004", "warning", 9), ("IJM003", "warning", 10), ("IJM001", "warning", 15)]
+    # The function's own loop is also a pixel loop (root-level inside the function).
+    if sorted(found) != sorted(want + [("IJM001", "warning", 14)]):
+        print(f"self-test FAIL: findings {found}")
+        return False
+    write = next(f for f in lint(bad) if f.rule == "IJM001" and f.line == 4)
+    if 'run("Macro..."' not in write.suggestion:
+        print(f"self-test FAIL: write suggestion {write.suggestion}")
+        return False
+    good = ('setBatchMode(true);\nopen("/data/blobs.gif");\nrun("Invert", "stack");\n'
+            'run("Gaussian Blur...", "sigma=2 stack");\nsetBatchMode("exit and display");\n')
+    if lint(good):
+        print(f"self-test FAIL: clean macro flagged {lint(good)}")
+        return False
+    for case in (bad, 'open("/data/blobs.gif");\nrun("Invert")  // done',
+                 'open("/data/blobs.gif");\nrun("Invert")\n'):
+        fixed = fix_batch_mode(case)
+        tokens = tokenize(fixed)
+        close = _calls(tokens, 0, len(tokens) - 2, frozenset({"setBatchMode"}))
+        if (fixed.splitlines()[1:len(case.splitlines())] != case.splitlines()[1:]
+                or any(f.rule == "IJM002" for f in lint(fixed)) or len(close) != 2
+                or not tokens[close[1] - 1].is_(OP, ";") or _call_args(tokens, close[1])[0].type != STRING):
+            print(f"self-test FAIL: --fix on {case!r} gave {fixed!r}")
+            return False
+    print("macro_lint self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("macros", nargs="*", help="Macro files ('-' for stdin)")
+    parser.add_argument("--fail-on", choices=SEVERITIES, default="error")
+    parser.add_argument("--fix", action="store_true", help="Apply the batch-mode rewrite")
+    parser.add_argument("-o", "--output", help="Write the fixed macro here (default: stdout); needs one input")
+    parser.add_argument("--json", dest="emit_json", action="store_true")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.macros:
+        parser.error("at least one macro file is required")
+    if args.fix and len(args.macros) != 1:
+        parser.error("--fix takes exactly one macro")
+
+    findings: list[Finding] = []
+    try:
+        for path in args.macros:
+            src = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+            if args.fix:
+                fixed = fix_batch_mode(src)
+                if args.output:
+                    Path(args.output).write_text(fixed, encoding="utf-8")
+                else:
+                    sys.stdout.write(fixed)
+                src = fixed
+            findings += lint(src, path)
+    except (OSError, MacroSyntaxError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    out = sys.stderr if args.fix and not args.output else sys.stdout
+    if args.emit_json:
+        print(json.dumps([asdict(f) for f in findings], indent=2), file=out)
+    else:
+        for f in findings:
+            print(f.render(), file=out)
+        print(f"{len(findings)} finding(s) in {len(args.macros)} macro(s)", file=out)
+    threshold = SEVERITIES.index(args.fail_on)
+    return 1 if any(SEVERITIES.index(f.severity) >= threshold for f in findings) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Per-command profiler for ImageJ macros running under CheerpJ.
+
+bench.ijm and morpholibj-bench.ijm time their phases by hand with
+`t0 = getTime(); ... print(...)`. This tool does that for any macro. It
+has two parts:
+
+instrument
+    Tokenizes the macro with tools/ijm_tokenizer.py. Every `run("...")`
+    statement and every for / while / do loop is wrapped in a probe:
+
+        { ijprofT3 = getTime(); run("Median...", "radius=2"); ijprofAdd(3, ijprofT3); }
+
+    Per-probe totals accumulate in `var` arrays declared on line 1, so a
+    loop of a million iterations still prints one line. Probe wrappers
+    and declarations never add newlines, so interpreter errors keep their
+    original line numbers. The dump runs at the end of the top-level code
+    and before every `exit`:
+
+        [ijprof] total_ms=5230
+        [ijprof] id=0 parent=- kind=for line=12 calls=1 ms=4980 name=for
+        [ijprof] id=1 parent=0 kind=run line=14 calls=8 ms=4710 name=Gaussian Blur...
+
+report
+    Parses those lines from logs into a flame-style table: call tree,
+    calls, total, self, % of run and ms/call. The logs can be plain text,
+    a saved getLogs() response ({"logs": ...}) or a runMacro(returnLog)
+    response ({"log": ...}). Pass many logs with --by-command to rank
+    commands across a macro corpus. Use --folded to write
+    flamegraph.pl / speedscope stacks.
+
+Nesting is static: a probe inside a user function is a root. The caller's
+loop still includes its time, so that loop's self time is an upper bound.
+Macro sets (`macro "name" { }` blocks) are probed, but their dump runs
+only on `exit`.
+
+Usage
+-----
+    python3 tools/macro_profile.py --self-test
+    python3 tools/macro_profile.py instrument threadhack/macros/bench.ijm -o /tmp/bench.prof.ijm
+    python3 tools/macro_profile.py report run1.log getlogs.json [--by-command] [--folded] [--json]
+
+Exit status: 0 on success, 1 on syntax errors or unreadable input.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from ijm_tokenizer import (LOOP_KINDS, OP, STRING, WORD, MacroSyntaxError, Token, iter_statements,  # noqa: E402
+                           tokenize)
+
+PREFIX = "ijprof"
+LOG_TAG = f"[{PREFIX}]"
+PROBE_RE = re.compile(r"^\[ijprof\] id=(\d+) parent=(\S+) kind=(\w+) line=(\d+) calls=(\d+) "
+                      r"ms=(-?\d+(?:\.\d+)?) name=(.*)$")
+TOTAL_RE = re.compile(r"^\[ijprof\] total_ms=(-?\d+(?:\.\d+)?)$")
+
+
+@dataclass
+class Probe:
+    id: int
+    kind: str
+    name: str
+    line: int
+    first: int
+    last: int
+    parent: int | None
+
+
+def find_probes(tokens: list[Token]) -> tuple[list[Probe], list[tuple[int, int]]]:
+    """Probe every run() statement and loop; also return exit statement spans."""
+    probes: list[Probe] = []
+    exits: list[tuple[int, int]] = []
+    probe_of: dict[int, int] = {}  # loop first-token index -> probe id
+
+    for s in iter_statements(tokens):
+        t = tokens[s.first]
+        parent = probe_of.get(s.loops[-1]) if s.loops else None
+        if s.kind in LOOP_KINDS:
+            name = s.kind
+        elif s.kind == "simple" and t.is_(WORD, "run") and tokens[s.first + 1].is_(OP, "("):
+            arg = tokens[s.first + 2]
+            name = arg.value if arg.type == STRING else "<dynamic>"
+        else:
+            if s.kind == "simple" and t.is_(WORD, "exit"):
+                exits.append((s.first, s.last))
+            continue
+        probes.append(Probe(len(probes), "run" if s.kind == "simple" else s.kind, name, t.line,
+                            s.first, s.last, parent))
+        if s.kind in LOOP_KINDS:
+            probe_of[s.first] = probes[-1].id
+    return probes, exits
+
+
+def _macro_string(s: str) -> str:
+    return s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def instrument(src: str) -> tuple[str, list[Probe]]:
+    """Return (instrumented macro, probes). Original lines keep their numbers."""
+    tokens = tokenize(src)
+    probes, exits = find_probes(tokens)
+    inserts: list[tuple[int, int, str]] = []  # (offset, order, text)
+    for p in probes:
+        first, last = tokens[p.first], tokens[p.last]
+        close = "" if last.is_(OP, ";") or last.is_(OP, "}") else ";"
+        inserts.append((first.start, 1, f"{{ {PREFIX}T{p.id} = getTime(); "))
+        inserts.append((last.end, 0, f"{close} {PREFIX}Add({p.id}, {PREFIX}T{p.id}); }}"))
+    for first, last in exits:
+        close = "" if tokens[last].is_(OP, ";") else ";"
+        inserts.append((tokens[first].start, 2, f"{{ {PREFIX}Dump(); "))
+        inserts.append((tokens[last].end, 0, f"{close} }}"))
+    out = src
+    # Right to left; at equal offsets closers (order 0) land before openers.
+    for offset, _, text in sorted(inserts, key=lambda x: (x[0], -x[1]), reverse=True):
+        out = out[:offset] + text + out[offset:]
+    n = max(1, len(probes))
+    header = (f"var {PREFIX}Ms = newArray({n}); var {PREFIX}N = newArray({n}); "
+              f"var {PREFIX}Start = getTime(); ")
+    dump = [f'    print("{LOG_TAG} total_ms=" + (getTime() - {PREFIX}Start));']
+    for p in probes:
+        parent = "-" if p.parent is None else p.parent
+        dump.append(f'    print("{LOG_TAG} id={p.id} parent={parent} kind={p.kind} line={p.line} calls=" + '
+                    f'{PREFIX}N[{p.id}] + " ms=" + {PREFIX}Ms[{p.id}] + " name={_macro_string(p.name)}");')
+    footer = "\n".join([
+        "",
+        f"{PREFIX}Dump();",
+        f"function {PREFIX}Add(id, t0) {{",
+        f"    {PREFIX}Ms[id] = {PREFIX}Ms[id] + getTime() - t0;",
+        f"    {PREFIX}N[id] = {PREFIX}N[id] + 1;",
+        "}",
+        f"function {PREFIX}Dump() {{",
+        *dump,
+        "}",
+        "",
+    ])
+    return header + out.rstrip("\n") + "\n" + footer, probes
+
+
+@dataclass
+class ProfileNode:
+    id: int
+    parent: int | None
+    kind: str
+    line: int
+    name: str
+    calls: int = 0
+    total_ms: float = 0.0
+    children: list[int] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        return f"run(\"{self.name}\")" if self.kind == "run" else f"{self.kind} loop @{self.line}"
+
+
+@dataclass
+class Profile:
+    source: str
+    runs: int = 0
+    total_ms: float = 0.0
+    nodes: dict[int, ProfileNode] = field(default_factory=dict)
+
+    def self_ms(self, node: ProfileNode) -> float:
+        return max(0.0, node.total_ms - sum(self.nodes[c].total_ms for c in node.children))
+
+    def roots(self) -> list[ProfileNode]:
+        return sorted((n for n in self.nodes.values() if n.parent is None or n.parent not in self.nodes),
+                      key=lambda n: n.line)
+
+
+def log_text(raw: str) -> str:
+    """Unwrap a getLogs / runMacro(returnLog) JSON response if given one."""
+    stripped = raw.lstrip()
+    if stripped.startswith("{"):
+        try:
+            obj = json.loads(stripped)
+        except json.JSONDecodeError:
+            return raw
+        if isinstance(obj, dict):
+            return str(obj.get("logs", obj.get("log", "")))
+    return raw
+
+
+def parse_profile(text: str, source: str = "") -> Profile:
+    """Sum every dump found in *text* into one profile."""
+    prof = Profile(source)
+    for line in log_text(text).splitlines():
+        line = line.strip()
+        if m := TOTAL_RE.match(line):
+            prof.runs += 1
+            prof.total_ms += float(m[1])
+        elif m := PROBE_RE.match(line):
+            pid = int(m[1])
+            node = prof.nodes.get(pid)
+            if node is None:
+                node = prof.nodes[pid] = ProfileNode(pid, None if m[2] == "-" else int(m[2]), m[3],
+                                                     int(m[4]), m[7])
+            node.calls += int(m[5])
+            node.total_ms += float(m[6])
+    for node in prof.nodes.values():
+        if node.parent is not None and node.parent in prof.nodes:
+            prof.nodes[node.parent].children.append(node.id)
+    return prof
+
+
+def flame_rows(prof: Profile) -> list[dict]:
+    rows = []
+
+    def visit(node: ProfileNode, depth: int) -> None:
+        if node.calls == 0:
+            return
+        rows.append({"depth": depth, "id": node.id, "label": node.label, "line": node.line, "calls": node.calls,
+                     "total_ms": node.total_ms, "self_ms": prof.self_ms(node),
+                     "pct": 100 * node.total_ms / prof.total_ms if prof.total_ms else 0.0,
+                     "ms_per_call": node.total_ms / node.calls})
+        for c in sorted(node.children, key=lambda c: prof.nodes[c].line):
+            visit(prof.nodes[c], depth + 1)
+
+    for root in prof.roots():
+        visit(root, 0)
+    return rows
+
+
+def render_flame(prof: Profile) -> str:
+    lines = [f"== {prof.source or 'log'}: {prof.runs} run(s), total {prof.total_ms:.0f} ms ==",
+             f"{'probe':<48} {'line':>5} {'calls':>7} {'total ms':>10} {'self ms':>9} {'%':>6} {'ms/call':>9}"]
+    covered = 0.0
+    for r in flame_rows(prof):
+        if r["depth"] == 0:
+            covered += r["total_ms"]
+        label = ("  " * r["depth"] + r["label"])[:48]
+        lines.append(f"{label:<48} {r['line']:>5} {r['calls']:>7} {r['total_ms']:>10.0f} {r['self_ms']:>9.0f} "
+                     f"{r['pct']:>5.1f}% {r['ms_per_call']:>9.1f}")
+    other = prof.total_ms - covered
+    if prof.total_ms:
+        lines.append(f"{'(outside probes)':<48} {'':>5} {'':>7} {other:>10.0f} {other:>9.0f} "
+                     f"{100 * other / prof.total_ms:>5.1f}%")
+    return "\n".join(lines)
+
+
+def folded(prof: Profile) -> list[str]:
+    """Brendan Gregg folded stacks, weighted by self milliseconds."""
+    out = []
+
+    def visit(node: ProfileNode, stack: list[str]) -> None:
+        if node.calls == 0:
+            return
+        stack = stack + [node.label.replace(";", ",")]
+        if (s := prof.self_ms(node)) > 0:
+            out.append(f"{';'.join(stack)} {round(s)}")
+        for c in node.children:
+            visit(prof.nodes[c], stack)
+
+    for root in prof.roots():
+        visit(root, [])
+    return out
+
+
+def by_command(profiles: list[Profile]) -> list[dict]:
+    agg: dict[str, dict] = {}
+    grand = sum(p.total_ms for p in profiles)
+    for prof in profiles:
+        for node in prof.nodes.values():
+            if node.kind != "run" or node.calls == 0:
+                continue
+            a = agg.setdefault(node.name, {"command": node.name, "macros": 0, "calls": 0, "total_ms": 0.0})
+            a["macros"] += 1
+            a["calls"] += node.calls
+            a["total_ms"] += node.total_ms
+    rows = sorted(agg.values(), key=lambda a: -a["total_ms"])
+    for a in rows:
+        a["ms_per_call"] = a["total_ms"] / a["calls"]
+        a["pct"] = 100 * a["total_ms"] / grand if grand else 0.0
+    return rows
+
+
+def _self_test() -> bool:
+    """Instrument a macro covering every statement form, then parse a dump."""
+    src = ('// demo\nsetBatchMode(true);\nnewImage("t", "8-bit noise", 64, 64, 4);\n'
+           'for (i = 0; i < 3; i++) {\n    run("Gaussian Blur...", "sigma=2 stack");\n'
+           '    if (i == 1) run("Invert", "stack"); else run("Smooth", "stack");\n}\n'
+           'n = 0;\nwhile (n < 2) n++;\ndo { run("Add...", "value=1 stack"); } while (n-- > 0);\n'
+           'function f(x) { run("Median...", "radius=1"); return x; }\n'
+           'if (nImages == 0) exit("none");\nrun(cmd)\n')
+    out, probes = instrument(src)
+    kinds = [(p.kind, p.name, p.parent) for p in probes]
+    want = [("for", "for", None), ("run", "Gaussian Blur...", 0), ("run", "Invert", 0), ("run", "Smooth", 0),
+            ("while", "while", None), ("do", "do", None), ("run", "Add...", 5), ("run", "Median...", None),
+            ("run", "<dynamic>", None)]
+    if kinds != want:
+        print(f"self-test FAIL: probes {kinds}")
+        return False
+    orig_lines, new_lines = src.splitlines(), out.splitlines()
+    for n, line in enumerate(orig_lines):
+        stripped = [t.value for t in tokenize(line)]
+        got = [t.value for t in tokenize(new_lines[n])]
+        if not all(v in got for v in stripped):
+            print(f"self-test FAIL: line {n + 1} moved: {new_lines[n]!r}")
+            return False
+    if "else { ijprofT3 = getTime(); run(\"Smooth\"" not in out or '{ ijprofDump(); exit("none"); }' not in out \
+            or 'run(cmd); ijprofAdd(8, ijprofT8); }' not in out:
+        print("self-test FAIL: probe wrapping")
+        return False
+    toks = tokenize(out)
+    depth = sum(1 if t.is_(OP, "{") else -1 if t.is_(OP, "}") else 0 for t in toks)
+    if depth != 0:
+        print("self-test FAIL: unbalanced braces after instrumentation")
+        return False
+
+    log = "\n".join([
+        "🌐 Remote API Call: runMacro()",
+        "[ijprof] total_ms=1000",
+        "[ijprof] id=0 parent=- kind=for line=4 calls=1 ms=900 name=for",
+        "[ijprof] id=1 parent=0 kind=run line=5 calls=3 ms=600 name=Gaussian Blur...",
+        "[ijprof] id=2 parent=0 kind=run line=6 calls=1 ms=100 name=Invert",
+        "[ijprof] id=3 parent=0 kind=run line=6 calls=0 ms=0 name=Smooth",
+    ])
+    prof = parse_profile(json.dumps({"log": log}), "demo")
+    rows = flame_rows(prof)
+    if [(r["depth"], r["label"], r["self_ms"]) for r in rows] != [
+            (0, "for loop @4", 200.0), (1, 'run("Gaussian Blur...")', 600.0), (1, 'run("Invert")', 100.0)]:
+        print(f"self-test FAIL: flame rows {rows}")
+        return False
+    if folded(prof)[1] != 'for loop @4;run("Gaussian Blur...") 600':
+        print(f"self-test FAIL: folded {folded(prof)}")
+        return False
+    cmds = by_command([prof, parse_profile(log.replace("ms=600", "ms=300"), "b")])
+    if (cmds[0]["command"], cmds[0]["calls"], cmds[0]["total_ms"]) != ("Gaussian Blur...", 6, 900.0):
+        print(f"self-test FAIL: by-command {cmds}")
+        return False
+    print("macro_profile self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    p_ins = sub.add_parser("instrument", help="Write a probed copy of a macro")
+    p_ins.add_argument("macro")
+    p_ins.add_argument("-o", "--output", help="Output file (default: stdout)")
+    p_rep = sub.add_parser("report", help="Flame-style table from profiled logs")
+    p_rep.add_argument("logs", nargs="+", help="Log text, getLogs JSON or runMacro(returnLog) JSON")
+    p_rep.add_argument("--by-command", action="store_true", help="Aggregate run() commands across all logs")
+    p_rep.add_argument("--folded", action="store_true", help="Emit folded stacks for flame graph tools")
+    p_rep.add_argument("--json", dest="emit_json", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.cmd:
+        parser.error("a command (instrument, report) is required")
+
+    try:
+        if args.cmd == "instrument":
+            out, probes = instrument(Path(args.macro).read_text(encoding="utf-8"))
+            if args.output:
+                Path(args.output).write_text(out, encoding="utf-8")
+                print(f"{len(probes)} probes -> {args.output}", file=sys.stderr)
+            else:
+                sys.stdout.write(out)
+            return 0
+        profiles = [parse_profile(Path(p).read_text(encoding="utf-8", errors="replace"), p) for p in args.logs]
+    except (OSError, MacroSyntaxError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    if args.by_command:
+        rows = by_command(profiles)
+        if args.emit_json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print(f"{'command':<36} {'macros':>6} {'calls':>7} {'total ms':>10} {'ms/call':>9} {'%':>6}")
+            for r in rows:
+                print(f"{r['command'][:36]:<36} {r['macros']:>6} {r['calls']:>7} {r['total_ms']:>10.0f} "
+                      f"{r['ms_per_call']:>9.1f} {r['pct']:>5.1f}%")
+        return 0
+    if args.folded:
+        for prof in profiles:
+            print("\n".join(folded(prof)))
+        return 0
+    if args.emit_json:
+        print(json.dumps([{"source": p.source, "runs": p.runs, "total_ms": p.total_ms, "rows": flame_rows(p)}
+                          for p in profiles], indent=2))
+        return 0
+    missing = [p.source for p in profiles if not p.runs]
+    print("\n\n".join(render_flame(p) for p in profiles if p.runs))
+    if missing:
+        print(f"no {LOG_TAG} dump in: {', '.join(missing)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Pull raw ImageJ.JS pixel arrays into NumPy through `getPixelData`.
+
+getPixelData (hypha-imagej-service.js) cuts an image's stack into byte
+chunks of at most maxChunkBytes, in C order over (stack index, y, x). Every
+chunk carries the same header: shape, dtype, hyperstack dims and
+calibration. fetch_pixels() reads chunk 0 and allocates one bytearray for
+the whole array. It then requests the remaining chunks pipelined through
+ImageJClient and copies each into place as it arrives, so at most
+max_in_flight chunks are held at once. The result is np.frombuffer over
+that bytearray, with no further copy. RGB images arrive as little-endian
+0x00RRGGBB words and become an (..., 3) view in R, G, B order.
+hyperstack() reshapes to (T, Z, C, Y, X) without copying.
+
+Usage
+-----
+    python3 tools/pixel_export.py --self-test
+    python3 tools/pixel_export.py export --service-id <workspace>/<id> [--title T] -o stack.npy
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from imagej_client import HyphaTransport, ImageJClient  # noqa: E402
+
+DTYPES = {"uint8": np.dtype("<u1"), "uint16": np.dtype("<u2"), "float32": np.dtype("<f4"),
+          "rgb24": np.dtype("<u4")}
+DEFAULT_CHUNK_BYTES = 8 << 20
+
+
+class PixelExportError(RuntimeError):
+    pass
+
+
+def to_array(buf: bytearray | memoryview, header: dict[str, Any]) -> np.ndarray:
+    """(stack, y, x) array over buf; RGB becomes a strided (stack, y, x, 3) view."""
+    arr = np.frombuffer(buf, DTYPES[header["dtype"]]).reshape(header["shape"])
+    if header["dtype"] == "rgb24":
+        arr = arr.view(np.uint8).reshape(*header["shape"], 4)[..., 2::-1]
+    return arr
+
+
+def hyperstack(arr: np.ndarray, header: dict[str, Any]) -> np.ndarray:
+    """Reshape a to_array() result to (T, Z, C, Y, X[, 3]); ImageJ stacks are C-fastest."""
+    d = header["dims"]
+    return arr.reshape(d["frames"], d["slices"], d["channels"], *arr.shape[1:])
+
+
+async def fetch_pixels(client: ImageJClient, window_title: str | None = None,
+                       max_chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> tuple[np.ndarray, dict[str, Any]]:
+    def checked(res: dict[str, Any], k: int) -> dict[str, Any]:
+        if not res.get("success"):
+            raise PixelExportError(f"chunk {k}: {res.get('error', 'export failed')}")
+        return res
+
+    first = checked(await client.getPixelData(windowTitle=window_title, chunk=0,
+                                              maxChunkBytes=max_chunk_bytes), 0)
+    header = first["header"]
+    buf = bytearray(header["totalBytes"])
+    view = memoryview(buf)
+
+    def place(res: dict[str, Any]) -> None:
+        h = res["header"]
+        if (h["imageId"], h["totalBytes"], h["dtype"]) != (header["imageId"], header["totalBytes"], header["dtype"]):
+            raise PixelExportError(f"image changed during export (chunk {res['chunk']})")
+        data = res["data"]
+        view[res["offset"]:res["offset"] + len(data)] = data
+
+    async def fetch(k: int) -> None:
+        place(checked(await client.getPixelData(windowTitle=window_title, chunk=k,
+                                                maxChunkBytes=max_chunk_bytes), k))
+
+    place(first)
+    # Pin to the same image even if another window becomes active meanwhile.
+    window_title = window_title or header["title"]
+    await asyncio.gather(*(fetch(k) for k in range(1, first["chunkCount"])))
+    return to_array(buf, header), header
+
+
+class StackTransport:
+    """In-process stand-in serving getPixelData from a NumPy stack, chunked like the service."""
+
+    def __init__(self, stack: np.ndarray, dtype: str, dims: tuple[int, int, int] | None = None,
+                 latency_s: float = 0.0):
+        self.stack = np.ascontiguousarray(stack)
+        self.dtype, self.latency_s = dtype, latency_s
+        c, z, t = dims or (1, self.stack.shape[0], 1)
+        self.dims = {"channels": c, "slices": z, "frames": t}
+        self.calls = 0
+
+    async def call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        if method != "getPixelData":
+            raise ValueError(f"StackTransport only serves getPixelData, not {method}")
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        raw = self.stack.tobytes()
+        bpp = DTYPES[self.dtype].itemsize
+        max_bytes = kwargs.get("maxChunkBytes", DEFAULT_CHUNK_BYTES)
+        chunk_bytes = max(bpp, max_bytes - max_bytes % bpp)
+        count = max(1, -(-len(raw) // chunk_bytes))
+        k = kwargs.get("chunk", 0)
+        if not 0 <= k < count:
+            return {"success": False, "error": f"chunk {k} out of range (chunkCount={count})"}
+        header = {"title": "stand-in", "imageId": -1, "shape": list(self.stack.shape[:3]), "dims": self.dims,
+                  "dtype": self.dtype, "bytesPerPixel": bpp, "byteOrder": "little", "totalBytes": len(raw),
+                  "calibration": {"unit": "micron", "pixelWidth": 0.5, "pixelHeight": 0.5, "pixelDepth": 1.0}}
+        off = k * chunk_bytes
+        return {"success": True, "header": header, "chunk": k, "chunkCount": count, "offset": off,
+                "data": raw[off:off + chunk_bytes]}
+
+
+async def _exercise() -> list[str]:
+    fails = []
+    rng = np.random.default_rng(1)
+    cases = {
+        "uint16": rng.integers(0, 65535, (6, 33, 47), dtype=np.uint16),
+        "float32": rng.standard_normal((2, 19, 23)).astype(np.float32),
+        "uint8": rng.integers(0, 255, (1, 5, 7), dtype=np.uint8),
+    }
+    for dtype, stack in cases.items():
+        transport = StackTransport(stack, dtype, dims=(2, 3, 1) if dtype == "uint16" else None)
+        client = ImageJClient(transport, max_in_flight=4)
+        arr, header = await fetch_pixels(client, max_chunk_bytes=1001)  # splits mid-slice and mid-row
+        if not np.array_equal(arr, stack) or arr.dtype != stack.dtype:
+            fails.append(f"{dtype}: round trip differs")
+        if arr.flags.owndata or not arr.flags.writeable:  # a view over the bytearray
+            fails.append(f"{dtype}: array does not wrap the receive buffer")
+        if transport.calls != -(-stack.nbytes // 1000):
+            fails.append(f"{dtype}: {transport.calls} calls")
+        if dtype == "uint16" and not np.array_equal(hyperstack(arr, header)[0, 1, 0], stack[2]):
+            fails.append("hyperstack index order")
+    rgb = rng.integers(0, 255, (2, 4, 6, 3), dtype=np.uint8)
+    packed = (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+    arr, _ = await fetch_pixels(ImageJClient(StackTransport(packed, "rgb24")), max_chunk_bytes=64)
+    if not np.array_equal(arr, rgb):
+        fails.append("rgb24 view")
+    slow = StackTransport(cases["uint16"], "uint16", latency_s=0.01)
+    t0 = time.perf_counter()
+    await fetch_pixels(ImageJClient(slow, max_in_flight=8), max_chunk_bytes=4096)
+    if time.perf_counter() - t0 > slow.calls * slow.latency_s / 2:
+        fails.append(f"chunks were not pipelined ({slow.calls} chunks)")
+    return fails
+
+
+def _self_test() -> bool:
+    fails = asyncio.run(_exercise())
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("pixel_export self-test: PASS")
+    return True
+
+
+async def _export(args: argparse.Namespace) -> int:
+    client = ImageJClient(await HyphaTransport.connect(args.service_id, args.server_url),
+                          max_in_flight=args.max_in_flight)
+    t0 = time.perf_counter()
+    arr, header = await fetch_pixels(client, args.title, args.chunk_mb << 20)
+    dt = time.perf_counter() - t0
+    np.save(args.output, arr)
+    Path(args.output).with_suffix(".json").write_text(json.dumps(header, indent=2) + "\n", encoding="utf-8")
+    print(f"{header['title']}: {arr.shape} {arr.dtype}, {header['totalBytes'] / 1e6:.1f} MB in {dt:.1f} s "
+          f"({header['totalBytes'] / 1e6 / dt:.1f} MB/s) -> {args.output}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    e = sub.add_parser("export", help="Save an open image as .npy plus a .json header")
+    e.add_argument("--service-id", required=True)
+    e.add_argument("--server-url", default="https://hypha.aicell.io")
+    e.add_argument("--title", help="Image title (default: the active image)")
+    e.add_argument("--chunk-mb", type=int, default=8)
+    e.add_argument("--max-in-flight", type=int, default=4)
+    e.add_argument("-o", "--output", required=True)
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if args.cmd == "export":
+        try:
+            return asyncio.run(_export(args))
+        except (RuntimeError, OSError) as ex:
+            print(f"ERROR: {ex}", file=sys.stderr)
+            return 1
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
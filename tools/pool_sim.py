@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""Discrete-event model of the threadhack worker pool.
+
+Predicts the wall time of N Serializable tasks shipped through
+WorkerBackedExecutorService / WorkerBackedForkJoinPool (and the
+Thread.start hook, which uses the same ThreadHook.nativeDispatch path) for a
+given pool size, device and scheduling policy. It lets us choose pool sizes
+per device class without running puppeteer sweeps.
+
+Model
+-----
+- **Boot.** Workers boot one after another (FINDINGS §3b.1). The first
+  takes --boot-first-ms and each later one --boot-next-ms (§11: 1000 ms,
+  then ~610 ms). A one-shot run waits for the whole pool
+  (`spawnPool` awaits every worker) before it dispatches anything.
+- **Main thread.** The main thread is a serial resource. Each message
+  costs --dispatch-ms plus writeObject of its payload at --ser-ns-per-byte.
+  Each result costs readObject of the bytes shipped back. WorkerRunner
+  serializes the whole mutated Runnable, so a PFRSliceTask returns
+  pixelsIn as well as pixelsOut.
+- **Workers.** Each worker runs its messages FIFO, one at a time
+  (library mode is not re-entrant, §3b.2). A task costs --task-ms.
+  The first task on a worker adds the cold-JIT penalty
+  (--cold-task-ms minus --task-ms, §3a: 1961 vs 905 ms) unless the pool
+  was pre-warmed.
+- **Cores.** Running workers share the device's cores (processor sharing
+  over the fastest free cores, with E-cores at reduced speed, §12). On
+  top of that, memory contention slows each worker by
+  1 + contention * min(running - 1, contention_cap). This reproduces the
+  §12 after-warmup curve.
+
+Policies (combine with '+', e.g. `eager+stealing+batch`)
+  baseline   round-robin push, as in runtime/loader.js `nextWorker++ % pool`
+  eager      pool booted and warmed at page load; boot and JIT excluded
+  stealing   main keeps a shared queue; an idle worker pulls the next message
+  batch      ceil(tasks / pool) tasks per message (or --batch N)
+
+Usage
+-----
+    python3 tools/pool_sim.py --self-test
+    python3 tools/pool_sim.py findings              # model vs FINDINGS.md
+    python3 tools/pool_sim.py simulate --pool 6 --tasks 10 --task-ms 1675 \
+        --policies baseline,eager,eager+stealing --device m2-pro
+    python3 tools/pool_sim.py recommend --tasks 8 --payload-bytes 8388608
+
+Exit status: 0 on success, 1 on invalid parameters or self-test failure.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import random
+import sys
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+
+
+@dataclass(frozen=True)
+class Device:
+    name: str
+    p_cores: int
+    e_cores: int = 0
+    e_speed: float = 0.5
+
+    @property
+    def hardware_concurrency(self) -> int:
+        return self.p_cores + self.e_cores
+
+    def speeds(self) -> list[float]:
+        return [1.0] * self.p_cores + [self.e_speed] * self.e_cores
+
+
+# hardwareConcurrency alone over-allocates on heterogeneous parts (§12).
+DEVICES = {
+    "m2-pro": Device("m2-pro", 6, 4, 0.5),
+    "laptop-4c": Device("laptop-4c", 4),
+    "desktop-16c": Device("desktop-16c", 16),
+    "phone-8c": Device("phone-8c", 2, 6, 0.4),
+    "chromebook-2c": Device("chromebook-2c", 2),
+}
+
+
+@dataclass(frozen=True)
+class CostModel:
+    boot_first_ms: float = 1000.0
+    boot_next_ms: float = 610.0
+    dispatch_ms: float = 2.0
+    transfer_ms: float = 0.5
+    worker_msg_ms: float = 1.0
+    ser_ns_per_byte: float = 10.0
+    contention: float = 0.1
+    contention_cap: int = 4
+
+    def ser_ms(self, nbytes: int) -> float:
+        return nbytes * self.ser_ns_per_byte / 1e6
+
+
+@dataclass(frozen=True)
+class Workload:
+    tasks: int
+    task_ms: float = 905.0
+    cold_task_ms: float = 1961.0
+    payload_bytes: int = 106
+    result_bytes: int = 129
+    task_cv: float = 0.0
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str = "baseline"
+    stealing: bool = False
+    prewarm: bool = False
+    batch: int = 1  # 0 = ceil(tasks / pool)
+
+
+POLICY_FLAGS = {
+    "baseline": {},
+    "eager": {"prewarm": True},
+    "stealing": {"stealing": True},
+    "batch": {"batch": 0},
+}
+
+
+def resolve_policy(spec: str, batch: int | None = None) -> Policy:
+    kwargs: dict = {}
+    for part in spec.split("+"):
+        if part not in POLICY_FLAGS:
+            raise ValueError(f"unknown policy {part!r} (choose from {', '.join(POLICY_FLAGS)})")
+        kwargs.update(POLICY_FLAGS[part])
+    if batch is not None and "batch" in kwargs:
+        kwargs["batch"] = batch
+    return Policy(spec, **kwargs)
+
+
+@dataclass
+class SimResult:
+    pool: int
+    policy: str
+    wall_ms: float
+    setup_ms: float
+    messages: int
+    bytes_shipped: int
+    main_busy_ms: float
+    worker_busy_ms: list[float] = field(default_factory=list)
+
+    @property
+    def utilization(self) -> float:
+        if not self.worker_busy_ms or self.wall_ms <= 0:
+            return 0.0
+        return sum(self.worker_busy_ms) / (len(self.worker_busy_ms) * self.wall_ms)
+
+
+def boot_ms(pool: int, cost: CostModel) -> float:
+    return cost.boot_first_ms + max(0, pool - 1) * cost.boot_next_ms if pool else 0.0
+
+
+def rate_per_worker(running: int, device: Device, cost: CostModel) -> float:
+    """Speed of each running worker relative to one idle P-core."""
+    speeds = device.speeds()
+    capacity = sum(speeds[:running])
+    slowdown = 1 + cost.contention * min(running - 1, cost.contention_cap)
+    return capacity / running / slowdown
+
+
+def task_costs(workload: Workload, seed: int = 0) -> list[float]:
+    if workload.task_cv <= 0:
+        return [workload.task_ms] * workload.tasks
+    # Log-normal with mean task_ms and the requested coefficient of variation.
+    sigma = math.sqrt(math.log1p(workload.task_cv ** 2))
+    mu = math.log(workload.task_ms) - sigma * sigma / 2
+    rng = random.Random(seed)
+    return [rng.lognormvariate(mu, sigma) for _ in range(workload.tasks)]
+
+
+@dataclass
+class _Worker:
+    queue: deque = field(default_factory=deque)
+    remaining: float | None = None
+    current: tuple | None = None
+    warm: bool = False
+    busy_ms: float = 0.0
+
+
+def simulate(workload: Workload, pool: int, device: Device, cost: CostModel = CostModel(),
+             policy: Policy = Policy(), include_boot: bool = True, seed: int = 0) -> SimResult:
+    """Run the event loop and return the predicted timings.
+
+    Wall time starts when the app asks for the work. For a cold one-shot run
+    it therefore includes pool boot when *include_boot* is set. Eager
+    warmup moves boot and the JIT pass into `setup_ms`, which is paid once
+    per page.
+    """
+    if pool < 1 or workload.tasks < 1:
+        raise ValueError("pool and tasks must be >= 1")
+    costs = task_costs(workload, seed)
+    size = policy.batch or math.ceil(workload.tasks / pool)
+    batches = [costs[i:i + size] for i in range(0, len(costs), size)]
+    cold_extra = max(0.0, workload.cold_task_ms - workload.task_ms)
+
+    workers = [_Worker(warm=policy.prewarm) for _ in range(pool)]
+    start = boot_ms(pool, cost) if include_boot and not policy.prewarm else 0.0
+    setup = boot_ms(pool, cost) + cold_extra if policy.prewarm else 0.0
+    events: list = []  # (time, seq, kind, worker, batch index)
+    seq = 0
+    main_free = start
+    main_busy = 0.0
+    shipped = 0
+    finished_at = start
+    next_batch = 0
+
+    def send(w: int) -> None:
+        nonlocal main_free, main_busy, shipped, seq, next_batch
+        b = next_batch
+        next_batch += 1
+        out_bytes = workload.payload_bytes * len(batches[b])
+        c = cost.dispatch_ms + cost.ser_ms(out_bytes)
+        main_free += c
+        main_busy += c
+        shipped += out_bytes
+        heapq.heappush(events, (main_free + cost.transfer_ms, seq, "arrive", w, b))
+        seq += 1
+
+    if policy.stealing:
+        for w in range(min(pool, len(batches))):
+            send(w)
+    else:
+        for b in range(len(batches)):
+            send(b % pool)
+
+    def begin(w: _Worker) -> None:
+        if w.current is None and w.queue:
+            b = w.queue.popleft()
+            n = len(batches[b])
+            work = cost.worker_msg_ms + sum(batches[b])
+            work += cost.ser_ms(n * (workload.payload_bytes + workload.result_bytes))
+            if not w.warm:
+                work += cold_extra
+                w.warm = True
+            w.current, w.remaining = (b,), work
+
+    t = start
+    while True:
+        running = [w for w in workers if w.current is not None]
+        rate = rate_per_worker(len(running), device, cost) if running else 0.0
+        t_done = min((t + w.remaining / rate for w in running), default=math.inf)
+        t_evt = events[0][0] if events else math.inf
+        nt = min(t_done, t_evt)
+        if nt == math.inf:
+            break
+        for w in running:
+            w.remaining -= rate * (nt - t)
+            w.busy_ms += nt - t
+        t = nt
+        for i, w in enumerate(workers):
+            if w.current is not None and w.remaining <= 1e-9:
+                heapq.heappush(events, (t + cost.transfer_ms, seq, "result", i, w.current[0]))
+                seq += 1
+                w.current = w.remaining = None
+                begin(w)
+        while events and events[0][0] <= t:
+            _, _, kind, wi, b = heapq.heappop(events)
+            if kind == "arrive":
+                workers[wi].queue.append(b)
+                begin(workers[wi])
+                continue
+            back = workload.result_bytes * len(batches[b])
+            main_free = max(main_free, t) + cost.ser_ms(back)
+            main_busy += cost.ser_ms(back)
+            shipped += back
+            finished_at = max(finished_at, main_free)
+            if policy.stealing and next_batch < len(batches):
+                send(wi)
+
+    return SimResult(pool, policy.name, finished_at, setup, len(batches), shipped, main_busy,
+                     [w.busy_ms for w in workers])
+
+
+def recommend(workload: Workload, device: Device, cost: CostModel, policy: Policy,
+              include_boot: bool = True, tolerance: float = 0.05) -> tuple[int, list[SimResult]]:
+    """Smallest pool whose wall time is within *tolerance* of the best."""
+    results = [simulate(workload, p, device, cost, policy, include_boot)
+               for p in range(1, device.hardware_concurrency + 1)]
+    best = min(r.wall_ms for r in results)
+    pick = next(r.pool for r in results if r.wall_ms <= best * (1 + tolerance))
+    return pick, results
+
+
+# Measurements quoted in FINDINGS.md, used by `findings` and the self-test.
+GAUSS_3A = Workload(8, task_ms=905, cold_task_ms=1961)
+SUMJOB_12 = Workload(10, task_ms=1675, cold_task_ms=1675 + 2500)
+FINDINGS_ROWS = [
+    ("§3a 1 worker serial, 8 tasks", GAUSS_3A, 1, "baseline", False, 7322),
+    ("§3a 4-worker pool, 8 tasks", GAUSS_3A, 4, "baseline", False, 3357),
+    ("§12 after warmup, pool=1", SUMJOB_12, 1, "eager", False, 16750),
+    ("§12 after warmup, pool=2", SUMJOB_12, 2, "eager", False, 8439),
+    ("§12 after warmup, pool=4", SUMJOB_12, 4, "eager", False, 6494),
+    ("§12 after warmup, pool=6", SUMJOB_12, 6, "eager", False, 4869),
+    ("§12 after warmup, pool=10", SUMJOB_12, 10, "eager", False, 2722),
+]
+FINDINGS_BOOT = [(2, 1575), (4, 2812), (8, 5333), (10, 6443)]
+
+
+def findings_table(device: Device, cost: CostModel) -> list[dict]:
+    rows = []
+    for label, wl, pool, pol, boot, measured in FINDINGS_ROWS:
+        model = simulate(wl, pool, device, cost, resolve_policy(pol), boot).wall_ms
+        rows.append({"row": label, "measured_ms": measured, "model_ms": round(model),
+                     "error": (model - measured) / measured})
+    for pool, measured in FINDINGS_BOOT:
+        model = boot_ms(pool, cost)
+        rows.append({"row": f"§11 boot, {pool} workers", "measured_ms": measured,
+                     "model_ms": round(model), "error": (model - measured) / measured})
+    return rows
+
+
+def render_results(results: list[SimResult], baseline: dict[str, float]) -> str:
+    lines = [f"{'policy':<24} {'pool':>4} {'wall ms':>9} {'speedup':>8} {'eff':>5} "
+             f"{'setup ms':>9} {'msgs':>5} {'MB':>8} {'main ms':>8} {'util':>5}"]
+    for r in results:
+        base = baseline.get(r.policy)
+        speedup = base / r.wall_ms if base else 0.0
+        lines.append(f"{r.policy:<24} {r.pool:>4} {r.wall_ms:>9.0f} {speedup:>7.2f}x "
+                     f"{100 * speedup / r.pool:>4.0f}% {r.setup_ms:>9.0f} {r.messages:>5} "
+                     f"{r.bytes_shipped / 1e6:>8.2f} {r.main_busy_ms:>8.0f} {100 * r.utilization:>4.0f}%")
+    return "\n".join(lines)
+
+
+def _self_test() -> bool:
+    """Check the model against FINDINGS.md and the expected policy orderings."""
+    dev, cost = DEVICES["m2-pro"], CostModel()
+    for row in findings_table(dev, cost):
+        if abs(row["error"]) > 0.20:
+            print(f"self-test FAIL: {row['row']} model {row['model_ms']} vs measured {row['measured_ms']}")
+            return False
+
+    def wall(wl, pool, spec, boot=True, d=dev, c=cost):
+        return simulate(wl, pool, d, c, resolve_policy(spec), boot).wall_ms
+
+    cold = wall(GAUSS_3A, 4, "baseline")
+    if not wall(GAUSS_3A, 4, "eager") < cold:
+        print("self-test FAIL: eager warmup did not beat a cold pool")
+        return False
+    # Uneven tasks: pulling from a shared queue beats fixed round-robin.
+    skewed = replace(SUMJOB_12, tasks=24, task_cv=0.8)
+    if not wall(skewed, 4, "eager+stealing") < wall(skewed, 4, "eager"):
+        print("self-test FAIL: work stealing did not help skewed tasks")
+        return False
+    # Many small tasks: one message per worker amortizes dispatch overhead.
+    tiny = Workload(400, task_ms=5, cold_task_ms=5, payload_bytes=1 << 16, result_bytes=1 << 17)
+    batched = simulate(tiny, 4, dev, cost, resolve_policy("eager+batch"), False)
+    single = simulate(tiny, 4, dev, cost, resolve_policy("eager"), False)
+    if batched.messages != 4 or not batched.wall_ms < single.wall_ms:
+        print(f"self-test FAIL: batching {batched.messages} msgs {batched.wall_ms:.0f} ms "
+              f"vs {single.wall_ms:.0f} ms")
+        return False
+    # §12: one-shot work should not use all 10 hardware threads on an M2 Pro.
+    pick, _ = recommend(SUMJOB_12, dev, cost, resolve_policy("baseline"))
+    if pick >= dev.hardware_concurrency:
+        print(f"self-test FAIL: one-shot recommendation {pick}")
+        return False
+    print("pool_sim self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+
+    def common(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--device", default="m2-pro", choices=sorted(DEVICES))
+        p.add_argument("--p-cores", type=int, help="Override the device's P-core count")
+        p.add_argument("--e-cores", type=int, help="Override the device's E-core count")
+        for f in CostModel.__dataclass_fields__.values():
+            p.add_argument("--" + f.name.replace("_", "-"), type=type(f.default), default=f.default)
+        p.add_argument("--json", dest="emit_json", action="store_true")
+
+    def workload_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--tasks", type=int, default=8)
+        p.add_argument("--task-ms", type=float, default=905.0, help="Warm per-task compute (§3a)")
+        p.add_argument("--cold-task-ms", type=float, default=1961.0, help="First task on a worker (§3a)")
+        p.add_argument("--payload-bytes", type=int, default=106, help="Serialized task size (§11)")
+        p.add_argument("--result-bytes", type=int, default=129, help="Serialized result size (§11)")
+        p.add_argument("--task-cv", type=float, default=0.0, help="Task-time coefficient of variation")
+        p.add_argument("--policies", default="baseline,eager,eager+stealing,eager+batch")
+        p.add_argument("--batch", type=int, help="Tasks per message for 'batch' (default ceil(tasks/pool))")
+        p.add_argument("--no-boot", action="store_true", help="Exclude pool boot from cold runs")
+
+    p_sim = sub.add_parser("simulate", help="Predict wall time for pool sizes and policies")
+    common(p_sim)
+    workload_args(p_sim)
+    p_sim.add_argument("--pool", type=int, action="append", help="Pool size (repeatable; default 1..hw)")
+    p_rec = sub.add_parser("recommend", help="Pick a pool size per device class")
+    common(p_rec)
+    workload_args(p_rec)
+    p_rec.add_argument("--devices", help="Comma-separated device classes (default: all; just --device "
+                       "when --p-cores/--e-cores are given)")
+    p_rec.add_argument("--tolerance", type=float, default=0.05)
+    p_find = sub.add_parser("findings", help="Compare the model with FINDINGS.md measurements")
+    common(p_find)
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.cmd:
+        parser.error("a command (simulate, recommend, findings) is required")
+
+    cost = CostModel(**{f: getattr(args, f) for f in CostModel.__dataclass_fields__})
+    custom = args.p_cores is not None or args.e_cores is not None
+
+    def with_cores(dev: Device) -> Device:
+        if not custom:
+            return dev
+        return replace(dev, name=f"{dev.name} (custom)",
+                       p_cores=args.p_cores if args.p_cores is not None else dev.p_cores,
+                       e_cores=args.e_cores if args.e_cores is not None else dev.e_cores)
+
+    device = with_cores(DEVICES[args.device])
+
+    if args.cmd == "findings":
+        rows = findings_table(device, cost)
+        if args.emit_json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print(f"{'row':<34} {'measured':>9} {'model':>9} {'error':>7}")
+            for r in rows:
+                print(f"{r['row']:<34} {r['measured_ms']:>9} {r['model_ms']:>9} {100 * r['error']:>+6.1f}%")
+        return 0
+
+    try:
+        workload = Workload(args.tasks, args.task_ms, args.cold_task_ms, args.payload_bytes,
+                            args.result_bytes, args.task_cv)
+        policies = [resolve_policy(s.strip(), args.batch) for s in args.policies.split(",") if s.strip()]
+        if args.cmd == "recommend":
+            out = []
+            names = args.devices.split(",") if args.devices else [args.device] if custom else list(DEVICES)
+            for name in names:
+                dev = DEVICES.get(name.strip())
+                if dev is None:
+                    raise ValueError(f"unknown device {name!r}")
+                dev = with_cores(dev)
+                for pol in policies:
+                    pick, results = recommend(workload, dev, cost, pol, not args.no_boot, args.tolerance)
+                    best = next(r for r in results if r.pool == pick)
+                    out.append({"device": dev.name, "hardwareConcurrency": dev.hardware_concurrency,
+                                "policy": pol.name, "pool": pick, "wall_ms": round(best.wall_ms),
+                                "serial_ms": round(results[0].wall_ms)})
+            if args.emit_json:
+                print(json.dumps(out, indent=2))
+            else:
+                print(f"{'device':<20} {'hw':>3} {'policy':<24} {'pool':>4} {'wall ms':>9} {'serial ms':>10}")
+                for o in out:
+                    print(f"{o['device']:<20} {o['hardwareConcurrency']:>3} {o['policy']:<24} {o['pool']:>4} "
+                          f"{o['wall_ms']:>9} {o['serial_ms']:>10}")
+            return 0
+
+        pools = args.pool or list(range(1, device.hardware_concurrency + 1))
+        results, baseline = [], {}
+        for pol in policies:
+            baseline[pol.name] = simulate(workload, 1, device, cost, pol, not args.no_boot).wall_ms
+            results += [simulate(workload, p, device, cost, pol, not args.no_boot) for p in pools]
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.emit_json:
+        print(json.dumps([asdict(r) | {"speedup": baseline[r.policy] / r.wall_ms} for r in results], indent=2))
+    else:
+        print(f"device={device.name} (P={device.p_cores} E={device.e_cores}) tasks={workload.tasks} "
+              f"task_ms={workload.task_ms:g} payload={workload.payload_bytes}B")
+        print(render_results(results, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
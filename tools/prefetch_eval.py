@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Tile prefetch-policy evaluator driven by recorded pan/zoom traces.
+
+Compares candidate prefetch policies for JSTileSource providers before
+any of them is written in JS. The same trace is replayed once per policy.
+Each policy decides which extra tiles to request after every viewport
+fetch, and the evaluator reports what that costs (wasted bytes) against
+what it buys (demand tiles already on hand when the view needed them).
+
+Viewport math comes from tools/tile_trace.py (LazyImagePlus level choice
+and fetch regions). Zoom prediction mirrors the `ImageWindow.mouseWheelMoved`
+patch in apply_patch.py: one notch scales magnification by 1.2^-rotation,
+clamped to [1e-5, 32], and keeps the cursor's level-0 pixel fixed. The
+cursor is assumed to be at the canvas centre, because traces do not
+record it.
+
+Policies
+--------
+    none     no prefetch (baseline)
+    ring     tiles in a ring of `--ring` tiles around the visible tiles
+    zoom     tiles of the views one wheel notch in and one notch out
+    motion   tiles of the next view, extrapolated from the last two views
+             (pan offset and zoom ratio)
+
+Combine policies with "+", e.g. `ring+zoom`.
+
+Metrics
+-------
+- hidden: demand tiles served by an earlier prefetch that had arrived in
+  time. With `--bandwidth-mbps`, prefetches are queued on one link and
+  complete in order; a tile that arrives after it is needed counts as
+  `late`. Without it, or for untimed traces (console logs), every
+  prefetch is in time.
+- misses: demand tiles fetched on demand (latency exposed).
+- hiding ratio = hidden / (hidden + late + misses).
+- wasted bytes: prefetched tiles evicted or left unused at the end.
+
+Usage
+-----
+    python3 tools/prefetch_eval.py --self-test
+    python3 tools/prefetch_eval.py trace.jsonl --pyramid out/slide.ijtp
+    python3 tools/prefetch_eval.py trace.jsonl --base 92160 38092 --tile-size 512 \\
+        --policies none ring zoom motion ring+motion --cache-tiles 512 --bandwidth-mbps 40
+
+Exit status: 0 on success, 1 on input errors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from tile_trace import (  # noqa: E402
+    FETCH_DEBOUNCE_MS,
+    Fetch,
+    LRUCache,
+    Pyramid,
+    ViewEvent,
+    debounce,
+    fetch_region,
+    load_manifest,
+    parse_trace,
+    pick_level,
+    plan_fetches,
+    region_tiles,
+)
+
+# Mirrors of the mouseWheelMoved patch in apply_patch.py.
+WHEEL_ZOOM_FACTOR = 1.2
+MIN_MAGNIFICATION = 1e-5
+MAX_MAGNIFICATION = 32.0
+
+DEFAULT_POLICIES = ("none", "ring", "zoom", "motion")
+
+TileKey = tuple[int, int, int]
+
+
+def wheel_zoom(ev: ViewEvent, rotation: int, cursor: tuple[float, float] | None = None) -> ViewEvent:
+    """The view one mouseWheelMoved step produces, anchored at `cursor`.
+
+    `cursor` is in canvas pixels and defaults to the canvas centre.
+    """
+    cw = ev.w * ev.mag
+    ch = ev.h * ev.mag
+    sx, sy = cursor if cursor is not None else (cw / 2, ch / 2)
+    new_mag = max(MIN_MAGNIFICATION, min(MAX_MAGNIFICATION, ev.mag * WHEEL_ZOOM_FACTOR ** -rotation))
+    l0x = ev.x + sx / ev.mag
+    l0y = ev.y + sy / ev.mag
+    return ViewEvent(round(l0x - sx / new_mag), round(l0y - sy / new_mag),
+                     max(1, round(cw / new_mag)), max(1, round(ch / new_mag)), new_mag)
+
+
+def view_tiles(pyr: Pyramid, ev: ViewEvent) -> list[TileKey]:
+    level = pick_level(pyr, ev.mag)
+    region = fetch_region(pyr, level, ev)
+    return region_tiles(pyr, level, region) if region else []
+
+
+def ring_policy(pyr: Pyramid, history: list[Fetch], width: int = 1) -> list[TileKey]:
+    cur = history[-1]
+    level = cur.level
+    rows = [r for _, r, _ in cur.tiles]
+    cols = [c for _, _, c in cur.tiles]
+    n_rows, n_cols = pyr.grid(level)
+    out = []
+    for row in range(max(0, min(rows) - width), min(n_rows, max(rows) + width + 1)):
+        for col in range(max(0, min(cols) - width), min(n_cols, max(cols) + width + 1)):
+            if not (min(rows) <= row <= max(rows) and min(cols) <= col <= max(cols)):
+                out.append((level, row, col))
+    return out
+
+
+def zoom_policy(pyr: Pyramid, history: list[Fetch], width: int = 1) -> list[TileKey]:
+    ev = history[-1].event
+    return view_tiles(pyr, wheel_zoom(ev, -1)) + view_tiles(pyr, wheel_zoom(ev, 1))
+
+
+def motion_policy(pyr: Pyramid, history: list[Fetch], width: int = 1) -> list[TileKey]:
+    if len(history) < 2:
+        return []
+    prev, cur = history[-2].event, history[-1].event
+    ratio = cur.mag / prev.mag if prev.mag > 0 else 1.0
+    mag = max(MIN_MAGNIFICATION, min(MAX_MAGNIFICATION, cur.mag * ratio))
+    # Extrapolate the view centre and keep the canvas size fixed.
+    cx = cur.x + cur.w / 2 + (cur.x + cur.w / 2 - prev.x - prev.w / 2)
+    cy = cur.y + cur.h / 2 + (cur.y + cur.h / 2 - prev.y - prev.h / 2)
+    w = cur.w * cur.mag / mag
+    h = cur.h * cur.mag / mag
+    return view_tiles(pyr, ViewEvent(round(cx - w / 2), round(cy - h / 2), round(w), round(h), mag))
+
+
+POLICIES = {
+    "none": lambda pyr, history, width=1: [],
+    "ring": ring_policy,
+    "zoom": zoom_policy,
+    "motion": motion_policy,
+}
+
+
+def resolve_policy(name: str):
+    parts = name.split("+")
+    for p in parts:
+        if p not in POLICIES:
+            raise ValueError(f"unknown policy {p!r} (expected {', '.join(POLICIES)})")
+
+    def combined(pyr: Pyramid, history: list[Fetch], width: int = 1) -> list[TileKey]:
+        seen: dict[TileKey, None] = {}
+        for p in parts:
+            for key in POLICIES[p](pyr, history, width):
+                seen.setdefault(key)
+        return list(seen)
+
+    return combined
+
+
+@dataclass
+class PolicyReport:
+    policy: str
+    demand_tiles: int
+    cached: int
+    hidden: int
+    late: int
+    misses: int
+    hiding_ratio: float
+    demand_bytes: int
+    prefetched_tiles: int
+    prefetch_bytes: int
+    wasted_bytes: int
+    waste_ratio: float
+
+
+def evaluate(pyr: Pyramid, events: list[ViewEvent], policy: str, cache: LRUCache,
+             ring_width: int = 1, bandwidth_mbps: float | None = None,
+             rtt_ms: float = 0.0) -> PolicyReport:
+    """Replay `events` with `policy` prefetching into `cache`."""
+    choose = resolve_policy(policy)
+    bytes_per_ms = bandwidth_mbps * 1e6 / 8 / 1000 if bandwidth_mbps else None
+    fetches = plan_fetches(pyr, events)
+    unused: dict[TileKey, float] = {}   # prefetched, not yet demanded -> ready time
+    link_free = 0.0
+    demand = cached = hidden = late = misses = 0
+    demand_bytes = prefetched = prefetch_bytes = wasted = 0
+
+    def add(key: TileKey) -> None:
+        nonlocal wasted
+        for evicted in cache.insert(key, pyr.tile_bytes(*key)):
+            if evicted in unused:
+                del unused[evicted]
+                wasted += pyr.tile_bytes(*evicted)
+
+    for i, f in enumerate(fetches):
+        now = f.event.t if f.event.t is not None else float(i)
+        for key in f.tiles:
+            demand += 1
+            if key in unused:
+                ready = unused.pop(key)
+                if bytes_per_ms is None or f.event.t is None or ready <= now:
+                    hidden += 1
+                else:
+                    late += 1
+                cache.entries.move_to_end(key)
+            elif key in cache:
+                cached += 1
+                cache.entries.move_to_end(key)
+            else:
+                misses += 1
+                demand_bytes += pyr.tile_bytes(*key)
+                add(key)
+        link_free = max(link_free, now)
+        for key in choose(pyr, fetches[:i + 1], ring_width):
+            if key in cache:
+                continue
+            nbytes = pyr.tile_bytes(*key)
+            prefetched += 1
+            prefetch_bytes += nbytes
+            if bytes_per_ms is not None:
+                link_free += rtt_ms + nbytes / bytes_per_ms
+            unused[key] = link_free
+            add(key)
+    wasted += sum(pyr.tile_bytes(*k) for k in unused)
+    exposed = hidden + late + misses
+    return PolicyReport(policy, demand, cached, hidden, late, misses,
+                        hidden / exposed if exposed else 0.0, demand_bytes,
+                        prefetched, prefetch_bytes, wasted,
+                        wasted / prefetch_bytes if prefetch_bytes else 0.0)
+
+
+def render_report(pyr: Pyramid, reports: list[PolicyReport]) -> str:
+    mb = 1 << 20
+    lines = [f"== tile size {pyr.tile_size}, {len(pyr.levels)} levels ==",
+             f"{'policy':<16} {'hidden':>7} {'late':>6} {'misses':>7} {'hide%':>6} "
+             f"{'prefetch MB':>12} {'wasted MB':>10} {'waste%':>7}"]
+    for r in reports:
+        lines.append(f"{r.policy:<16} {r.hidden:>7} {r.late:>6} {r.misses:>7} "
+                     f"{100 * r.hiding_ratio:>6.1f} {r.prefetch_bytes / mb:>12.2f} "
+                     f"{r.wasted_bytes / mb:>10.2f} {100 * r.waste_ratio:>7.1f}")
+    return "\n".join(lines)
+
+
+def _self_test() -> bool:
+    """A steady pan and a zoom-in sequence with predictable winners."""
+    ev = ViewEvent(1000, 1000, 640, 480, 1.0)
+    z = wheel_zoom(ev, -1)
+    if abs(z.mag - 1.2) > 1e-12 or (z.x, z.y, z.w, z.h) != (1053, 1040, 533, 400):
+        print(f"self-test FAIL: wheel_zoom in gave {z}")
+        return False
+    if wheel_zoom(ViewEvent(0, 0, 10, 10, 30.0), -5).mag != MAX_MAGNIFICATION:
+        print("self-test FAIL: wheel_zoom must clamp to 32")
+        return False
+
+    pyr = Pyramid.synthetic(16384, 16384, 256)
+    pan = [ViewEvent(2000 + 200 * i, 4000, 1024, 768, 1.0, t=500.0 * i) for i in range(30)]
+    reports = {p: evaluate(pyr, pan, p, LRUCache(max_tiles=512))
+               for p in ("none", "ring", "motion", "zoom")}
+    if reports["none"].hidden or reports["none"].prefetch_bytes:
+        print("self-test FAIL: baseline must not prefetch")
+        return False
+    if reports["motion"].hiding_ratio < 0.75:
+        print(f"self-test FAIL: motion should hide a steady pan, got {reports['motion']}")
+        return False
+    if not (reports["ring"].hiding_ratio > 0.5 and reports["ring"].waste_ratio > reports["motion"].waste_ratio):
+        print(f"self-test FAIL: ring should hide the pan at a higher waste than motion: "
+              f"{reports['ring']} vs {reports['motion']}")
+        return False
+
+    # Zooming out one notch at a time walks up the pyramid; zooming in
+    # would stay on already-cached level-0 tiles and prove nothing.
+    zoom = [ViewEvent(8000, 8000, 640, 480, 1.0, t=0.0)]
+    for i in range(1, 12):
+        z = wheel_zoom(zoom[-1], 1)
+        zoom.append(ViewEvent(z.x, z.y, z.w, z.h, z.mag, t=400.0 * i))
+    zr = {p: evaluate(pyr, zoom, p, LRUCache(max_tiles=512)) for p in ("none", "zoom")}
+    if zr["zoom"].misses * 2 >= zr["none"].misses:
+        print(f"self-test FAIL: zoom policy should cut misses on a wheel sequence: {zr}")
+        return False
+
+    slow = evaluate(pyr, pan, "ring+motion", LRUCache(max_tiles=512), bandwidth_mbps=0.5)
+    if slow.late == 0:
+        print("self-test FAIL: a slow link should make some prefetches late")
+        return False
+    print("prefetch_eval self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", nargs="?", help="JSONL trace or console log with view lines")
+    parser.add_argument("--pyramid", help="build_pyramid.py output (dir, manifest.json or .ijtp)")
+    parser.add_argument("--base", type=int, nargs=2, metavar=("W", "H"), help="Synthetic level-0 size")
+    parser.add_argument("--tile-size", type=int, default=256, help="Synthetic tile size")
+    parser.add_argument("--policies", nargs="+", default=list(DEFAULT_POLICIES), help="Policies to compare")
+    parser.add_argument("--ring", type=int, default=1, help="Ring width in tiles")
+    parser.add_argument("--cache-tiles", type=int, default=512, help="LRU capacity in tiles")
+    parser.add_argument("--bandwidth-mbps", type=float, help="Model a link of this speed for prefetches")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Per-request latency on the modelled link")
+    parser.add_argument("--debounce-ms", type=float, default=FETCH_DEBOUNCE_MS, help="Fetch debounce for timed traces")
+    parser.add_argument("--json", dest="emit_json", action="store_true", help="Emit JSON instead of text")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.trace or not (args.pyramid or args.base):
+        parser.error("a trace and either --pyramid or --base are required")
+
+    try:
+        events = debounce(parse_trace(Path(args.trace).read_text(encoding="utf-8")),
+                          args.debounce_ms)
+        if args.pyramid:
+            pyr = Pyramid.from_manifest(load_manifest(Path(args.pyramid)))
+        else:
+            pyr = Pyramid.synthetic(args.base[0], args.base[1], args.tile_size)
+        reports = [evaluate(pyr, events, p, LRUCache(max_tiles=args.cache_tiles), args.ring,
+                            args.bandwidth_mbps, args.rtt_ms)
+                   for p in args.policies]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    if args.emit_json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+    else:
+        print(render_report(pyr, reports))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
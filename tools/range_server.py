@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""Local stand-in for raw.githubusercontent.com, with HTTP Range support.
+
+/github mounts (GitHubFileSystemHandler in utils.js) read files of 256 KB
+or more with Range requests instead of downloading them when ImageJ opens
+them. This server serves a directory under the same URL layout as
+raw.githubusercontent.com. It handles single-range GET, HEAD and CORS
+preflight, and counts the requests and bytes it sends. Point a page at it
+with
+
+    githubFS.rawBase = 'http://127.0.0.1:8765'
+
+and mount <owner>/<repo>@<branch>; files come from DIR/<owner>/<repo>/<branch>/.
+GET /__stats returns the counters as JSON (?reset=1 clears them).
+
+`bench` drives the real read path: it extracts the githubFS code from
+utils.js into node and runs it against this server. It writes a synthetic
+ImageJ stack TIFF (header, first IFD, pixel data, then the remaining IFDs
+at the end, as ij.io.TiffEncoder lays it out), then counts the bytes sent
+for:
+
+  preload      the old path: the whole file is fetched on open
+  one slice    TiffDecoder reads the first IFD of an ImageJ TIFF, then
+               a virtual stack reads one plane
+  ifd walk     a generic TIFF reader follows every IFD to the end of the file
+  full open    all planes, read sequentially
+
+The reads are a model of what ij.io.TiffDecoder and ImageReader ask for
+(short header/IFD reads, then 64 KB pixel reads), not a trace.
+
+Usage
+-----
+    python3 tools/range_server.py --self-test
+    python3 tools/range_server.py serve DIR [--port 8765] [--index-list]
+    python3 tools/range_server.py tiff OUT.tif [--width 2048 --height 1024 --slices 64]
+    python3 tools/range_server.py bench [--slices 64] [--width 2048 --height 1024]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+UTILS_JS = ROOT / "utils.js"
+PIXEL_READ = 64 * 1024
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Resolve a Range header to an inclusive (start, end) within size.
+
+    Returns None for no header or a form this server does not handle
+    (multiple ranges, other units), meaning "send the whole file"; raises
+    ValueError for a range that cannot be satisfied (416).
+    """
+    m = _RANGE.match(header.strip()) if header else None
+    if not m or m.group(1) == m.group(2) == "":
+        return None
+    if m.group(1) == "":
+        n = int(m.group(2))
+        if n == 0 or size == 0:
+            raise ValueError(f"empty suffix range of a {size} byte file")
+        return max(0, size - n), size - 1
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"bytes {start}-{end} outside a {size} byte file")
+    return start, min(end, size - 1)
+
+
+class Stats:
+    """Request and byte counters per path, shared by the handler threads."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.paths: dict[str, dict[str, int]] = defaultdict(lambda: {"get": 0, "head": 0, "bytes": 0})
+
+    def add(self, path: str, method: str, nbytes: int) -> None:
+        with self.lock:
+            entry = self.paths[path]
+            entry[method] += 1
+            entry["bytes"] += nbytes
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            paths = {p: dict(v) for p, v in self.paths.items()}
+        return {"get": sum(v["get"] for v in paths.values()), "head": sum(v["head"] for v in paths.values()),
+                "bytes": sum(v["bytes"] for v in paths.values()), "paths": paths}
+
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    """Static files with single-range GET, HEAD, CORS and byte counting."""
+
+    stats: Stats
+    ranges = True  # False models a server that ignores Range
+    range_error: int | None = None  # status for every Range GET (proxy, rate limit)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - base class signature
+        pass
+
+    def end_headers(self) -> None:
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "Content-Length, Content-Range, Accept-Ranges")
+        super().end_headers()
+
+    def do_OPTIONS(self) -> None:
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Range")
+        self.end_headers()
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    def content_type(self, path: Path) -> str:
+        return "application/octet-stream"  # what raw.githubusercontent.com sends for binaries
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/__stats":
+            body = json.dumps(self.stats.snapshot()).encode()
+            if "reset" in parse_qs(url.query):
+                self.stats.reset()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._serve(head=False)
+
+    def _serve(self, head: bool) -> None:
+        rel = unquote(urlsplit(self.path).path)
+        path = Path(self.translate_path(rel))
+        if not path.is_file():
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        size = path.stat().st_size
+        if self.range_error and not head and self.headers.get("Range"):
+            self.send_error(self.range_error)
+            return
+        try:
+            span = parse_range(self.headers.get("Range"), size) if self.ranges else None
+        except ValueError:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start, end = span if span else (0, size - 1)
+        length = end - start + 1
+        self.send_response(HTTPStatus.PARTIAL_CONTENT if span else HTTPStatus.OK)
+        self.send_header("Content-Type", self.content_type(path))
+        self.send_header("Content-Length", str(length))
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if span:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        self.stats.add(rel, "head" if head else "get", 0 if head else length)
+        if head:
+            return
+        with path.open("rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+def serve(directory: str | Path, port: int = 0, ranges: bool = True,
+          range_error: int | None = None) -> ThreadingHTTPServer:
+    """Start a server on 127.0.0.1 in a daemon thread; port 0 picks a free one."""
+    handler = type("Handler", (RangeHandler,), {"stats": Stats(), "ranges": ranges, "range_error": range_error})
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(handler, directory=str(directory)))
+    server.daemon_threads = True
+    server.stats = handler.stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_index_lists(root: str | Path) -> int:
+    """Write an index.list (v3, with file sizes) into every directory below root."""
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        lines = [f"dir:{d}" for d in dirnames]
+        for name in sorted(filenames):
+            if name != "index.list" and not name.startswith("."):
+                lines.append(f"{name}\t{os.path.getsize(os.path.join(dirpath, name))}")
+        Path(dirpath, "index.list").write_text("".join(line + "\n" for line in lines))
+        count += 1
+    return count
+
+
+# -- synthetic ImageJ TIFF -----------------------------------------------------
+
+_SHORT, _ASCII, _LONG = 3, 2, 4
+
+
+def _ifd(entries: list[tuple[int, int, int, int]], next_offset: int) -> bytes:
+    out = struct.pack("<H", len(entries))
+    for tag, typ, count, value in sorted(entries):
+        out += struct.pack("<HHII", tag, typ, count, value) if typ != _SHORT or count != 1 else \
+            struct.pack("<HHIHH", tag, typ, count, value, 0)
+    return out + struct.pack("<I", next_offset)
+
+
+def write_imagej_tiff(path: str | Path, width: int, height: int, slices: int) -> int:
+    """Write a 16-bit ImageJ stack in TiffEncoder's layout; returns the file size.
+
+    Plane k holds (x + 7*y + 1031*k) mod 65536, so every byte range is distinct.
+    """
+    plane = width * height * 2
+    description = f"ImageJ=1.54f\nimages={slices}\nslices={slices}\nloop=false\n".encode() + b"\0"
+
+    def entries(strip: int, desc_offset: int | None) -> list[tuple[int, int, int, int]]:
+        out = [(254, _LONG, 1, 0), (256, _LONG, 1, width), (257, _LONG, 1, height), (258, _SHORT, 1, 16),
+               (262, _SHORT, 1, 1), (273, _LONG, 1, strip), (277, _SHORT, 1, 1), (278, _LONG, 1, height),
+               (279, _LONG, 1, plane)]
+        if desc_offset is not None:
+            out.append((270, _ASCII, len(description), desc_offset))
+        return out
+
+    ifd0_len = len(_ifd(entries(0, 0), 0))
+    desc_offset = 8 + ifd0_len
+    pixels = desc_offset + len(description)
+    tail = pixels + slices * plane
+    rest_len = len(_ifd(entries(0, None), 0))
+    if tail + (slices - 1) * rest_len >= 1 << 32:
+        raise ValueError("stack too large for a classic TIFF")
+    base = (np.arange(width, dtype=np.uint32)[None, :] + 7 * np.arange(height, dtype=np.uint32)[:, None])
+    with open(path, "wb") as f:
+        f.write(b"II*\0" + struct.pack("<I", 8))
+        f.write(_ifd(entries(pixels, desc_offset), tail if slices > 1 else 0))
+        f.write(description)
+        for k in range(slices):
+            f.write(((base + 1031 * k) & 0xFFFF).astype("<u2").tobytes())
+        for k in range(1, slices):
+            nxt = tail + k * rest_len if k < slices - 1 else 0
+            f.write(_ifd(entries(pixels + k * plane, None), nxt))
+        return f.tell()
+
+
+class _Reader:
+    """Records the (offset, length) reads a TIFF decoder issues on a local file."""
+
+    def __init__(self, path: Path) -> None:
+        self.f = path.open("rb")
+        self.reads: list[tuple[int, int]] = []
+
+    def read(self, offset: int, length: int) -> bytes:
+        self.reads.append((offset, length))
+        self.f.seek(offset)
+        return self.f.read(length)
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def _read_ifds(r: _Reader, imagej: bool) -> list[dict[int, tuple[int, int]]]:
+    """TiffDecoder-style IFD walk. ImageJ TIFFs with images=N in the description
+    stop after the first IFD; the remaining planes are assumed contiguous."""
+    ifds = []
+    offset = struct.unpack("<I", r.read(4, 4))[0] if r.read(0, 4) == b"II*\0" else 0
+    while offset:
+        n = struct.unpack("<H", r.read(offset, 2))[0]
+        raw = r.read(offset + 2, 12 * n + 4)
+        tags = {}
+        for i in range(n):
+            tag, typ, count = struct.unpack_from("<HHI", raw, 12 * i)
+            value = struct.unpack_from("<H" if typ == _SHORT and count == 1 else "<I", raw, 12 * i + 8)[0]
+            tags[tag] = (count, value)
+        ifds.append(tags)
+        offset = struct.unpack_from("<I", raw, 12 * n)[0]
+        if imagej and 270 in tags:
+            count, desc_at = tags[270]
+            if b"images=" in r.read(desc_at, count):
+                break
+    return ifds
+
+
+def _plane_reads(r: _Reader, offset: int, nbytes: int) -> None:
+    for at in range(offset, offset + nbytes, PIXEL_READ):
+        r.reads.append((at, min(PIXEL_READ, offset + nbytes - at)))
+
+
+def open_pattern(path: str | Path, scenario: str) -> list[tuple[int, int]]:
+    """Reads issued to open path, for the scenarios listed in the module docstring."""
+    r = _Reader(Path(path))
+    try:
+        ifds = _read_ifds(r, imagej=scenario != "ifd walk")
+        first = ifds[0]
+        plane, strip = first[279][1], first[273][1]
+        images = int(re.search(rb"images=(\d+)", r.read(first[270][1], first[270][0])).group(1)) \
+            if 270 in first else len(ifds)
+        if scenario == "one slice":
+            _plane_reads(r, strip + (images // 2) * plane, plane)
+        elif scenario == "full open":
+            _plane_reads(r, strip, images * plane)
+        return r.reads
+    finally:
+        r.close()
+
+
+# -- driving utils.js from node --------------------------------------------------
+
+# Pulls the githubFS code out of utils.js, mounts the repo and performs the
+# reads from stdin through githubFileReadAsync (or the old whole-file fetch).
+_NODE_READ = r"""
+const src = require('fs').readFileSync(process.argv[1], 'utf8');
+const grab = (marker) => { const i = src.indexOf(marker);
+  let depth = 0, j = src.indexOf('{', i);
+  for (; j < src.length; j++) { if (src[j] === '{') depth++; else if (src[j] === '}' && --depth === 0) break; }
+  return src.slice(i, j + 1); };
+const job = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+let consts = src.match(/^const GITHUB_\w+ = .*$/gm).join('\n');
+for (const [k, v] of Object.entries(job.overrides || {})) consts = consts.replace(new RegExp(`(const ${k} = )[^;]+`), `$1${v}`);
+eval([consts, ...['function parseIndexList(', 'function copyToReadBuffer(', 'class GitHubFileSystemHandler ',
+                  'function githubFileReadAsync('].map(grab)].join('\n') +
+     ';Object.assign(globalThis, { GitHubFileSystemHandler, githubFileReadAsync, GITHUB_BLOCK_SIZE });');
+console.log = console.warn = () => {};
+(async () => {
+  const githubFS = new GitHubFileSystemHandler();
+  globalThis.window = { githubFS };
+  githubFS.rawBase = job.rawBase;
+  const mount = await githubFS.mountRepo(job.owner, job.repo, job.branch);
+  const path = `${mount}/${job.path}`;
+  const hash = require('crypto').createHash('sha256');
+  const t0 = performance.now();
+  const info = await githubFS.getFileInfo(path);
+  const fileData = { length: info.size };
+  if (job.preload || info.size < GITHUB_BLOCK_SIZE) {
+    fileData.data = await githubFS.getFileContent(path);
+  } else {
+    githubFS.openRanged(fileData, info.downloadUrl);
+  }
+  const codes = [];
+  const read = ([offset, len]) => new Promise(resolve => {
+    const buf = new Int8Array(len + 3);
+    githubFileReadAsync(fileData, offset, buf, 3, len, 0, n => {
+      codes.push(n);
+      resolve(buf.subarray(3, 3 + Math.max(n, 0)));
+    });
+  });
+  const chunks = [];
+  if (job.concurrent) {
+    chunks.push(...await Promise.all(job.reads.map(read)));
+  } else {
+    for (const r of job.reads) chunks.push(await read(r));
+  }
+  for (const c of chunks) hash.update(new Uint8Array(c.buffer, c.byteOffset, c.length));
+  process.stdout.write(JSON.stringify({ sha256: hash.digest('hex'), ms: performance.now() - t0,
+                                        ranged: !fileData.data, codes, ...githubFS.stats }));
+})().catch(err => { console.error(err.stack || String(err)); process.exit(1); });
+"""
+
+
+def node_reads(base_url: str, relpath: str, reads: list[tuple[int, int]], *, preload: bool = False,
+               concurrent: bool = False, overrides: dict | None = None) -> dict:
+    """Run reads of owner/repo/branch/<path> through utils.js in node."""
+    owner, repo, branch, path = relpath.split("/", 3)
+    job = {"rawBase": base_url, "owner": owner, "repo": repo, "branch": branch, "path": path,
+           "reads": reads, "preload": preload, "concurrent": concurrent, "overrides": overrides or {}}
+    out = subprocess.run(["node", "-e", _NODE_READ, str(UTILS_JS)], input=json.dumps(job),
+                         capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(f"node: {out.stderr.strip()[-500:]}")
+    return json.loads(out.stdout)
+
+
+def expected_sha(path: Path, reads: list[tuple[int, int]]) -> str:
+    h = hashlib.sha256()
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        for offset, length in reads:
+            if offset < size:
+                f.seek(offset)
+                h.update(f.read(min(length, size - offset)))
+    return h.hexdigest()
+
+
+def _fetch_stats(server: ThreadingHTTPServer) -> dict:
+    stats = server.stats.snapshot()
+    server.stats.reset()
+    return stats
+
+
+SCENARIOS = ("preload", "one slice", "ifd walk", "full open")
+
+
+def bench(width: int, height: int, slices: int) -> list[tuple[str, int, int, int, float]]:
+    """(scenario, bytes read by the decoder, bytes sent, GET requests, ms) per scenario."""
+    with tempfile.TemporaryDirectory() as tmp:
+        rel = "bench/images/main/stack.tif"
+        tif = Path(tmp, rel)
+        tif.parent.mkdir(parents=True)
+        write_imagej_tiff(tif, width, height, slices)
+        write_index_lists(tmp)
+        server = serve(tmp)
+        try:
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            rows = []
+            for scenario in SCENARIOS:
+                reads = open_pattern(tif, "one slice" if scenario == "preload" else scenario)
+                _fetch_stats(server)
+                result = node_reads(base, rel, reads, preload=scenario == "preload")
+                if result["sha256"] != expected_sha(tif, reads):
+                    raise RuntimeError(f"{scenario}: bytes read through utils.js differ from the file")
+                stats = _fetch_stats(server)
+                rows.append((scenario, sum(n for _, n in reads), stats["bytes"], stats["get"], result["ms"]))
+            return rows
+        finally:
+            server.shutdown()
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    for header, want in (("bytes=0-99", (0, 99)), ("bytes=10-", (10, 999)), ("bytes=-100", (900, 999)),
+                         ("bytes=990-5000", (990, 999)), ("bytes=-5000", (0, 999)), (None, None),
+                         ("bytes=0-1,5-6", None), ("items=0-1", None)):
+        if parse_range(header, 1000) != want:
+            fails.append(f"parse_range({header!r}) = {parse_range(header, 1000)}, want {want}")
+    for header in ("bytes=1000-", "bytes=5-4", "bytes=-0"):
+        try:
+            parse_range(header, 1000)
+            fails.append(f"parse_range({header!r}) accepted")
+        except ValueError:
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rel = "acme/data/main/sub/stack.tif"
+        tif = Path(tmp, rel)
+        tif.parent.mkdir(parents=True)
+        size = write_imagej_tiff(tif, 256, 256, 48)  # ~6.3 MB, 25 blocks
+        Path(tmp, "acme/data/main/small.txt").write_bytes(b"hello github\n")
+        gone = Path(tmp, "acme/data/main/gone.bin")
+        gone.write_bytes(bytes(300_000))  # listed in index.list, deleted before the error check
+        write_index_lists(tmp)
+        if f"stack.tif\t{size}" not in Path(tif.parent, "index.list").read_text():
+            fails.append("index.list size column")
+        ifds = _read_ifds(_Reader(tif), imagej=False)
+        if len(ifds) != 48 or ifds[5][273][1] != ifds[0][273][1] + 5 * 256 * 256 * 2:
+            fails.append(f"synthetic TIFF IFD chain ({len(ifds)} IFDs)")
+        rng = np.random.default_rng(3)
+        scattered = [(int(o), int(n)) for o, n in zip(rng.integers(0, size + 100, 60), rng.integers(1, 600_000, 60))]
+        scattered += [(size - 10, 100), (262_144 - 5, 10), (0, size)]
+        server = serve(tmp)
+        try:
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            req = urllib.request.Request(f"{base}/{rel}", headers={"Range": "bytes=8-15"})
+            with urllib.request.urlopen(req) as resp:
+                body = resp.read()
+                if resp.status != 206 or resp.headers["Content-Range"] != f"bytes 8-15/{size}" or \
+                        body != tif.read_bytes()[8:16]:
+                    fails.append(f"Range GET: {resp.status} {resp.headers['Content-Range']}")
+            try:
+                urllib.request.urlopen(urllib.request.Request(f"{base}/{rel}", headers={"Range": f"bytes={size}-"}))
+                fails.append("unsatisfiable range accepted")
+            except urllib.error.HTTPError as e:
+                if e.code != 416:
+                    fails.append(f"unsatisfiable range: {e.code}")
+            _fetch_stats(server)
+
+            cases = [
+                ("one slice", open_pattern(tif, "one slice"), {}),
+                ("ifd walk", open_pattern(tif, "ifd walk"), {}),
+                ("full open", open_pattern(tif, "full open"), {}),
+                ("scattered", scattered, {}),
+                ("scattered, 2-block cache", scattered, {"overrides": {"GITHUB_CACHE_BLOCKS": 2}}),
+                ("concurrent, 2-block cache", scattered, {"concurrent": True, "overrides": {"GITHUB_CACHE_BLOCKS": 2}}),
+            ]
+            for label, reads, kwargs in cases:
+                got = node_reads(base, rel, reads, **kwargs)
+                stats = _fetch_stats(server)
+                if got["sha256"] != expected_sha(tif, reads):
+                    fails.append(f"{label}: bytes differ from the file")
+                if not got["ranged"] or stats["head"]:
+                    fails.append(f"{label}: ranged={got['ranged']} HEAD requests={stats['head']}")
+                if label == "one slice" and stats["paths"][f"/{rel}"]["bytes"] > size // 4:
+                    fails.append(f"one slice transferred {stats['paths'][f'/{rel}']['bytes']} of {size} bytes")
+            got = node_reads(base, "acme/data/main/small.txt", [(0, 100)])
+            if got["sha256"] != hashlib.sha256(b"hello github\n").hexdigest() or got["ranged"]:
+                fails.append("small file read")
+            _fetch_stats(server)
+        except FileNotFoundError:
+            print("  (node not found; skipped utils.js read checks)")
+        except RuntimeError as e:
+            fails.append(str(e))
+        finally:
+            server.shutdown()
+
+        # A server that ignores Range: the read path falls back to the whole body
+        server = serve(tmp, ranges=False)
+        try:
+            reads = open_pattern(tif, "one slice")
+            got = node_reads(f"http://127.0.0.1:{server.server_address[1]}", rel, reads)
+            stats = _fetch_stats(server)
+            if got["sha256"] != expected_sha(tif, reads) or stats["paths"][f"/{rel}"]["get"] != 1:
+                fails.append(f"no-Range fallback: {stats['paths'].get(f'/{rel}')}")
+        except FileNotFoundError:
+            pass
+        except RuntimeError as e:
+            fails.append(f"no-Range fallback: {e}")
+        finally:
+            server.shutdown()
+
+        # Range requests rejected (403/416/5xx): one whole download instead; if
+        # that fails too, the read reports -1, not 0 (which ImageJ takes as EOF)
+        server = serve(tmp, range_error=503)
+        try:
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            reads = open_pattern(tif, "one slice")
+            got = node_reads(base, rel, reads)
+            stats = _fetch_stats(server)
+            if got["sha256"] != expected_sha(tif, reads) or stats["paths"].get(f"/{rel}", {}).get("get") != 1:
+                fails.append(f"Range-error fallback: {stats['paths'].get(f'/{rel}')}")
+            gone.unlink()
+            got = node_reads(base, "acme/data/main/gone.bin", [(0, 100), (200_000, 100)])
+            if got["codes"] != [-1, -1]:
+                fails.append(f"failed read returned {got['codes']}, want [-1, -1]")
+        except FileNotFoundError:
+            pass
+        except RuntimeError as e:
+            fails.append(f"Range-error fallback: {e}")
+        finally:
+            server.shutdown()
+
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("range_server self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    s = sub.add_parser("serve", help="Serve DIR as <owner>/<repo>/<branch>/... with Range support")
+    s.add_argument("directory")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--index-list", action="store_true", help="Write index.list files (with sizes) first")
+    s.add_argument("--no-range", dest="ranges", action="store_false", help="Ignore Range headers")
+    t = sub.add_parser("tiff", help="Write a synthetic ImageJ stack TIFF")
+    t.add_argument("output")
+    be = sub.add_parser("bench", help="Bytes transferred per ImageJ open, through utils.js")
+    for p in (t, be):
+        p.add_argument("--width", type=int, default=2048)
+        p.add_argument("--height", type=int, default=1024)
+        p.add_argument("--slices", type=int, default=64)
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    try:
+        if args.cmd == "serve":
+            if args.index_list:
+                print(f"wrote {write_index_lists(args.directory)} index.list files")
+            server = serve(args.directory, args.port, args.ranges)
+            print(f"serving {args.directory} at http://127.0.0.1:{server.server_address[1]} (Ctrl-C to stop)")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                server.shutdown()
+            return 0
+        if args.cmd == "tiff":
+            size = write_imagej_tiff(args.output, args.width, args.height, args.slices)
+            print(f"{args.slices} x {args.width}x{args.height} 16-bit, {size / 1e6:.1f} MB -> {args.output}")
+            return 0
+        if args.cmd == "bench":
+            size = args.width * args.height * 2 * args.slices
+            print(f"{args.slices} x {args.width}x{args.height} 16-bit stack, {size / 1e6:.0f} MB")
+            print(f"  {'scenario':<12} {'read MB':>10} {'sent MB':>10} {'GETs':>6} {'ms':>8}")
+            for label, used, sent, gets, ms in bench(args.width, args.height, args.slices):
+                print(f"  {label:<12} {used / 1e6:>10.2f} {sent / 1e6:>10.2f} {gets:>6} {ms:>8.0f}")
+            return 0
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""Offline ImageJ `.roi` / `RoiSet.zip` <-> GeoJSON converter.
+
+The page converts ROIs with roiToGeoJson / geoJsonToRoi in
+hypha-imagej-service.js. That makes one awaited CheerpJ call per
+coordinate accessor, which takes minutes for segmentation outputs of about
+100k ROIs. This module reads and writes the binary format of
+ij.io.RoiDecoder / RoiEncoder directly. It decodes each ROI's coordinate
+block with one np.frombuffer, and follows the same type mapping as the page
+(see ROI_GEOJSON_CONVERSION.md):
+
+  Rectangle                 Polygon (bounds ring; rounded corners as arcs)
+  Oval                      Polygon, properties.shape = "ellipse"
+  Polygon/Freehand/Traced   Polygon (closed ring)
+  Polyline/Freeline/Angle   LineString
+  Straight Line             LineString (2 points)
+  Point                     Point or MultiPoint
+  Composite (ShapeRoi)      GeometryCollection of its closed sub-paths
+
+GeoJSON -> ROI is the reverse of geoJsonToRoi. An axis-aligned 4-vertex
+ring becomes a Rectangle. A ring marked shape "ellipse" becomes an Oval on
+its bounds. MultiPolygon and GeometryCollection become a composite
+ShapeRoi. Non-integer coordinates are stored at sub-pixel resolution.
+properties.name and properties.strokeColor round-trip, as do the c/z/t
+positions (when set).
+
+Ovals and curved ShapeRoi segments are approximated by vertices. ImageJ's
+own OvalRoi.getFloatPolygon() traces pixel edges, so vertex lists
+differ from the page's output; the shapes agree.
+
+Usage
+-----
+    python3 tools/roi_codec.py --self-test
+    python3 tools/roi_codec.py to-geojson RoiSet.zip -o rois.geojson
+    python3 tools/roi_codec.py from-geojson rois.geojson -o RoiSet.zip
+    python3 tools/roi_codec.py bench [--rois 100000] [--vertices 40]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import math
+import struct
+import sys
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+MAGIC = b"Iout"
+VERSION = 228
+HEADER = struct.Struct(">4shBxhhhhHffffhiiihhBBhii")  # 64 bytes, RoiDecoder offsets 0..63
+HEADER2 = struct.Struct(">iiiiiiihBBifiii12x")  # 64 bytes at header2Offset
+HEADER2_SIZE = 64
+
+# RoiDecoder type codes (file), and Roi.getTypeAsString() names
+POLYGON, RECT, OVAL, LINE, FREELINE, POLYLINE, NOROI, FREEHAND, TRACED, ANGLE, POINT = range(11)
+TYPE_NAMES = {POLYGON: "Polygon", RECT: "Rectangle", OVAL: "Oval", LINE: "Straight Line",
+              FREELINE: "Freeline", POLYLINE: "Polyline", FREEHAND: "Freehand", TRACED: "Traced",
+              ANGLE: "Angle", POINT: "Point"}
+COMPOSITE = "Composite"
+CLOSED_TYPES = frozenset({POLYGON, FREEHAND, TRACED})
+OPEN_TYPES = frozenset({POLYLINE, FREELINE, ANGLE})
+
+SUB_PIXEL_RESOLUTION = 128
+# java.awt.geom.PathIterator segment codes used by ShapeRoi.getShapeAsArray()
+SEG_MOVETO, SEG_LINETO, SEG_QUADTO, SEG_CUBICTO, SEG_CLOSE = range(5)
+SEG_ARGS = {SEG_MOVETO: 2, SEG_LINETO: 2, SEG_QUADTO: 4, SEG_CUBICTO: 6, SEG_CLOSE: 0}
+CURVE_STEPS = 8
+
+
+class RoiFormatError(ValueError):
+    pass
+
+
+@dataclass
+class Roi:
+    type: int | str  # file type code, or COMPOSITE
+    name: str = ""
+    bounds: tuple[float, float, float, float] = (0, 0, 0, 0)  # x, y, width, height
+    coords: np.ndarray = field(default_factory=lambda: np.zeros((0, 2)))  # (n, 2) float64, image coords
+    parts: list[np.ndarray] = field(default_factory=list)  # closed sub-paths of a composite
+    arc_size: int = 0
+    stroke_color: int = 0
+    position: tuple[int, int, int] = (0, 0, 0)  # c, z, t (0 = unset)
+
+    @property
+    def type_name(self) -> str:
+        return COMPOSITE if self.type == COMPOSITE else TYPE_NAMES.get(self.type, "Unknown")
+
+
+# --- decoding ----------------------------------------------------------------
+
+def decode_roi(data: bytes, name: str = "") -> Roi:
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise RoiFormatError(f"{name or 'roi'}: not an ImageJ ROI (magic {data[:4]!r})")
+    (_, version, rtype, top, left, bottom, right, n, x1, y1, x2, y2, _stroke, shape_size,
+     stroke_color, _fill, _subtype, options, _style, _head, arc, position, hdr2) = HEADER.unpack_from(data)
+    roi = Roi(type=rtype, name=name, bounds=(left, top, right - left, bottom - top),
+              arc_size=arc, stroke_color=stroke_color & 0xFFFFFFFF)
+    if hdr2 and hdr2 + HEADER2_SIZE <= len(data):
+        (_, c, z, t, name_off, name_len, *_rest) = HEADER2.unpack_from(data, hdr2)
+        roi.position = (c, z, t)
+        if name_len and name_off + 2 * name_len <= len(data):
+            roi.name = data[name_off:name_off + 2 * name_len].decode("utf-16-be")
+    elif position:
+        roi.position = (0, position, 0)
+    if shape_size > 0:
+        roi.type = COMPOSITE
+        roi.parts = _shape_parts(np.frombuffer(data, ">f4", shape_size, HEADER.size).astype(np.float64))
+        return roi
+    if rtype == LINE:
+        roi.coords = np.array([[x1, y1], [x2, y2]], np.float64)
+    elif rtype in (RECT, OVAL):
+        if options & SUB_PIXEL_RESOLUTION and version >= 223:
+            roi.bounds = (x1, y1, x2, y2)  # RoiEncoder stores x, y, width, height here
+    else:
+        if n == 0:
+            n = struct.unpack_from(">i", data, 18)[0]  # > 65535 vertices: count moves to SIZE
+        if options & SUB_PIXEL_RESOLUTION and version >= 222:
+            base = HEADER.size + 4 * n
+            roi.coords = np.frombuffer(data, ">f4", 2 * n, base).astype(np.float64).reshape(2, n).T
+        else:
+            xy = np.frombuffer(data, ">i2", 2 * n, HEADER.size).astype(np.float64).reshape(2, n).T
+            roi.coords = xy + (left, top)
+    return roi
+
+
+def _shape_parts(arr: np.ndarray) -> list[np.ndarray]:
+    """Closed (n, 2) rings from a ShapeRoi segment array; curves are sampled."""
+    parts, cur, i = [], [], 0
+    ts = np.linspace(0, 1, CURVE_STEPS + 1)[1:, None]
+    while i < len(arr):
+        seg = int(arr[i])
+        if seg not in SEG_ARGS:
+            raise RoiFormatError(f"bad ShapeRoi segment code {arr[i]}")
+        pts = arr[i + 1:i + 1 + SEG_ARGS[seg]].reshape(-1, 2)
+        i += 1 + SEG_ARGS[seg]
+        if seg == SEG_MOVETO:
+            if len(cur) > 1:
+                parts.append(np.array(cur))
+            cur = [pts[0]]
+        elif seg == SEG_LINETO:
+            cur.append(pts[0])
+        elif seg in (SEG_QUADTO, SEG_CUBICTO):
+            ctrl = np.vstack([cur[-1], pts])
+            if seg == SEG_QUADTO:
+                curve = (1 - ts) ** 2 * ctrl[0] + 2 * (1 - ts) * ts * ctrl[1] + ts ** 2 * ctrl[2]
+            else:
+                curve = ((1 - ts) ** 3 * ctrl[0] + 3 * (1 - ts) ** 2 * ts * ctrl[1]
+                         + 3 * (1 - ts) * ts ** 2 * ctrl[2] + ts ** 3 * ctrl[3])
+            cur.extend(curve)
+        else:
+            if len(cur) > 1:
+                parts.append(np.array(cur))
+            cur = [cur[0]] if cur else []
+    if len(cur) > 1:
+        parts.append(np.array(cur))
+    return parts
+
+
+def read_rois(path: str | Path) -> list[Roi]:
+    """Read a `.roi` file or a RoiSet.zip (entry order is ROI Manager order)."""
+    path = Path(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            return [decode_roi(zf.read(info), Path(info.filename).stem)
+                    for info in zf.infolist() if info.filename.endswith(".roi")]
+    return [decode_roi(path.read_bytes(), path.stem)]
+
+
+# --- GeoJSON -----------------------------------------------------------------
+
+def _ring(coords: np.ndarray) -> list[list[float]]:
+    ring = coords.tolist()
+    if ring and ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return ring
+
+
+def _ellipse(x: float, y: float, w: float, h: float) -> np.ndarray:
+    n = 4 * max(4, min(180, int(math.pi * (w + h) / 8)))  # ~one vertex per 2 px; hits the 4 extremes
+    a = np.linspace(0, 2 * math.pi, n, endpoint=False)
+    return np.column_stack([x + w / 2 * (1 + np.cos(a)), y + h / 2 * (1 - np.sin(a))])
+
+
+def _rounded_rect(x: float, y: float, w: float, h: float, arc: float) -> np.ndarray:
+    r = min(arc / 2, w / 2, h / 2)
+    a = np.linspace(0, math.pi / 2, CURVE_STEPS + 1)
+    corners = [(x + w - r, y + r, -math.pi / 2), (x + w - r, y + h - r, 0),
+               (x + r, y + h - r, math.pi / 2), (x + r, y + r, math.pi)]
+    return np.vstack([np.column_stack([cx + r * np.cos(a + a0), cy + r * np.sin(a + a0)])
+                      for cx, cy, a0 in corners])
+
+
+def roi_to_geometry(roi: Roi) -> dict[str, Any] | None:
+    x, y, w, h = roi.bounds
+    if roi.type == COMPOSITE:
+        return {"type": "GeometryCollection",
+                "geometries": [{"type": "Polygon", "coordinates": [_ring(p)]} for p in roi.parts]}
+    if roi.type == RECT:
+        if roi.arc_size:
+            return {"type": "Polygon", "coordinates": [_ring(_rounded_rect(x, y, w, h, roi.arc_size))]}
+        return {"type": "Polygon", "coordinates": [[[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]]]}
+    if roi.type == OVAL:
+        return {"type": "Polygon", "coordinates": [_ring(_ellipse(x, y, w, h))]}
+    if roi.type == POINT:
+        if len(roi.coords) == 1:
+            return {"type": "Point", "coordinates": roi.coords[0].tolist()}
+        return {"type": "MultiPoint", "coordinates": roi.coords.tolist()}
+    if roi.type == LINE or roi.type in OPEN_TYPES:
+        return {"type": "LineString", "coordinates": roi.coords.tolist()}
+    if roi.type in CLOSED_TYPES:
+        return {"type": "Polygon", "coordinates": [_ring(roi.coords)]}
+    return None
+
+
+def roi_to_feature(roi: Roi, index: int | None = None, source: str | None = None,
+                   include_properties: bool = True) -> dict[str, Any] | None:
+    geometry = roi_to_geometry(roi)
+    if geometry is None:
+        return None
+    props: dict[str, Any] = {}
+    if include_properties:
+        props = {"name": roi.name or "Unnamed", "type": roi.type_name}
+        if index is not None:
+            props["index"] = index
+        if source:
+            props["source"] = source
+        if roi.type == OVAL:
+            props["shape"] = "ellipse"
+        if roi.stroke_color:
+            props["strokeColor"] = f"#{roi.stroke_color & 0xFFFFFF:06x}"
+        for key, v in zip(("c", "z", "t"), roi.position):
+            if v:
+                props[key] = v
+    return {"type": "Feature", "geometry": geometry, "properties": props}
+
+
+def rois_to_geojson(rois: list[Roi], source: str | None = None, include_properties: bool = True) -> dict[str, Any]:
+    features = [f for i, r in enumerate(rois) if (f := roi_to_feature(r, i, source, include_properties))]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _parse_color(value: str | None) -> int:
+    if not value:
+        return 0
+    v = value.strip()
+    if v.startswith("#"):
+        hx = v[1:]
+        if len(hx) == 3:
+            hx = "".join(c * 2 for c in hx)
+        return 0xFF000000 | int(hx[:6], 16) if len(hx) >= 6 else 0
+    if v.startswith("rgb"):
+        r, g, b = (int(float(p)) for p in v[v.index("(") + 1:v.index(")")].split(",")[:3])
+        return 0xFF000000 | (r << 16) | (g << 8) | b
+    return 0
+
+
+def _open_ring(ring: list) -> np.ndarray:
+    arr = np.asarray(ring, np.float64).reshape(-1, 2)
+    return arr[:-1] if len(arr) > 1 and np.array_equal(arr[0], arr[-1]) else arr
+
+
+def _bounds(arr: np.ndarray) -> tuple[float, float, float, float]:
+    lo, hi = arr.min(axis=0), arr.max(axis=0)
+    return float(lo[0]), float(lo[1]), float(hi[0] - lo[0]), float(hi[1] - lo[1])
+
+
+def feature_to_roi(feature: dict[str, Any]) -> Roi:
+    geom = feature.get("geometry")
+    if not geom:
+        raise RoiFormatError("Invalid feature: missing geometry")
+    props = feature.get("properties") or {}
+    roi = Roi(type=POLYGON, name=props.get("name") or "Unnamed",
+              stroke_color=_parse_color(props.get("strokeColor")),
+              position=tuple(int(props.get(k) or 0) for k in ("c", "z", "t")))
+    gtype, coords = geom["type"], geom.get("coordinates")
+    if gtype in ("Point", "MultiPoint"):
+        roi.type, roi.coords = POINT, np.asarray(coords, np.float64).reshape(-1, 2)
+    elif gtype == "LineString":
+        roi.coords = np.asarray(coords, np.float64).reshape(-1, 2)
+        roi.type = LINE if len(roi.coords) == 2 else POLYLINE
+    elif gtype == "Polygon":
+        if not coords:
+            raise RoiFormatError("Polygon has no rings")
+        pts = _open_ring(coords[0])
+        box = _bounds(pts)
+        on_edges = (np.isin(pts[:, 0], (box[0], box[0] + box[2])).all()
+                    and np.isin(pts[:, 1], (box[1], box[1] + box[3])).all())
+        if props.get("shape") == "ellipse":
+            roi.type, roi.bounds = OVAL, box
+        elif len(pts) == 4 and on_edges:
+            roi.type, roi.bounds = RECT, box
+        else:
+            roi.coords = pts
+    elif gtype in ("MultiPolygon", "GeometryCollection"):
+        rings: list[np.ndarray] = []
+        if gtype == "MultiPolygon":
+            rings = [_open_ring(p[0]) for p in coords if p]
+        else:
+            for g in geom.get("geometries", []):
+                sub = feature_to_roi({"geometry": g})
+                rings.extend(sub.parts if sub.type == COMPOSITE else
+                             [_rect_ring(sub.bounds) if sub.type == RECT else sub.coords])
+        rings = [r for r in rings if len(r)]
+        if len(rings) == 1:
+            roi.coords = rings[0]
+        else:
+            roi.type, roi.parts = COMPOSITE, rings
+    else:
+        raise RoiFormatError(f"Unsupported geometry type: {gtype}")
+    if roi.type not in (RECT, OVAL):
+        roi.bounds = _bounds(np.vstack(roi.parts) if roi.type == COMPOSITE else roi.coords)
+    return roi
+
+
+def _rect_ring(bounds: tuple[float, float, float, float]) -> np.ndarray:
+    x, y, w, h = bounds
+    return np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], np.float64)
+
+
+# --- encoding ----------------------------------------------------------------
+
+def encode_roi(roi: Roi) -> bytes:
+    x, y, w, h = roi.bounds
+    left, top = math.floor(x), math.floor(y)
+    right, bottom = math.ceil(x + w), math.ceil(y + h)
+    rtype, options, n, shape_size = roi.type, 0, 0, 0
+    x1 = y1 = x2 = y2 = 0.0
+    body = b""
+    if roi.type == COMPOSITE:
+        rtype = RECT
+        segs = []
+        for part in roi.parts:
+            segs.append([SEG_MOVETO, *part[0]])
+            segs.extend([SEG_LINETO, *p] for p in part[1:])
+            segs.append([SEG_CLOSE])
+        flat = np.fromiter((v for s in segs for v in s), np.float64)
+        shape_size = len(flat)
+        body = flat.astype(">f4").tobytes()
+    elif roi.type in (RECT, OVAL):
+        if (x, y, w, h) != (left, top, right - left, bottom - top):
+            options |= SUB_PIXEL_RESOLUTION
+            x1, y1, x2, y2 = x, y, w, h
+    elif roi.type == LINE:
+        (x1, y1), (x2, y2) = roi.coords[:2].tolist()
+    else:
+        n = len(roi.coords)
+        rel = np.rint(roi.coords - (left, top))
+        body = rel.T.astype(">i2").tobytes()
+        if not np.array_equal(roi.coords, np.rint(roi.coords)):
+            options |= SUB_PIXEL_RESOLUTION
+            body += roi.coords.T.astype(">f4").tobytes()
+    hdr2 = HEADER.size + len(body)
+    name = (roi.name or "").encode("utf-16-be")
+    c, z, t = roi.position
+    stroke = roi.stroke_color - (1 << 32) if roi.stroke_color >= 1 << 31 else roi.stroke_color  # Java int
+    header = HEADER.pack(MAGIC, VERSION, rtype, top, left, bottom, right, n if n <= 0xFFFF else 0,
+                         x1, y1, x2, y2, 0, shape_size, stroke, 0, 0, options, 0, 0,
+                         roi.arc_size, z if not (c or t) else 0, hdr2)
+    if n > 0xFFFF:
+        header = header[:18] + struct.pack(">i", n) + header[22:]
+    header2 = HEADER2.pack(0, c, z, t, hdr2 + HEADER2_SIZE, len(name) // 2, 0, 0, 0, 0, 0, 0.0, 0, 0, 0)
+    return header + body + header2 + name
+
+
+def write_roiset(rois: list[Roi], path: str | Path) -> None:
+    """Write a RoiSet.zip; entry names are made unique like RoiManager does."""
+    seen: dict[str, int] = {}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, roi in enumerate(rois):
+            base = roi.name or f"{i + 1:04d}"
+            seen[base] = seen.get(base, 0) + 1
+            label = base if seen[base] == 1 else f"{base}-{seen[base]}"
+            zf.writestr(f"{label}.roi", encode_roi(roi))
+
+
+# --- self-test / bench -------------------------------------------------------
+
+def _synthetic(count: int, vertices: int, seed: int = 0) -> list[Roi]:
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(50, 4000, (count, 2))
+    radii = rng.uniform(4, 20, count)
+    a = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    rois = []
+    for i in range(count):
+        r = radii[i] * (1 + 0.2 * rng.standard_normal(vertices))
+        pts = np.rint(centres[i] + np.column_stack([r * np.cos(a), r * np.sin(a)]))
+        rois.append(Roi(type=TRACED, name=f"cell-{i:06d}", coords=pts, bounds=_bounds(pts)))
+    return rois
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    cases = [
+        {"type": "Feature", "properties": {"name": "box", "strokeColor": "#ff0000"},
+         "geometry": {"type": "Polygon", "coordinates": [[[10, 20], [40, 20], [40, 50], [10, 50], [10, 20]]]}},
+        {"type": "Feature", "properties": {"name": "cell", "z": 3},
+         "geometry": {"type": "Polygon", "coordinates": [[[1.5, 2], [9, 2.25], [5, 8], [1.5, 2]]]}},
+        {"type": "Feature", "properties": {"name": "nucleus", "shape": "ellipse"},
+         "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [30, 0], [30, 20], [0, 20], [0, 0]]]}},
+        {"type": "Feature", "properties": {"name": "trace"},
+         "geometry": {"type": "LineString", "coordinates": [[0, 0], [5, 5], [9, 2]]}},
+        {"type": "Feature", "properties": {"name": "ln"},
+         "geometry": {"type": "LineString", "coordinates": [[0.5, 0], [5, 5.5]]}},
+        {"type": "Feature", "properties": {"name": "pts"},
+         "geometry": {"type": "MultiPoint", "coordinates": [[1, 1], [2, 3]]}},
+        {"type": "Feature", "properties": {"name": "two"},
+         "geometry": {"type": "MultiPolygon", "coordinates": [[[[0, 0], [4, 0], [4, 4], [0, 0]]],
+                                                               [[[10, 10], [14, 10], [14, 14], [10, 10]]]]}},
+    ]
+    buf = io.BytesIO()
+    write_roiset([feature_to_roi(f) for f in cases], buf)
+    buf.seek(0)
+    with zipfile.ZipFile(buf) as zf:
+        rois = [decode_roi(zf.read(i), Path(i.filename).stem) for i in zf.infolist()]
+    out = rois_to_geojson(rois)["features"]
+    want_types = ["Polygon", "Polygon", "Polygon", "LineString", "LineString", "MultiPoint", "GeometryCollection"]
+    got_types = [f["geometry"]["type"] for f in out]
+    if got_types != want_types:
+        fails.append(f"geometry types {got_types}")
+    else:
+        if out[0]["geometry"] != cases[0]["geometry"] or out[0]["properties"].get("strokeColor") != "#ff0000" \
+                or out[0]["properties"]["type"] != "Rectangle":
+            fails.append(f"rectangle {out[0]}")
+        if out[1]["geometry"] != cases[1]["geometry"] or out[1]["properties"].get("z") != 3:
+            fails.append(f"sub-pixel polygon {out[1]}")
+        ring = np.array(out[2]["geometry"]["coordinates"][0])
+        if out[2]["properties"].get("shape") != "ellipse" or not np.allclose(_bounds(ring), (0, 0, 30, 20)):
+            fails.append(f"oval {out[2]['properties']} {_bounds(ring)}")
+        for k in (3, 4, 5):
+            if out[k]["geometry"]["coordinates"] != cases[k]["geometry"]["coordinates"]:
+                fails.append(f"{cases[k]['properties']['name']}: {out[k]['geometry']}")
+        if len(out[6]["geometry"]["geometries"]) != 2:
+            fails.append(f"composite {out[6]['geometry']}")
+    big = Roi(type=POLYGON, name="big", coords=np.column_stack([np.arange(70000) % 300, np.arange(70000) // 300])
+              .astype(np.float64))
+    big.bounds = _bounds(big.coords)
+    if not np.array_equal(decode_roi(encode_roi(big)).coords, big.coords):
+        fails.append("> 65535 vertices")
+    names = [r.name for r in rois]
+    if names[:2] != ["box", "cell"]:
+        fails.append(f"names {names}")
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("roi_codec self-test: PASS")
+    return True
+
+
+def bench(count: int, vertices: int) -> list[tuple[str, float]]:
+    rois = _synthetic(count, vertices)
+    buf = io.BytesIO()
+    t0 = time.perf_counter()
+    write_roiset(rois, buf)
+    t1 = time.perf_counter()
+    buf.seek(0)
+    with zipfile.ZipFile(buf) as zf:
+        decoded = [decode_roi(zf.read(i), Path(i.filename).stem) for i in zf.infolist()]
+    t2 = time.perf_counter()
+    text = json.dumps(rois_to_geojson(decoded, "RoiSet.zip"))
+    t3 = time.perf_counter()
+    return [("write RoiSet.zip", t1 - t0), ("read + decode", t2 - t1), ("GeoJSON", t3 - t2),
+            ("MB GeoJSON", len(text) / 1e6)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    t = sub.add_parser("to-geojson", help="Convert .roi / RoiSet.zip to a GeoJSON FeatureCollection")
+    t.add_argument("input")
+    t.add_argument("-o", "--output", help="Output file (default: stdout)")
+    t.add_argument("--no-properties", dest="properties", action="store_false")
+    f = sub.add_parser("from-geojson", help="Convert GeoJSON to RoiSet.zip (or .roi for one feature)")
+    f.add_argument("input")
+    f.add_argument("-o", "--output", required=True)
+    b = sub.add_parser("bench", help="Time a synthetic segmentation round trip")
+    b.add_argument("--rois", type=int, default=100000)
+    b.add_argument("--vertices", type=int, default=40)
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    try:
+        if args.cmd == "to-geojson":
+            rois = read_rois(args.input)
+            text = json.dumps(rois_to_geojson(rois, Path(args.input).name, args.properties))
+            if args.output:
+                Path(args.output).write_text(text, encoding="utf-8")
+                print(f"{len(rois)} ROIs -> {args.output}", file=sys.stderr)
+            else:
+                print(text)
+            return 0
+        if args.cmd == "from-geojson":
+            doc = json.loads(Path(args.input).read_text(encoding="utf-8"))
+            features = doc["features"] if doc.get("type") == "FeatureCollection" else [doc]
+            rois = [feature_to_roi(ft) for ft in features]
+            if args.output.endswith(".roi"):
+                if len(rois) != 1:
+                    raise RoiFormatError(f"{len(rois)} features need a .zip output")
+                Path(args.output).write_bytes(encode_roi(rois[0]))
+            else:
+                write_roiset(rois, args.output)
+            print(f"{len(rois)} features -> {args.output}", file=sys.stderr)
+            return 0
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.cmd == "bench":
+        print(f"{args.rois} ROIs x {args.vertices} vertices")
+        for label, v in bench(args.rois, args.vertices):
+            print(f"  {label:<18} {v:>8.2f}{'' if label.startswith('MB') else ' s'}")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
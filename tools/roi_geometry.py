@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""Simplify ROI outlines and build per-pyramid-level overlays.
+
+Freehand and traced ROIs, and ovals traced with vertices, come out of
+roiToGeoJson with a vertex every pixel or so. At the zoom levels where
+LazyImagePlus shows a downsampled pyramid level, most of those vertices
+fall inside one screen pixel. They still cost payload and draw time.
+
+  simplify_chains()   Douglas-Peucker over every ROI at once. Each pass
+                      splits all open segments of all outlines in one set
+                      of NumPy operations (np.maximum.reduceat over the
+                      concatenated points), so the number of passes is the
+                      depth of the split tree, not the number of ROIs.
+                      method="vw" uses Visvalingam-Whyatt instead: rounds
+                      that drop every vertex whose triangle area is a local
+                      minimum below tolerance**2.
+  simplify_geojson()  The same, applied to a FeatureCollection. Polygon
+                      rings (holes too), LineStrings and the parts of
+                      Multi*/GeometryCollection geometries are simplified.
+                      Points are left alone. Closed rings keep at least 4
+                      vertices.
+  build_lod()         One simplified FeatureCollection per pyramid level.
+                      The tolerance is tolerance_px screen pixels, times
+                      levelScaleFactor(L). LazyImagePlus.pickLevelFor shows
+                      level L at about one level-L pixel per screen pixel,
+                      so level L's overlay loses at most tolerance_px
+                      on screen. ROIs smaller than min_size_px at a level
+                      can be dropped there.
+
+Coordinates stay in level-0 pixels at every level, as LazyImageCanvas
+expects.
+
+Usage
+-----
+    python3 tools/roi_geometry.py --self-test
+    python3 tools/roi_geometry.py simplify rois.geojson|RoiSet.zip -o out.geojson [--tolerance 1] [--method dp|vw]
+    python3 tools/roi_geometry.py lod rois.geojson --pyramid out/slide.pyramid -o rois.lod/ [--tolerance-px 0.5]
+    python3 tools/roi_geometry.py bench [--rois 20000] [--vertices 400]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import roi_codec  # noqa: E402
+from build_pyramid import MANIFEST_NAME, PyramidReader  # noqa: E402
+
+LOD_MANIFEST = "lod.json"
+METHODS = ("dp", "vw")
+
+
+# --- Douglas-Peucker, all chains at once -------------------------------------
+
+def _segment_distance(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    ab = b - a
+    den = np.einsum("ij,ij->i", ab, ab)
+    t = np.einsum("ij,ij->i", p - a, ab) / np.where(den > 0, den, 1)
+    t = np.clip(np.where(den > 0, t, 0), 0, 1)
+    return np.hypot(*(p - a - t[:, None] * ab).T)
+
+
+def _farthest(x: np.ndarray, y: np.ndarray, s: np.ndarray, e: np.ndarray,
+              from_start: bool) -> tuple[np.ndarray, np.ndarray]:
+    """Per span (s, e) with interior points: max squared distance and the first index reaching it."""
+    inner = e - s - 1
+    offs = np.cumsum(inner) - inner
+    seg = np.repeat(np.arange(len(s)), inner)
+    idx = np.arange(inner.sum()) - np.repeat(offs - s - 1, inner)
+    ax, ay = np.repeat(x[s], inner), np.repeat(y[s], inner)
+    px, py = x[idx] - ax, y[idx] - ay
+    if not from_start:
+        dx, dy = x[e] - x[s], y[e] - y[s]
+        den = dx * dx + dy * dy
+        t = np.divide(px * np.repeat(dx, inner) + py * np.repeat(dy, inner), np.repeat(den, inner),
+                      out=np.zeros(len(idx)), where=np.repeat(den > 0, inner))
+        np.clip(t, 0, 1, out=t)
+        px -= t * np.repeat(dx, inner)
+        py -= t * np.repeat(dy, inner)
+    d = px * px + py * py
+    dmax = np.maximum.reduceat(d, offs)
+    far = np.minimum.reduceat(np.where(d == dmax[seg], idx, len(x)), offs)
+    return dmax, far
+
+
+def _dp_keep(xy: np.ndarray, starts: np.ndarray, ends: np.ndarray, closed: np.ndarray,
+             tolerance: float) -> np.ndarray:
+    """Keep-mask over concatenated chains; closed chains repeat their first point at `ends`."""
+    keep = np.zeros(len(xy), bool)
+    keep[starts] = keep[ends] = True
+    x, y = np.ascontiguousarray(xy[:, 0]), np.ascontiguousarray(xy[:, 1])
+    tol2 = tolerance * tolerance
+    s, e = starts, ends
+    ring = closed & (ends - starts > 1)
+    if ring.any():
+        # A ring's endpoints coincide: anchor on the point farthest from them
+        _, far = _farthest(x, y, starts[ring], ends[ring], from_start=True)
+        keep[far] = True
+        s = np.concatenate([starts[~ring], starts[ring], far])
+        e = np.concatenate([ends[~ring], far, ends[ring]])
+        # ... and on the farthest point of each half, so rings never collapse
+        m = e - s > 1
+        forced = np.zeros(len(s), bool)
+        forced[np.count_nonzero(~ring):] = True
+        forced &= m
+        if forced.any():
+            _, f2 = _farthest(x, y, s[forced], e[forced], from_start=False)
+            keep[f2] = True
+            s, e = np.concatenate([s[~forced], s[forced], f2]), np.concatenate([e[~forced], f2, e[forced]])
+    while True:
+        m = e - s > 1
+        s, e = s[m], e[m]
+        if not len(s):
+            return keep
+        dmax, far = _farthest(x, y, s, e, from_start=False)
+        split = dmax > tol2
+        far = far[split]
+        keep[far] = True
+        s, e = np.concatenate([s[split], far]), np.concatenate([far, e[split]])
+
+
+# --- Visvalingam-Whyatt ------------------------------------------------------
+
+def _vw_keep(x: np.ndarray, y: np.ndarray, starts: np.ndarray, lengths: np.ndarray, closed: np.ndarray,
+             tolerance: float) -> np.ndarray:
+    """Keep-mask over concatenated chains, closed ones without their closing vertex.
+
+    Vertices are a doubly linked list per chain (prev/nxt). Each round computes
+    every live vertex's triangle area and drops the strict local minima of
+    (area, index) below tolerance**2. Those minima are never adjacent, so
+    unlinking them all at once is safe.
+    """
+    n = len(x)
+    chain = np.repeat(np.arange(len(starts)), lengths)
+    last = starts + lengths - 1
+    prev, nxt = np.arange(n) - 1, np.arange(n) + 1
+    prev[starts] = np.where(closed, last, starts)
+    nxt[last] = np.where(closed, starts, last)
+    min_keep = np.where(closed, 3, 2)
+    alive = lengths.copy()
+    movable = np.ones(n, bool)
+    movable[starts[~closed]] = movable[last[~closed]] = False
+    active = np.flatnonzero(movable & (lengths > min_keep)[chain])
+    threshold = tolerance * tolerance
+    area = np.full(n, np.inf)
+    keep = np.ones(n, bool)
+    while active.size:
+        p, q = prev[active], nxt[active]
+        a = 0.5 * np.abs((x[p] - x[active]) * (y[q] - y[active]) - (x[q] - x[active]) * (y[p] - y[active]))
+        area[active] = a
+        ap, aq = area[p], area[q]
+        drop = ((a < threshold) & ((a < ap) | ((a == ap) & (active < p)))
+                & ((a < aq) | ((a == aq) & (active < q))))
+        cand = active[drop]
+        if not cand.size:
+            break
+        c = chain[cand]
+        rank = np.arange(len(cand)) - np.searchsorted(c, c)
+        cand = cand[rank < (alive - min_keep)[c]]
+        np.subtract.at(alive, chain[cand], 1)
+        keep[cand] = False
+        area[cand] = np.inf
+        nxt[prev[cand]] = nxt[cand]
+        prev[nxt[cand]] = prev[cand]
+        active = active[keep[active] & (alive > min_keep)[chain[active]]]
+    return keep
+
+
+# --- chains ------------------------------------------------------------------
+
+def simplify_chains(chains: list[np.ndarray], closed: list[bool], tolerance: float,
+                    method: str = "dp") -> list[np.ndarray]:
+    """Simplify (n, 2) vertex lists; closed chains are given without their closing vertex."""
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r} (expected one of {METHODS})")
+    if not chains:
+        return []
+    parts = [np.asarray(c, np.float64).reshape(-1, 2) for c in chains]
+    if method == "vw":
+        lengths = np.array([len(c) for c in parts])
+        xy = np.vstack(parts) if lengths.sum() else np.zeros((0, 2))
+        starts = np.cumsum(lengths) - lengths
+        nonempty = lengths > 0
+        keep = _vw_keep(np.ascontiguousarray(xy[:, 0]), np.ascontiguousarray(xy[:, 1]), starts[nonempty],
+                        lengths[nonempty], np.asarray(closed, bool)[nonempty], tolerance)
+        return [np.asarray(c)[keep[st:st + n]] for c, st, n in zip(chains, starts, lengths)]
+    # Closed chains get their first vertex repeated so a ring is a span like any other
+    parts = [np.vstack([c, c[:1]]) if cl and len(c) else c for c, cl in zip(parts, closed)]
+    lengths = np.array([len(c) for c in parts])
+    starts = np.cumsum(lengths) - lengths
+    nonempty = lengths > 0
+    xy = np.vstack(parts) if lengths.sum() else np.zeros((0, 2))
+    keep = _dp_keep(xy, starts[nonempty], (starts + lengths - 1)[nonempty],
+                    np.asarray(closed, bool)[nonempty], tolerance)
+    out = []
+    for c, cl, st, n in zip(chains, closed, starts, lengths):
+        k = keep[st:st + n]
+        out.append(np.asarray(c)[k[:-1] if cl and n else k])
+    return out
+
+
+def _collect(geometry: dict[str, Any], chains: list[np.ndarray], closed: list[bool]) -> None:
+    t, c = geometry.get("type"), geometry.get("coordinates")
+    if t == "LineString":
+        chains.append(np.asarray(c, np.float64).reshape(-1, 2))
+        closed.append(False)
+    elif t == "MultiLineString":
+        for line in c:
+            _collect({"type": "LineString", "coordinates": line}, chains, closed)
+    elif t == "Polygon":
+        for ring in c:
+            chains.append(roi_codec._open_ring(ring))
+            closed.append(True)
+    elif t == "MultiPolygon":
+        for poly in c:
+            _collect({"type": "Polygon", "coordinates": poly}, chains, closed)
+    elif t == "GeometryCollection":
+        for g in geometry.get("geometries", []):
+            _collect(g, chains, closed)
+
+
+def _rebuild(geometry: dict[str, Any], it: Iterator[np.ndarray]) -> dict[str, Any]:
+    t, c = geometry.get("type"), geometry.get("coordinates")
+    if t == "LineString":
+        return {"type": t, "coordinates": next(it).tolist()}
+    if t == "MultiLineString":
+        return {"type": t, "coordinates": [next(it).tolist() for _ in c]}
+    if t == "Polygon":
+        return {"type": t, "coordinates": [roi_codec._ring(next(it)) for _ in c]}
+    if t == "MultiPolygon":
+        return {"type": t, "coordinates": [[roi_codec._ring(next(it)) for _ in poly] for poly in c]}
+    if t == "GeometryCollection":
+        return {"type": t, "geometries": [_rebuild(g, it) for g in geometry.get("geometries", [])]}
+    return geometry
+
+
+def simplify_geojson(doc: dict[str, Any], tolerance: float, method: str = "dp",
+                     min_size: float = 0.0) -> dict[str, Any]:
+    """Simplified copy of a FeatureCollection; features whose bounds are under min_size are dropped."""
+    features = doc["features"] if doc.get("type") == "FeatureCollection" else [doc]
+    if min_size > 0:
+        features = [f for f in features if _extent(f.get("geometry") or {}) >= min_size]
+    chains: list[np.ndarray] = []
+    closed: list[bool] = []
+    for f in features:
+        _collect(f.get("geometry") or {}, chains, closed)
+    it = iter(simplify_chains(chains, closed, tolerance, method))
+    out = [{**f, "geometry": _rebuild(f["geometry"], it)} if f.get("geometry") else f for f in features]
+    return {"type": "FeatureCollection", "features": out}
+
+
+def _extent(geometry: dict[str, Any]) -> float:
+    chains: list[np.ndarray] = []
+    _collect(geometry, chains, [])
+    if not chains:
+        return np.inf  # points are never dropped
+    pts = np.vstack(chains)
+    return float((pts.max(axis=0) - pts.min(axis=0)).max()) if len(pts) else 0.0
+
+
+def vertex_count(doc: dict[str, Any]) -> int:
+    chains: list[np.ndarray] = []
+    for f in doc["features"]:
+        _collect(f.get("geometry") or {}, chains, [])
+    return sum(len(c) for c in chains)
+
+
+# --- levels of detail --------------------------------------------------------
+
+def pyramid_scale_factors(path: str | Path) -> list[float]:
+    """levelScaleFactor(L) for a build_pyramid.py output (directory, manifest.json or .ijtp)."""
+    path = Path(path)
+    if path.name == MANIFEST_NAME:
+        path = path.parent
+    levels = PyramidReader(path).manifest["levels"]
+    return [levels[0]["w"] / lv["w"] for lv in levels]
+
+
+def build_lod(doc: dict[str, Any], scale_factors: list[float], tolerance_px: float = 0.5,
+              method: str = "dp", min_size_px: float = 0.0) -> list[dict[str, Any]]:
+    """One simplified FeatureCollection per pyramid level, coordinates in level-0 pixels."""
+    return [simplify_geojson(doc, tolerance_px * sf, method, min_size_px * sf if min_size_px else 0.0)
+            for sf in scale_factors]
+
+
+def write_lod(levels: list[dict[str, Any]], scale_factors: list[float], out: Path,
+              tolerance_px: float, method: str) -> dict[str, Any]:
+    out.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, Any] = {"format": "imagej-roi-lod", "version": 1, "method": method,
+                                "tolerancePx": tolerance_px, "levels": []}
+    for level, (doc, sf) in enumerate(zip(levels, scale_factors)):
+        name = f"level-{level}.geojson"
+        text = json.dumps(doc, separators=(",", ":"))
+        (out / name).write_text(text, encoding="utf-8")
+        manifest["levels"].append({"level": level, "scaleFactor": sf, "tolerance": tolerance_px * sf,
+                                   "file": name, "features": len(doc["features"]),
+                                   "vertices": vertex_count(doc), "bytes": len(text)})
+    (out / LOD_MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def load_rois(path: str | Path) -> dict[str, Any]:
+    """FeatureCollection from GeoJSON, a .roi or a RoiSet.zip."""
+    path = Path(path)
+    if path.suffix.lower() in (".zip", ".roi"):
+        return roi_codec.rois_to_geojson(roi_codec.read_rois(path), path.name)
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# --- self-test / bench -------------------------------------------------------
+
+def _dp_reference(pts: np.ndarray, tolerance: float) -> np.ndarray:
+    keep = np.zeros(len(pts), bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        s, e = stack.pop()
+        if e - s < 2:
+            continue
+        d = _segment_distance(pts[s + 1:e], np.repeat(pts[s:s + 1], e - s - 1, 0), np.repeat(pts[e:e + 1], e - s - 1, 0))
+        i = int(np.argmax(d))
+        if d[i] > tolerance:
+            keep[s + 1 + i] = True
+            stack += [(s, s + 1 + i), (s + 1 + i, e)]
+    return keep
+
+
+def _max_deviation(orig: np.ndarray, simp: np.ndarray, closed: bool) -> float:
+    ring = np.vstack([simp, simp[:1]]) if closed else simp
+    a, b = ring[:-1], ring[1:]
+    return max(float(min(_segment_distance(np.repeat(p[None], len(a), 0), a, b))) for p in orig)
+
+
+def _synthetic(count: int, vertices: int, seed: int = 0) -> dict[str, Any]:
+    """Traced-mask-like cells: wobbly outlines snapped to the pixel grid, duplicates dropped."""
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(100, 20000, (count, 2))
+    a = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    feats = []
+    for i in range(count):
+        r = rng.uniform(10, 40) * (1 + 0.15 * np.sin(3 * a + i))
+        pts = np.rint(centres[i] + np.column_stack([r * np.cos(a), r * np.sin(a)]))
+        pts = pts[np.r_[True, np.any(pts[1:] != pts[:-1], axis=1)]]
+        feats.append({"type": "Feature", "properties": {"name": f"cell-{i:06d}", "type": "Traced"},
+                      "geometry": {"type": "Polygon", "coordinates": [roi_codec._ring(pts)]}})
+    return {"type": "FeatureCollection", "features": feats}
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    rng = np.random.default_rng(3)
+    lines = [np.cumsum(rng.standard_normal((n, 2)), axis=0) for n in (2, 3, 17, 200, 1)]
+    got = simplify_chains(lines, [False] * len(lines), 1.5)
+    for line, g in zip(lines, got):
+        want = line[_dp_reference(line, 1.5)] if len(line) > 1 else line
+        if not np.array_equal(g, want):
+            fails.append(f"DP differs from reference on {len(line)} points: {len(g)} vs {len(want)}")
+    straight = np.column_stack([np.arange(50.0), np.arange(50.0) * 2])
+    if len(simplify_chains([straight], [False], 0.01)[0]) != 2:
+        fails.append("collinear points were kept")
+    a = np.linspace(0, 2 * np.pi, 1000, endpoint=False)
+    circle = 100 + 80 * np.column_stack([np.cos(a), np.sin(a)])
+    for method in METHODS:
+        simp = simplify_chains([circle], [True], 0.5, method)[0]
+        dev = _max_deviation(circle, simp, True)
+        if not 4 <= len(simp) < (100 if method == "dp" else 200):  # tolerance**2 area is the gentler cut
+            fails.append(f"{method}: circle kept {len(simp)} of 1000 vertices")
+        if method == "dp" and dev > 0.5 + 1e-9:
+            fails.append(f"dp: deviation {dev:.3f} > tolerance")
+        if method == "vw" and dev > 2.0:
+            fails.append(f"vw: deviation {dev:.3f}")
+    wobbly = [circle + rng.standard_normal(circle.shape), lines[3], circle[::7] * 0.3]
+    for method in METHODS:
+        together = simplify_chains(wobbly, [True, False, True], 0.8, method)
+        alone = [simplify_chains([c], [cl], 0.8, method)[0] for c, cl in zip(wobbly, [True, False, True])]
+        if not all(np.array_equal(a, b) for a, b in zip(together, alone)):
+            fails.append(f"{method}: chains simplified together differ from one at a time")
+    tiny = simplify_chains([circle[::250]], [True], 1e6)[0]
+    if len(tiny) < 3:
+        fails.append(f"ring collapsed to {len(tiny)} vertices")
+    doc = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"name": "donut"},
+         "geometry": {"type": "Polygon", "coordinates": [roi_codec._ring(circle), roi_codec._ring(circle[::-1] * 0.5 + 50)]}},
+        {"type": "Feature", "properties": {"name": "pt"}, "geometry": {"type": "Point", "coordinates": [1, 2]}},
+        {"type": "Feature", "properties": {"name": "gc"}, "geometry": {"type": "GeometryCollection", "geometries": [
+            {"type": "Polygon", "coordinates": [roi_codec._ring(circle + 500)]},
+            {"type": "LineString", "coordinates": straight.tolist()}]}},
+    ]}
+    out = simplify_geojson(doc, 0.5)
+    ring0, hole = out["features"][0]["geometry"]["coordinates"]
+    if ring0[0] != ring0[-1] or hole[0] != hole[-1] or len(ring0) >= 1001:
+        fails.append("polygon rings not simplified and closed")
+    if out["features"][1]["geometry"] != doc["features"][1]["geometry"]:
+        fails.append("point changed")
+    if [g["type"] for g in out["features"][2]["geometry"]["geometries"]] != ["Polygon", "LineString"]:
+        fails.append("geometry collection structure")
+    if out["features"][0]["properties"] != {"name": "donut"}:
+        fails.append("properties lost")
+    levels = build_lod(_synthetic(50, 300), [1, 2, 4, 8, 16], 0.5, min_size_px=4)
+    counts = [vertex_count(lv) for lv in levels]
+    if counts != sorted(counts, reverse=True) or counts[0] >= 50 * 300:
+        fails.append(f"LOD vertex counts {counts}")
+    if len(levels[-1]["features"]) >= 50 or len(levels[0]["features"]) != 50:
+        fails.append(f"min_size_px kept {[len(lv['features']) for lv in levels]}")
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("roi_geometry self-test: PASS")
+    return True
+
+
+def bench(count: int, vertices: int, tolerance: float) -> list[tuple[str, float, int, int]]:
+    doc = _synthetic(count, vertices)
+    rows = [("original", 0.0, vertex_count(doc), len(json.dumps(doc, separators=(",", ":"))))]
+    for method in METHODS:
+        for sf in (1, 4, 16):
+            t0 = time.perf_counter()
+            out = simplify_geojson(doc, tolerance * sf, method)
+            dt = time.perf_counter() - t0
+            rows.append((f"{method} level x{sf}", dt, vertex_count(out),
+                         len(json.dumps(out, separators=(",", ":")))))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    s = sub.add_parser("simplify", help="Simplify a GeoJSON file or RoiSet.zip")
+    s.add_argument("input")
+    s.add_argument("-o", "--output", required=True)
+    s.add_argument("--tolerance", type=float, default=1.0, help="Max deviation in pixels (dp) or sqrt of area (vw)")
+    s.add_argument("--method", choices=METHODS, default="dp")
+    lo = sub.add_parser("lod", help="Write one simplified GeoJSON per pyramid level plus lod.json")
+    lo.add_argument("input")
+    lo.add_argument("-o", "--output", required=True, help="Output directory")
+    g = lo.add_mutually_exclusive_group(required=True)
+    g.add_argument("--pyramid", help="build_pyramid.py output (directory or .ijtp) to take levels from")
+    g.add_argument("--levels", type=int, help="Assume N levels with scale factors 1, 2, 4, ...")
+    lo.add_argument("--tolerance-px", type=float, default=0.5, help="Max deviation in screen pixels")
+    lo.add_argument("--min-size-px", type=float, default=0.0, help="Drop ROIs smaller than this on screen")
+    lo.add_argument("--method", choices=METHODS, default="dp")
+    b = sub.add_parser("bench", help="Simplify a synthetic dense segmentation")
+    b.add_argument("--rois", type=int, default=20000)
+    b.add_argument("--vertices", type=int, default=400)
+    b.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    try:
+        if args.cmd == "simplify":
+            doc = load_rois(args.input)
+            out = simplify_geojson(doc, args.tolerance, args.method)
+            Path(args.output).write_text(json.dumps(out, separators=(",", ":")), encoding="utf-8")
+            print(f"{len(out['features'])} features: {vertex_count(doc)} -> {vertex_count(out)} vertices")
+            return 0
+        if args.cmd == "lod":
+            doc = load_rois(args.input)
+            factors = pyramid_scale_factors(args.pyramid) if args.pyramid else [2.0 ** i for i in range(args.levels)]
+            levels = build_lod(doc, factors, args.tolerance_px, args.method, args.min_size_px)
+            manifest = write_lod(levels, factors, Path(args.output), args.tolerance_px, args.method)
+            for lv in manifest["levels"]:
+                print(f"  level {lv['level']}  x{lv['scaleFactor']:<6g} {lv['features']:>8} features "
+                      f"{lv['vertices']:>10} vertices {lv['bytes'] / 1e6:>8.2f} MB")
+            return 0
+    except (OSError, KeyError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.cmd == "bench":
+        print(f"{args.rois} traced ROIs, tolerance {args.tolerance:g} px x level scale factor")
+        for label, dt, nv, nb in bench(args.rois, args.vertices, args.tolerance):
+            print(f"  {label:<14} {dt:>6.2f} s {nv:>10} vertices {nb / 1e6:>8.2f} MB")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Grid spatial index over ROI bounding boxes, for viewport queries.
+
+A LazyImagePlus overlay with 100k+ ROIs makes every repaint visit every
+ROI. This module buckets ROI bounds into a uniform grid. The cell size is
+chosen so that a typical ROI touches about one cell, with no more cells
+than ROIs. ROIs that would span
+more than LARGE_CELLS cells go on a short list that every query tests.
+The index serialises to a compact little-endian .ijri file (layout in
+com.hack.viewer.RoiIndex). The file embeds the ROIs themselves as a
+RoiPacker buffer (see roi_packed.py), so one upload gives the page both
+the overlay and the index:
+
+    python3 tools/roi_index.py build cells.geojson -o cells.ijri
+    python3 tools/roi_index.py attach cells.ijri --service-id <workspace>/<id>
+
+attachRoiIndex turns the ROIs into the image overlay. LazyImageCanvas
+then draws only RoiIndex.query(srcRect), so repaint cost follows the ROIs
+on screen rather than the total. GridIndex.query() is the NumPy
+equivalent, for the self-test and for Python-side viewport culling.
+
+Usage
+-----
+    python3 tools/roi_index.py --self-test
+    python3 tools/roi_index.py build rois.geojson|RoiSet.zip -o rois.ijri [--cell-size PX] [--no-rois]
+    python3 tools/roi_index.py query rois.ijri X Y W H
+    python3 tools/roi_index.py attach rois.ijri --service-id <workspace>/<id> [--title T]
+    python3 tools/roi_index.py bench [--rois 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import roi_codec  # noqa: E402
+from imagej_client import HyphaTransport, ImageJClient  # noqa: E402
+from roi_packed import pack_rois  # noqa: E402
+
+MAGIC = b"IJRI"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIIffffI")  # RoiIndex.HEADER_BYTES
+LARGE_CELLS = 64
+MAX_CELLS = 1 << 22
+
+
+class IndexFormatError(ValueError):
+    pass
+
+
+@dataclass
+class GridIndex:
+    bounds: np.ndarray  # (R, 4) float32 minX, minY, maxX, maxY
+    origin: tuple[float, float]
+    cell: tuple[float, float]
+    shape: tuple[int, int]  # rows, cols
+    cell_start: np.ndarray  # (rows * cols + 1,) uint32
+    items: np.ndarray  # (M,) uint32
+    large: np.ndarray  # (L,) uint32
+    packed: bytes = b""
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def query(self, x: float, y: float, w: float, h: float) -> np.ndarray:
+        """Ascending ids of ROIs whose bounds intersect [x, x + w] x [y, y + h]."""
+        rows, cols = self.shape
+        (ox, oy), (cw, ch) = self.origin, self.cell
+        c0, c1 = np.clip(np.floor([(x - ox) / cw, (x + w - ox) / cw]).astype(int), 0, cols - 1)
+        r0, r1 = np.clip(np.floor([(y - oy) / ch, (y + h - oy) / ch]).astype(int), 0, rows - 1)
+        cells = (np.arange(r0, r1 + 1)[:, None] * cols + np.arange(c0, c1 + 1)).ravel()
+        lo = self.cell_start[cells].astype(np.int64)
+        hi = self.cell_start[cells + 1].astype(np.int64)
+        n = hi - lo
+        take = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n - lo, n)
+        ids = np.unique(np.concatenate([self.items[take], self.large]))
+        b = self.bounds[ids]
+        hit = (b[:, 0] <= x + w) & (b[:, 2] >= x) & (b[:, 1] <= y + h) & (b[:, 3] >= y)
+        return ids[hit]
+
+    def to_bytes(self) -> bytes:
+        rows, cols = self.shape
+        header = HEADER.pack(MAGIC, VERSION, 0, len(self), cols, rows, len(self.items), len(self.large),
+                             *self.origin, *self.cell, len(self.packed))
+        return b"".join([header, self.bounds.astype("<f4").tobytes(), self.cell_start.astype("<u4").tobytes(),
+                         self.items.astype("<u4").tobytes(), self.large.astype("<u4").tobytes(), self.packed])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> GridIndex:
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise IndexFormatError("not a RoiIndex file")
+        _, version, _, r, cols, rows, m, n_large, ox, oy, cw, ch, packed_len = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise IndexFormatError(f"unsupported RoiIndex version {version}")
+        off = HEADER.size
+        need = off + 4 * (4 * r + rows * cols + 1 + m + n_large) + packed_len
+        if need != len(data):
+            raise IndexFormatError(f"RoiIndex file is {len(data)} bytes, header says {need}")
+        arrays = []
+        for dtype, count in (("<f4", 4 * r), ("<u4", rows * cols + 1), ("<u4", m), ("<u4", n_large)):
+            arrays.append(np.frombuffer(data, dtype, count, off))
+            off += arrays[-1].nbytes
+        return cls(arrays[0].reshape(r, 4), (ox, oy), (cw, ch), (rows, cols), arrays[1], arrays[2], arrays[3],
+                   bytes(data[off:]))
+
+
+def build_index(bounds: np.ndarray, cell_size: float | None = None, packed: bytes = b"") -> GridIndex:
+    """Index (R, 4) minX, minY, maxX, maxY boxes.
+
+    cell_size defaults to twice the median ROI extent, grown if needed so
+    that there are no more cells than ROIs.
+    """
+    bounds = np.asarray(bounds, np.float32).reshape(-1, 4)
+    if not len(bounds):
+        return GridIndex(bounds, (0.0, 0.0), (1.0, 1.0), (1, 1), np.zeros(2, np.uint32),
+                         np.zeros(0, np.uint32), np.zeros(0, np.uint32), packed)
+    lo, hi = bounds[:, :2].min(axis=0), bounds[:, 2:].max(axis=0)
+    span = np.maximum(hi - lo, 1.0)
+    extent = np.maximum(bounds[:, 2:] - bounds[:, :2], 1.0)
+    cell = float(cell_size or 2 * np.median(extent.max(axis=1)))
+    cell = max(cell, float(np.sqrt(span[0] * span[1] / min(len(bounds), MAX_CELLS))))
+    cell = float(np.float32(cell))  # the header stores f32; bin exactly as RoiIndex.query will
+    cols, rows = (int(v) for v in np.ceil(span / cell).astype(int) + 1)
+    b64, lo64 = bounds.astype(np.float64), lo.astype(np.float64)
+    c0, r0 = np.floor((b64[:, :2] - lo64) / cell).astype(np.int64).T
+    c1, r1 = np.floor((b64[:, 2:] - lo64) / cell).astype(np.int64).T
+    nx, ny = c1 - c0 + 1, r1 - r0 + 1
+    count = nx * ny
+    is_large = count > LARGE_CELLS
+    ids = np.flatnonzero(~is_large)
+    k = count[ids]
+    rep = np.repeat(ids, k)
+    j = np.arange(k.sum()) - np.repeat(np.cumsum(k) - k, k)  # position within each ROI's cell block
+    cells = (r0[rep] + j // nx[rep]) * cols + c0[rep] + j % nx[rep]
+    order = np.lexsort((rep, cells))
+    cell_start = np.zeros(rows * cols + 1, np.uint32)
+    cell_start[1:] = np.cumsum(np.bincount(cells, minlength=rows * cols))
+    return GridIndex(bounds, (float(lo[0]), float(lo[1])), (cell, cell), (rows, cols), cell_start,
+                     rep[order].astype(np.uint32), np.flatnonzero(is_large).astype(np.uint32), packed)
+
+
+def rois_bounds(rois: list[roi_codec.Roi]) -> np.ndarray:
+    return np.array([(x, y, x + w, y + h) for x, y, w, h in (r.bounds for r in rois)], np.float32).reshape(-1, 4)
+
+
+def load_rois(path: str | Path) -> list[roi_codec.Roi]:
+    """roi_codec ROIs from GeoJSON, a .roi or a RoiSet.zip."""
+    path = Path(path)
+    if path.suffix.lower() in (".zip", ".roi"):
+        return roi_codec.read_rois(path)
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    features = doc["features"] if doc.get("type") == "FeatureCollection" else [doc]
+    return [roi_codec.feature_to_roi(f) for f in features]
+
+
+def index_rois(rois: list[roi_codec.Roi], cell_size: float | None = None, embed: bool = True) -> GridIndex:
+    return build_index(rois_bounds(rois), cell_size, pack_rois(rois, oval_outline=False) if embed else b"")
+
+
+# --- self-test / bench -------------------------------------------------------
+
+def _synthetic_bounds(count: int, size: float = 100_000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, size, (count, 2))
+    wh = rng.lognormal(3, 0.4, (count, 2))
+    out = np.hstack([xy, xy + wh])
+    out[:3] = [[0, 0, size, 40], [10, 10, 20, 20], [size / 2, 0, size / 2 + 30, size]]  # large and tiny
+    return out.astype(np.float32)
+
+
+def _brute(bounds: np.ndarray, x: float, y: float, w: float, h: float) -> np.ndarray:
+    return np.flatnonzero((bounds[:, 0] <= x + w) & (bounds[:, 2] >= x) & (bounds[:, 1] <= y + h) & (bounds[:, 3] >= y))
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    bounds = _synthetic_bounds(5000, 10_000)
+    index = build_index(bounds)
+    if len(index.large) < 2:
+        fails.append(f"{len(index.large)} large ROIs")
+    back = GridIndex.from_bytes(index.to_bytes())
+    rng = np.random.default_rng(1)
+    views = [(rng.uniform(-500, 10_000), rng.uniform(-500, 10_000), rng.uniform(1, 3000), rng.uniform(1, 3000))
+             for _ in range(200)] + [(-1e6, -1e6, 1, 1), (0, 0, 1e5, 1e5), (5000, 5000, 0, 0)]
+    for v in views:
+        want = _brute(bounds, *v)
+        for label, idx in (("built", index), ("loaded", back)):
+            got = idx.query(*v)
+            if not np.array_equal(got, want):
+                fails.append(f"{label} query {v}: {len(got)} ids, brute force {len(want)}")
+                break
+    rois = [roi_codec.feature_to_roi(f) for f in [
+        {"type": "Feature", "properties": {"name": "a"},
+         "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]}},
+        {"type": "Feature", "properties": {"name": "b", "shape": "ellipse"},
+         "geometry": {"type": "Polygon", "coordinates": [[[50, 50], [70, 50], [70, 60], [50, 60], [50, 50]]]}},
+        {"type": "Feature", "properties": {"name": "c"}, "geometry": {"type": "Point", "coordinates": [200, 5]}},
+    ]]
+    small = GridIndex.from_bytes(index_rois(rois).to_bytes())
+    if small.query(45, 45, 10, 10).tolist() != [1] or small.query(0, 0, 300, 300).tolist() != [0, 1, 2]:
+        fails.append(f"small index {small.query(0, 0, 300, 300)}")
+    if not small.packed.startswith(b"IJRP"):
+        fails.append("ROIs not embedded")
+    try:
+        GridIndex.from_bytes(index.to_bytes()[:-4])
+        fails.append("truncated index accepted")
+    except IndexFormatError:
+        pass
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("roi_index self-test: PASS")
+    return True
+
+
+def bench(count: int, size: float, view: float, queries: int = 200) -> list[tuple[str, float]]:
+    bounds = _synthetic_bounds(count, size)
+    t0 = time.perf_counter()
+    index = build_index(bounds)
+    t1 = time.perf_counter()
+    data = index.to_bytes()
+    rng = np.random.default_rng(2)
+    views = [(rng.uniform(0, size - view), rng.uniform(0, size - view), view, view) for _ in range(queries)]
+    t2 = time.perf_counter()
+    hits = sum(len(index.query(*v)) for v in views)
+    t3 = time.perf_counter()
+    for v in views[:20]:
+        _brute(bounds, *v)
+    t4 = time.perf_counter()
+    return [("build (s)", t1 - t0), ("index MB", len(data) / 1e6), ("grid cells", index.shape[0] * index.shape[1]),
+            ("visible ROIs / view", hits / queries), ("query (ms)", (t3 - t2) / queries * 1e3),
+            ("brute force (ms)", (t4 - t3) / 20 * 1e3)]
+
+
+async def _attach(args: argparse.Namespace) -> int:
+    data = Path(args.index).read_bytes()
+    GridIndex.from_bytes(data)  # fail early on a bad file
+    client = ImageJClient(await HyphaTransport.connect(args.service_id, args.server_url))
+    res = await client.attachRoiIndex(index=data, windowTitle=args.title)
+    if not res.get("success"):
+        raise RuntimeError(res.get("error", "attach failed"))
+    print(f"attached {res['count']} ROIs ({'indexed repaint' if res.get('indexed') else 'plain overlay'})")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    b = sub.add_parser("build", help="Index a GeoJSON file or RoiSet.zip")
+    b.add_argument("input")
+    b.add_argument("-o", "--output", required=True)
+    b.add_argument("--cell-size", type=float, help="Grid cell size in pixels (default: 2x median ROI extent, at most one cell per ROI)")
+    b.add_argument("--no-rois", dest="embed", action="store_false", help="Store bounds only, not the ROIs")
+    q = sub.add_parser("query", help="List ROI ids intersecting a viewport")
+    q.add_argument("index")
+    q.add_argument("viewport", type=float, nargs=4, metavar=("X", "Y", "W", "H"))
+    a = sub.add_parser("attach", help="Send an index to a live service as the image overlay")
+    a.add_argument("index")
+    a.add_argument("--service-id", required=True)
+    a.add_argument("--server-url", default="https://hypha.aicell.io")
+    a.add_argument("--title", help="Image title (default: the active image)")
+    be = sub.add_parser("bench", help="Build and query a synthetic whole-slide ROI set")
+    be.add_argument("--rois", type=int, default=200_000)
+    be.add_argument("--size", type=float, default=100_000, help="Slide edge in pixels")
+    be.add_argument("--view", type=float, default=2_000, help="Viewport edge in pixels")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    try:
+        if args.cmd == "build":
+            rois = load_rois(args.input)
+            index = index_rois(rois, args.cell_size, args.embed)
+            data = index.to_bytes()
+            Path(args.output).write_bytes(data)
+            print(f"{len(index)} ROIs, {index.shape[1]}x{index.shape[0]} cells of {index.cell[0]:.0f} px, "
+                  f"{len(index.large)} large, {len(data) / 1e6:.2f} MB -> {args.output}")
+            return 0
+        if args.cmd == "query":
+            ids = GridIndex.from_bytes(Path(args.index).read_bytes()).query(*args.viewport)
+            print(json.dumps(ids.tolist()))
+            return 0
+        if args.cmd == "attach":
+            return asyncio.run(_attach(args))
+    except (OSError, KeyError, ValueError, RuntimeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    if args.cmd == "bench":
+        print(f"{args.rois} ROIs on a {args.size:.0f} px slide, {args.view:.0f} px viewport")
+        for label, v in bench(args.rois, args.size, args.view):
+            print(f"  {label:<20} {v:>10.2f}")
+        return 0
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Packed ROI transfer: `getRoisAsGeoJson(format="packed")` and `ingestRoisPacked`.
+
+The default getRoisAsGeoJson path walks the ROI Manager from JS. Each ROI
+and each vertex is an awaited CheerpJ call, so 20k cell outlines take
+minutes. com.hack.ij.RoiPacker (threadhack/java) serialises every ROI in
+one JVM call into a little-endian buffer. The buffer holds the ROI type
+codes, part and point offsets, float32 coordinates, stroke colours, c/z/t
+positions and UTF-8 names; see RoiPacker.java for the exact layout. The
+page decodes the same buffer for format "geojson". With format "packed",
+the bytes come over msgpack unchanged and this module decodes them:
+
+  decode_packed()   zero-copy NumPy views over the buffer
+  to_geojson()      the FeatureCollection the page returns, including
+                    strokeColor and c/z/t properties as in roi_codec.py
+  to_rois()         roi_codec.Roi objects, e.g. to write a RoiSet.zip
+
+Import runs the same layout the other way. setRoisFromGeoJson builds
+each ROI with several bridge calls. ingest_features() converts features
+with roi_codec.feature_to_roi (the geoJsonToRoi mapping) and packs them
+with pack_rois(), the Python twin of RoiPacker. It then sends chunks of
+chunk_rois to ingestRoisPacked. RoiPacker.ingest turns each chunk into
+ROIs inside the JVM, and the final call adds them all to the ROI Manager
+while its window is hidden.
+
+Usage
+-----
+    python3 tools/roi_packed.py --self-test
+    python3 tools/roi_packed.py bench [--rois 20000] [--vertices 40]
+    python3 tools/roi_packed.py export --service-id <workspace>/<id> [--source manager] -o rois.geojson|rois.npz|RoiSet.zip
+    python3 tools/roi_packed.py ingest --service-id <workspace>/<id> rois.geojson [--chunk-rois 5000] [--clear]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import struct
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import roi_codec  # noqa: E402
+from imagej_client import HyphaTransport, ImageJClient  # noqa: E402
+
+MAGIC = b"IJRP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIII8x")  # RoiPacker.HEADER_BYTES
+SOURCE_CURRENT, SOURCE_MANAGER = 0, 1
+
+# Roi.getType() codes (ij.gui.Roi constants); these differ from the .roi file codes
+RECTANGLE, OVAL, POLYGON, FREEROI, TRACED_ROI, LINE, POLYLINE, FREELINE, ANGLE, COMPOSITE, POINT = range(11)
+TYPE_NAMES = ["Rectangle", "Oval", "Polygon", "Freehand", "Traced", "Straight Line",
+              "Polyline", "Freeline", "Angle", "Composite", "Point"]
+OPEN_TYPES = frozenset({LINE, POLYLINE, FREELINE, ANGLE})
+# Roi.getType() -> roi_codec file type code
+FILE_TYPES = {RECTANGLE: roi_codec.RECT, OVAL: roi_codec.OVAL, POLYGON: roi_codec.POLYGON,
+              FREEROI: roi_codec.FREEHAND, TRACED_ROI: roi_codec.TRACED, LINE: roi_codec.LINE,
+              POLYLINE: roi_codec.POLYLINE, FREELINE: roi_codec.FREELINE, ANGLE: roi_codec.ANGLE,
+              COMPOSITE: roi_codec.COMPOSITE, POINT: roi_codec.POINT}
+JAVA_TYPES = {v: k for k, v in FILE_TYPES.items()}
+SERVICE_JS = Path(__file__).resolve().parent.parent / "hypha-imagej-service.js"
+
+
+class PackedFormatError(ValueError):
+    pass
+
+
+@dataclass
+class PackedRois:
+    """Column views over one RoiPacker buffer; ROI i owns parts part_start[i]:part_start[i + 1]."""
+
+    part_start: np.ndarray  # (R + 1,) uint32
+    point_start: np.ndarray  # (P + 1,) uint32
+    stroke: np.ndarray  # (R,) int32 ARGB, 0 = none
+    position: np.ndarray  # (R, 3) int32 c, z, t
+    name_start: np.ndarray  # (R + 1,) uint32
+    coords: np.ndarray  # (N, 2) float32
+    types: np.ndarray  # (R,) uint8 Roi.getType()
+    sources: np.ndarray  # (R,) uint8
+    name_bytes: memoryview
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def name(self, i: int) -> str:
+        return bytes(self.name_bytes[self.name_start[i]:self.name_start[i + 1]]).decode("utf-8")
+
+    def parts(self, i: int) -> list[np.ndarray]:
+        """ROI i's vertex lists as (n, 2) views into coords."""
+        ps = self.point_start
+        return [self.coords[ps[j]:ps[j + 1]] for j in range(self.part_start[i], self.part_start[i + 1])]
+
+
+def decode_packed(buf: bytes | bytearray | memoryview) -> PackedRois:
+    mv = memoryview(buf).cast("B")
+    if len(mv) < HEADER.size or bytes(mv[:4]) != MAGIC:
+        raise PackedFormatError("not a RoiPacker buffer")
+    _, version, _flags, r, p, n, name_len = HEADER.unpack_from(mv)
+    if version != VERSION:
+        raise PackedFormatError(f"unsupported RoiPacker version {version}")
+    off = HEADER.size
+
+    def take(dtype: str, count: int) -> np.ndarray:
+        nonlocal off
+        arr = np.frombuffer(mv, dtype, count, off)
+        off += arr.nbytes
+        return arr
+
+    try:
+        packed = PackedRois(part_start=take("<u4", r + 1), point_start=take("<u4", p + 1),
+                            stroke=take("<i4", r), position=take("<i4", 3 * r).reshape(r, 3),
+                            name_start=take("<u4", r + 1), coords=take("<f4", 2 * n).reshape(n, 2),
+                            types=take("u1", r), sources=take("u1", r), name_bytes=mv[off:off + name_len])
+    except ValueError as e:
+        raise PackedFormatError(f"truncated RoiPacker buffer: {e}") from e
+    if len(packed.name_bytes) != name_len or packed.part_start[-1] != p or packed.point_start[-1] != n:
+        raise PackedFormatError("RoiPacker offsets do not match the header")
+    return packed
+
+
+def _closed(pts: list[list[float]]) -> list[list[float]]:
+    if pts and pts[0] != pts[-1]:
+        pts.append(pts[0])
+    return pts
+
+
+def to_features(packed: PackedRois, include_properties: bool = True) -> list[dict[str, Any]]:
+    """Mirror of packedRoisToFeatures in hypha-imagej-service.js."""
+    xy = packed.coords.tolist()  # one conversion; float32 -> float as in JS
+    ps, ss = packed.point_start.tolist(), packed.part_start.tolist()
+    features, manager_index = [], 0
+    for i, (t, src) in enumerate(zip(packed.types.tolist(), packed.sources.tolist())):
+        first = ss[i]
+        if t == POINT:
+            pts = xy[ps[first]:ps[first + 1]]
+            geometry = {"type": "Point", "coordinates": pts[0]} if len(pts) == 1 else \
+                {"type": "MultiPoint", "coordinates": pts}
+        elif t in OPEN_TYPES:
+            geometry = {"type": "LineString", "coordinates": xy[ps[first]:ps[first + 1]]}
+        elif t == COMPOSITE:
+            geometry = {"type": "GeometryCollection",
+                        "geometries": [{"type": "Polygon", "coordinates": [_closed(xy[ps[j]:ps[j + 1]])]}
+                                       for j in range(first, ss[i + 1])]}
+        else:
+            geometry = {"type": "Polygon", "coordinates": [_closed(xy[ps[first]:ps[first + 1]])]}
+        props: dict[str, Any] = {}
+        if include_properties:
+            props = {"name": packed.name(i) or "Unnamed", "type": TYPE_NAMES[t] if t < len(TYPE_NAMES) else "Unknown"}
+            if t == OVAL:
+                props["shape"] = "ellipse"
+            if src == SOURCE_MANAGER:
+                props["index"] = manager_index
+                props["source"] = "ROI Manager"
+            if packed.stroke[i]:
+                props["strokeColor"] = f"#{int(packed.stroke[i]) & 0xFFFFFF:06x}"
+            for key, v in zip(("c", "z", "t"), packed.position[i].tolist()):
+                if v:
+                    props[key] = v
+        if src == SOURCE_MANAGER:
+            manager_index += 1
+        features.append({"type": "Feature", "geometry": geometry, "properties": props})
+    return features
+
+
+def to_geojson(packed: PackedRois, include_properties: bool = True) -> dict[str, Any]:
+    return {"type": "FeatureCollection", "features": to_features(packed, include_properties)}
+
+
+def to_rois(packed: PackedRois) -> list[roi_codec.Roi]:
+    """roi_codec.Roi per packed ROI; rounded rectangles become polygons of their outline."""
+    out = []
+    for i in range(len(packed)):
+        t, parts = int(packed.types[i]), [p.astype(np.float64) for p in packed.parts(i)]
+        coords = parts[0] if parts else np.zeros((0, 2))
+        ftype = FILE_TYPES.get(t, roi_codec.POLYGON)
+        if t == RECTANGLE and len(coords) != 4:
+            ftype = roi_codec.POLYGON
+        bounds = roi_codec._bounds(np.vstack(parts)) if parts and len(np.vstack(parts)) else (0, 0, 0, 0)
+        out.append(roi_codec.Roi(type=ftype, name=packed.name(i), bounds=bounds, coords=coords,
+                                 parts=parts if t == COMPOSITE else [],
+                                 stroke_color=int(packed.stroke[i]) & 0xFFFFFFFF,
+                                 position=tuple(packed.position[i].tolist())))
+    return out
+
+
+def pack_rois(rois: list[roi_codec.Roi], sources: list[int] | None = None, oval_outline: bool = True) -> bytes:
+    """Python twin of RoiPacker.pack(): the same bytes for the same vertex lists.
+
+    RoiPacker.unpack() rebuilds ovals from their bounds, so ingest passes
+    oval_outline=False and sends the 4-corner bounds ring instead.
+    """
+    sources = sources or [SOURCE_MANAGER] * len(rois)
+    types, parts, part_start = [], [], [0]
+    for roi in rois:
+        types.append(JAVA_TYPES[roi.type])
+        if roi.type == roi_codec.COMPOSITE:
+            parts += roi.parts
+        elif roi.type == roi_codec.RECT and not roi.arc_size:
+            parts.append(roi_codec._rect_ring(roi.bounds))
+        elif roi.type == roi_codec.OVAL:
+            parts.append(roi_codec._ellipse(*roi.bounds) if oval_outline else roi_codec._rect_ring(roi.bounds))
+        else:
+            parts.append(roi.coords)
+        part_start.append(len(parts))
+    counts = [len(p) for p in parts]
+    point_start = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype("<u4")
+    names = [r.name.encode("utf-8") for r in rois]
+    name_start = np.concatenate([[0], np.cumsum([len(b) for b in names], dtype=np.int64)]).astype("<u4")
+    coords = np.vstack([np.asarray(p, np.float64).reshape(-1, 2) for p in parts]) if parts else np.zeros((0, 2))
+    stroke = np.array([r.stroke_color for r in rois], np.int64).astype(np.uint32).view("<i4")
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, 0, len(rois), len(parts), len(coords), int(name_start[-1])),
+        np.asarray(part_start, "<u4").tobytes(), point_start.tobytes(), stroke.tobytes(),
+        np.asarray([r.position for r in rois], "<i4").reshape(-1, 3).tobytes(), name_start.tobytes(),
+        coords.astype("<f4").tobytes(), np.asarray(types, "u1").tobytes(), np.asarray(sources, "u1").tobytes(),
+        b"".join(names),
+    ])
+
+
+async def ingest_features(client: ImageJClient, features: list[dict[str, Any]], chunk_rois: int = 5000,
+                          target: str = "manager", clear_existing: bool = False,
+                          ingest_id: str | None = None) -> int:
+    """Send features to ingestRoisPacked in packed chunks; returns the number of ROIs added."""
+    ingest_id = ingest_id or uuid.uuid4().hex
+    rois = [roi_codec.feature_to_roi(f) for f in features]
+    for k, start in enumerate(range(0, len(rois), chunk_rois)):
+        res = await client.ingestRoisPacked(ingestId=ingest_id, chunk=k,
+                                            packed=pack_rois(rois[start:start + chunk_rois], oval_outline=False))
+        if not res.get("success"):
+            raise RuntimeError(f"chunk {k}: {res.get('error', 'ingest failed')}")
+    res = await client.ingestRoisPacked(ingestId=ingest_id, finish=True, target=target, clearExisting=clear_existing)
+    if not res.get("success"):
+        raise RuntimeError(res.get("error", "ingest failed"))
+    return res["count"]
+
+
+class IngestTransport:
+    """In-process stand-in for ingestRoisPacked, with RoiPacker.ingest/commit semantics."""
+
+    def __init__(self) -> None:
+        self.pending: dict[str, list[roi_codec.Roi]] = {}
+        self.manager: list[roi_codec.Roi] = []
+        self.calls = 0
+
+    async def call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        if method != "ingestRoisPacked":
+            raise ValueError(f"IngestTransport only serves ingestRoisPacked, not {method}")
+        self.calls += 1
+        ingest_id = kwargs["ingestId"]
+        try:
+            if kwargs.get("packed") is not None:
+                rois = to_rois(decode_packed(kwargs["packed"]))
+                if kwargs.get("chunk", 0) == 0:
+                    self.pending[ingest_id] = []
+                self.pending.setdefault(ingest_id, []).extend(rois)
+        except PackedFormatError as e:
+            self.pending.pop(ingest_id, None)
+            return {"success": False, "error": str(e), "pending": 0, "count": 0}
+        if not kwargs.get("finish"):
+            return {"success": True, "pending": len(self.pending[ingest_id])}
+        rois = self.pending.pop(ingest_id, [])
+        if kwargs.get("clearExisting"):
+            self.manager.clear()
+        self.manager.extend(rois)
+        return {"success": True, "pending": 0, "count": len(rois)}
+
+
+_NODE_FEATURES = r"""
+const src = require('fs').readFileSync(process.argv[1], 'utf8');
+const grab = (name) => { const i = src.indexOf('function ' + name + '(');
+  let depth = 0, j = src.indexOf('{', i);
+  for (; j < src.length; j++) { if (src[j] === '{') depth++; else if (src[j] === '}' && --depth === 0) break; }
+  return src.slice(i, j + 1); };
+const consts = src.slice(src.indexOf('const ROI_TYPE_NAMES'), src.indexOf('\n', src.indexOf('const ROI_PACK_MAGIC')));
+eval(consts + '\n' + grab('packedRoisToFeatures') + ';globalThis.run = packedRoisToFeatures;');
+const bytes = Buffer.from(require('fs').readFileSync(0, 'utf8'), 'hex');
+process.stdout.write(JSON.stringify(run(new Uint8Array(bytes))));
+"""
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    tri = np.array([[1.5, 2], [9, 2.25], [5, 8]])
+    rois = [
+        roi_codec.Roi(type=roi_codec.RECT, name="box", bounds=(10, 20, 30, 30), stroke_color=0xFFFF0000),
+        roi_codec.Roi(type=roi_codec.TRACED, name="cell", coords=tri, position=(0, 3, 0)),
+        roi_codec.Roi(type=roi_codec.OVAL, name="nucleus", bounds=(0, 0, 30, 20)),
+        roi_codec.Roi(type=roi_codec.POLYLINE, name="trace", coords=np.array([[0, 0], [5, 5], [9, 2]])),
+        roi_codec.Roi(type=roi_codec.POINT, name="pt", coords=np.array([[4, 4]])),
+        roi_codec.Roi(type=roi_codec.COMPOSITE, name="", parts=[tri, tri + 10]),
+        roi_codec.Roi(type=roi_codec.POLYGON, name="zellkern-ü", coords=tri),
+    ]
+    buf = pack_rois(rois, [SOURCE_CURRENT] + [SOURCE_MANAGER] * (len(rois) - 1))
+    packed = decode_packed(buf)
+    if packed.coords.base is None or packed.coords.flags.owndata:
+        fails.append("coords were copied")
+    feats = to_features(packed)
+    got = [(f["geometry"]["type"], f["properties"]["type"]) for f in feats]
+    want = [("Polygon", "Rectangle"), ("Polygon", "Traced"), ("Polygon", "Oval"), ("LineString", "Polyline"),
+            ("Point", "Point"), ("GeometryCollection", "Composite"), ("Polygon", "Polygon")]
+    if got != want:
+        fails.append(f"types {got}")
+    else:
+        if feats[0]["geometry"]["coordinates"] != [[[10, 20], [40, 20], [40, 50], [10, 50], [10, 20]]] \
+                or feats[0]["properties"].get("strokeColor") != "#ff0000" or "index" in feats[0]["properties"]:
+            fails.append(f"rectangle {feats[0]}")
+        if feats[1]["geometry"]["coordinates"] != [_closed(tri.tolist())] or feats[1]["properties"].get("z") != 3 \
+                or feats[1]["properties"].get("index") != 0:
+            fails.append(f"traced {feats[1]}")
+        if feats[2]["properties"].get("shape") != "ellipse":
+            fails.append(f"oval {feats[2]['properties']}")
+        if feats[4]["geometry"]["coordinates"] != [4, 4]:
+            fails.append(f"point {feats[4]['geometry']}")
+        if len(feats[5]["geometry"]["geometries"]) != 2 or feats[5]["properties"]["name"] != "Unnamed":
+            fails.append(f"composite {feats[5]}")
+        if feats[6]["properties"]["name"] != "zellkern-ü":
+            fails.append(f"utf-8 name {feats[6]['properties']['name']!r}")
+    back = to_rois(packed)
+    if [r.type for r in back] != [r.type for r in rois] or back[0].bounds != (10, 20, 30, 30):
+        fails.append(f"to_rois {[(r.type, r.bounds) for r in back]}")
+    if pack_rois(back, packed.sources.tolist())[:HEADER.size] != buf[:HEADER.size]:
+        fails.append("re-pack header differs")
+    for bad in (b"nope" + buf[4:], buf[:-3]):
+        try:
+            decode_packed(bad)
+            fails.append("corrupt buffer accepted")
+        except PackedFormatError:
+            pass
+    features = to_features(packed)
+    transport = IngestTransport()
+    client = ImageJClient(transport)
+    count = asyncio.run(ingest_features(client, features, chunk_rois=3, clear_existing=True))
+    want_rois = [roi_codec.feature_to_roi(f) for f in features]
+    if count != len(features) or transport.calls != 4:
+        fails.append(f"ingest: {count} ROIs in {transport.calls} calls")
+    elif [(r.type, r.name) for r in transport.manager] != [(r.type, r.name) for r in want_rois]:
+        fails.append(f"ingest ROIs {[(r.type, r.name) for r in transport.manager]}")
+    elif transport.manager[2].bounds != want_rois[2].bounds or transport.manager[0].stroke_color != 0xFFFF0000:
+        fails.append(f"ingest oval/colour {transport.manager[2].bounds} {transport.manager[0].stroke_color:x}")
+    asyncio.run(ingest_features(client, features[:2], chunk_rois=3, ingest_id="again"))
+    if len(transport.manager) != len(features) + 2:
+        fails.append("ingest without clearExisting replaced the manager")
+    try:
+        out = subprocess.run(["node", "-e", _NODE_FEATURES, str(SERVICE_JS)], input=buf.hex(),
+                             capture_output=True, text=True, check=True)
+        if json.loads(out.stdout) != json.loads(json.dumps(feats)):
+            fails.append(f"packedRoisToFeatures differs from to_features(): {out.stdout[:300]}")
+    except FileNotFoundError:
+        print("  (node not found; skipped service parity check)")
+    except subprocess.CalledProcessError as e:
+        fails.append(f"packedRoisToFeatures failed: {e.stderr.strip()[:300]}")
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("roi_packed self-test: PASS")
+    return True
+
+
+def bench(count: int, vertices: int) -> list[tuple[str, float]]:
+    rois = roi_codec._synthetic(count, vertices)
+    t0 = time.perf_counter()
+    buf = pack_rois(rois)
+    t1 = time.perf_counter()
+    packed = decode_packed(buf)
+    t2 = time.perf_counter()
+    text = json.dumps(to_geojson(packed))
+    t3 = time.perf_counter()
+    features = json.loads(text)["features"]
+    t4 = time.perf_counter()
+    chunks = [pack_rois([roi_codec.feature_to_roi(f) for f in features[i:i + 5000]], oval_outline=False)
+              for i in range(0, len(features), 5000)]
+    t5 = time.perf_counter()
+    return [("pack (Python twin)", t1 - t0), ("decode to NumPy", t2 - t1), ("GeoJSON + dumps", t3 - t2),
+            ("GeoJSON -> ingest chunks", t5 - t4), ("MB packed", len(buf) / 1e6),
+            ("MB ingest chunks", sum(map(len, chunks)) / 1e6), ("MB GeoJSON", len(text) / 1e6)]
+
+
+async def _export(args: argparse.Namespace) -> int:
+    client = ImageJClient(await HyphaTransport.connect(args.service_id, args.server_url))
+    t0 = time.perf_counter()
+    res = await client.getRoisAsGeoJson(source=args.source, format="packed")
+    if not res.get("success"):
+        raise RuntimeError(res.get("error", "export failed"))
+    packed = decode_packed(res["packed"])
+    t1 = time.perf_counter()
+    out = Path(args.output)
+    if out.suffix == ".npz":
+        np.savez(out, part_start=packed.part_start, point_start=packed.point_start, coords=packed.coords,
+                 types=packed.types, sources=packed.sources, stroke=packed.stroke, position=packed.position,
+                 names=np.array([packed.name(i) for i in range(len(packed))]))
+    elif out.suffix in (".zip", ".roi"):
+        roi_codec.write_roiset(to_rois(packed), out)
+    else:
+        out.write_text(json.dumps(to_geojson(packed)), encoding="utf-8")
+    print(f"{len(packed)} ROIs ({len(res['packed']) / 1e6:.1f} MB packed) in {t1 - t0:.2f} s -> {out}")
+    return 0
+
+
+async def _ingest(args: argparse.Namespace) -> int:
+    doc = json.loads(Path(args.input).read_text(encoding="utf-8"))
+    features = doc["features"] if doc.get("type") == "FeatureCollection" else [doc]
+    client = ImageJClient(await HyphaTransport.connect(args.service_id, args.server_url))
+    t0 = time.perf_counter()
+    count = await ingest_features(client, features, args.chunk_rois, args.target, args.clear)
+    print(f"{count} ROIs -> {args.target} in {time.perf_counter() - t0:.2f} s")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    sub = parser.add_subparsers(dest="cmd")
+    b = sub.add_parser("bench", help="Time packing and decoding a synthetic segmentation")
+    b.add_argument("--rois", type=int, default=20000)
+    b.add_argument("--vertices", type=int, default=40)
+    e = sub.add_parser("export", help="Fetch ROIs from a live service in one call")
+    e.add_argument("--service-id", required=True)
+    e.add_argument("--server-url", default="https://hypha.aicell.io")
+    e.add_argument("--source", choices=("current", "manager", "both"), default="manager")
+    e.add_argument("-o", "--output", required=True, help=".geojson, .npz or RoiSet .zip")
+    i = sub.add_parser("ingest", help="Add a GeoJSON FeatureCollection to a live service in packed chunks")
+    i.add_argument("input")
+    i.add_argument("--service-id", required=True)
+    i.add_argument("--server-url", default="https://hypha.aicell.io")
+    i.add_argument("--chunk-rois", type=int, default=5000)
+    i.add_argument("--target", choices=("current", "manager", "both"), default="manager")
+    i.add_argument("--clear", action="store_true", help="Clear the ROI Manager first")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if args.cmd == "bench":
+        print(f"{args.rois} ROIs x {args.vertices} vertices")
+        for label, v in bench(args.rois, args.vertices):
+            print(f"  {label:<26} {v:>8.2f}{'' if label.startswith('MB') else ' s'}")
+        return 0
+    if args.cmd in ("export", "ingest"):
+        try:
+            return asyncio.run(_export(args) if args.cmd == "export" else _ingest(args))
+        except (RuntimeError, OSError, ValueError, KeyError) as ex:
+            print(f"ERROR: {ex}", file=sys.stderr)
+            return 1
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
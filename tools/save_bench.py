@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Peak memory and throughput of ImageJ saves through utils.js.
+
+/local saves and saves into a mounted native folder stream out through
+StreamingSave in utils.js. Only SAVE_RESIDENT_CHUNKS 1 MB chunks stay in
+the tab. Sealed chunks go to the File System Access writable
+(NativeSaveSink) or into per-chunk Blobs that are downloaded on close
+(DownloadSaveSink).
+
+This harness extracts that code into node and replays a save against it:
+sequential writes, then a seek back to patch the header. It runs three
+modes:
+
+  buffered   the previous behaviour: 1 MB chunks kept until close, then
+             concatenated into one array for the download (reimplemented here)
+  download   StreamingSave + DownloadSaveSink
+  native     StreamingSave + NativeSaveSink, with the writable stream backed
+             by a local HTTP server in this process that writes the file to
+             disk (positional PUTs), as the browser does outside the tab heap
+
+For each mode and size it reports the peak growth in live ArrayBuffer memory
+(sampled after a forced GC) and RSS, and the throughput of the write and close
+calls. The saved bytes are checked against the expected file. node's Blob
+is memory-backed, so `download` shows the Blob parts; browsers page large
+Blob storage out of the tab. node also frees ArrayBuffers lazily, which
+puts a floor of a few tens of MB under every mode.
+
+Usage
+-----
+    python3 tools/save_bench.py --self-test
+    python3 tools/save_bench.py [--sizes 16,64,256] [--write-size 65536] [--modes buffered,download,native]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+UTILS_JS = ROOT / "utils.js"
+MODES = ("buffered", "download", "native")
+HEADER = b"IJSAVEBENCH"
+SAMPLE_BYTES = 4 << 20  # memory is sampled (after a forced GC) every this many bytes written
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    """Backs a FileSystemWritableFileStream: PUT writes a byte range of a
+    file, POST ?truncate=N truncates it, POST ?close finishes it."""
+
+    directory: Path
+    received: dict[str, int]
+    lock: threading.Lock
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - base class signature
+        pass
+
+    def _target(self) -> Path:
+        return self.directory / unquote(urlsplit(self.path).path).lstrip("/")
+
+    def _reply(self, status: HTTPStatus) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self) -> None:
+        m = _CONTENT_RANGE.match(self.headers.get("Content-Range", ""))
+        length = int(self.headers.get("Content-Length", 0))
+        if not m or int(m.group(2)) - int(m.group(1)) + 1 != length:
+            self._reply(HTTPStatus.BAD_REQUEST)
+            return
+        body = self.rfile.read(length)
+        path = self._target()
+        with self.lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("r+b" if path.exists() else "wb") as f:
+                f.seek(int(m.group(1)))
+                f.write(body)
+            self.received[path.name] = self.received.get(path.name, 0) + length
+        self._reply(HTTPStatus.NO_CONTENT)
+
+    def do_POST(self) -> None:
+        query = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+        path = self._target()
+        with self.lock:
+            if "truncate" in query:
+                with path.open("r+b" if path.exists() else "wb") as f:
+                    f.truncate(int(query["truncate"][0]))
+        self._reply(HTTPStatus.NO_CONTENT)
+
+
+def serve(directory: str | Path) -> ThreadingHTTPServer:
+    """Start a sink server on a free 127.0.0.1 port in a daemon thread."""
+    handler = type("Handler", (SinkHandler,), {"directory": Path(directory), "received": {},
+                                               "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler))
+    server.daemon_threads = True
+    server.received = handler.received
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def save_pattern(size: int, write_size: int) -> list[list[int]]:
+    """[offset, length, fill byte] writes of a size-byte save: sequential
+    writes, then the header rewritten in place, as encoders that patch
+    lengths or offsets after the data do."""
+    writes = [[at, min(write_size, size - at), (at // write_size * 7 + 1) & 255]
+              for at in range(0, size, write_size)]
+    writes.append([0, min(len(HEADER), size), HEADER[0]])
+    return writes
+
+
+def expected_sha(writes: list[list[int]]) -> str:
+    """sha256 of the file the writes produce, built on disk."""
+    with tempfile.TemporaryFile() as f:
+        for offset, length, value in writes:
+            f.seek(offset)
+            f.write(bytes([value]) * length)
+        f.seek(0)
+        h = hashlib.sha256()
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+        return h.hexdigest()
+
+
+# Pulls the save code out of utils.js, replays job.writes through
+# localFileWriteAsync/localFileClose and reports memory, time and the
+# sha256 of what was saved.
+_NODE_SAVE = r"""
+const src = require('fs').readFileSync(process.argv[1], 'utf8');
+const grab = (marker) => { const i = src.indexOf(marker);
+  let depth = 0, j = src.indexOf('{', i);
+  for (; j < src.length; j++) { if (src[j] === '{') depth++; else if (src[j] === '}' && --depth === 0) break; }
+  return src.slice(i, j + 1); };
+const job = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+let consts = src.match(/^const SAVE_\w+ = .*$/gm).join('\n');
+for (const [k, v] of Object.entries(job.overrides || {})) consts = consts.replace(new RegExp(`(const ${k} = )[^;]+`), `$1${v}`);
+eval([consts, ...['class StreamingSave ', 'class NativeSaveSink ', 'class DownloadSaveSink ', 'function downloadBlob(',
+                  'function copyFromWriteBuffer(', 'function localFileWriteAsync(', 'function localFileClose(']
+                 .map(grab)].join('\n') +
+     ';Object.assign(globalThis, { StreamingSave, NativeSaveSink, DownloadSaveSink, localFileWriteAsync, localFileClose });');
+console.log = () => {};
+
+// Browser stand-ins: an <a download> that keeps the Blob, and a file handle
+// whose writable stream is the harness server
+let downloaded = null, aborted = false;
+URL.createObjectURL = blob => { downloaded = blob; return 'blob:save-bench'; };
+URL.revokeObjectURL = () => {};
+globalThis.document = { createElement: () => ({ click() {} }), body: { appendChild() {}, removeChild() {} } };
+const handle = { createWritable: async () => ({
+  write: async ({ position, data }) => {
+    const r = await fetch(job.sinkUrl, { method: 'PUT', body: data,
+      headers: { 'Content-Range': `bytes ${position}-${position + data.length - 1}/*` } });
+    if (!r.ok) throw new Error(`PUT ${r.status}`);
+  },
+  truncate: async n => { await fetch(`${job.sinkUrl}?truncate=${n}`, { method: 'POST' }); },
+  close: async () => {
+    if (job.failClose) throw new Error('close rejected');
+    await fetch(`${job.sinkUrl}?close`, { method: 'POST' });
+  },
+  abort: async () => { aborted = true; },
+}) };
+
+// The previous write path: whole 1 MB chunks until close, then one array
+function bufferedWriteAsync(fileData, fileOffset, buf, off, len, cb) {
+  const chunkSize = 1024 * 1024;
+  let done = 0;
+  while (done < len) {
+    const pos = fileOffset + done, index = Math.floor(pos / chunkSize), from = pos % chunkSize;
+    if (!fileData.chunks[index]) fileData.chunks[index] = new Uint8Array(chunkSize);
+    const n = Math.min(len - done, chunkSize - from);
+    for (let i = 0; i < n; i++) fileData.chunks[index][from + i] = buf[off + done + i];
+    done += n;
+  }
+  fileData.length = Math.max(fileData.length, fileOffset + len);
+  cb(len);
+}
+function bufferedClose(fileData, cb) {
+  const content = new Uint8Array(fileData.length);
+  for (let i = 0, at = 0; at < fileData.length; i++, at += 1024 * 1024) {
+    const n = Math.min(1024 * 1024, fileData.length - at);
+    if (fileData.chunks[i]) content.set(fileData.chunks[i].subarray(0, n), at);
+  }
+  downloadBlob(new Blob([content]), 'save.bin');
+  cb();
+}
+
+(async () => {
+  const fileData = { path: '/local/save.bin', length: 0, dirty: 0, chunks: [] };
+  let write = localFileWriteAsync, close = localFileClose;
+  if (job.mode === 'buffered') {
+    write = bufferedWriteAsync; close = bufferedClose;
+  } else if (job.mode === 'download') {
+    fileData.save = new StreamingSave(new DownloadSaveSink('save.bin'));
+  } else {
+    fileData.save = new StreamingSave(new NativeSaveSink(handle));
+  }
+  const peak = { arrayBuffers: 0, rss: 0 };
+  // Live memory: collect first, so garbage awaiting GC is not counted
+  const sample = () => {
+    global.gc();
+    const m = process.memoryUsage();
+    peak.arrayBuffers = Math.max(peak.arrayBuffers, m.arrayBuffers + m.external);
+    peak.rss = Math.max(peak.rss, m.rss);
+  };
+  global.gc();
+  const base = process.memoryUsage();
+  const maxLen = Math.max(...job.writes.map(w => w[1]));
+  const buf = new Int8Array(maxLen); // one Java byte[] reused for every write
+  let ms = 0, unsampled = 0;
+  for (let i = 0; i < job.writes.length; i++) {
+    const [offset, len, value] = job.writes[i];
+    buf.fill(value << 24 >> 24, 0, len);
+    const t0 = performance.now();
+    const n = await new Promise(resolve => write(fileData, offset, buf, 0, len, resolve));
+    ms += performance.now() - t0;
+    if (n !== len) throw new Error(`write returned ${n}`);
+    if ((unsampled += len) >= job.sampleBytes) {
+      sample();
+      unsampled = 0;
+    }
+  }
+  sample();
+  const t0 = performance.now();
+  const closed = await new Promise(resolve => close(fileData, resolve));
+  ms += performance.now() - t0;
+  sample();
+  let sha256 = null;
+  if (downloaded) {
+    const hash = require('crypto').createHash('sha256');
+    for await (const part of downloaded.stream()) hash.update(part);
+    sha256 = hash.digest('hex');
+  }
+  process.stdout.write(JSON.stringify({
+    ms, sha256, closed: closed === undefined ? null : closed, aborted,
+    peakArrayBuffers: peak.arrayBuffers - (base.arrayBuffers + base.external), peakRss: peak.rss - base.rss }));
+})().catch(err => { process.stderr.write(String(err.stack || err)); process.exit(1); });
+"""
+
+
+def run_save(mode: str, writes: list[list[int]], sink_url: str = "", overrides: dict | None = None,
+             fail_close: bool = False) -> dict:
+    """Replay writes in node through the given mode (see module docstring)."""
+    job = {"mode": mode, "writes": writes, "sinkUrl": sink_url, "overrides": overrides or {},
+           "sampleBytes": SAMPLE_BYTES, "failClose": fail_close}
+    out = subprocess.run(["node", "--expose-gc", "-e", _NODE_SAVE, str(UTILS_JS)], input=json.dumps(job),
+                         capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(f"node ({mode}): {out.stderr.strip()[-500:]}")
+    return json.loads(out.stdout)
+
+
+def _sha_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def measure(mode: str, writes: list[list[int]], want_sha: str, tmp: Path, server: ThreadingHTTPServer,
+            overrides: dict | None = None) -> dict:
+    """Run one save and check its bytes; returns run_save()'s result."""
+    name = f"{mode}-{len(writes)}.bin"
+    result = run_save(mode, writes, f"http://127.0.0.1:{server.server_address[1]}/{name}", overrides)
+    got = _sha_file(tmp / name) if mode == "native" else result["sha256"]
+    (tmp / name).unlink(missing_ok=True)
+    if got != want_sha:
+        raise RuntimeError(f"{mode}: saved bytes differ from the written file")
+    return result
+
+
+def bench(sizes_mb: list[int], write_size: int, modes: list[str]) -> list[tuple[int, str, float, float, float]]:
+    """(size MB, mode, peak ArrayBuffer MB, peak RSS MB, MB/s) rows."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        server = serve(tmp)
+        try:
+            for size_mb in sizes_mb:
+                writes = save_pattern(size_mb << 20, write_size)
+                want = expected_sha(writes)
+                for mode in modes:
+                    r = measure(mode, writes, want, Path(tmp), server)
+                    rows.append((size_mb, mode, r["peakArrayBuffers"] / 2**20, r["peakRss"] / 2**20,
+                                 size_mb / (r["ms"] / 1000)))
+        finally:
+            server.shutdown()
+    return rows
+
+
+def _self_test() -> bool:
+    fails: list[str] = []
+    pattern = save_pattern(100, 30)
+    if pattern[-1] != [0, 11, HEADER[0]] or [w[1] for w in pattern[:-1]] != [30, 30, 30, 10]:
+        fails.append(f"save_pattern {pattern}")
+    with tempfile.TemporaryDirectory() as tmp:
+        server = serve(tmp)
+        try:
+            # Odd-sized writes across chunk edges, a sparse jump past the end
+            # and patches into chunks that were already sealed
+            writes = save_pattern(3_500_000, 70_001)
+            writes += [[5_000_000, 1000, 9], [1_048_570, 20, 3], [10, 5, 4]]
+            want = expected_sha(writes)
+            for mode in MODES:
+                for overrides in ({}, {"SAVE_RESIDENT_CHUNKS": 1}):
+                    try:
+                        measure(mode, writes, want, Path(tmp), server, overrides)
+                    except RuntimeError as e:
+                        fails.append(f"{e} {overrides}")
+            # A rejected close aborts the writable and fails like a write (-1)
+            got = run_save("native", writes, f"http://127.0.0.1:{server.server_address[1]}/failed.bin",
+                           fail_close=True)
+            if got["closed"] != -1 or not got["aborted"]:
+                fails.append(f"failed close: returned {got['closed']}, aborted={got['aborted']}")
+            # Streaming keeps the tab's buffers bounded; buffering holds the file twice on close
+            writes = save_pattern(128 << 20, 1 << 16)
+            want = expected_sha(writes)
+            peaks = {mode: measure(mode, writes, want, Path(tmp), server)["peakArrayBuffers"] / 2**20
+                     for mode in ("buffered", "native")}
+            if peaks["native"] > 64 or peaks["buffered"] < 256:
+                fails.append(f"peak ArrayBuffer MB {peaks}")
+        except FileNotFoundError:
+            print("  (node not found; skipped utils.js save checks)")
+        except RuntimeError as e:
+            fails.append(str(e))
+        finally:
+            server.shutdown()
+    for f in fails:
+        print(f"self-test FAIL: {f}")
+    if fails:
+        return False
+    print("save_bench self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    parser.add_argument("--sizes", default="16,64,256", help="Comma-separated save sizes in MB")
+    parser.add_argument("--write-size", type=int, default=1 << 16, help="Bytes per write call")
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args(argv)
+    if args.self_test:
+        return 0 if _self_test() else 1
+    try:
+        sizes = [int(s) for s in args.sizes.split(",")]
+        modes = args.modes.split(",")
+        if unknown := set(modes) - set(MODES):
+            raise ValueError(f"unknown mode(s) {sorted(unknown)}; choose from {', '.join(MODES)}")
+        print(f"  {'MB':>6} {'mode':<9} {'peak AB MB':>11} {'peak RSS MB':>12} {'MB/s':>8}")
+        for size, mode, ab, rss, rate in bench(sizes, args.write_size, modes):
+            print(f"  {size:>6} {mode:<9} {ab:>11.1f} {rss:>12.1f} {rate:>8.0f}")
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
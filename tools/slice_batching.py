@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Slice-batching planner for PFRShipper payloads.
+
+`com.hack.ij.PFRShipper` ships one PFRSliceTask per slice. WorkerRunner
+then serializes the whole task back, so the result carries pixelsIn as
+well as pixelsOut. A 2048x2048x8 16-bit stack therefore moves 64 MB out
+and 128 MB back as eight large messages. Work is balanced only when the
+slice count divides evenly by the pool.
+
+This tool searches groupings of g slices x b row-bands per message. Each
+band carries `radius` halo rows above and below; they are clamped at the
+image edge. Each plan is scored with the pool model in tools/pool_sim.py:
+serial main-thread serialization plus per-message dispatch, worker
+compute on core and halo pixels, and processor sharing across cores. The
+planner keeps the plan with the lowest predicted wall time. Ties go to
+fewer transfer bytes, then fewer messages.
+
+Output table (TSV, consumable with String.split on the Java side):
+
+    # imagej-slice-batching v1 width=2048 height=2048 slices=8 bitDepth=16 radius=2 pool=6 ...
+    # message  sliceStart  sliceEnd  y0  y1  haloTop  haloBottom
+    0          1           2         0   683 0        2
+
+Slices are 1-based and inclusive, as in ImageStack. Rows [y0, y1) are the
+core rows the worker writes back. The shipped block spans
+[y0 - haloTop, y1 + haloBottom).
+
+Usage
+-----
+    python3 tools/slice_batching.py --self-test
+    python3 tools/slice_batching.py --width 2048 --height 2048 --slices 8 --bit-depth 16 \
+        --radius 2 --pool 6 [--no-echo] [--table plan.tsv] [--json]
+
+Exit status: 0 on success, 1 on invalid parameters or self-test failure.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from pool_sim import DEVICES, CostModel, Device, Policy, Workload, resolve_policy, simulate  # noqa: E402
+
+TABLE_VERSION = 1
+# §3a: Gaussian σ=4 on 1024² 8-bit takes ~905 ms warm => ~863 ns/pixel.
+DEFAULT_NS_PER_PIXEL = 905e6 / (1024 * 1024)
+DEFAULT_MAX_MESSAGE_MB = 64
+MIN_BAND_ROWS = 16
+MAX_BANDS = 64
+ENVELOPE_BYTES = 512  # PFRSliceTask fields + ObjectOutputStream framing
+
+
+@dataclass(frozen=True)
+class Stack:
+    width: int
+    height: int
+    slices: int
+    bit_depth: int
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return {8: 1, 16: 2, 32: 4}[self.bit_depth]
+
+    @property
+    def row_bytes(self) -> int:
+        return self.width * self.bytes_per_pixel
+
+
+@dataclass(frozen=True)
+class Message:
+    slice_start: int
+    slice_end: int
+    y0: int
+    y1: int
+    halo_top: int
+    halo_bottom: int
+
+    @property
+    def slices(self) -> int:
+        return self.slice_end - self.slice_start + 1
+
+    @property
+    def shipped_rows(self) -> int:
+        return self.y1 - self.y0 + self.halo_top + self.halo_bottom
+
+
+@dataclass
+class Plan:
+    group: int
+    bands: int
+    messages: list[Message]
+    bytes_out: int
+    bytes_back: int
+    halo_bytes: int
+    wall_ms: float
+    main_busy_ms: float
+    note: str = ""
+
+    @property
+    def bytes_total(self) -> int:
+        return self.bytes_out + self.bytes_back
+
+
+@dataclass
+class PlanSettings:
+    radius: int = 0
+    echo_input: bool = True
+    ns_per_pixel: float = DEFAULT_NS_PER_PIXEL
+    max_message_bytes: int = DEFAULT_MAX_MESSAGE_MB << 20
+    policy: Policy = field(default_factory=lambda: resolve_policy("eager"))
+
+
+def band_edges(height: int, bands: int) -> list[tuple[int, int]]:
+    step, extra = divmod(height, bands)
+    edges, y = [], 0
+    for i in range(bands):
+        h = step + (i < extra)
+        edges.append((y, y + h))
+        y += h
+    return edges
+
+
+def make_messages(stack: Stack, group: int, bands: int, radius: int) -> list[Message]:
+    msgs = []
+    for s in range(1, stack.slices + 1, group):
+        end = min(stack.slices, s + group - 1)
+        for y0, y1 in band_edges(stack.height, bands):
+            msgs.append(Message(s, end, y0, y1, min(radius, y0), min(radius, stack.height - y1)))
+    return msgs
+
+
+def evaluate(stack: Stack, group: int, bands: int, pool: int, device: Device, cost: CostModel,
+             settings: PlanSettings) -> Plan | None:
+    """Score one grouping; None if a message would exceed the size limit."""
+    msgs = make_messages(stack, group, bands, settings.radius)
+    rb = stack.row_bytes
+    out_sizes = [m.slices * m.shipped_rows * rb + ENVELOPE_BYTES for m in msgs]
+    back_sizes = [m.slices * (m.y1 - m.y0) * rb + ENVELOPE_BYTES for m in msgs]
+    if settings.echo_input:
+        back_sizes = [a + b for a, b in zip(out_sizes, back_sizes)]
+    if max(out_sizes) > settings.max_message_bytes or max(back_sizes) > settings.max_message_bytes:
+        return None
+    # Groups and bands are near-even; model every message as the largest one.
+    big = max(range(len(msgs)), key=lambda i: out_sizes[i])
+    task_ms = msgs[big].slices * msgs[big].shipped_rows * stack.width * settings.ns_per_pixel / 1e6
+    wl = Workload(len(msgs), task_ms, task_ms, out_sizes[big], back_sizes[big])
+    res = simulate(wl, pool, device, cost, replace(settings.policy, batch=1), include_boot=False)
+    halo = sum(m.slices * (m.halo_top + m.halo_bottom) * rb for m in msgs)
+    return Plan(group, bands, msgs, sum(out_sizes), sum(back_sizes), halo, res.wall_ms, res.main_busy_ms)
+
+
+def plan(stack: Stack, pool: int, device: Device, cost: CostModel = CostModel(),
+         settings: PlanSettings = PlanSettings()) -> tuple[Plan, Plan | None]:
+    """Return (best plan, current one-slice-per-message plan)."""
+    if stack.bit_depth not in (8, 16, 32):
+        raise ValueError(f"unsupported bit depth {stack.bit_depth}")
+    if min(stack.width, stack.height, stack.slices, pool) < 1:
+        raise ValueError("width, height, slices and pool must be >= 1")
+    max_bands = max(1, min(MAX_BANDS, stack.height // max(MIN_BAND_ROWS, 2 * settings.radius + 1)))
+    current = evaluate(stack, 1, 1, pool, device, cost, settings)
+    best = None
+    for group in range(1, stack.slices + 1):
+        # Only group sizes that change the message count are worth scoring.
+        if group > 1 and math.ceil(stack.slices / group) == math.ceil(stack.slices / (group - 1)):
+            continue
+        for bands in range(1, max_bands + 1):
+            p = evaluate(stack, group, bands, pool, device, cost, settings)
+            if p and (best is None or (round(p.wall_ms), p.bytes_total, len(p.messages))
+                      < (round(best.wall_ms), best.bytes_total, len(best.messages))):
+                best = p
+    if best is None:
+        raise ValueError("no plan fits --max-message-mb; raise it or lower the radius")
+    return best, current
+
+
+def render_table(stack: Stack, p: Plan, pool: int, settings: PlanSettings) -> str:
+    lines = [f"# imagej-slice-batching v{TABLE_VERSION} width={stack.width} height={stack.height} "
+             f"slices={stack.slices} bitDepth={stack.bit_depth} radius={settings.radius} pool={pool} "
+             f"group={p.group} bands={p.bands} echoInput={str(settings.echo_input).lower()}",
+             "# message\tsliceStart\tsliceEnd\ty0\ty1\thaloTop\thaloBottom"]
+    for i, m in enumerate(p.messages):
+        lines.append(f"{i}\t{m.slice_start}\t{m.slice_end}\t{m.y0}\t{m.y1}\t{m.halo_top}\t{m.halo_bottom}")
+    return "\n".join(lines) + "\n"
+
+
+def parse_table(text: str) -> list[Message]:
+    msgs = []
+    for line in text.splitlines():
+        if line.startswith("#") or not line.strip():
+            continue
+        _, *vals = (int(v) for v in line.split("\t"))
+        msgs.append(Message(*vals))
+    return msgs
+
+
+def summarize(label: str, p: Plan) -> str:
+    return (f"{label:<8} group={p.group:<3} bands={p.bands:<3} msgs={len(p.messages):<5} "
+            f"out={p.bytes_out / 2**20:8.1f} MiB back={p.bytes_back / 2**20:8.1f} MiB "
+            f"halo={p.halo_bytes / 2**20:6.1f} MiB main={p.main_busy_ms:7.0f} ms wall={p.wall_ms:8.0f} ms")
+
+
+def _self_test() -> bool:
+    """Check coverage, halo clamping, table round-trip and plan quality."""
+    dev, cost = DEVICES["m2-pro"], CostModel()
+    stack = Stack(2048, 2048, 8, 16)
+    settings = PlanSettings(radius=2)
+    msgs = make_messages(stack, 3, 5, 2)
+    covered = {(s, y) for m in msgs for s in range(m.slice_start, m.slice_end + 1) for y in range(m.y0, m.y1)}
+    if len(covered) != stack.slices * stack.height or sum(m.slices * (m.y1 - m.y0) for m in msgs) != len(covered):
+        print("self-test FAIL: messages do not tile the stack exactly once")
+        return False
+    if msgs[0].halo_top != 0 or msgs[0].halo_bottom != 2 or msgs[4].halo_bottom != 0:
+        print(f"self-test FAIL: halo clamping {msgs[0]} {msgs[4]}")
+        return False
+    best, current = plan(stack, 6, dev, cost, settings)
+    if parse_table(render_table(stack, best, 6, settings)) != best.messages:
+        print("self-test FAIL: table round-trip")
+        return False
+    # Eight slices on six workers: the per-slice plan idles four workers in round two.
+    if not best.wall_ms < 0.85 * current.wall_ms:
+        print(f"self-test FAIL: best {best.wall_ms:.0f} ms vs per-slice {current.wall_ms:.0f} ms")
+        return False
+    # Tiny slices: per-message overhead dominates, so the planner should group them.
+    small, _ = plan(Stack(64, 64, 256, 8), 4, dev, replace(cost, dispatch_ms=5.0),
+                    PlanSettings(ns_per_pixel=50.0))
+    if len(small.messages) > 32:
+        print(f"self-test FAIL: tiny slices not grouped ({len(small.messages)} msgs)")
+        return False
+    try:
+        plan(stack, 4, dev, cost, PlanSettings(radius=2, max_message_bytes=1024))
+    except ValueError:
+        pass
+    else:
+        print("self-test FAIL: impossible message limit accepted")
+        return False
+    print("slice_batching self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--slices", type=int, default=1)
+    parser.add_argument("--bit-depth", type=int, default=8, choices=(8, 16, 32))
+    parser.add_argument("--radius", type=int, default=0, help="Filter kernel radius in rows (halo)")
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--device", default="m2-pro", choices=sorted(DEVICES))
+    parser.add_argument("--policy", default="eager", help="pool_sim policy (e.g. eager, eager+stealing)")
+    parser.add_argument("--ns-per-pixel", type=float, default=DEFAULT_NS_PER_PIXEL,
+                        help="Filter cost per pixel on one P-core (default from FINDINGS §3a)")
+    parser.add_argument("--dispatch-ms", type=float, default=CostModel.dispatch_ms)
+    parser.add_argument("--ser-ns-per-byte", type=float, default=CostModel.ser_ns_per_byte)
+    parser.add_argument("--max-message-mb", type=int, default=DEFAULT_MAX_MESSAGE_MB)
+    parser.add_argument("--no-echo", action="store_true",
+                        help="Assume pixelsIn is not shipped back (transient after run)")
+    parser.add_argument("--table", help="Write the batching table here (default: stdout)")
+    parser.add_argument("--json", dest="emit_json", action="store_true")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.width or not args.height:
+        parser.error("--width and --height are required")
+
+    stack = Stack(args.width, args.height, args.slices, args.bit_depth)
+    cost = CostModel(dispatch_ms=args.dispatch_ms, ser_ns_per_byte=args.ser_ns_per_byte)
+    try:
+        settings = PlanSettings(args.radius, not args.no_echo, args.ns_per_pixel,
+                                args.max_message_mb << 20, resolve_policy(args.policy))
+        best, current = plan(stack, args.pool, DEVICES[args.device], cost, settings)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    if args.emit_json:
+        out = {"stack": asdict(stack), "pool": args.pool, "radius": args.radius,
+               "best": {k: v for k, v in asdict(best).items() if k != "messages"}
+               | {"messages": [asdict(m) for m in best.messages]}}
+        if current:
+            out["current"] = {k: v for k, v in asdict(current).items() if k != "messages"}
+        print(json.dumps(out, indent=2))
+        return 0
+    table = render_table(stack, best, args.pool, settings)
+    if current:
+        print(summarize("current", current), file=sys.stderr)
+    print(summarize("best", best), file=sys.stderr)
+    if args.table:
+        Path(args.table).write_text(table, encoding="utf-8")
+        print(f"wrote {len(best.messages)} rows to {args.table}", file=sys.stderr)
+    else:
+        sys.stdout.write(table)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
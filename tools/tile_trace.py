@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Tile-access trace replay for LazyImagePlus viewport logic.
+
+Replays recorded pan/zoom traces against a tile pyramid, offline, and
+reports what the viewer would fetch. Use it to tune tile size and cache
+size without clicking around in a browser.
+
+What it does
+------------
+1. Reproduces the Java viewport math:
+   - `LazyImagePlus.pickLevelFor`: choose the level whose
+     `magnification * levelScaleFactor` is closest to 1, allowing up to
+     1.5× oversampling;
+   - `LazyImagePlus.refresh`: map the level-0 srcRect to a level-L
+     region (floor origin, ceil size) clamped to the level bounds.
+2. Maps each region onto the pyramid's tile grid, in the same way as the
+   `tiledProvider` in `threadhack/viv-loader/ome-loader.js`.
+3. Replays the tile requests through LRU caches of each requested size,
+   counted in tiles (the JS provider's `MAX_TILES`) or in MB. Reports
+   tiles and bytes fetched and the hit rates.
+
+Pyramids
+--------
+- a build_pyramid.py output: directory, `manifest.json` or `.ijtp`;
+- or a synthetic one: `--base W H` with `--tile-size` (several sizes can
+  be given to sweep) and `--bits`.
+
+Traces
+------
+- JSON lines: `{"t": ms, "srcRect": [x, y, w, h], "mag": m}`. Events with
+  `t` are debounced like `LazyImagePlus.scheduleFetch` (80 ms by default),
+  so only settled views fetch.
+- Console logs: lines `[LazyImagePlus] view x=.. y=.. w=.. h=.. mag=..`
+  that `LazyImagePlus.refresh` prints. These are already debounced.
+
+Usage
+-----
+    python3 tools/tile_trace.py --self-test
+    python3 tools/tile_trace.py trace.jsonl --pyramid out/slide.ijtp --cache-tiles 64 256 512
+    python3 tools/tile_trace.py console.log --base 92160 38092 --tile-size 256 512 1024 --cache-mb 32 128
+    python3 tools/tile_trace.py trace.jsonl --base 20000 20000 --json
+
+Exit status: 0 on success, 1 on input errors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import struct
+import sys
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+# Mirrors of LazyImagePlus constants.
+OVERSAMPLE_TOLERANCE = 1.5   # pickLevelFor: ratio <= 1.5
+FETCH_DEBOUNCE_MS = 80       # scheduleFetch timer
+DEFAULT_CACHE_TILES = (512,)  # tiledProvider MAX_TILES in ome-loader.js
+
+CONTAINER_MAGIC = b"IJTP"
+CONTAINER_HEADER = struct.Struct("<4sHHQIQI")
+
+VIEW_LOG_RE = re.compile(
+    r"\[LazyImagePlus\] view x=(?P<x>-?\d+) y=(?P<y>-?\d+) w=(?P<w>\d+) h=(?P<h>\d+) "
+    r"mag=(?P<mag>[0-9.eE+-]+)"
+)
+
+
+@dataclass(frozen=True)
+class Level:
+    w: int
+    h: int
+    scale: float
+
+
+@dataclass
+class Pyramid:
+    """Level geometry plus tile size; enough to size every tile fetch."""
+
+    levels: list[Level]
+    tile_size: int
+    bytes_per_sample: int = 1
+
+    @classmethod
+    def synthetic(cls, w: int, h: int, tile_size: int, bits: int = 8) -> Pyramid:
+        # Same halving rule as build_pyramid.level_shapes.
+        dims = [(w, h)]
+        while dims[-1][0] > tile_size or dims[-1][1] > tile_size:
+            pw, ph = dims[-1]
+            dims.append(((pw + 1) // 2, (ph + 1) // 2))
+        return cls([Level(lw, lh, w / lw) for lw, lh in dims], tile_size, max(1, bits // 8))
+
+    @classmethod
+    def from_manifest(cls, manifest: dict, display: bool = True) -> Pyramid:
+        bps = 1 if display else max(1, manifest["bitsPerSample"] // 8)
+        levels = [Level(lv["w"], lv["h"], lv["scaleFactor"]) for lv in manifest["levels"]]
+        return cls(levels, manifest["tileSize"], bps)
+
+    def tile_bytes(self, level: int, row: int, col: int) -> int:
+        lv = self.levels[level]
+        t = self.tile_size
+        return min(t, lv.w - col * t) * min(t, lv.h - row * t) * self.bytes_per_sample
+
+    def grid(self, level: int) -> tuple[int, int]:
+        lv = self.levels[level]
+        return -(-lv.h // self.tile_size), -(-lv.w // self.tile_size)
+
+
+def load_manifest(path: Path) -> dict:
+    """Read a build_pyramid.py manifest from a directory, JSON or container."""
+    if path.is_dir():
+        path = path / "manifest.json"
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    with open(path, "rb") as fh:
+        magic, _v, _f, _io, _ic, man_offset, man_len = CONTAINER_HEADER.unpack(
+            fh.read(CONTAINER_HEADER.size))
+        if magic != CONTAINER_MAGIC:
+            raise ValueError(f"{path}: not a pyramid container")
+        fh.seek(man_offset)
+        return json.loads(fh.read(man_len))
+
+
+@dataclass(frozen=True)
+class ViewEvent:
+    """One srcRect (level-0 coords) + magnification, as ImageCanvas holds them."""
+
+    x: float
+    y: float
+    w: float
+    h: float
+    mag: float
+    t: float | None = None
+
+
+def parse_trace(text: str) -> list[ViewEvent]:
+    events = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        m = VIEW_LOG_RE.search(line)
+        if m:
+            events.append(ViewEvent(int(m["x"]), int(m["y"]), int(m["w"]), int(m["h"]),
+                                    float(m["mag"])))
+            continue
+        if not line.startswith("{"):
+            continue
+        try:
+            rec = json.loads(line)
+            x, y, w, h = rec["srcRect"]
+            events.append(ViewEvent(x, y, w, h, float(rec["mag"]), rec.get("t")))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"trace line {lineno}: {e}") from None
+    return events
+
+
+def debounce(events: list[ViewEvent], ms: float = FETCH_DEBOUNCE_MS) -> list[ViewEvent]:
+    """Keep only views that stayed put for `ms`, like scheduleFetch's timer.
+
+    Untimed events (console log lines) were already debounced and are kept.
+    """
+    if not events:
+        return []
+    kept = []
+    for cur, nxt in zip(events, events[1:]):
+        if cur.t is None or nxt.t is None or nxt.t - cur.t >= ms:
+            kept.append(cur)
+    kept.append(events[-1])
+    return kept
+
+
+def pick_level(pyr: Pyramid, mag: float) -> int:
+    """LazyImagePlus.pickLevelFor."""
+    best, best_err = 0, math.inf
+    for i, lv in enumerate(pyr.levels):
+        ratio = mag * lv.scale
+        if ratio <= OVERSAMPLE_TOLERANCE:
+            err = abs(ratio - 1.0)
+            if err < best_err:
+                best, best_err = i, err
+    return best
+
+
+def fetch_region(pyr: Pyramid, level: int, ev: ViewEvent) -> tuple[int, int, int, int] | None:
+    """LazyImagePlus.refresh: clamped level-L region (x, y, w, h) or None."""
+    lv = pyr.levels[level]
+    sf = lv.scale
+    x0 = math.floor(ev.x / sf)
+    y0 = math.floor(ev.y / sf)
+    rx1 = min(lv.w, x0 + math.ceil(ev.w / sf))
+    ry1 = min(lv.h, y0 + math.ceil(ev.h / sf))
+    rx0, ry0 = max(0, x0), max(0, y0)
+    if rx1 <= rx0 or ry1 <= ry0:
+        return None
+    return rx0, ry0, rx1 - rx0, ry1 - ry0
+
+
+def region_tiles(pyr: Pyramid, level: int,
+                 region: tuple[int, int, int, int]) -> list[tuple[int, int, int]]:
+    """(level, row, col) of every tile the region overlaps, row-major."""
+    x, y, w, h = region
+    t = pyr.tile_size
+    return [(level, row, col)
+            for row in range(y // t, (y + h - 1) // t + 1)
+            for col in range(x // t, (x + w - 1) // t + 1)]
+
+
+class LRUCache:
+    """Tile cache bounded by tile count or by bytes."""
+
+    def __init__(self, max_tiles: int | None = None, max_bytes: int | None = None) -> None:
+        self.max_tiles = max_tiles
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, int] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.entries
+
+    def access(self, key: tuple, nbytes: int) -> bool:
+        """Touch `key`; return True on a hit, otherwise fetch and insert it."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        self.bytes_fetched += nbytes
+        self.insert(key, nbytes)
+        return False
+
+    def insert(self, key: tuple, nbytes: int) -> list[tuple]:
+        """Add `key` as most recent; return the keys evicted to make room."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return []
+        self.entries[key] = nbytes
+        self.bytes += nbytes
+        evicted = []
+        while self.entries and (
+            (self.max_tiles is not None and len(self.entries) > self.max_tiles)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            old, size = self.entries.popitem(last=False)
+            self.bytes -= size
+            evicted.append(old)
+        return evicted
+
+    def label(self) -> str:
+        if self.max_tiles is not None:
+            return f"{self.max_tiles} tiles"
+        return f"{self.max_bytes / (1 << 20):g} MB"
+
+
+@dataclass
+class Fetch:
+    """One debounced refresh(): the level chosen and the tiles it needs."""
+
+    event: ViewEvent
+    level: int
+    tiles: list[tuple[int, int, int]]
+
+
+def plan_fetches(pyr: Pyramid, events: list[ViewEvent]) -> list[Fetch]:
+    fetches = []
+    for ev in events:
+        level = pick_level(pyr, ev.mag)
+        region = fetch_region(pyr, level, ev)
+        if region is not None:
+            fetches.append(Fetch(ev, level, region_tiles(pyr, level, region)))
+    return fetches
+
+
+@dataclass
+class CacheResult:
+    cache: str
+    hits: int
+    misses: int
+    hit_rate: float
+    bytes_fetched: int
+
+
+@dataclass
+class ReplayReport:
+    tile_size: int
+    views: int
+    fetches: int
+    tiles_requested: int
+    unique_tiles: int
+    bytes_requested: int
+    level_histogram: dict[int, int]
+    caches: list[CacheResult] = field(default_factory=list)
+
+
+def replay(pyr: Pyramid, events: list[ViewEvent], caches: list[LRUCache]) -> ReplayReport:
+    fetches = plan_fetches(pyr, events)
+    levels: dict[int, int] = {}
+    seen = set()
+    requested = 0
+    nbytes = 0
+    for f in fetches:
+        levels[f.level] = levels.get(f.level, 0) + 1
+        for key in f.tiles:
+            requested += 1
+            nbytes += pyr.tile_bytes(*key)
+            seen.add(key)
+            for cache in caches:
+                cache.access(key, pyr.tile_bytes(*key))
+    report = ReplayReport(pyr.tile_size, len(events), len(fetches), requested, len(seen),
+                          nbytes, dict(sorted(levels.items())))
+    for cache in caches:
+        total = cache.hits + cache.misses
+        report.caches.append(CacheResult(cache.label(), cache.hits, cache.misses,
+                                         cache.hits / total if total else 0.0,
+                                         cache.bytes_fetched))
+    return report
+
+
+def make_caches(tiles: list[int] | None, mb: list[float] | None) -> list[LRUCache]:
+    caches = [LRUCache(max_tiles=n) for n in (tiles or [])]
+    caches += [LRUCache(max_bytes=int(m * (1 << 20))) for m in (mb or [])]
+    return caches or [LRUCache(max_tiles=n) for n in DEFAULT_CACHE_TILES]
+
+
+def render_report(reports: list[ReplayReport]) -> str:
+    lines = []
+    for r in reports:
+        lines.append(f"== tile size {r.tile_size}: {r.views} views -> {r.fetches} fetches ==")
+        lines.append(f"  tiles requested: {r.tiles_requested} ({r.unique_tiles} unique), "
+                     f"{r.bytes_requested / (1 << 20):.2f} MB without a cache")
+        lines.append("  fetches per level: "
+                     + ", ".join(f"L{k}={v}" for k, v in r.level_histogram.items()))
+        for c in r.caches:
+            lines.append(f"  LRU {c.cache:>10}: hit rate {100 * c.hit_rate:5.1f}%  "
+                         f"misses {c.misses:6d}  fetched {c.bytes_fetched / (1 << 20):8.2f} MB")
+    return "\n".join(lines)
+
+
+def _self_test() -> bool:
+    """Synthetic pyramid + a hand-built pan/zoom trace with known answers."""
+    pyr = Pyramid.synthetic(4096, 2048, 256)
+    if [(lv.w, lv.h) for lv in pyr.levels] != [(4096, 2048), (2048, 1024), (1024, 512),
+                                                (512, 256), (256, 128)]:
+        print(f"self-test FAIL: synthetic levels {pyr.levels}")
+        return False
+    # mag 0.7: L0 ratio .7 (err .3) beats L1 ratio 1.4 (err .4).
+    # mag 8: nothing is within tolerance, so the default L0 stays.
+    for mag, want in ((1.0, 0), (0.5, 1), (0.7, 0), (0.3, 2), (0.001, 4), (8.0, 0)):
+        if pick_level(pyr, mag) != want:
+            print(f"self-test FAIL: pick_level({mag}) = {pick_level(pyr, mag)}, want {want}")
+            return False
+    region = fetch_region(pyr, 1, ViewEvent(-100, 10, 1000, 501, 0.5))
+    if region != (0, 5, 450, 251):
+        print(f"self-test FAIL: fetch_region clamp gave {region}")
+        return False
+    if region_tiles(pyr, 1, region) != [(1, 0, 0), (1, 0, 1)]:
+        print("self-test FAIL: region_tiles count")
+        return False
+
+    lines = [
+        '{"t": 0, "srcRect": [0, 0, 640, 640], "mag": 1.0}',
+        '{"t": 20, "srcRect": [64, 0, 640, 640], "mag": 1.0}',      # dropped: debounced
+        '{"t": 200, "srcRect": [200, 0, 640, 640], "mag": 1.0}',
+        '{"t": 400, "srcRect": [0, 0, 640, 640], "mag": 1.0}',      # back: all hits
+        "[LazyImagePlus] view x=0 y=0 w=4096 h=2048 mag=0.0625",     # zoomed out: L4
+    ]
+    events = debounce(parse_trace("\n".join(lines)))
+    if len(events) != 4:
+        print(f"self-test FAIL: debounce kept {len(events)} events, want 4")
+        return False
+    big, small = LRUCache(max_tiles=64), LRUCache(max_tiles=4)
+    report = replay(pyr, events, [big, small])
+    # L0 640x640 at x=0 -> 3x3 tiles; at x=200 -> cols 0..3 -> 12 tiles;
+    # back to x=0 -> 9; whole image at L4 -> 1.
+    if report.tiles_requested != 9 + 12 + 9 + 1 or report.unique_tiles != 12 + 1:
+        print(f"self-test FAIL: tiles requested {report.tiles_requested}, "
+              f"unique {report.unique_tiles}")
+        return False
+    if big.hits != 9 + 9 or big.misses != 13:
+        print(f"self-test FAIL: 64-tile LRU hits={big.hits} misses={big.misses}")
+        return False
+    if report.caches[1].hit_rate >= report.caches[0].hit_rate:
+        print("self-test FAIL: a 4-tile cache should hit less than a 64-tile cache")
+        return False
+    if report.bytes_requested != report.tiles_requested * 256 * 256 - (256 * 256 - 256 * 128):
+        print(f"self-test FAIL: bytes_requested {report.bytes_requested}")
+        return False
+    print("tile_trace self-test: PASS")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", nargs="?", help="JSONL trace or console log with view lines")
+    parser.add_argument("--pyramid", help="build_pyramid.py output (dir, manifest.json or .ijtp)")
+    parser.add_argument("--base", type=int, nargs=2, metavar=("W", "H"), help="Synthetic level-0 size")
+    parser.add_argument("--tile-size", type=int, nargs="+", help="Tile size(s) to sweep (synthetic or override)")
+    parser.add_argument("--bits", type=int, default=8, choices=(8, 16, 32), help="Synthetic sample depth")
+    parser.add_argument("--raw", action="store_true", help="Count raw tiles instead of 8-bit display tiles")
+    parser.add_argument("--cache-tiles", type=int, nargs="+", help="LRU capacities in tiles")
+    parser.add_argument("--cache-mb", type=float, nargs="+", help="LRU capacities in MB")
+    parser.add_argument("--debounce-ms", type=float, default=FETCH_DEBOUNCE_MS, help="Fetch debounce for timed traces")
+    parser.add_argument("--json", dest="emit_json", action="store_true", help="Emit JSON instead of text")
+    parser.add_argument("--self-test", dest="self_test", action="store_true", help="Run built-in smoke test and exit")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        return 0 if _self_test() else 1
+    if not args.trace or not (args.pyramid or args.base):
+        parser.error("a trace and either --pyramid or --base are required")
+
+    try:
+        events = debounce(parse_trace(Path(args.trace).read_text(encoding="utf-8")),
+                          args.debounce_ms)
+        if args.pyramid:
+            manifest = load_manifest(Path(args.pyramid))
+            base = Pyramid.from_manifest(manifest, display=not args.raw)
+            pyramids = [base]
+            if args.tile_size:
+                w0, h0 = base.levels[0].w, base.levels[0].h
+                pyramids = [Pyramid.synthetic(w0, h0, t, 8 * base.bytes_per_sample)
+                            for t in args.tile_size]
+        else:
+            bits = args.bits if args.raw else 8
+            pyramids = [Pyramid.synthetic(args.base[0], args.base[1], t, bits)
+                        for t in (args.tile_size or [256])]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+
+    reports = [replay(p, events, make_caches(args.cache_tiles, args.cache_mb)) for p in pyramids]
+    if args.emit_json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+    else:
+        print(render_report(reports))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -121,10 +121,80 @@ class LocalFileSystemHandler {
   }
 }
 
+// Files on /github mounts at least this long are not downloaded when opened.
+// They are read on demand with HTTP Range requests in blocks of this size.
+const GITHUB_BLOCK_SIZE = 256 * 1024;
+const GITHUB_MAX_READAHEAD = 16; // blocks fetched ahead once reads turn sequential
+const GITHUB_CACHE_BLOCKS = 256; // resident blocks per open file (64 MB)
+
+// Parse an index.list: "dir:name" for directories, "name" or "name<TAB>size"
+// for files (size in bytes; null when the list predates the size column)
+function parseIndexList(text) {
+  const entries = [];
+  for (let line of text.split('\n')) {
+    line = line.trim();
+    if (line.length === 0) continue;
+    if (line.startsWith('dir:')) {
+      entries.push({ name: line.substring(4), type: 'directory', size: 0 });
+      continue;
+    }
+    const tab = line.lastIndexOf('\t');
+    const size = tab > 0 ? Number(line.substring(tab + 1)) : NaN;
+    if (Number.isInteger(size) && size >= 0) {
+      entries.push({ name: line.substring(0, tab), type: 'file', size: size });
+    } else {
+      entries.push({ name: line, type: 'file', size: null });
+    }
+  }
+  return entries;
+}
+
+// Bulk copy into a CheerpJ read buffer; byte-sized typed arrays get a memcpy
+function copyToReadBuffer(buf, off, src) {
+  if (ArrayBuffer.isView(buf) && buf.BYTES_PER_ELEMENT === 1) {
+    new Uint8Array(buf.buffer, buf.byteOffset + off, src.length).set(src);
+  } else {
+    for (let i = 0; i < src.length; i++) {
+      buf[off + i] = src[i];
+    }
+  }
+}
+
 // GitHub File System Handler for HTTP-based access to GitHub repositories
 class GitHubFileSystemHandler {
   constructor() {
     this.repos = new Map(); // Map of mountPath -> {owner, repo, branch}
+    this.rawBase = 'https://raw.githubusercontent.com'; // tools/range_server.py stands in for it locally
+    this.indexLists = new Map(); // directory path -> Promise of parseIndexList() entries
+    this.stats = { requests: 0, bytes: 0 }; // HTTP GETs issued and body bytes received
+  }
+
+  rawUrl(repoInfo) {
+    return `${this.rawBase}/${repoInfo.owner}/${repoInfo.repo}/${repoInfo.branch}/${repoInfo.filePath}`;
+  }
+
+  // index.list of a directory, fetched once; rejects when there is none
+  getIndexList(dirPath) {
+    if (!this.indexLists.has(dirPath)) {
+      const entries = this.getFileContent(`${dirPath}/index.list`)
+        .then(content => (content ? parseIndexList(new TextDecoder().decode(content)) : null));
+      entries.catch(() => this.indexLists.delete(dirPath));
+      this.indexLists.set(dirPath, entries);
+    }
+    return this.indexLists.get(dirPath);
+  }
+
+  // Entry for path in its parent's index.list, or null
+  async getIndexEntry(path) {
+    const repoInfo = this.parseRepoFromPath(path);
+    if (!repoInfo || !repoInfo.filePath) return null;
+    const slash = path.lastIndexOf('/');
+    try {
+      const entries = await this.getIndexList(path.substring(0, slash));
+      return (entries || []).find(e => e.name === path.substring(slash + 1)) || null;
+    } catch (err) {
+      return null;
+    }
   }
 
   async mountRepo(owner, repo, branch) {
@@ -210,29 +280,10 @@ class GitHubFileSystemHandler {
       const indexListPath = `${path}/index.list`;
       console.log('[listDirectory] Checking for index.list at:', indexListPath);
 
-      const indexContent = await this.getFileContent(indexListPath);
-      if (indexContent) {
-        // Parse index.list - supports type prefixes
-        // Format: "dir:dirname" for directories, "filename" for files
-        const text = new TextDecoder().decode(indexContent);
-        const entries = [];
-
-        text.split('\n').forEach(line => {
-          line = line.trim();
-          if (line.length === 0) return;
-
-          // Check for type prefix
-          if (line.startsWith('dir:')) {
-            const dirName = line.substring(4);
-            entries.push(dirName);
-          } else {
-            // No prefix = file
-            entries.push(line);
-          }
-        });
-
+      const entries = await this.getIndexList(path);
+      if (entries) {
         console.log('[listDirectory] Using index.list with', entries.length, 'entries');
-        return entries;
+        return entries.map(e => e.name);
       }
     } catch (indexErr) {
       // index.list doesn't exist or couldn't be read
@@ -283,20 +334,10 @@ class GitHubFileSystemHandler {
         console.log('[getTypeFromParentIndexList] Verifying ancestor exists:', ancestorName, 'in', ancestorParentFullPath);
 
         try {
-          const ancestorIndexPath = `${ancestorParentFullPath}/index.list`;
-          const ancestorIndexContent = await this.getFileContent(ancestorIndexPath);
-
-          if (ancestorIndexContent) {
-            const text = new TextDecoder().decode(ancestorIndexContent);
-            let ancestorExists = false;
-
-            for (const line of text.split('\n')) {
-              const trimmedLine = line.trim();
-              if (trimmedLine === `dir:${ancestorName}`) {
-                ancestorExists = true;
-                break;
-              }
-            }
+          const ancestorEntries = await this.getIndexList(ancestorParentFullPath);
+
+          if (ancestorEntries) {
+            const ancestorExists = ancestorEntries.some(e => e.type === 'directory' && e.name === ancestorName);
 
             if (!ancestorExists) {
               console.log('[getTypeFromParentIndexList] Ancestor directory not found in index.list:', ancestorName);
@@ -321,30 +362,13 @@ class GitHubFileSystemHandler {
 
     // All ancestors verified, now check the parent's index.list for our file
     try {
-      const indexListPath = `${parentFullPath}/index.list`;
-      const indexContent = await this.getFileContent(indexListPath);
-
-      if (indexContent) {
-        const text = new TextDecoder().decode(indexContent);
-
-        // Check each line for our filename
-        for (const line of text.split('\n')) {
-          const trimmedLine = line.trim();
-          if (trimmedLine.length === 0) continue;
-
-          if (trimmedLine.startsWith('dir:')) {
-            const dirName = trimmedLine.substring(4);
-            if (dirName === fileName) {
-              console.log('[getTypeFromParentIndexList] Found as directory in index.list');
-              return 'directory';
-            }
-          } else {
-            // No prefix = file
-            if (trimmedLine === fileName) {
-              console.log('[getTypeFromParentIndexList] Found as file in index.list');
-              return 'file';
-            }
-          }
+      const entries = await this.getIndexList(parentFullPath);
+
+      if (entries) {
+        const entry = entries.find(e => e.name === fileName);
+        if (entry) {
+          console.log(`[getTypeFromParentIndexList] Found as ${entry.type} in index.list`);
+          return entry.type;
         }
 
         // Not found in index.list = doesn't exist
@@ -376,8 +400,18 @@ class GitHubFileSystemHandler {
         size: 0
       };
     } else if (typeFromIndex === 'file') {
-      // Found as file in index.list - make HEAD request to get size
-      const url = `https://raw.githubusercontent.com/${repoInfo.owner}/${repoInfo.repo}/${repoInfo.branch}/${repoInfo.filePath}`;
+      const url = this.rawUrl(repoInfo);
+      const entry = await this.getIndexEntry(path);
+      if (entry && entry.size !== null) {
+        // index.list carries the size - no HEAD request
+        return {
+          type: 'file',
+          size: entry.size,
+          downloadUrl: url
+        };
+      }
+
+      // Found as file in an index.list without sizes - make HEAD request to get size
       console.log('[getFileInfo] Found as file in index.list, making HEAD request for size:', url);
 
       try {
@@ -408,7 +442,7 @@ class GitHubFileSystemHandler {
       // Fall back to HEAD request
       console.log('[getFileInfo] Parent has no index.list, falling back to HEAD request');
 
-      const url = `https://raw.githubusercontent.com/${repoInfo.owner}/${repoInfo.repo}/${repoInfo.branch}/${repoInfo.filePath}`;
+      const url = this.rawUrl(repoInfo);
       console.log('[getFileInfo] Making HEAD request to:', url);
 
       try {
@@ -439,7 +473,7 @@ class GitHubFileSystemHandler {
 
     try {
       // Use raw.githubusercontent.com for direct file download
-      const url = `https://raw.githubusercontent.com/${repoInfo.owner}/${repoInfo.repo}/${repoInfo.branch}/${repoInfo.filePath}`;
+      const url = this.rawUrl(repoInfo);
       const response = await fetch(url);
 
       if (!response.ok) {
@@ -448,6 +482,8 @@ class GitHubFileSystemHandler {
 
       const arrayBuffer = await response.arrayBuffer();
       const data = new Uint8Array(arrayBuffer);
+      this.stats.requests++;
+      this.stats.bytes += data.length;
 
       return data;
     } catch (err) {
@@ -456,6 +492,153 @@ class GitHubFileSystemHandler {
     }
   }
 
+  // Set up fileData for on-demand reads of url; nothing is downloaded yet
+  openRanged(fileData, url) {
+    fileData.url = url;
+    fileData.blocks = new Map(); // block number -> Uint8Array, or Promise while in flight (LRU order)
+    fileData.nextOffset = 0;     // where a sequential read would continue
+    fileData.readahead = 0;      // blocks fetched past the end of a read
+  }
+
+  async fetchRange(url, start, end) {
+    const response = await fetch(url, { headers: { Range: `bytes=${start}-${end}` } });
+    if (response.status !== 206 && response.status !== 200) {
+      throw new Error(`Failed to fetch ${url} bytes ${start}-${end}: ${response.status}`);
+    }
+    const data = new Uint8Array(await response.arrayBuffer());
+    this.stats.requests++;
+    this.stats.bytes += data.length;
+    // A 200 means the server ignored Range and sent the whole file
+    return { data: data, whole: response.status !== 206 };
+  }
+
+  // Fetch blocks first..last with one Range request
+  fetchBlocks(fileData, first, last) {
+    const start = first * GITHUB_BLOCK_SIZE;
+    const end = Math.min((last + 1) * GITHUB_BLOCK_SIZE, fileData.length) - 1;
+    const blocks = fileData.blocks;
+    const pending = this.fetchRange(fileData.url, start, end).then(({ data, whole }) => {
+      if (whole) {
+        fileData.data = data;
+        fileData.blocks = new Map();
+        return;
+      }
+      if (data.length !== end - start + 1) {
+        throw new Error(`Range ${start}-${end} of ${fileData.url} returned ${data.length} bytes`);
+      }
+      for (let k = first; k <= last; k++) {
+        const from = (k - first) * GITHUB_BLOCK_SIZE;
+        blocks.set(k, data.subarray(from, from + GITHUB_BLOCK_SIZE));
+      }
+    }).catch(err => {
+      for (let k = first; k <= last; k++) blocks.delete(k);
+      throw err;
+    });
+    for (let k = first; k <= last; k++) blocks.set(k, pending);
+    return pending;
+  }
+
+  // Make blocks first..last resident. Missing runs that start by `last` are
+  // fetched together with the read-ahead window up to `ahead` and awaited.
+  // Runs entirely past `last` are prefetched in the background once less
+  // than half the window is left, so read-ahead requests stay large.
+  async loadBlocks(fileData, first, last, ahead) {
+    const waits = [];
+    let k = first;
+    while (k <= ahead) {
+      const block = fileData.blocks.get(k);
+      if (block instanceof Uint8Array) {
+        k++;
+        continue;
+      }
+      if (block) {
+        if (k <= last) waits.push(block);
+        k++;
+        continue;
+      }
+      if (k > last && 2 * (k - last) > ahead - last + 1) break;
+      const runStart = k;
+      while (k <= ahead && !fileData.blocks.has(k)) k++;
+      const pending = this.fetchBlocks(fileData, runStart, k - 1);
+      if (runStart <= last) {
+        waits.push(pending);
+      } else {
+        pending.catch(err => console.warn('[githubFS] read-ahead failed:', err.message));
+      }
+    }
+    await Promise.all(waits);
+  }
+
+  // Drop least recently used blocks beyond GITHUB_CACHE_BLOCKS
+  evictBlocks(fileData) {
+    let excess = fileData.blocks.size - GITHUB_CACHE_BLOCKS;
+    for (const [k, block] of fileData.blocks) {
+      if (excess <= 0) break;
+      if (block instanceof Uint8Array) {
+        fileData.blocks.delete(k);
+        excess--;
+      }
+    }
+  }
+
+  // Copy file bytes [fileOffset, fileOffset + len) into buf at off from
+  // resident blocks. Returns false if one was evicted meanwhile.
+  copyBlocks(fileData, fileOffset, buf, off, len) {
+    let done = 0;
+    while (done < len) {
+      const k = Math.floor((fileOffset + done) / GITHUB_BLOCK_SIZE);
+      const block = fileData.blocks.get(k);
+      if (!(block instanceof Uint8Array)) return false;
+      fileData.blocks.delete(k);
+      fileData.blocks.set(k, block);
+      const from = fileOffset + done - k * GITHUB_BLOCK_SIZE;
+      const n = Math.min(len - done, block.length - from);
+      copyToReadBuffer(buf, off + done, block.subarray(from, from + n));
+      done += n;
+    }
+    return true;
+  }
+
+  // Read len bytes at fileOffset of a file set up by openRanged() into buf.
+  // Resolves to the byte count, or -14 (EFAULT) if CheerpJ invalidated buf.
+  async readRange(fileData, fileOffset, buf, off, len) {
+    const first = Math.floor(fileOffset / GITHUB_BLOCK_SIZE);
+    const last = Math.floor((fileOffset + len - 1) / GITHUB_BLOCK_SIZE);
+    // The read-ahead window doubles each time sequential reads move on to a
+    // new block; a seek resets it
+    if (fileOffset !== fileData.nextOffset) {
+      fileData.readahead = 0;
+    } else if (last !== Math.floor((fileOffset - 1) / GITHUB_BLOCK_SIZE)) {
+      fileData.readahead = Math.min(Math.max(1, fileData.readahead * 2), GITHUB_MAX_READAHEAD);
+    }
+    fileData.nextOffset = fileOffset + len;
+    const lastBlock = Math.ceil(fileData.length / GITHUB_BLOCK_SIZE) - 1;
+    const ahead = Math.min(last + fileData.readahead, lastBlock);
+
+    for (;;) {
+      try {
+        await this.loadBlocks(fileData, first, last, ahead);
+      } catch (err) {
+        // Any Range failure (network, CORS, 403/416/5xx, short body): fall
+        // back to one full download; if that fails too, the read fails
+        console.warn('[githubFS] Range request failed, downloading whole file:', err.message);
+        const response = await fetch(fileData.url);
+        if (!response.ok) throw new Error(`Failed to fetch ${fileData.url}: ${response.status}`);
+        fileData.data = new Uint8Array(await response.arrayBuffer());
+        this.stats.requests++;
+        this.stats.bytes += fileData.data.length;
+      }
+      if (buf.length === 0) return -14;
+      if (fileData.data) {
+        copyToReadBuffer(buf, off, fileData.data.subarray(fileOffset, fileOffset + len));
+        return len;
+      }
+      if (this.copyBlocks(fileData, fileOffset, buf, off, len)) break;
+    }
+    this.evictBlocks(fileData);
+    return len;
+  }
+
   isDirectory(path) {
     const repoInfo = this.parseRepoFromPath(path);
     if (!repoInfo) {
@@ -573,6 +756,178 @@ class NativeFileSystemHandler {
   }
 }
 
+// Saves are streamed out while ImageJ writes them instead of being held in
+// memory until close. Writes land in SAVE_CHUNK_SIZE chunks; once more than
+// SAVE_RESIDENT_CHUNKS are resident, the lowest is handed to the sink.
+const SAVE_CHUNK_SIZE = 1024 * 1024;
+const SAVE_RESIDENT_CHUNKS = 4;
+
+class StreamingSave {
+  constructor(sink) {
+    this.sink = sink;          // NativeSaveSink or DownloadSaveSink
+    this.resident = new Map(); // chunk index -> Uint8Array still being written
+    this.sealed = new Set();   // chunk indexes already handed to the sink
+    this.length = 0;
+    this.queue = Promise.resolve();
+  }
+
+  // Run op after everything queued before it, so the sink sees writes in order
+  enqueue(op) {
+    const result = this.queue.then(op);
+    this.queue = result.catch(() => {});
+    return result;
+  }
+
+  // Resolves once data (owned by the caller's copy) is resident or in the sink
+  write(fileOffset, data) {
+    return this.enqueue(() => this.writeChunks(fileOffset, data));
+  }
+
+  async writeChunks(fileOffset, data) {
+    let done = 0;
+    while (done < data.length) {
+      const pos = fileOffset + done;
+      const index = Math.floor(pos / SAVE_CHUNK_SIZE);
+      const from = pos - index * SAVE_CHUNK_SIZE;
+      const n = Math.min(data.length - done, SAVE_CHUNK_SIZE - from);
+      if (this.sealed.has(index) && this.sink.patch) {
+        // Seek back into data already streamed out, e.g. a header fixup
+        await this.sink.patch(pos, data.subarray(done, done + n));
+      } else {
+        let chunk = this.resident.get(index);
+        if (!chunk) {
+          chunk = this.sealed.has(index) ? await this.sink.get(index) : new Uint8Array(SAVE_CHUNK_SIZE);
+          this.sealed.delete(index);
+          this.resident.set(index, chunk);
+        }
+        chunk.set(data.subarray(done, done + n), from);
+      }
+      done += n;
+    }
+    this.length = Math.max(this.length, fileOffset + data.length);
+    while (this.resident.size > SAVE_RESIDENT_CHUNKS) {
+      await this.seal(Math.min(...this.resident.keys()));
+    }
+  }
+
+  async seal(index) {
+    const chunk = this.resident.get(index);
+    this.resident.delete(index);
+    this.sealed.add(index);
+    await this.sink.put(index, chunk);
+  }
+
+  close() {
+    return this.enqueue(async () => {
+      for (const index of [...this.resident.keys()].sort((a, b) => a - b)) {
+        await this.seal(index);
+      }
+      await this.sink.close(this.length);
+    });
+  }
+
+  abort() {
+    this.resident.clear();
+    return this.sink.abort();
+  }
+}
+
+// Streams a save into a file of a mounted native folder through the File
+// System Access API; chunks are written at their position as they are sealed
+class NativeSaveSink {
+  constructor(handle) {
+    this.handle = handle;
+    this.writable = null;
+  }
+
+  async open() {
+    if (!this.writable) {
+      this.writable = await this.handle.createWritable();
+    }
+    return this.writable;
+  }
+
+  async put(index, chunk) {
+    await this.patch(index * SAVE_CHUNK_SIZE, chunk);
+  }
+
+  async patch(position, data) {
+    const writable = await this.open();
+    await writable.write({ type: 'write', position: position, data: data });
+  }
+
+  async close(length) {
+    const writable = await this.open();
+    await writable.truncate(length); // sealed chunks are whole; drop the tail of the last one
+    await writable.close();
+  }
+
+  async abort() {
+    if (this.writable) {
+      await this.writable.abort();
+    }
+  }
+}
+
+// Collects a save as one Blob per chunk and downloads them as a single Blob
+// on close. Blob storage is managed by the browser (and spilled to disk for
+// large saves), so the tab holds only the resident chunks.
+class DownloadSaveSink {
+  constructor(fileName) {
+    this.fileName = fileName;
+    this.parts = [];
+  }
+
+  async put(index, chunk) {
+    this.parts[index] = new Blob([chunk]);
+  }
+
+  async get(index) {
+    return new Uint8Array(await this.parts[index].arrayBuffer());
+  }
+
+  async close(length) {
+    const count = Math.ceil(length / SAVE_CHUNK_SIZE);
+    const parts = [];
+    for (let i = 0; i < count; i++) {
+      const part = this.parts[i] || new Blob([new Uint8Array(SAVE_CHUNK_SIZE)]); // never written: zeros
+      parts.push(i === count - 1 ? part.slice(0, length - i * SAVE_CHUNK_SIZE) : part);
+    }
+    this.parts = [];
+    downloadBlob(new Blob(parts), this.fileName);
+  }
+
+  async abort() {
+    this.parts = [];
+  }
+}
+
+function downloadBlob(blob, fileName) {
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = fileName;
+
+  document.body.appendChild(a);
+  a.click();
+  document.body.removeChild(a);
+  URL.revokeObjectURL(url);
+
+  console.log(`✓ Downloaded file: ${fileName} (${blob.size} bytes)`);
+}
+
+// Copy len bytes of a CheerpJ write buffer into a new Uint8Array
+function copyFromWriteBuffer(buf, off, len) {
+  if (ArrayBuffer.isView(buf) && buf.BYTES_PER_ELEMENT === 1) {
+    return new Uint8Array(buf.buffer, buf.byteOffset + off, len).slice();
+  }
+  const data = new Uint8Array(len);
+  for (let i = 0; i < len; i++) {
+    data[i] = buf[off + i];
+  }
+  return data;
+}
+
 // Custom read function for native files (also used for local FS)
 function nativeFileReadAsync(fileData, fileOffset, buf, off, len, flags, cb) {
     if (fileOffset >= fileData.length) {
@@ -667,6 +1022,7 @@ function createNativeFileSystemPatches() {
     const originalIdbStatAsync = IdbOps.statAsync;
     const originalIdbListAsync = IdbOps.listAsync;
     const originalIdbMakeFileData = IdbOps.makeFileData;
+    const originalIdbWriteAsync = IdbInodeOps.writeAsync;
     const originalIdbCommitFileData = IdbInodeOps.close;
 
     // Patch IndexedDB folder operations to use native file system
@@ -866,8 +1222,9 @@ function createNativeFileSystemPatches() {
                         );
                         fileData.mount = mp.inodeOps;
                         fileData.dirty = 1;
-                        fileData.chunks = [];
                         fileData.nativeHandle = handle;
+                        // Stream writes into the file instead of buffering it all until close
+                        fileData.save = new StreamingSave(new NativeSaveSink(handle));
                         cb(fileData);
                     } else {
                         console.error('Failed to create file handle:', nativePath);
@@ -885,68 +1242,17 @@ function createNativeFileSystemPatches() {
         return originalIdbMakeFileData.call(this, mp, path, mode, uid, gid, cb);
     }
 
-    function patchedIdbCommitFileData(fileData, cb) {
-        if (fileData.nativeHandle && fileData.dirty) {
-            // Write to native file system
-            const writeToNativeFile = async () => {
-                try {
-                    const writable = await fileData.nativeHandle.createWritable();
-
-                    // Reconstruct file content from chunks
-                    const chunkSize = 1024 * 1024;
-
-                    // Calculate actual file size based on chunks
-                    let totalSize = 0;
-                    for (let i = 0; i < fileData.chunks.length; i++) {
-                        if (fileData.chunks[i]) {
-                            totalSize += chunkSize;
-                        }
-                    }
-
-                    // Use either the calculated size or fileData.length, whichever is larger
-                    const fileSize = Math.max(totalSize, fileData.length);
-
-                    if (fileSize === 0 && fileData.chunks.length === 0) {
-                        // Empty file, just close it
-                        await writable.write(new Uint8Array(0));
-                        await writable.close();
-                        console.log('Wrote empty file to native file system');
-                        fileData.dirty = 0;
-                        cb();
-                        return;
-                    }
-
-                    // Write chunks directly
-                    for (let i = 0; i < fileData.chunks.length; i++) {
-                        const chunk = fileData.chunks[i];
-                        if (chunk) {
-                            // For the last chunk, only write the actual data length
-                            if (i === fileData.chunks.length - 1 && fileData.length > 0) {
-                                const lastChunkSize = fileData.length - (i * chunkSize);
-                                if (lastChunkSize > 0 && lastChunkSize < chunkSize) {
-                                    await writable.write(chunk.subarray(0, lastChunkSize));
-                                } else {
-                                    await writable.write(chunk);
-                                }
-                            } else {
-                                await writable.write(chunk);
-                            }
-                        }
-                    }
-
-                    await writable.close();
-                    console.log('Successfully wrote file to native file system:', fileData.path, 'size:', fileData.length);
-
-                    fileData.dirty = 0;
-                    cb();
-                } catch (err) {
-                    console.error('Error writing to native file:', fileData.path, err);
-                    cb();
-                }
-            };
+    function patchedIdbWriteAsync(fileData, fileOffset, buf, off, len, cb) {
+        if (fileData.save) {
+            return localFileWriteAsync(fileData, fileOffset, buf, off, len, cb);
+        }
+        return originalIdbWriteAsync.call(this, fileData, fileOffset, buf, off, len, cb);
+    }
 
-            writeToNativeFile();
-            return;
+    function patchedIdbCommitFileData(fileData, cb) {
+        // Native files (write mode streams through fileData.save) never go to IndexedDB
+        if (fileData.save || fileData.nativeHandle) {
+            return localFileClose(fileData, cb);
         }
 
         // Fall back to original implementation
@@ -957,6 +1263,7 @@ function createNativeFileSystemPatches() {
     IdbOps.statAsync = patchedIdbStatAsync;
     IdbOps.listAsync = patchedIdbListAsync;
     IdbOps.makeFileData = patchedIdbMakeFileData;
+    IdbInodeOps.writeAsync = patchedIdbWriteAsync;
     IdbInodeOps.close = patchedIdbCommitFileData;
 
     // Expose to global window object for CheerpJ runtime access
@@ -971,6 +1278,7 @@ function createNativeFileSystemPatches() {
     window.patchedIdbStatAsync = patchedIdbStatAsync;
     window.patchedIdbListAsync = patchedIdbListAsync;
     window.patchedIdbMakeFileData = patchedIdbMakeFileData;
+    window.patchedIdbWriteAsync = patchedIdbWriteAsync;
     window.patchedIdbCommitFileData = patchedIdbCommitFileData;
 }
 
@@ -1080,7 +1388,7 @@ function localMakeFileData(mp, path, mode, uid, gid, cb) {
 
         return cb(fileData);
     } else if (mode === "w" || mode === "r+") {
-        // Write mode - create in-memory file that will trigger download on close
+        // Write mode - stream the file into a download that starts on close
         console.log('Creating writable file for download:', localPath);
 
         const fileData = new CheerpJFileData(
@@ -1095,7 +1403,7 @@ function localMakeFileData(mp, path, mode, uid, gid, cb) {
         );
 
         // Initialize for writing
-        fileData.chunks = [];
+        fileData.save = new StreamingSave(new DownloadSaveSink(localPath.split('/').pop() || 'downloaded-file'));
         fileData.dirty = 0;
         fileData.mount = mp.inodeOps; // Use LocalInodeOps which includes write and close
 
@@ -1116,7 +1424,8 @@ var LocalOps = {
     unlinkAsync: null
 };
 
-// Write function for local files - accumulates data in memory
+// Write function for local files (also used for native saves) - streams
+// the data to fileData.save; cb runs once the sink has accepted it
 function localFileWriteAsync(fileData, fileOffset, buf, off, len, cb) {
     // Check if callback is provided
     if (typeof cb !== 'function') {
@@ -1124,34 +1433,14 @@ function localFileWriteAsync(fileData, fileOffset, buf, off, len, cb) {
         return 0; // Return 0 bytes written on error
     }
 
-    // Initialize chunks array if not present
-    if (!fileData.chunks) {
-        fileData.chunks = [];
+    if (!fileData.save) {
+        console.error('[localFileWriteAsync] File not opened for writing:', fileData.path);
+        return cb(-1);
     }
 
-    const chunkSize = 1024 * 1024; // 1MB chunks
-
-    // Write data to chunks
-    let bytesWritten = 0;
-    while (bytesWritten < len) {
-        const currentOffset = fileOffset + bytesWritten;
-        const chunkIndex = Math.floor(currentOffset / chunkSize);
-        const chunkOffset = currentOffset % chunkSize;
-
-        // Create chunk if it doesn't exist
-        if (!fileData.chunks[chunkIndex]) {
-            fileData.chunks[chunkIndex] = new Uint8Array(chunkSize);
-        }
-
-        const chunk = fileData.chunks[chunkIndex];
-        const bytesToWrite = Math.min(len - bytesWritten, chunkSize - chunkOffset);
-
-        // Copy data to chunk
-        for (let i = 0; i < bytesToWrite; i++) {
-            chunk[chunkOffset + i] = buf[off + bytesWritten + i];
-        }
-
-        bytesWritten += bytesToWrite;
+    // cheerpOS keeps file offsets as int32, which wrap negative past 2 GB
+    if (fileOffset < 0) {
+        fileOffset = fileOffset >>> 0;
     }
 
     // Update file length
@@ -1162,10 +1451,14 @@ function localFileWriteAsync(fileData, fileOffset, buf, off, len, cb) {
 
     fileData.dirty = 1; // Mark as modified
 
-    return cb(bytesWritten);
+    fileData.save.write(fileOffset, copyFromWriteBuffer(buf, off, len)).then(() => cb(len)).catch(err => {
+        console.error('[localFileWriteAsync] Error writing', fileData.path, err);
+        cb(-1);
+    });
 }
 
-// Close function for local files - triggers download
+// Close function for local files (also used for native saves) - finishes
+// the save: triggers the download, or commits the native file
 function localFileClose(fileData, cb) {
     // Check if callback is provided
     if (typeof cb !== 'function') {
@@ -1173,48 +1466,23 @@ function localFileClose(fileData, cb) {
         return; // Just return without calling cb
     }
 
-    // Only trigger download if the file was written to
-    if (fileData.dirty && fileData.chunks && fileData.chunks.length > 0) {
-
-        // Reconstruct file content from chunks
-        const chunkSize = 1024 * 1024;
-        const totalSize = fileData.length;
-        const fileContent = new Uint8Array(totalSize);
-
-        let offset = 0;
-        for (let i = 0; i < fileData.chunks.length && offset < totalSize; i++) {
-            const chunk = fileData.chunks[i];
-            if (chunk) {
-                const bytesToCopy = Math.min(chunkSize, totalSize - offset);
-                fileContent.set(chunk.subarray(0, bytesToCopy), offset);
-                offset += bytesToCopy;
-            }
-        }
-
-        // Trigger browser download
-        const blob = new Blob([fileContent]);
-        const url = URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-
-        // Extract filename from path (remove /local/ prefix)
-        const fileName = fileData.path.split('/').pop() || 'downloaded-file';
-        a.download = fileName;
-
-        document.body.appendChild(a);
-        a.click();
-        document.body.removeChild(a);
-        URL.revokeObjectURL(url);
-
-        console.log(`✓ Downloaded file: ${fileName} (${totalSize} bytes)`);
-
-        // Clear the file data to free memory
-        fileData.chunks = null;
-        fileData.dirty = 0;
-        fileData.length = 0;
+    const save = fileData.save;
+    if (!save || !fileData.dirty) {
+        return cb();
     }
 
-    return cb();
+    // Only finish the save if the file was written to
+    fileData.save = null;
+    fileData.dirty = 0;
+    save.close().then(() => {
+        console.log('Saved', fileData.path, 'size:', save.length);
+        cb();
+    }).catch(err => {
+        console.error('Error saving file:', fileData.path, err);
+        // Discard the partial file, then fail the close like a failed write
+        save.abort().catch(abortErr => console.error('Error aborting save:', fileData.path, abortErr))
+            .then(() => cb(-1));
+    });
 }
 
 var LocalInodeOps = {
@@ -1239,15 +1507,22 @@ function githubFileReadAsync(fileData, fileOffset, buf, off, len, flags, cb) {
 
     // Use the direct data that was loaded from GitHub
     if (fileData.data) {
-        for (let i = 0; i < len; i++) {
-            buf[off + i] = fileData.data[fileOffset + i];
-        }
+        copyToReadBuffer(buf, off, fileData.data.subarray(fileOffset, fileOffset + len));
         return cb(len);
     }
 
-    // If data is not available, return 0 (this shouldn't happen)
+    // Large file: fetch the blocks covering the read with Range requests
+    if (fileData.blocks) {
+        window.githubFS.readRange(fileData, fileOffset, buf, off, len).then(cb).catch(err => {
+            console.error('Error reading GitHub file range:', err);
+            cb(-1);  // 0 would read as end of file
+        });
+        return;
+    }
+
+    // Neither data nor blocks (this shouldn't happen)
     console.error('GitHub file data not available');
-    return cb(0);
+    return cb(-1);
 }
 
 // GitHub file system operations
@@ -1504,6 +1779,23 @@ function githubMakeFileData(mp, path, mode, uid, gid, cb) {
                 return cb(fileData);
             }
 
+            // A large file of known size is read on demand with Range requests
+            if (info.size >= GITHUB_BLOCK_SIZE) {
+                const fileData = new CheerpJFileData(
+                    mp,
+                    path,
+                    info.size,
+                    Math.floor(Math.random() * 1000000),
+                    CheerpJFileData.S_IFREG | 0o444, // Read-only
+                    Math.floor(Date.now() / 1000),
+                    uid,
+                    gid
+                );
+                window.githubFS.openRanged(fileData, info.downloadUrl);
+                fileData.mount = mp.inodeOps;
+                return cb(fileData);
+            }
+
             // It's a file - fetch the content
             return window.githubFS.getFileContent(githubPath).then(data => {
                 if (!data) {